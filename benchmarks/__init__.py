@@ -0,0 +1,3 @@
+"""
+性能基准测试（合成数据集、计时与基线比较），见 benchmarks/README.md
+"""
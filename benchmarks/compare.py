@@ -0,0 +1,118 @@
+"""
+基准结果比较
+
+用法：
+    python -m benchmarks.compare baseline.json bench.json
+    python -m benchmarks.compare baseline.json bench.json --threshold 0.15 --min-time 0.002
+
+按中位数计算 当前/基线 比值：超过 1 + threshold 记为变慢，低于 1 - threshold 记为变快。
+两次中位数都小于 min-time 的基准视为噪声不参与判定。
+存在变慢项或当前结果中有运行失败的基准时退出码为 1，便于在 CI 中使用；
+当前结果缺失的基准（例如用 --only 只跑了一部分）只列出，不算变慢。
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_MIN_TIME = 0.001
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD,
+            min_time: float = DEFAULT_MIN_TIME) -> List[Dict[str, Any]]:
+    """
+    Returns:
+        [{'name', 'baseline', 'current', 'ratio', 'status'}]，status 为
+        'regression' / 'improvement' / 'unchanged' / 'noise' / 'missing' / 'new'
+    """
+    base_results = baseline.get('results', {})
+    cur_results = current.get('results', {})
+    rows = []
+    for name in sorted(set(base_results) | set(cur_results)):
+        base = base_results.get(name)
+        cur = cur_results.get(name)
+        if cur is None:
+            rows.append({'name': name, 'baseline': base['median'], 'current': None, 'ratio': None,
+                         'status': 'missing'})
+            continue
+        if base is None:
+            rows.append({'name': name, 'baseline': None, 'current': cur['median'], 'ratio': None, 'status': 'new'})
+            continue
+        b, c = base['median'], cur['median']
+        ratio = c / b if b > 0 else float('inf')
+        if max(b, c) < min_time:
+            status = 'noise'
+        elif ratio > 1.0 + threshold:
+            status = 'regression'
+        elif ratio < 1.0 - threshold:
+            status = 'improvement'
+        else:
+            status = 'unchanged'
+        rows.append({'name': name, 'baseline': b, 'current': c, 'ratio': ratio, 'status': status})
+    return rows
+
+
+def comparability_warnings(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """规模/种子/运行环境不同的提示（结果仍会比较）"""
+    warnings = []
+    for key in ('size', 'seed'):
+        if baseline.get(key) != current.get(key):
+            warnings.append(f"{key} 不同: {baseline.get(key)} → {current.get(key)}")
+    base_env, cur_env = baseline.get('environment', {}), current.get('environment', {})
+    for key in ('machine', 'cpu_count', 'python'):
+        if base_env.get(key) != cur_env.get(key):
+            warnings.append(f"环境 {key} 不同: {base_env.get(key)} → {cur_env.get(key)}")
+    if base_env.get('versions') != cur_env.get('versions'):
+        warnings.append(f"依赖版本不同: {base_env.get('versions')} → {cur_env.get('versions')}")
+    return warnings
+
+
+def _ms(value) -> str:
+    return '-' if value is None else f"{value * 1e3:.1f}"
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    marks = {'regression': '变慢', 'improvement': '变快', 'unchanged': '', 'noise': '(噪声)',
+             'missing': '缺失', 'new': '新增'}
+    lines = [f"{'基准':<44} {'基线(ms)':>10} {'当前(ms)':>10} {'比值':>7}  状态"]
+    for r in rows:
+        ratio = '-' if r['ratio'] is None else f"{r['ratio']:.2f}x"
+        lines.append(f"{r['name']:<44} {_ms(r['baseline']):>10} {_ms(r['current']):>10} {ratio:>7}  "
+                     f"{marks[r['status']]}")
+    return "\n".join(lines)
+
+
+def summarize(rows: List[Dict[str, Any]]) -> Tuple[int, int]:
+    regressions = sum(r['status'] == 'regression' for r in rows)
+    improvements = sum(r['status'] == 'improvement' for r in rows)
+    return regressions, improvements
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="比较两份基准结果")
+    parser.add_argument('baseline', help="基线结果 JSON")
+    parser.add_argument('current', help="当前结果 JSON")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="判定变慢/变快的相对阈值")
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME, help="低于该耗时（秒）视为噪声")
+    args = parser.parse_args(argv)
+
+    baseline, current = load(args.baseline), load(args.current)
+    for warning in comparability_warnings(baseline, current):
+        print(f"[compare] 警告: {warning}")
+    rows = compare(baseline, current, args.threshold, args.min_time)
+    print(format_table(rows))
+    for name, error in current.get('errors', {}).items():
+        print(f"[compare] {name} 运行失败: {error}")
+    regressions, improvements = summarize(rows)
+    print(f"[compare] 变慢 {regressions} 项，变快 {improvements} 项（阈值 ±{args.threshold:.0%}）")
+    return 1 if regressions or current.get('errors') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+基准测试用的确定性合成数据集
+
+所有数据由 seed 决定（np.random.default_rng + SyntheticDataGenerator.generate_batch），
+同一 (规模, seed) 在任何机器上生成完全相同的文件，便于与基线结果比较。
+
+- make_pure_components：若干条洛伦兹峰组成的纯组分光谱
+- write_spectra_folder：按“组名-编号.txt”写出的两列文本光谱（模拟实验数据文件夹）
+- write_library：RRUFF 风格的库文件（## 头部 + 升序波数 + ##END=），可附带近似重复的变体
+- mixture_set：混合光谱矩阵与真实比例（NMF / 2D-COS / 组合匹配使用）
+"""
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.core.generators import SyntheticDataGenerator
+
+
+@dataclass(frozen=True)
+class WorkloadSize:
+    """一档数据规模"""
+    name: str
+    n_points: int          # 每条光谱的点数
+    n_files: int           # 数据文件夹中的文件数
+    n_groups: int          # 文件分组数
+    n_library: int         # 库光谱条数
+    n_components: int      # 纯组分数
+    n_mixtures: int        # 混合光谱条数（NMF）
+    n_project_arrays: int  # 项目文件中的数组数
+
+
+SIZES: Dict[str, WorkloadSize] = {
+    'small': WorkloadSize('small', n_points=1000, n_files=40, n_groups=4, n_library=60,
+                          n_components=4, n_mixtures=200, n_project_arrays=20),
+    'medium': WorkloadSize('medium', n_points=2000, n_files=200, n_groups=10, n_library=300,
+                           n_components=6, n_mixtures=1000, n_project_arrays=100),
+    'large': WorkloadSize('large', n_points=4000, n_files=1000, n_groups=20, n_library=1500,
+                          n_components=8, n_mixtures=5000, n_project_arrays=400),
+}
+
+X_MIN = 100.0
+X_MAX = 3200.0
+
+
+def wavenumbers(n_points: int) -> np.ndarray:
+    """降序波数轴（与 read_data 的约定一致）"""
+    return np.linspace(X_MAX, X_MIN, n_points)
+
+
+def _lorentz_peaks(x: np.ndarray, rng: np.random.Generator, n_peaks: int) -> np.ndarray:
+    centers = rng.uniform(X_MIN + 50, X_MAX - 50, n_peaks)
+    widths = rng.uniform(4.0, 25.0, n_peaks)
+    heights = rng.uniform(0.1, 1.0, n_peaks)
+    y = np.zeros_like(x)
+    for c, w, h in zip(centers, widths, heights):
+        y += h * w ** 2 / ((x - c) ** 2 + w ** 2)
+    return y / y.max()
+
+
+def make_pure_components(n_components: int, n_points: int, seed: int = 0,
+                         n_peaks: Tuple[int, int] = (5, 15)) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Returns:
+        (x, {name: y})：x 为降序波数轴
+    """
+    rng = np.random.default_rng(seed)
+    x = wavenumbers(n_points)
+    return x, {f"comp{i}": _lorentz_peaks(x, rng, int(rng.integers(n_peaks[0], n_peaks[1] + 1)))
+               for i in range(n_components)}
+
+
+def mixture_set(n_samples: int, n_components: int, n_points: int, seed: int = 0,
+                noise_level: float = 0.01, baseline_drift: float = 0.05) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """
+    由 SyntheticDataGenerator 生成混合光谱
+
+    Returns:
+        (x, X (n_samples, n_points), ratios (n_samples, n_components), component_names)
+    """
+    x, components = make_pure_components(n_components, n_points, seed)
+    generator = SyntheticDataGenerator(x, random_state=seed)
+    generator.pure_spectra.update(components)
+    ratio_ranges = {name: (0.0, 1.0) for name in components}
+    X_blocks, ratio_blocks = [], []
+    for X, ratios in generator.iter_batches(n_samples, ratio_ranges, noise_level=noise_level,
+                                            baseline_drift=baseline_drift, complexity=0.5, random_state=seed):
+        X_blocks.append(X)
+        ratio_blocks.append(ratios)
+    return x, np.vstack(X_blocks), np.vstack(ratio_blocks), list(components)
+
+
+def _write_two_columns(path: str, x: np.ndarray, y: np.ndarray, header: str = '', footer: str = ''):
+    with open(path, 'w', encoding='utf-8') as f:
+        if header:
+            f.write(header)
+        np.savetxt(f, np.column_stack([x, y]), fmt='%.4f', delimiter='\t')
+        if footer:
+            f.write(footer)
+
+
+def write_spectra_folder(folder: str, size: WorkloadSize, seed: int = 0) -> List[str]:
+    """
+    写出实验数据文件夹：n_groups 组，每组文件为 组名-编号.txt，两列（波数\\t强度），带一行表头
+
+    Returns:
+        文件路径列表（按写出顺序）
+    """
+    os.makedirs(folder, exist_ok=True)
+    x, X, _, _ = mixture_set(size.n_files, size.n_components, size.n_points, seed)
+    X = X * 1000.0 + 50.0  # 模拟计数值与暗电流
+    paths = []
+    for i, y in enumerate(X):
+        group = i % size.n_groups
+        path = os.path.join(folder, f"G{group:02d}-{i // size.n_groups + 1:03d}.txt")
+        _write_two_columns(path, x, y, header="Wavenumber\tIntensity\n")
+        paths.append(path)
+    return paths
+
+
+def write_library(folder: str, size: WorkloadSize, seed: int = 0, variants: int = 1) -> List[str]:
+    """
+    写出 RRUFF 风格的库：每个文件含 ##NAMES= 等头部行、升序波数两列数据、##END= 结尾
+
+    Args:
+        variants: 每种矿物的文件数。大于 1 时额外写出近似重复的变体（不同激光/晶向：
+                  轻微峰位偏移、强度缩放、噪声），模拟完整 RRUFF 镜像中的重复光谱；
+                  第一份与 variants=1 时完全相同
+    Returns:
+        文件路径列表
+    """
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(seed + 1)
+    x = wavenumbers(size.n_points)[::-1]
+    paths = []
+    for i in range(size.n_library):
+        y = _lorentz_peaks(x, rng, int(rng.integers(3, 12))) * 1000.0
+        y += rng.normal(0.0, 5.0, x.shape)
+        name = f"Mineral{i:04d}__R{100000 + i}__Raman__532__0__processed"
+        path = os.path.join(folder, name + ".txt")
+        header = f"##NAMES=Mineral{i:04d}\n##RRUFFID=R{100000 + i}\n##LOCALITY=synthetic\n"
+        _write_two_columns(path, x, np.maximum(y, 0.0), header=header, footer="##END=\n")
+        paths.append(path)
+        variant_rng = np.random.default_rng((seed, i))  # 变体使用独立随机流，不影响主库
+        for v in range(1, variants):
+            shift = variant_rng.uniform(-1.5, 1.5)
+            y_v = np.interp(x, x + shift, y) * variant_rng.uniform(0.6, 1.4)
+            y_v += variant_rng.normal(0.0, 8.0, x.shape)
+            laser = (532, 785, 633, 514)[v % 4]
+            name = f"Mineral{i:04d}__R{100000 + i}-{v}__Raman__{laser}__{v * 45}__processed"
+            path = os.path.join(folder, name + ".txt")
+            header = f"##NAMES=Mineral{i:04d}\n##RRUFFID=R{100000 + i}-{v}\n##LOCALITY=synthetic\n"
+            _write_two_columns(path, x, np.maximum(y_v, 0.0), header=header, footer="##END=\n")
+            paths.append(path)
+    return paths
+
+
+def project_sections(size: WorkloadSize, seed: int = 0) -> Dict[str, dict]:
+    """
+    项目文件各部分（结构与 ProjectSaveManager 收集的 data_states / other_info 类似，数组为主）
+    """
+    rng = np.random.default_rng(seed + 2)
+    x = wavenumbers(size.n_points)
+    spectra = {f"G{i % size.n_groups:02d}-{i:03d}": {'x': x, 'y': rng.random(size.n_points)}
+               for i in range(size.n_project_arrays)}
+    return {
+        'data_states': {'spectra': spectra, 'nmf': {'W': rng.random((size.n_mixtures, size.n_components)),
+                                                    'H': rng.random((size.n_components, size.n_points))}},
+        'other_info': {'folder': 'benchmark', 'params': {'als_lam': 10000, 'als_p': 0.005}},
+    }
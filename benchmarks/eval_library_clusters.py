@@ -0,0 +1,169 @@
+"""
+库聚类检索评估：与逐条检索相比的 top-k 质量与耗时
+
+用法：
+    python -m benchmarks.eval_library_clusters                      # 合成库（medium，每种矿物 4 个变体）
+    python -m benchmarks.eval_library_clusters --size large --variants 6 --queries 50
+    python -m benchmarks.eval_library_clusters --library-folder /path/to/rruff --queries 100
+    python -m benchmarks.eval_library_clusters --threshold 0.95 --margin 0.2 -o eval.json
+
+查询光谱取自库中随机光谱：加噪声、轻微峰位偏移，部分查询再混入第二条光谱（已知答案）。
+对每条查询分别做逐条检索（use_clusters=False）与聚类检索（use_clusters=True），统计：
+
+- recall@k：聚类检索的前 k 名与逐条检索前 k 名的重合比例（1.0 表示完全一致）
+- top-1 一致率、前 k 名最低分之差
+- 每条查询的平均耗时与加速比、实际打分的光谱条数
+存在 recall@k < 1 的查询时退出码为 1。
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import datasets  # noqa: E402
+from src.core.library_clusters import DEFAULT_THRESHOLD  # noqa: E402
+from src.core.rruff_loader import RRUFFLibraryLoader, PeakMatcher, CLUSTER_SCORE_MARGIN  # noqa: E402
+
+
+def make_queries(loader: RRUFFLibraryLoader, n_queries: int, seed: int, mixture_fraction: float = 0.3):
+    """[(x, y, peak_wavenumbers, 来源名称列表)]"""
+    rng = np.random.default_rng(seed)
+    library = loader.library_spectra
+    names = library.names
+    queries = []
+    for _ in range(n_queries):
+        row = int(rng.integers(len(names)))
+        x = library.x(row)
+        y = library.y(row)
+        y = np.interp(x, x + rng.uniform(-1.0, 1.0), y) if x[0] < x[-1] else y
+        sources = [names[row]]
+        if rng.random() < mixture_fraction:
+            other = int(rng.integers(len(names)))
+            ox, oy = library.x(other), library.y(other)
+            if ox[0] > ox[-1]:
+                ox, oy = ox[::-1], oy[::-1]
+            y = 0.7 * y + 0.3 * np.interp(x, ox, oy, left=0.0, right=0.0)
+            sources.append(names[other])
+        scale = float(np.max(np.abs(y))) or 1.0
+        y = y + rng.normal(0.0, 0.01 * scale, y.shape)
+        _, peak_x = loader._detect_peaks(x, y, peak_detection_params=loader.peak_detection_params or None)
+        queries.append((x, y, peak_x, sources))
+    return queries
+
+
+def evaluate(loader: RRUFFLibraryLoader, queries, top_k: int, threshold: float,
+             margin: float = CLUSTER_SCORE_MARGIN) -> Dict[str, Any]:
+    build_start = time.perf_counter()
+    clusters = loader.compact_library(threshold)
+    build_time = time.perf_counter() - build_start
+
+    exhaustive = PeakMatcher(tolerance=5.0, use_clusters=False)
+    clustered = PeakMatcher(tolerance=5.0, use_clusters=True, cluster_threshold=threshold,
+                            cluster_margin=margin)
+    per_query: List[Dict[str, Any]] = []
+    for x, y, peaks, sources in queries:
+        counted = {'n': 0}
+
+        def count(current, total, name):
+            counted['n'] = current
+
+        t0 = time.perf_counter()
+        full = exhaustive.find_best_matches(x, y, peaks, loader, top_k=top_k)
+        t1 = time.perf_counter()
+        fast = clustered.find_best_matches(x, y, peaks, loader, top_k=top_k, progress_callback=count)
+        t2 = time.perf_counter()
+        full_names = [m['name'] for m in full]
+        fast_names = [m['name'] for m in fast]
+        per_query.append({
+            'sources': sources,
+            'recall': len(set(full_names) & set(fast_names)) / max(len(full_names), 1),
+            'top1_agree': bool(full_names[:1] == fast_names[:1]),
+            'kth_score_delta': (full[-1]['match_score'] - fast[-1]['match_score']) if full and fast else 0.0,
+            'exhaustive_time': t1 - t0,
+            'clustered_time': t2 - t1,
+            'scored': counted['n'],
+        })
+
+    exhaustive_time = float(np.mean([q['exhaustive_time'] for q in per_query]))
+    clustered_time = float(np.mean([q['clustered_time'] for q in per_query]))
+    return {
+        'n_spectra': clusters.n_spectra,
+        'n_clusters': clusters.n_clusters,
+        'threshold': threshold,
+        'margin': margin,
+        'top_k': top_k,
+        'n_queries': len(per_query),
+        'cluster_build_time': build_time,
+        'mean_recall': float(np.mean([q['recall'] for q in per_query])),
+        'min_recall': float(np.min([q['recall'] for q in per_query])),
+        'top1_agreement': float(np.mean([q['top1_agree'] for q in per_query])),
+        'max_kth_score_delta': float(np.max([q['kth_score_delta'] for q in per_query])),
+        'mean_scored': float(np.mean([q['scored'] for q in per_query])),
+        'exhaustive_time': exhaustive_time,
+        'clustered_time': clustered_time,
+        'speedup': exhaustive_time / clustered_time if clustered_time > 0 else float('inf'),
+        'queries': per_query,
+    }
+
+
+def format_report(result: Dict[str, Any]) -> str:
+    return "\n".join([
+        f"库光谱 {result['n_spectra']} 条 → {result['n_clusters']} 个簇 "
+        f"(阈值 {result['threshold']}, 裕量 {result['margin']}, 构建 {result['cluster_build_time'] * 1e3:.0f} ms)",
+        f"查询 {result['n_queries']} 条, top_k={result['top_k']}",
+        f"recall@k: 平均 {result['mean_recall']:.3f}, 最低 {result['min_recall']:.3f}; "
+        f"top-1 一致率 {result['top1_agreement']:.3f}; 第 k 名分数最大差 {result['max_kth_score_delta']:.4f}",
+        f"每条查询打分光谱数: {result['mean_scored']:.0f} / {result['n_spectra']}",
+        f"平均耗时: 逐条 {result['exhaustive_time'] * 1e3:.1f} ms, 聚类 {result['clustered_time'] * 1e3:.1f} ms, "
+        f"加速 {result['speedup']:.2f}x",
+    ])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="评估 RRUFF 库聚类检索的 top-k 质量与加速比")
+    parser.add_argument('--library-folder', help="真实 RRUFF 库文件夹（不指定则生成合成库）")
+    parser.add_argument('--size', default='medium', choices=sorted(datasets.SIZES), help="合成库规模")
+    parser.add_argument('--variants', type=int, default=4, help="合成库中每种矿物的变体数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--queries', type=int, default=30, help="查询条数")
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="聚类相关系数阈值")
+    parser.add_argument('--margin', type=float, default=CLUSTER_SCORE_MARGIN, help="聚类检索展开裕量")
+    parser.add_argument('-o', '--output', help="结果 JSON 路径")
+    args = parser.parse_args(argv)
+
+    work_dir = None
+    folder = args.library_folder
+    if not folder:
+        work_dir = tempfile.mkdtemp(prefix='spectra_eval_')
+        folder = os.path.join(work_dir, 'library')
+        datasets.write_library(folder, datasets.SIZES[args.size], args.seed, variants=args.variants)
+    try:
+        loader = RRUFFLibraryLoader()
+        loader.load_library(folder, preprocess_params={})
+        queries = make_queries(loader, args.queries, args.seed)
+        result = evaluate(loader, queries, args.top_k, args.threshold, args.margin)
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(format_report(result))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"[eval] 结果已写入 {args.output}")
+    return 0 if result['min_recall'] >= 1.0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,414 @@
+"""
+性能基准测试（合成数据，离线可运行）
+
+用法（在仓库根目录）：
+    python -m benchmarks.run_benchmarks --size small --repeat 5 --output bench.json
+    python -m benchmarks.run_benchmarks --only preprocess --only rruff
+    python -m benchmarks.run_benchmarks --list
+    python -m benchmarks.run_benchmarks --profile trace.json   # 同时导出 Chrome Trace（见 src.utils.profiling）
+
+每个基准先预热 warmup 次，再计时 repeat 次，记录中位数/最小值/均值/标准差（秒）。
+每次计时前调用各自的 setup 清空相关缓存（peak_cache、group_stats_cache、2D-COS 引擎等），
+保证测到的是冷路径而不是缓存命中。
+结果与基线比较见 benchmarks/compare.py。
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cached_property
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import datasets  # noqa: E402
+
+SCHEMA_VERSION = 1
+
+# 全部预处理步骤开启时的参数（与 DataPreProcessor.preprocess_spectrum 的键一致）
+FULL_PREPROCESS_PARAMS = {
+    'is_be_correction': True, 'be_temp': 300.0,
+    'is_smoothing': True, 'smoothing_window': 15, 'smoothing_poly': 3,
+    'is_baseline_als': True, 'als_lam': 10000, 'als_p': 0.005,
+    'normalization_mode': 'max',
+    'global_transform_mode': '对数变换 (Log)', 'global_log_base': '10', 'global_log_offset': 1.0,
+    'is_quadratic_fit': True, 'quadratic_degree': 2,
+    'is_derivative': True,
+}
+
+
+@dataclass
+class Benchmark:
+    name: str
+    group: str
+    run: Callable[['Workload'], Any]
+    setup: Optional[Callable[['Workload'], Any]] = None
+    items: Optional[Callable[['Workload'], int]] = None   # 单次运行处理的条目数（用于换算每条耗时）
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, group: str, setup: Optional[Callable] = None, items: Optional[Callable] = None):
+    """注册基准：被装饰函数接收 Workload，执行一次被测操作"""
+    def decorator(fn):
+        BENCHMARKS.append(Benchmark(name, group, fn, setup, items))
+        return fn
+    return decorator
+
+
+class Workload:
+    """一次运行共享的数据集（按需生成，写入临时目录）"""
+
+    def __init__(self, size: datasets.WorkloadSize, seed: int, work_dir: str):
+        self.size = size
+        self.seed = seed
+        self.work_dir = work_dir
+
+    @cached_property
+    def spectra_files(self) -> List[str]:
+        return datasets.write_spectra_folder(os.path.join(self.work_dir, 'spectra'), self.size, self.seed)
+
+    @cached_property
+    def library_folder(self) -> str:
+        folder = os.path.join(self.work_dir, 'library')
+        datasets.write_library(folder, self.size, self.seed)
+        return folder
+
+    @cached_property
+    def mixtures(self):
+        return datasets.mixture_set(self.size.n_mixtures, self.size.n_components, self.size.n_points, self.seed)
+
+    @cached_property
+    def stage_spectra(self) -> np.ndarray:
+        """预处理基准使用的光谱（计数值量级）"""
+        x, X, _, _ = self.mixtures
+        return X[:min(100, X.shape[0])] * 1000.0 + 50.0
+
+    @cached_property
+    def library_loader(self):
+        from src.core.rruff_loader import RRUFFLibraryLoader
+        loader = RRUFFLibraryLoader()
+        loader.load_library(self.library_folder, preprocess_params={})
+        return loader
+
+    @cached_property
+    def query(self):
+        """查询光谱：两条库光谱的混合（已知答案），返回 (x, y, peak_wavenumbers)"""
+        loader = self.library_loader
+        names = sorted(loader.library_spectra)
+        a, b = loader.library_spectra[names[1]], loader.library_spectra[names[len(names) // 2]]
+        x = np.asarray(a['x'])
+        y = 0.6 * np.asarray(a['y']) + 0.4 * np.interp(x[::-1], np.asarray(b['x'])[::-1], np.asarray(b['y'])[::-1])[::-1]
+        y = y + np.random.default_rng(self.seed).normal(0.0, 0.005 * y.max(), y.shape)
+        _, peak_x = loader._detect_peaks(x, y)
+        return x, y, peak_x
+
+    @cached_property
+    def cos_matrix(self):
+        """2D-COS 扰动矩阵：按第一组分比例排序后分成 n_groups 组取平均"""
+        x, X, ratios, _ = self.mixtures
+        order = np.argsort(ratios[:, 0])
+        groups = np.array_split(order, max(2, self.size.n_groups))
+        return x, np.vstack([X[idx].mean(axis=0) for idx in groups])
+
+    @cached_property
+    def project_path(self) -> str:
+        return os.path.join(self.work_dir, 'project.h5')
+
+
+# ---------------------------------------------------------------------- 缓存清理
+def _clear_caches(_ctx=None):
+    from src.core.peak_cache import peak_cache
+    from src.core.group_stats import group_stats_cache
+    peak_cache.clear()
+    group_stats_cache.clear()
+
+
+# ---------------------------------------------------------------------- 数据读取
+@benchmark('io.read_data', 'io', items=lambda ctx: len(ctx.spectra_files))
+def bench_read_data(ctx: Workload):
+    from src.ui.controllers import DataController
+    controller = DataController()
+    for path in ctx.spectra_files:
+        controller.read_data(path, -1)
+
+
+@benchmark('io.group_average', 'io', setup=_clear_caches, items=lambda ctx: len(ctx.spectra_files))
+def bench_group_average(ctx: Workload):
+    from src.ui.controllers import DataController
+    DataController().load_and_average_data(ctx.spectra_files, 3, -1)
+
+
+# ---------------------------------------------------------------------- 预处理（逐步骤）
+def _stage(name: str, fn: Callable[[np.ndarray, np.ndarray], Any]):
+    def run(ctx: Workload):
+        x = ctx.mixtures[0]
+        for y in ctx.stage_spectra:
+            fn(x, y)
+    benchmark(f'preprocess.{name}', 'preprocess', items=lambda ctx: len(ctx.stage_spectra))(run)
+
+
+def _register_stages():
+    from src.core.preprocessor import DataPreProcessor as P
+    _stage('bose_einstein', lambda x, y: P.apply_bose_einstein_correction(x, y, 300.0))
+    _stage('smoothing', lambda x, y: P.apply_smoothing(y, 15, 3))
+    _stage('baseline_als', lambda x, y: P.apply_baseline_als(y, 10000, 0.005))
+    _stage('baseline_poly', lambda x, y: P.apply_baseline_correction(x, y, 50, 3))
+    _stage('normalization', lambda x, y: P.apply_normalization(y, 'max'))
+    _stage('snv', lambda x, y: P.apply_snv(y))
+    _stage('log_transform', lambda x, y: P.apply_log_transform(y, 10, 1.0))
+    _stage('quadratic_fit', lambda x, y: P.apply_quadratic_fit(x, y, 2))
+    _stage('derivative', lambda x, y: np.gradient(np.gradient(y, x), x))
+    _stage('full_pipeline', lambda x, y: P.preprocess_spectrum(x, y, FULL_PREPROCESS_PARAMS))
+
+
+_register_stages()
+
+
+# ---------------------------------------------------------------------- RRUFF 库
+@benchmark('rruff.load_library', 'rruff', setup=_clear_caches, items=lambda ctx: ctx.size.n_library)
+def bench_load_library(ctx: Workload):
+    from src.core.rruff_loader import RRUFFLibraryLoader
+    RRUFFLibraryLoader().load_library(ctx.library_folder, preprocess_params={})
+
+
+@benchmark('rruff.find_best_matches', 'rruff', setup=_clear_caches, items=lambda ctx: ctx.size.n_library)
+def bench_find_best_matches(ctx: Workload):
+    from src.core.rruff_loader import PeakMatcher
+    x, y, peaks = ctx.query
+    PeakMatcher(tolerance=5.0).find_best_matches(x, y, peaks, ctx.library_loader, top_k=10)
+
+
+@benchmark('rruff.find_best_matches_clustered', 'rruff', setup=_clear_caches,
+           items=lambda ctx: ctx.size.n_library)
+def bench_find_best_matches_clustered(ctx: Workload):
+    from src.core.rruff_loader import PeakMatcher
+    x, y, peaks = ctx.query
+    ctx.library_loader.compact_library()  # 聚类结果按库版本缓存，只在首次调用时构建
+    PeakMatcher(tolerance=5.0, use_clusters=True).find_best_matches(x, y, peaks, ctx.library_loader, top_k=10)
+
+
+@benchmark('rruff.find_best_combination_matches', 'rruff', setup=_clear_caches,
+           items=lambda ctx: ctx.size.n_library)
+def bench_find_combination(ctx: Workload):
+    from src.core.rruff_loader import PeakMatcher
+    x, y, peaks = ctx.query
+    PeakMatcher(tolerance=5.0).find_best_combination_matches(x, y, peaks, ctx.library_loader,
+                                                             max_phases=2, top_k=5)
+
+
+# ---------------------------------------------------------------------- 分析
+@benchmark('analysis.nmf', 'analysis', items=lambda ctx: ctx.size.n_mixtures)
+def bench_nmf(ctx: Workload):
+    from sklearn.decomposition import NMF
+    _, X, _, _ = ctx.mixtures
+    NMF(n_components=ctx.size.n_components, init='nndsvda', max_iter=200, tol=1e-4,
+        random_state=0).fit_transform(X)
+
+
+@benchmark('analysis.batch_nnls', 'analysis', items=lambda ctx: ctx.size.n_mixtures)
+def bench_batch_nnls(ctx: Workload):
+    from src.core.batch_nnls import batch_nnls
+    _, X, _, names = ctx.mixtures
+    _, components = datasets.make_pure_components(len(names), ctx.size.n_points, ctx.seed)
+    batch_nnls(np.vstack([components[n] for n in names]), X)
+
+
+@benchmark('analysis.two_dcos', 'analysis', items=lambda ctx: ctx.cos_matrix[1].shape[0])
+def bench_two_dcos(ctx: Workload):
+    from src.core.two_dcos import TwoDCOSEngine
+    x, X = ctx.cos_matrix
+    result = TwoDCOSEngine().compute(X, x, datasets.X_MIN, datasets.X_MAX, sigma=1.0)
+    np.asarray(result.Phi)
+    np.asarray(result.Psi)
+
+
+@benchmark('analysis.two_dcos_moving_window', 'analysis', items=lambda ctx: ctx.cos_matrix[1].shape[0])
+def bench_two_dcos_moving(ctx: Workload):
+    from src.core.two_dcos import TwoDCOSEngine
+    x, X = ctx.cos_matrix
+    TwoDCOSEngine().moving_window(X, x, datasets.X_MIN, datasets.X_MAX, window=3)
+
+
+# ---------------------------------------------------------------------- 项目保存/加载
+def _remove_project(ctx: Workload):
+    if os.path.exists(ctx.project_path):
+        os.remove(ctx.project_path)
+
+
+def _project_sections(ctx: Workload):
+    return datasets.project_sections(ctx.size, ctx.seed)
+
+
+@benchmark('project.save', 'project', setup=_remove_project, items=lambda ctx: ctx.size.n_project_arrays)
+def bench_project_save(ctx: Workload):
+    from src.core.project_hdf5 import write_project
+    write_project(ctx.project_path, {'version': 'benchmark', 'note': ''}, _project_sections(ctx))
+
+
+def _ensure_project(ctx: Workload):
+    if not os.path.exists(ctx.project_path):
+        bench_project_save(ctx)
+
+
+@benchmark('project.load', 'project', setup=_ensure_project, items=lambda ctx: ctx.size.n_project_arrays)
+def bench_project_load(ctx: Workload):
+    from src.core.project_hdf5 import materialize, read_project
+    materialize(read_project(ctx.project_path))
+
+
+# ---------------------------------------------------------------------- 运行与输出
+def environment() -> Dict[str, Any]:
+    """运行环境（比较结果时用于判断两份结果是否可比）"""
+    versions = {}
+    for module in ('numpy', 'scipy', 'sklearn', 'pandas', 'h5py'):
+        try:
+            versions[module] = __import__(module).__version__
+        except Exception:
+            versions[module] = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'versions': versions,
+        'git_commit': commit,
+    }
+
+
+def time_benchmark(bench: Benchmark, ctx: Workload, repeat: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        if bench.setup:
+            bench.setup(ctx)
+        bench.run(ctx)
+    times = []
+    for _ in range(repeat):
+        if bench.setup:
+            bench.setup(ctx)
+        start = time.perf_counter()
+        bench.run(ctx)
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    result = {
+        'group': bench.group,
+        'median': median,
+        'min': min(times),
+        'mean': statistics.fmean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'times': times,
+    }
+    if bench.items:
+        n = int(bench.items(ctx))
+        result['items'] = n
+        result['per_item'] = median / n if n else None
+    return result
+
+
+def select(only: Optional[List[str]], skip: Optional[List[str]]) -> List[Benchmark]:
+    """按名称前缀或组名筛选"""
+    def matches(bench: Benchmark, patterns: List[str]) -> bool:
+        return any(bench.name.startswith(p) or bench.group == p for p in patterns)
+    selected = [b for b in BENCHMARKS if not only or matches(b, only)]
+    return [b for b in selected if not skip or not matches(b, skip)]
+
+
+def run(size: str = 'small', seed: int = 0, repeat: int = 5, warmup: int = 1,
+        only: Optional[List[str]] = None, skip: Optional[List[str]] = None,
+        work_dir: Optional[str] = None, verbose: bool = True) -> Dict[str, Any]:
+    """运行所选基准，返回结果字典（结构见模块文档）"""
+    workload_size = datasets.SIZES[size]
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='spectra_bench_')
+    ctx = Workload(workload_size, seed, work_dir)
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    try:
+        for bench in select(only, skip):
+            try:
+                results[bench.name] = time_benchmark(bench, ctx, repeat, warmup)
+            except Exception as e:
+                errors[bench.name] = f"{type(e).__name__}: {e}"
+                if verbose:
+                    print(f"[bench] {bench.name}: 失败 {errors[bench.name]}")
+                continue
+            if verbose:
+                r = results[bench.name]
+                print(f"[bench] {bench.name}: median {r['median'] * 1e3:.1f} ms (min {r['min'] * 1e3:.1f}, ±{r['stdev'] * 1e3:.1f})")
+    finally:
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        'schema': SCHEMA_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'size': size,
+        'workload': workload_size.__dict__,
+        'seed': seed,
+        'repeat': repeat,
+        'warmup': warmup,
+        'environment': environment(),
+        'results': results,
+        'errors': errors,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="光谱处理性能基准（合成数据）")
+    parser.add_argument('--size', choices=sorted(datasets.SIZES), default='small', help="数据规模")
+    parser.add_argument('--seed', type=int, default=0, help="数据随机种子")
+    parser.add_argument('--repeat', type=int, default=5, help="计时次数")
+    parser.add_argument('--warmup', type=int, default=1, help="预热次数")
+    parser.add_argument('--only', action='append', help="只运行名称前缀或组名匹配的基准（可重复）")
+    parser.add_argument('--skip', action='append', help="跳过名称前缀或组名匹配的基准（可重复）")
+    parser.add_argument('--output', '-o', help="结果 JSON 路径（默认 benchmarks/results/<size>-<时间>.json）")
+    parser.add_argument('--work-dir', help="数据集目录（默认临时目录，运行结束后删除）")
+    parser.add_argument('--profile', metavar='TRACE', help="开启 profiler 并导出 Chrome Trace")
+    parser.add_argument('--list', action='store_true', help="列出所有基准")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for bench in BENCHMARKS:
+            print(f"{bench.group:<10} {bench.name}")
+        return 0
+
+    if args.profile:
+        from src.utils.profiling import profiler
+        profiler.enable()
+
+    report = run(args.size, args.seed, max(1, args.repeat), max(0, args.warmup), args.only, args.skip,
+                 args.work_dir)
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"{args.size}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"[bench] 结果已写入 {output}")
+
+    if args.profile:
+        from src.utils.profiling import profiler
+        profiler.export_chrome_trace(args.profile)
+        print(f"[bench] Chrome Trace 已写入 {args.profile}")
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,6 +13,10 @@ from PyQt6.QtGui import QColor, QPainter, QPainterPath, QLinearGradient
 
 
 def main():
+    # 启动计时与导入耗时统计（供“启动性能报告”面板查看）
+    from src.utils import startup
+    startup.import_timer.install()
+    
     # 立即创建应用程序（不导入其他模块）
     app = QApplication(sys.argv)
     
@@ -228,9 +232,9 @@ def main():
     
     # 强制处理事件以确保启动画面立即显示
     app.processEvents()
+    startup.mark("启动画面已显示")
     
     # 现在开始加载模块（所有导入都在启动画面显示之后）
-    import time
     import matplotlib
     matplotlib.use('QtAgg')
     
@@ -266,15 +270,9 @@ def main():
     from src.ui.canvas import MplCanvas
     from src.ui.windows.plot_window import MplPlotWindow
     
-    # 步骤4: 加载窗口模块
+    # 步骤4: 加载窗口模块（大型分析窗口、sklearn、torch 延迟到首次使用，并在主窗口显示后后台预热）
     splash.update_progress(3, "正在加载窗口模块...")
     from src.ui.windows.nmf_window import NMFResultWindow
-    from src.ui.windows.quantitative_window import QuantitativeResultWindow, QuantitativeAnalysisDialog
-    from src.ui.windows.nmf_validation_window import NMFFitValidationWindow
-    from src.ui.windows.two_dcos_window import TwoDCOSWindow, TwoDCOSMarginalPlotWindow
-    from src.ui.windows.classification_window import ClassificationResultWindow
-    from src.ui.windows.dae_window import DAEComparisonWindow
-    from src.ui.windows.batch_plot_window import BatchPlotWindow
     
     # 步骤5: 加载分析工具
     splash.update_progress(4, "正在加载分析工具...")
@@ -288,6 +286,7 @@ def main():
     try:
         from src.ui.main_window import SpectraConfigDialog
         window = SpectraConfigDialog()
+        startup.mark("主窗口已创建")
     except Exception as e:
         splash.close()
         from PyQt6.QtWidgets import QMessageBox
@@ -302,8 +301,6 @@ def main():
     
     # 步骤8: 完成
     splash.update_progress(7, "准备就绪！")
-    # 短暂延迟以便用户看到完成状态
-    time.sleep(0.3)
     
     # 关闭启动画面
     splash.close()
@@ -350,11 +347,20 @@ def main():
         QMessageBox.critical(None, "显示错误", error_msg)
         traceback.print_exc()
         sys.exit(1)
+    
+    # 事件循环开始处理后即可交互；随后在后台预热延迟加载的模块
+    from PyQt6.QtCore import QTimer
+    def _on_interactive():
+        startup.mark("主窗口可交互")
+        startup.start_warmup()
+    QTimer.singleShot(0, _on_interactive)
 
     # 运行应用程序
     sys.exit(app.exec())
 
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # 打包后的可执行文件中，spawn 启动的进程池子进程从这里进入
     main()
 
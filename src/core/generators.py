@@ -4,16 +4,24 @@ import pandas as pd
 
 
 class SyntheticDataGenerator:
-    """合成数据生成器：基于纯组分光谱生成混合光谱（用于数据增强）"""
-    def __init__(self, wavenumbers):
+    """
+    合成数据生成器：基于纯组分光谱生成混合光谱（用于数据增强）
+
+    批量接口（generate_batch / iter_batches）整批向量化生成：
+    分数偏移/拉伸用批量线性插值，多项式基线用 Vandermonde 矩阵广播，随机数来自 np.random.Generator。
+    iter_batches 按批从 SeedSequence 派生独立的随机流，同一 random_state 下结果与批的消费顺序、线程无关。
+    """
+    def __init__(self, wavenumbers, random_state=None):
         """
         Args:
             wavenumbers: 波数数组
+            random_state: 随机种子（None 表示不固定）
         """
         self.wavenumbers = wavenumbers
         self.common_x = wavenumbers  # 兼容性：支持两种命名
         self.pure_spectra = {}  # 存储纯组分光谱 {name: spectrum_array}
         self.pure_spectra_full = []  # 存储完整光谱信息 [(name, x, y), ...]
+        self.rng = np.random.default_rng(random_state)
     
     def load_pure_spectrum(self, file_path, name):
         """
@@ -108,8 +116,8 @@ class SyntheticDataGenerator:
         from scipy.interpolate import interp1d
         length = len(spectrum)
         original_indices = np.arange(length)
-        shift = np.random.uniform(-max_shift, max_shift)
-        stretch = np.random.uniform(1.0, max_stretch)
+        shift = self.rng.uniform(-max_shift, max_shift)
+        stretch = self.rng.uniform(1.0, max_stretch)
         center = length / 2.0
         shifted_indices = (original_indices - center) * stretch + center + shift
         
@@ -121,15 +129,15 @@ class SyntheticDataGenerator:
     def _add_selective_suppression(self, spectrum, suppression_prob=0.2, strength_range=(0.3, 0.8)):
         """选择性峰抑制：模拟部分峰被淹没或重叠的情况"""
         suppressed_spectrum = spectrum.copy()
-        suppression_mask = np.random.random(len(spectrum)) < suppression_prob
+        suppression_mask = self.rng.random(len(spectrum)) < suppression_prob
         if np.any(suppression_mask):
-            suppression_strength = np.random.uniform(strength_range[0], strength_range[1])
+            suppression_strength = self.rng.uniform(strength_range[0], strength_range[1])
             suppressed_spectrum[suppression_mask] *= suppression_strength
         return suppressed_spectrum
     
     def _add_noise(self, spectrum, noise_level=0.01):
         """添加高斯噪音"""
-        noise = np.random.normal(0, noise_level * np.max(spectrum), spectrum.shape)
+        noise = self.rng.normal(0, noise_level * np.max(spectrum), spectrum.shape)
         return spectrum + noise
     
     def generate_mixture(self, components, ratios, noise_level=0.01, drift_level=0.05, complexity=1.0):
@@ -155,20 +163,20 @@ class SyntheticDataGenerator:
             y_data = comp[2]  # 获取强度数据
             
             # [增强 1] 对矿物和有机物都应用随机偏移和拉伸
-            if np.random.random() < 0.5 * complexity:
+            if self.rng.random() < 0.5 * complexity:
                 y_data = self._add_shift_and_stretch(y_data, max_shift=2.0 * complexity)
             
             final_spectrum += y_data * ratio
         
         # [增强 2] 选择性峰抑制 (模拟信号淹没)
-        if np.random.random() < 0.3 * complexity:
+        if self.rng.random() < 0.3 * complexity:
             final_spectrum = self._add_selective_suppression(final_spectrum, suppression_prob=0.1 * complexity)
             
         # [增强 3] 基线漂移 (使用多项式基线，简化处理)
         if drift_level > 0:
             x = np.linspace(0, 1, len(self.wavenumbers))
             degree = int(10 * complexity) + 1  # 复杂度越高，多项式次数越高
-            coeffs = np.random.uniform(-drift_level, drift_level, degree + 1)
+            coeffs = self.rng.uniform(-drift_level, drift_level, degree + 1)
             baseline = np.polyval(coeffs, x)
             final_spectrum += baseline
             
@@ -200,12 +208,12 @@ class SyntheticDataGenerator:
         # 添加高斯噪声
         if noise_level > 0:
             max_intensity = np.max(np.abs(synthetic))
-            noise = np.random.normal(0, noise_level * max_intensity, len(synthetic))
+            noise = self.rng.normal(0, noise_level * max_intensity, len(synthetic))
             synthetic += noise
         
         # 添加基线漂移
         if baseline_drift > 0:
-            drift = np.random.uniform(-baseline_drift, baseline_drift) * np.ones_like(synthetic)
+            drift = self.rng.uniform(-baseline_drift, baseline_drift) * np.ones_like(synthetic)
             synthetic += drift
         
         # 确保非负
@@ -213,9 +221,149 @@ class SyntheticDataGenerator:
         
         return synthetic
     
-    def generate_batch(self, n_samples, ratio_ranges, noise_level=0.01, baseline_drift=0.0, complexity=1.0, use_advanced=True):
+    # ------------------------------------------------------------------ 向量化批量生成
+    
+    @staticmethod
+    def _batch_shift_and_stretch(y, m, rng, max_shift=3.0, max_stretch=1.005):
+        """
+        生成 m 条随机偏移与拉伸后的光谱（与 _add_shift_and_stretch 相同的线性插值与端点填充）
+        
+        Args:
+            y: 单条光谱 (n_points,)
+            m: 生成条数
+            rng: np.random.Generator
+        
+        Returns:
+            (m, n_points)
+        """
+        y = np.asarray(y, dtype=np.float64)
+        length = y.shape[0]
+        if length < 2:
+            return np.repeat(y[None, :], m, axis=0)
+        shift = rng.uniform(-max_shift, max_shift, (m, 1))
+        stretch = rng.uniform(1.0, max_stretch, (m, 1))
+        center = length / 2.0
+        positions = (np.arange(length) - center) * stretch
+        positions += center + shift
+        # 超出范围取端点值（等价于 interp1d 的 fill_value=(y[0], y[-1])）
+        np.clip(positions, 0, length - 1, out=positions)
+        left = np.minimum(positions.astype(np.intp), length - 2)
+        positions -= left                                     # 小数部分
+        y_left = y[left]
+        y_left += (y[left + 1] - y_left) * positions
+        return y_left
+    
+    @staticmethod
+    def _sample_ratios(n, ratio_ranges, rng):
+        """按范围均匀采样各组分比例并按行归一化（总和为1）→ (n, k)"""
+        bounds = np.array(list(ratio_ranges.values()), dtype=np.float64).reshape(-1, 2)
+        ratios = rng.uniform(bounds[:, 0], bounds[:, 1], (n, len(bounds)))
+        totals = ratios.sum(axis=1, keepdims=True)
+        return np.where(totals > 0, ratios / np.where(totals > 0, totals, 1.0), ratios)
+    
+    def _generate_mixture_batch(self, components, ratios, rng, noise_level=0.01, drift_level=0.05, complexity=1.0):
+        """generate_mixture 的整批版本：components (k, n_points)，ratios (n, k)"""
+        n = ratios.shape[0]
+        X = ratios @ components
+        
+        # [增强 1] 随机偏移和拉伸：只对被抽中的 (样本, 组分) 计算，叠加与原组分的差值
+        shift_mask = rng.random(ratios.shape) < 0.5 * complexity
+        for c in range(components.shape[0]):
+            rows = np.flatnonzero(shift_mask[:, c])
+            if rows.size == 0:
+                continue
+            delta = self._batch_shift_and_stretch(components[c], rows.size, rng, max_shift=2.0 * complexity)
+            delta -= components[c]
+            delta *= ratios[rows, c:c + 1]
+            X[rows] += delta
+        
+        # [增强 2] 选择性峰抑制
+        rows = np.flatnonzero(rng.random(n) < 0.3 * complexity)
+        if rows.size:
+            mask = rng.random((rows.size, X.shape[1])) < 0.1 * complexity
+            strength = rng.uniform(0.3, 0.8, (rows.size, 1))
+            factor = np.ones(mask.shape)
+            np.copyto(factor, np.broadcast_to(strength, mask.shape), where=mask)
+            X[rows] *= factor
+        
+        # [增强 3] 多项式基线漂移：系数 (n, degree+1) @ Vandermonde (degree+1, n_points)，与 np.polyval 一致
+        if drift_level > 0:
+            x = np.linspace(0, 1, X.shape[1])
+            degree = int(10 * complexity) + 1
+            coeffs = rng.uniform(-drift_level, drift_level, (n, degree + 1))
+            X += coeffs @ np.vander(x, degree + 1).T
+        
+        # 高斯噪声（相对每条光谱的最大值）
+        noise = rng.standard_normal(X.shape)
+        noise *= noise_level * np.max(X, axis=1, keepdims=True)
+        X += noise
+        return np.maximum(X, 0, out=X)
+    
+    @staticmethod
+    def _generate_simple_batch(components, ratios, rng, noise_level=0.01, baseline_drift=0.0):
+        """generate_synthetic_spectrum 的整批版本"""
+        X = ratios @ components
+        if noise_level > 0:
+            X += rng.standard_normal(X.shape) * (noise_level * np.max(np.abs(X), axis=1, keepdims=True))
+        if baseline_drift > 0:
+            X += rng.uniform(-baseline_drift, baseline_drift, (X.shape[0], 1))
+        return np.maximum(X, 0)
+    
+    def _component_matrix(self, ratio_ranges, use_advanced):
+        """
+        组分矩阵 (k, n_points)，行顺序与 ratio_ranges 一致（未加载的组分为 0，与简单方法忽略缺失组分一致）
+        
+        Returns:
+            (components, advanced)：所有组分都已加载且 use_advanced 时使用高级方法
+        """
+        names = list(ratio_ranges.keys())
+        components = np.zeros((len(names), len(self.wavenumbers)))
+        found = 0
+        for i, name in enumerate(names):
+            if name in self.pure_spectra:
+                components[i] = np.asarray(self.pure_spectra[name], dtype=np.float64)
+                found += 1
+        return components, bool(use_advanced and names and found == len(names))
+    
+    def iter_batches(self, n_samples, ratio_ranges, batch_size=1024, noise_level=0.01, baseline_drift=0.0,
+                     complexity=1.0, use_advanced=True, random_state=None, dtype=np.float64):
         """
-        批量生成合成光谱
+        按需逐批生成合成光谱（不在内存中保留全部样本）
+        
+        每批使用从 SeedSequence(random_state) 派生的独立随机流：
+        同一 random_state 下第 i 批的内容固定，与其他批是否生成、在哪个线程生成无关。
+        
+        Args:
+            n_samples: 总样本数
+            ratio_ranges: 字典 {component_name: (min_ratio, max_ratio)}
+            batch_size: 每批样本数
+            random_state: 随机种子（None 时从 self.rng 取一个种子）
+            dtype: 输出光谱的数组类型（训练时可用 np.float32）
+        
+        Yields:
+            (X_batch, ratios_batch)：(m, n_features) 与 (m, n_components)，比例列顺序与 ratio_ranges 一致
+        """
+        if not self.pure_spectra:
+            raise ValueError("未加载纯组分光谱")
+        if random_state is None:
+            random_state = int(self.rng.integers(0, 2 ** 63 - 1))
+        components, advanced = self._component_matrix(ratio_ranges, use_advanced)
+        n_samples = int(n_samples)
+        batch_size = max(1, int(batch_size))
+        n_batches = (n_samples + batch_size - 1) // batch_size
+        for i, seed in enumerate(np.random.SeedSequence(random_state).spawn(n_batches)):
+            rng = np.random.default_rng(seed)
+            ratios = self._sample_ratios(min(batch_size, n_samples - i * batch_size), ratio_ranges, rng)
+            if advanced:
+                X = self._generate_mixture_batch(components, ratios, rng, noise_level, baseline_drift, complexity)
+            else:
+                X = self._generate_simple_batch(components, ratios, rng, noise_level, baseline_drift)
+            yield X.astype(dtype, copy=False), ratios
+    
+    def generate_batch(self, n_samples, ratio_ranges, noise_level=0.01, baseline_drift=0.0, complexity=1.0, use_advanced=True,
+                       random_state=None, batch_size=4096):
+        """
+        批量生成合成光谱（整批向量化，逐块调用 iter_batches 后拼接）
         
         Args:
             n_samples: 生成样本数
@@ -224,58 +372,21 @@ class SyntheticDataGenerator:
             baseline_drift: 基线漂移幅度
             complexity: 复杂度因子（0-1），控制增强强度
             use_advanced: 是否使用高级增强方法（shift/stretch/suppression）
+            random_state: 随机种子（可复现）
+            batch_size: 内部分块大小（限制中间数组的内存）
         
         Returns:
             X_synthetic: 合成光谱矩阵 (n_samples, n_features)
             ratios_used: 使用的比例列表
         """
-        X_synthetic = []
-        ratios_used = []
-        
-        # 准备组分列表（用于高级方法）
-        component_names = list(ratio_ranges.keys())
-        components = []
-        for name in component_names:
-            # 查找对应的完整光谱信息
-            for comp_info in self.pure_spectra_full:
-                if comp_info[0] == name:
-                    # 如果X轴不一致，需要插值对齐
-                    if len(comp_info[1]) != len(self.wavenumbers) or not np.allclose(comp_info[1], self.wavenumbers):
-                        from scipy.interpolate import interp1d
-                        f_interp = interp1d(comp_info[1], comp_info[2], kind='linear', fill_value=0, bounds_error=False)
-                        y_aligned = f_interp(self.wavenumbers)
-                        components.append((name, self.wavenumbers, y_aligned))
-                    else:
-                        components.append((name, comp_info[1], comp_info[2]))
-                    break
-        
-        if not components:
-            # 回退到简单方法
-            components = None
-        
-        for i in range(n_samples):
-            # 随机生成比例
-            ratios = {}
-            ratio_list = []
-            for name, (min_r, max_r) in ratio_ranges.items():
-                ratio_val = np.random.uniform(min_r, max_r)
-                ratios[name] = ratio_val
-                ratio_list.append(ratio_val)
-            
-            # 归一化比例（确保总和为1）
-            total = sum(ratios.values())
-            if total > 0:
-                ratios = {k: v/total for k, v in ratios.items()}
-                ratio_list = [r/total for r in ratio_list]
-            
-            # 使用高级方法或简单方法
-            if use_advanced and components and len(components) == len(ratio_list):
-                synthetic = self.generate_mixture(components, ratio_list, noise_level, baseline_drift, complexity)
-            else:
-                synthetic = self.generate_synthetic_spectrum(ratios, noise_level, baseline_drift)
-            
-            X_synthetic.append(synthetic)
-            ratios_used.append(ratios)
-        
-        return np.array(X_synthetic), ratios_used
-
+        names = list(ratio_ranges.keys())
+        X_blocks = []
+        ratio_blocks = []
+        for X, ratios in self.iter_batches(n_samples, ratio_ranges, batch_size, noise_level, baseline_drift,
+                                           complexity, use_advanced, random_state):
+            X_blocks.append(X)
+            ratio_blocks.append(ratios)
+        if not X_blocks:
+            return np.zeros((0, len(self.wavenumbers))), []
+        ratios_used = [dict(zip(names, row.tolist())) for row in np.vstack(ratio_blocks)]
+        return np.vstack(X_blocks), ratios_used
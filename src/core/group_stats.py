@@ -0,0 +1,343 @@
+"""
+组统计量的流式累加（组平均 / 均值+阴影图 / 2D-COS 组平均）
+
+组平均瀑布图、2D-COS、组平均导出与 DataController.load_and_average_data 过去都把一组的全部光谱
+收集进列表再 np.array 求均值/标准差，上千条 mapping 光谱的组会整体驻留内存。这里改为：
+- SpectrumAccumulator：逐条光谱 Welford 更新均值/方差，同时维护逐点 min/max；
+  可选的行蓄水池抽样（reservoir）作为分位数草图，内存上限为 sketch_size 条光谱
+- 累加器可合并（Chan 并行公式），因此一组的文件可以分块并行读取+预处理，块结果再合并
+- compute_group_stats：按组/块在全局 runner 上并行（线程执行，load_fn 可为闭包），
+  结果按（文件签名, 参数摘要, 对齐方式及公共轴来源）缓存在 group_stats_cache 中，
+  只改颜色/偏移/字体等样式的重绘不会重新读取和求平均
+
+对齐规则与原实现一致：
+- align='global'：公共轴为按组顺序第一条可读光谱的 X 轴（或调用方给定的 common_x），
+  其余光谱按 interp1d 线性插值对齐（越界填 0）
+- align='group'：每组以本组第一条可读光谱的 X 轴为准
+标准差为总体标准差（ddof=0，与 np.std 默认一致）。
+"""
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.peak_cache import PeakResultCache
+
+DEFAULT_CHUNK_SIZE = 64
+DEFAULT_SKETCH_SIZE = 256
+
+# 沿用峰值缓存的 LRU 实现（线程安全）；值为只读数组组成的统计字典
+group_stats_cache = PeakResultCache(max_entries=512, name='group_stats')
+
+
+class SpectrumAccumulator:
+    """单组光谱的流式统计量（均值/方差/最小/最大 + 可选分位数草图）"""
+
+    def __init__(self, sketch_size: int = 0, seed: int = 0):
+        self.count = 0
+        self.sketch_size = int(sketch_size or 0)
+        self._mean: Optional[np.ndarray] = None
+        self._m2: Optional[np.ndarray] = None
+        self._min: Optional[np.ndarray] = None
+        self._max: Optional[np.ndarray] = None
+        self._sample: Optional[np.ndarray] = None
+        self._n_sample = 0
+        self._rng = np.random.default_rng(seed)
+
+    def _init(self, n_features: int):
+        self._mean = np.zeros(n_features)
+        self._m2 = np.zeros(n_features)
+        self._min = np.full(n_features, np.inf)
+        self._max = np.full(n_features, -np.inf)
+        if self.sketch_size:
+            self._sample = np.empty((self.sketch_size, n_features))
+
+    def add(self, y: np.ndarray):
+        y = np.asarray(y, dtype=np.float64).ravel()
+        if self._mean is None:
+            self._init(y.shape[0])
+        elif y.shape[0] != self._mean.shape[0]:
+            raise ValueError(f"光谱长度 {y.shape[0]} 与组内其他光谱 {self._mean.shape[0]} 不一致")
+        self.count += 1
+        delta = y - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (y - self._mean)
+        np.minimum(self._min, y, out=self._min)
+        np.maximum(self._max, y, out=self._max)
+        if self.sketch_size:
+            # 蓄水池抽样（Algorithm R）：每条光谱以 k/n 的概率保留
+            if self._n_sample < self.sketch_size:
+                self._sample[self._n_sample] = y
+                self._n_sample += 1
+            else:
+                j = int(self._rng.integers(0, self.count))
+                if j < self.sketch_size:
+                    self._sample[j] = y
+
+    def merge(self, other: 'SpectrumAccumulator') -> 'SpectrumAccumulator':
+        """合并另一个累加器（Chan et al. 并行方差公式），返回 self"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self._init(other._mean.shape[0])
+        elif other._mean.shape[0] != self._mean.shape[0]:
+            raise ValueError("合并的累加器光谱长度不一致")
+        n_a, n_b = self.count, other.count
+        n = n_a + n_b
+        delta = other._mean - self._mean
+        self._mean = self._mean + delta * (n_b / n)
+        self._m2 = self._m2 + other._m2 + delta ** 2 * (n_a * n_b / n)
+        np.minimum(self._min, other._min, out=self._min)
+        np.maximum(self._max, other._max, out=self._max)
+        if self.sketch_size:
+            self._merge_sample(other, n_a, n_b)
+        self.count = n
+        return self
+
+    def _merge_sample(self, other: 'SpectrumAccumulator', n_a: int, n_b: int):
+        a = self._sample[:self._n_sample]
+        b = other._sample[:other._n_sample] if other._sample is not None else np.empty((0, a.shape[1]))
+        pool = np.vstack([a, b])
+        k = self.sketch_size
+        if len(pool) <= k:
+            chosen = pool
+        else:
+            # 每条样本代表的原始光谱数不同（n/len(sample)），按此加权无放回抽取
+            weights = np.concatenate([np.full(len(a), n_a / max(len(a), 1)),
+                                      np.full(len(b), n_b / max(len(b), 1))])
+            index = self._rng.choice(len(pool), size=k, replace=False, p=weights / weights.sum())
+            chosen = pool[np.sort(index)]
+        self._sample = np.empty((k, pool.shape[1]))
+        self._sample[:len(chosen)] = chosen
+        self._n_sample = len(chosen)
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self._mean
+
+    @property
+    def var(self) -> np.ndarray:
+        return self._m2 / self.count if self.count else None
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(np.maximum(self.var, 0.0)) if self.count else None
+
+    @property
+    def min(self) -> np.ndarray:
+        return self._min
+
+    @property
+    def max(self) -> np.ndarray:
+        return self._max
+
+    def percentiles(self, q: Sequence[float]) -> Dict[float, np.ndarray]:
+        """逐点分位数（组内光谱不超过 sketch_size 条时为精确值，否则为蓄水池样本的近似值）"""
+        if not self.sketch_size or self._n_sample == 0:
+            return {}
+        values = np.percentile(self._sample[:self._n_sample], list(q), axis=0)
+        return {float(p): v for p, v in zip(q, values)}
+
+    def result(self, x: np.ndarray, files: Optional[List[str]] = None,
+               percentiles: Sequence[float] = ()) -> Dict[str, Any]:
+        """统计结果字典（数组只读，可安全放入缓存共享）"""
+        stats = {
+            'x': np.asarray(x),
+            'mean': self.mean,
+            'std': self.std,
+            'var': self.var,
+            'min': self.min,
+            'max': self.max,
+            'count': self.count,
+            'files': list(files or []),
+            'percentiles': self.percentiles(percentiles) if percentiles else {},
+        }
+        for value in list(stats.values()) + list(stats['percentiles'].values()):
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+        return stats
+
+
+def params_digest(params: Any) -> str:
+    """参数（字典/元组等）的稳定摘要，用作缓存键的一部分"""
+    text = json.dumps(params, sort_keys=True, default=repr)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def files_signature(files: Iterable[str]) -> Tuple:
+    """文件列表签名：(路径, 修改时间, 大小)，文件被改写后签名随之变化"""
+    signature = []
+    for path in files:
+        try:
+            st = os.stat(path)
+            signature.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+def align_to(x: np.ndarray, y: np.ndarray, target_x: np.ndarray) -> np.ndarray:
+    """把 (x, y) 对齐到 target_x（轴相同时原样返回，否则线性插值，越界填 0）"""
+    if len(x) == len(target_x) and np.allclose(x, target_x):
+        return y
+    from scipy.interpolate import interp1d
+    f_interp = interp1d(x, y, kind='linear', fill_value=0, bounds_error=False)
+    return f_interp(target_x)
+
+
+def _load(load_fn: Callable, path: str):
+    try:
+        return load_fn(path)
+    except Exception as e:
+        print(f"警告：处理文件 {os.path.basename(path)} 时出错: {e}")
+        return None
+
+
+def _load_head(item, load_fn):
+    """每组第一条可读光谱：确定该组的 X 轴；返回 (下一个文件位置, x, y)"""
+    group, files = item
+    for i, path in enumerate(files):
+        loaded = _load(load_fn, path)
+        if loaded is not None and loaded[0] is not None:
+            return i + 1, np.asarray(loaded[0]), (None if loaded[1] is None else np.asarray(loaded[1]))
+    return len(files), None, None
+
+
+def _accumulate_chunk(item, load_fn, axes: Dict[str, np.ndarray], sketch_size: int):
+    """子任务：读取+预处理一块文件并累加到一个新的累加器"""
+    group, files, seed = item
+    acc = SpectrumAccumulator(sketch_size, seed=seed)
+    target = axes[group]
+    for path in files:
+        loaded = _load(load_fn, path)
+        if loaded is None or loaded[1] is None:
+            continue
+        x, y = loaded
+        try:
+            acc.add(align_to(np.asarray(x), np.asarray(y), target))
+        except Exception as e:
+            print(f"警告：处理文件 {os.path.basename(path)} 时出错: {e}")
+    return acc
+
+
+def compute_group_stats(groups: Dict[str, List[str]], load_fn: Callable[[str], Optional[Tuple]],
+                        params_key: str = '', common_x: Optional[np.ndarray] = None,
+                        align: str = 'global', percentiles: Optional[Sequence[float]] = None,
+                        sketch_size: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        cache: Optional[PeakResultCache] = None, token=None,
+                        on_progress: Optional[Callable[[int, int, str], Any]] = None,
+                        name: str = "组统计") -> Tuple[Dict[str, Dict[str, Any]], Optional[np.ndarray]]:
+    """
+    流式计算各组统计量（按组/块并行，结果缓存）
+
+    Args:
+        groups: {组名: 文件列表}，顺序决定 align='global' 时公共轴的来源
+        load_fn: path -> (x, y)；y 为 None 表示读取成功但被排除（如 QC 未通过），
+                 返回 None 或抛出异常表示读取失败。会在工作线程中调用，不应访问界面控件
+        params_key: 影响 load_fn 结果的全部参数的摘要（跳过行数、截断范围、预处理参数等），见 params_digest
+        common_x: 指定公共轴（此时忽略 align）
+        align: 'global' 或 'group'（见模块说明）
+        percentiles: 需要的分位数（如 (5, 50, 95)），基于蓄水池草图
+        chunk_size: 每个并行子任务处理的文件数
+
+    Returns:
+        ({组名: {'x','mean','std','var','min','max','count','files','percentiles'}}, common_x)
+        无有效光谱的组不出现在结果中；align='group' 时返回的 common_x 为 None
+    """
+    from src.services.task_runner import runner
+
+    cache = group_stats_cache if cache is None else cache
+    q = tuple(float(v) for v in percentiles) if percentiles else ()
+    if sketch_size is None:
+        sketch_size = DEFAULT_SKETCH_SIZE if q else 0
+    order = [g for g, files in groups.items() if files]
+    if not order:
+        return {}, common_x
+
+    signatures = {g: files_signature(groups[g]) for g in order}
+    if common_x is not None:
+        from src.core.peak_cache import data_key
+        common_x = np.asarray(common_x)
+        align = 'global'
+        axis_key = ('axis', data_key(common_x))
+    elif align == 'global':
+        # 公共轴来自按组顺序第一条可读光谱，可能落在任一组：键包含全部组（按顺序）的文件签名
+        axis_key = ('first', params_digest([signatures[g] for g in order]))
+    else:
+        axis_key = ('group',)
+    keys = {g: ('group_stats', signatures[g], params_key, axis_key, q, int(sketch_size)) for g in order}
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for g in order:
+        hit = cache.get(keys[g])
+        if hit is not None:
+            results[g] = hit
+    pending = [g for g in order if g not in results]
+    if common_x is None and align == 'global' and order[0] in results:
+        common_x = results[order[0]]['x']
+
+    if pending:
+        # 第一阶段（按组并行）：每组第一条可读光谱，确定 X 轴
+        heads = runner.map(_load_head, [(g, groups[g]) for g in pending], load_fn, name=name,
+                           category='analysis', token=token)
+        heads = dict(zip(pending, heads))
+        if common_x is None and align == 'global':
+            for g in order:
+                if g in results:
+                    common_x = results[g]['x']
+                    break
+                if heads[g][1] is not None:
+                    common_x = heads[g][1]
+                    break
+        axes = {g: (common_x if align == 'global' else heads[g][1]) for g in pending if heads[g][1] is not None}
+
+        # 第二阶段（按块并行）：其余文件分块读取+预处理并累加
+        step = max(1, int(chunk_size))
+        chunks = []
+        for g in axes:
+            files = groups[g]
+            for seed, i in enumerate(range(heads[g][0], len(files), step)):
+                chunks.append((g, files[i:i + step], seed + 1))
+        partials = runner.map(_accumulate_chunk, chunks, load_fn, axes, int(sketch_size), name=name,
+                              category='analysis', token=token, describe=lambda c: c[0],
+                              on_progress=on_progress) if chunks else []
+
+        merged: Dict[str, SpectrumAccumulator] = {}
+        for g in axes:
+            acc = SpectrumAccumulator(sketch_size, seed=0)
+            head_x, head_y = heads[g][1], heads[g][2]
+            if head_y is not None:
+                try:
+                    acc.add(align_to(head_x, head_y, axes[g]))
+                except Exception as e:
+                    print(f"警告：组 {g} 的首条光谱无法对齐: {e}")
+            merged[g] = acc
+        for chunk, part in zip(chunks, partials):
+            merged[chunk[0]].merge(part)
+
+        for g, acc in merged.items():
+            if acc.count == 0:
+                continue
+            stats = acc.result(axes[g], groups[g], q)
+            cache.put(keys[g], stats)
+            results[g] = stats
+
+    ordered = {g: results[g] for g in order if g in results}
+    return ordered, (common_x if align == 'global' else None)
+
+
+def plot_item(stats: Dict[str, Any], label: str, color: Optional[str] = None,
+              scale: float = 1.0) -> Dict[str, Any]:
+    """转换为 MeanShadowPlotRenderer 使用的数据项 {'x','y','y_std','label','color'}"""
+    item = {
+        'x': stats['x'],
+        'y': stats['mean'] * scale,
+        'y_std': stats['std'] * abs(scale),
+        'label': label,
+        'count': stats['count'],
+    }
+    if color is not None:
+        item['color'] = color
+    return item
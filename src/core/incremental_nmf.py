@@ -0,0 +1,260 @@
+"""
+增量 NMF：热启动与小批量（mini-batch）更新
+
+在已有模型（上一次的 W/H，随项目保存）的基础上处理新增光谱，避免每次从头拟合：
+
+- warm_start_nmf：已有样本沿用上一次的 W 行，新增样本先用批量 NNLS 投影到旧 H 上，
+  再以 init='custom' 在全体数据上继续迭代。起点已接近收敛，通常只需少量迭代。
+- MiniBatchNMFUpdater：基于 sklearn MiniBatchNMF.partial_fit，H 的更新只处理新增样本，
+  耗时与新增数据量成正比；数据可按块迭代（ndarray、LazyArray、h5py 数据集均可），无需整体载入内存。
+  所有样本的 W 最后用批量 NNLS 对最终 H 求解（以上一次的 W 热启动）。
+
+容差（合成数据验证，frobenius 损失；单位量级与原始计数量级 ×1e3 均成立，见 test_incremental_nmf.py）：
+- 热启动结果的重构误差不超过冷启动的 (1 + WARM_START_RTOL) 倍
+- 小批量更新的重构误差不超过冷启动的 (1 + MINIBATCH_RTOL) 倍
+两者都以收敛的上一次模型为前提；没有上一次模型时的小批量首次拟合不在此保证之内。
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.batch_nnls import batch_nnls
+
+WARM_START_RTOL = 0.01
+MINIBATCH_RTOL = 0.05
+
+
+def reconstruction_error(X, W: np.ndarray, H: np.ndarray, chunk_size: int = 4096) -> float:
+    """Frobenius 重构误差 ||X - WH||（与 sklearn 的 reconstruction_err_ 一致，按块计算）"""
+    total = 0.0
+    for start, chunk in zip(range(0, X.shape[0], chunk_size), iter_row_chunks(X, chunk_size)):
+        residual = chunk - W[start:start + chunk.shape[0]] @ H
+        total += float(np.sum(residual ** 2))
+    return float(np.sqrt(total))
+
+
+def is_compatible(previous: Optional[Dict[str, Any]], n_components: int, n_features: int) -> bool:
+    """上一次的模型能否用于热启动（组分数与特征数一致）"""
+    if not previous or previous.get('H') is None:
+        return False
+    H = np.asarray(previous['H'])
+    return H.ndim == 2 and H.shape == (n_components, n_features)
+
+
+def _previous_rows(sample_labels: Sequence[str], previous: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    返回 (known_mask, prev_index)：known_mask[i] 表示样本 i 在上一次模型中存在，
+    prev_index[i] 为其在上一次 W 中的行号
+    """
+    prev_labels = list(previous.get('sample_labels') or [])
+    W_prev = previous.get('W')
+    lookup = {label: i for i, label in enumerate(prev_labels)}
+    n_prev = 0 if W_prev is None else np.asarray(W_prev).shape[0]
+    prev_index = np.array([lookup.get(label, -1) for label in sample_labels], dtype=int)
+    known_mask = (prev_index >= 0) & (prev_index < n_prev)
+    return known_mask, prev_index
+
+
+def initial_weights(X: np.ndarray, sample_labels: Sequence[str], previous: Dict[str, Any]) -> Tuple[np.ndarray, int]:
+    """
+    热启动的 W 初值：已知样本沿用上一次的权重，新增样本用 NNLS 投影到上一次的 H
+
+    Returns:
+        (W_init, 新增样本数)
+    """
+    H_prev = np.asarray(previous['H'], dtype=np.float64)
+    W_init = np.zeros((X.shape[0], H_prev.shape[0]))
+    known_mask, prev_index = _previous_rows(sample_labels, previous)
+    if np.any(known_mask):
+        W_init[known_mask] = np.asarray(previous['W'], dtype=np.float64)[prev_index[known_mask]]
+    new_mask = ~known_mask
+    if np.any(new_mask):
+        W_init[new_mask], _ = batch_nnls(H_prev, X[new_mask])
+    return W_init, int(new_mask.sum())
+
+
+def warm_start_nmf(X: np.ndarray, sample_labels: Sequence[str], previous: Dict[str, Any],
+                   max_iter: int = 200, tol: float = 1e-4,
+                   check_every: int = 10) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """
+    以上一次的 W/H 为起点拟合 NMF（init='custom'，坐标下降求解器）
+
+    sklearn 的停止准则是相对于初始投影梯度的比值，起点已接近收敛时几乎无法满足，
+    因此这里每 check_every 次迭代检查一次目标函数，相对下降小于 tol 即停止。
+
+    Returns:
+        (W, H, info)，info 含 n_new / n_known / n_iter / reconstruction_err
+    """
+    import warnings
+    from sklearn.decomposition import NMF
+    from sklearn.exceptions import ConvergenceWarning
+
+    X = np.asarray(X, dtype=np.float64)
+    H = np.asarray(previous['H'], dtype=np.float64).copy()
+    W, n_new = initial_weights(X, sample_labels, previous)
+    error = reconstruction_error(X, W, H)
+    n_iter = 0
+    while n_iter < max_iter:
+        step = min(check_every, max_iter - n_iter)
+        # 初值中的 0 在乘法更新中会锁死，坐标下降求解器没有这个问题
+        model = NMF(n_components=H.shape[0], init='custom', solver='cd', max_iter=step, tol=0.0)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', ConvergenceWarning)
+            W = model.fit_transform(X, W=W, H=H)
+        H = model.components_
+        n_iter += int(model.n_iter_)
+        new_error = float(model.reconstruction_err_)
+        converged = error - new_error <= tol * max(error, 1e-12)
+        error = new_error
+        if converged:
+            break
+    info = {
+        'mode': 'warm',
+        'n_new': n_new,
+        'n_known': X.shape[0] - n_new,
+        'n_iter': n_iter,
+        'reconstruction_err': error,
+    }
+    return W, H, info
+
+
+def iter_row_chunks(X, chunk_size: int) -> Iterable[np.ndarray]:
+    """按行分块读取（支持 ndarray、LazyArray、h5py 数据集等可切片对象）"""
+    n = X.shape[0]
+    for start in range(0, n, chunk_size):
+        yield np.asarray(X[start:start + chunk_size], dtype=np.float64)
+
+
+class MiniBatchNMFUpdater:
+    """
+    小批量 NMF：partial_fit 只处理新增样本
+
+    用法：
+        updater = MiniBatchNMFUpdater(n_components=3)
+        updater.fit(X)                        # 首次：多轮遍历全部数据块
+        updater.update(X_new)                 # 之后：只用新增样本更新 H
+        W = updater.weights(X, W_prev)        # 所有样本的权重（批量 NNLS）
+    也可从保存的 H 恢复：MiniBatchNMFUpdater.from_components(H, X_batch)
+    """
+
+    def __init__(self, n_components: int, batch_size: int = 128, max_epochs: int = 50,
+                 tol: float = 1e-4, random_state: int = 42):
+        self.n_components = n_components
+        self.batch_size = batch_size
+        self.max_epochs = max_epochs
+        self.tol = tol
+        self.random_state = random_state
+        self.model = None
+        self.n_samples_seen = 0
+
+    def _new_model(self, init=None):
+        from sklearn.decomposition import MiniBatchNMF
+        return MiniBatchNMF(n_components=self.n_components, init=init, batch_size=self.batch_size,
+                            tol=self.tol, random_state=self.random_state)
+
+    @property
+    def components_(self) -> np.ndarray:
+        return self.model.components_
+
+    @classmethod
+    def from_components(cls, H: np.ndarray, X_batch: np.ndarray, **kwargs) -> 'MiniBatchNMFUpdater':
+        """从已有 H 恢复（如项目重新打开后），用一批样本初始化 partial_fit 的内部统计量"""
+        H = np.asarray(H, dtype=np.float64)
+        updater = cls(n_components=H.shape[0], **kwargs)
+        updater.model = updater._new_model(init='custom')
+        X_batch = np.asarray(X_batch, dtype=np.float64)
+        W_batch, _ = batch_nnls(H, X_batch)
+        updater.model.partial_fit(X_batch, W=W_batch, H=H.copy())
+        updater.n_samples_seen = X_batch.shape[0]
+        return updater
+
+    def fit(self, X) -> 'MiniBatchNMFUpdater':
+        """首次拟合：多轮遍历所有数据块，直到 H 的相对变化小于 tol"""
+        self.model = self._new_model()
+        H_old = None
+        for _ in range(self.max_epochs):
+            for chunk in iter_row_chunks(X, self.batch_size):
+                self.model.partial_fit(chunk)
+            H = self.model.components_
+            if H_old is not None and np.linalg.norm(H - H_old) <= self.tol * max(np.linalg.norm(H_old), 1e-12):
+                break
+            H_old = H.copy()
+        self.n_samples_seen = X.shape[0]
+        return self
+
+    def update(self, X_new, n_passes: int = 1) -> 'MiniBatchNMFUpdater':
+        """用新增样本更新 H（耗时与新增样本数成正比）"""
+        if self.model is None:
+            return self.fit(X_new)
+        for _ in range(max(1, n_passes)):
+            for chunk in iter_row_chunks(X_new, self.batch_size):
+                self.model.partial_fit(chunk)
+        self.n_samples_seen += X_new.shape[0]
+        return self
+
+    def weights(self, X, W_prev: Optional[np.ndarray] = None) -> np.ndarray:
+        """所有样本在当前 H 下的权重（按块批量 NNLS，可用上一次的 W 热启动）"""
+        H = self.components_
+        blocks: List[np.ndarray] = []
+        for start, chunk in zip(range(0, X.shape[0], self.batch_size), iter_row_chunks(X, self.batch_size)):
+            W0 = None
+            if W_prev is not None and W_prev.shape[0] >= start + chunk.shape[0]:
+                W0 = W_prev[start:start + chunk.shape[0]]
+            blocks.append(batch_nnls(H, chunk, W0=W0)[0])
+        return np.vstack(blocks) if blocks else np.zeros((0, self.n_components))
+
+
+def minibatch_nmf(X, sample_labels: Sequence[str], n_components: int,
+                  previous: Optional[Dict[str, Any]] = None,
+                  updater: Optional[MiniBatchNMFUpdater] = None,
+                  batch_size: int = 128, tol: float = 1e-4,
+                  random_state: int = 42) -> Tuple[np.ndarray, np.ndarray, MiniBatchNMFUpdater, Dict[str, Any]]:
+    """
+    小批量 NMF：有可用的上一次模型时只用新增样本更新 H，否则对全部数据首次拟合
+
+    Args:
+        previous: 上一次的模型 {'W', 'H', 'sample_labels'}（随项目保存）
+        updater: 内存中仍保留的 MiniBatchNMFUpdater（没有时从 previous['H'] 恢复）
+
+    Returns:
+        (W, H, updater, info)
+    """
+    n_features = X.shape[1]
+    known_mask = np.zeros(X.shape[0], dtype=bool)
+    prev_index = np.full(X.shape[0], -1)
+    compatible = is_compatible(previous, n_components, n_features)
+    if compatible:
+        known_mask, prev_index = _previous_rows(sample_labels, previous)
+    new_idx = np.flatnonzero(~known_mask)
+
+    if updater is not None and (updater.n_components != n_components or updater.model is None
+                                or updater.components_.shape[1] != n_features):
+        updater = None
+
+    if compatible and np.any(known_mask):
+        if updater is None:
+            # 从保存的 H 恢复：用少量已知样本初始化内部统计量
+            seed_rows = np.flatnonzero(known_mask)[:batch_size]
+            updater = MiniBatchNMFUpdater.from_components(
+                previous['H'], np.asarray(X[seed_rows]), batch_size=batch_size, tol=tol, random_state=random_state)
+        if new_idx.size:
+            updater.update(np.asarray(X[new_idx], dtype=np.float64))
+        mode = 'minibatch-update'
+    else:
+        updater = MiniBatchNMFUpdater(n_components, batch_size=batch_size, tol=tol, random_state=random_state).fit(X)
+        mode = 'minibatch-fit'
+
+    W_prev = None
+    if compatible and np.any(known_mask):
+        W_prev = np.zeros((X.shape[0], n_components))
+        W_prev[known_mask] = np.asarray(previous['W'], dtype=np.float64)[prev_index[known_mask]]
+    W = updater.weights(X, W_prev)
+    H = updater.components_.copy()
+    info = {
+        'mode': mode,
+        'n_new': int(new_idx.size) if mode == 'minibatch-update' else X.shape[0],
+        'n_known': int(known_mask.sum()) if mode == 'minibatch-update' else 0,
+        'n_iter': int(getattr(updater.model, 'n_steps_', 0)),
+        'reconstruction_err': reconstruction_error(X, W, H),
+    }
+    return W, H, updater, info
@@ -0,0 +1,116 @@
+"""
+RRUFF 库聚类压缩
+
+RRUFF 文件夹中同一矿物往往有多条几乎相同的光谱（不同晶向、激光波长、raw / processed 版本），
+load_library 只按文件名中的 -raw / -processed 去重。这里按公共网格上的相关系数把库光谱聚类：
+
+- 所有光谱（预处理后的 y）插值到 SpectralLibrary.resampled 的公共网格，中心化并归一化后，
+  两行的点积即 Pearson 相关系数
+- 贪心的“领头者”聚类：按库顺序，尚未归类的光谱成为新簇的代表，与其相关系数 ≥ threshold 的
+  未归类光谱都并入该簇；相关矩阵按块计算（每块一次矩阵乘法），不需要 n×n 的完整矩阵
+- 每个成员与本簇代表的相关系数都不低于 threshold
+
+PeakMatcher.find_best_matches 先只对各簇代表打分，再展开得分最高的若干簇逐条打分，
+搜索量由“全部光谱”降为“簇数 + 获胜簇的成员数”。
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from src.core.spectral_library import SpectralLibrary, DEFAULT_GRID_POINTS
+from src.utils.profiling import profiler
+
+DEFAULT_THRESHOLD = 0.98
+BLOCK_ROWS = 256
+
+
+class LibraryClusters:
+    """聚类结果：各簇的代表与成员（均为 SpectralLibrary 的行号）"""
+
+    def __init__(self, representatives: np.ndarray, labels: np.ndarray, threshold: float, key: Tuple):
+        self.representatives = np.asarray(representatives, dtype=np.int64)
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.threshold = float(threshold)
+        self.key = key
+        order = np.argsort(self.labels, kind='stable')
+        counts = np.bincount(self.labels, minlength=len(self.representatives))
+        self._member_rows = order
+        self._member_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.representatives)
+
+    @property
+    def n_spectra(self) -> int:
+        return len(self.labels)
+
+    def members(self, cluster: int) -> np.ndarray:
+        """簇内全部行号（代表排在最前，其余按库顺序）"""
+        return self._member_rows[self._member_offsets[cluster]:self._member_offsets[cluster + 1]]
+
+    def cluster_of(self, row: int) -> int:
+        return int(self.labels[row])
+
+    def sizes(self) -> np.ndarray:
+        return np.diff(self._member_offsets)
+
+    def compression_ratio(self) -> float:
+        """代表数 / 光谱数（越小压缩越多）"""
+        return self.n_clusters / self.n_spectra if self.n_spectra else 1.0
+
+    def groups(self, names: List[str]) -> List[Tuple[str, List[str]]]:
+        """[(代表名称, [成员名称...]), ...]，用于显示或导出"""
+        return [(names[rep], [names[r] for r in self.members(c)])
+                for c, rep in enumerate(self.representatives)]
+
+    def __repr__(self):
+        return (f"LibraryClusters(n_spectra={self.n_spectra}, n_clusters={self.n_clusters}, "
+                f"threshold={self.threshold})")
+
+
+def _normalized_rows(matrix: np.ndarray) -> np.ndarray:
+    """逐行中心化并归一化（常数行保持为 0，只与自身成簇）"""
+    z = np.asarray(matrix, dtype=np.float32) - matrix.mean(axis=1, keepdims=True, dtype=np.float64).astype(np.float32)
+    norms = np.linalg.norm(z, axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = np.where(norms > 0, z / norms, 0.0).astype(np.float32)
+    return z
+
+
+@profiler.timed('rruff.cluster_library')
+def cluster_library(library: SpectralLibrary, threshold: float = DEFAULT_THRESHOLD,
+                    n_points: int = DEFAULT_GRID_POINTS, block_rows: int = BLOCK_ROWS) -> LibraryClusters:
+    """
+    按公共网格上的相关系数对库光谱聚类
+
+    Args:
+        library: SpectralLibrary
+        threshold: 成员与代表的最小相关系数
+        n_points: 公共网格点数
+        block_rows: 每次矩阵乘法处理的候选代表行数
+    """
+    key = (library.version_key, float(threshold), int(n_points))
+    n = len(library)
+    if n == 0:
+        return LibraryClusters(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), threshold, key)
+
+    _, matrix = library.resampled(n_points)
+    z = _normalized_rows(matrix)
+    labels = np.full(n, -1, dtype=np.int64)
+    representatives = []
+    for start in range(0, n, block_rows):
+        candidates = np.arange(start, min(start + block_rows, n))
+        candidates = candidates[labels[candidates] < 0]
+        if len(candidates) == 0:
+            continue
+        similarity = z[candidates] @ z.T   # (候选数, n)
+        for i, row in enumerate(candidates):
+            if labels[row] >= 0:
+                continue
+            cluster = len(representatives)
+            representatives.append(row)
+            joined = (similarity[i] >= threshold) & (labels < 0)
+            joined[row] = True
+            labels[joined] = cluster
+    return LibraryClusters(np.array(representatives, dtype=np.int64), labels, threshold, key)
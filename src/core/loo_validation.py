@@ -0,0 +1,269 @@
+"""
+分类模型留一法（LOO）交叉验证引擎
+
+- 各算法的全部折（算法 × 折）一次性提交到全局调度器的进程池，按块分发以减少调度开销；
+  X_train 通过共享内存传给子进程，只放入一次
+- 子进程内把 BLAS 线程限制为 1，避免多进程 × 多线程超额占用核心
+- k-NN（含 StandardScaler 的 Pipeline）使用精确的快速路径：每折的标准化参数由全体样本统计量
+  解析扣除被留出样本得到，一次矩阵运算算出所有折的距离，无需逐折重新拟合
+- 逐折预测逻辑与原串行实现一致，返回相同的预测值与指标字典
+"""
+import traceback
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.cross_decomposition import PLSCanonical
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+# 每折结果：(y_true, y_pred, y_proba)，均为长度 1 的数组；该折失败时为 None
+FoldResult = Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]
+
+
+def _sigmoid(values):
+    return 1 / (1 + np.exp(-values))
+
+
+def predict_fold(algo_name: str, model_instance, X: np.ndarray, y: np.ndarray, fold: int,
+                 report_errors: bool = True) -> FoldResult:
+    """训练并预测第 fold 折（留出第 fold 个样本）；失败时返回 None"""
+    train_idx = np.concatenate([np.arange(fold), np.arange(fold + 1, X.shape[0])])
+    X_train_cv, X_val_cv = X[train_idx], X[fold:fold + 1]
+    y_train_cv, y_val_cv = y[train_idx], y[fold:fold + 1]
+
+    try:
+        if algo_name == 'PLS-DA':
+            # PLS-DA 按成分数重新创建模型
+            n_comp = model_instance.n_components if hasattr(model_instance, 'n_components') else 2
+            model_cv = PLSCanonical(n_components=n_comp)
+            model_cv.fit(X_train_cv, y_train_cv.reshape(-1, 1))
+            y_proba = np.clip(model_cv.predict(X_val_cv).flatten(), 0, 1)
+            y_pred = (y_proba > 0.5).astype(int)
+        elif algo_name == 'PCA + LDA':
+            model_cv = clone(model_instance)
+            model_cv.fit(X_train_cv, y_train_cv)
+            y_pred = model_cv.predict(X_val_cv)
+            # PCA+LDA 通常不支持 predict_proba，使用 decision_function 的 sigmoid
+            try:
+                if hasattr(model_cv, 'decision_function'):
+                    y_proba = _sigmoid(model_cv.decision_function(X_val_cv))
+                else:
+                    y_proba = y_pred.astype(float)
+            except Exception:
+                y_proba = y_pred.astype(float)
+        else:
+            try:
+                model_cv = clone(model_instance)
+            except Exception:
+                if hasattr(model_instance, 'get_params'):
+                    model_cv = type(model_instance)(**model_instance.get_params())
+                else:
+                    model_cv = type(model_instance)()
+            model_cv.fit(X_train_cv, y_train_cv)
+
+            if hasattr(model_cv, 'predict_proba'):
+                y_proba = model_cv.predict_proba(X_val_cv)[:, 1]
+                y_pred = model_cv.predict(X_val_cv)
+            else:
+                y_pred = model_cv.predict(X_val_cv)
+                if hasattr(model_cv, 'decision_function'):
+                    y_proba = _sigmoid(model_cv.decision_function(X_val_cv))
+                else:
+                    y_proba = y_pred.astype(float)
+
+        return (np.asarray(y_val_cv), np.asarray(y_pred).flatten().astype(int),
+                np.asarray(y_proba, dtype=float).flatten())
+    except Exception as e:
+        if report_errors:
+            print(f"LOO-CV for {algo_name} failed: {e}")
+            traceback.print_exc()
+        return None
+
+
+def _predict_fold_chunk(job, X: np.ndarray, y: np.ndarray) -> List[FoldResult]:
+    """子任务入口：job = (algo_name, model, folds, report_errors)"""
+    algo_name, model, folds, report_errors = job
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return [predict_fold(algo_name, model, X, y, fold, report_errors) for fold in folds]
+    with threadpool_limits(limits=1):
+        return [predict_fold(algo_name, model, X, y, fold, report_errors) for fold in folds]
+
+
+# ---------------------------------------------------------------------------- k-NN 快速路径
+
+def _knn_parts(model) -> Optional[Tuple[Optional[StandardScaler], KNeighborsClassifier]]:
+    """识别可走快速路径的 k-NN（裸模型或 StandardScaler + k-NN 的 Pipeline，欧氏距离）"""
+    scaler = None
+    knn = model
+    if isinstance(model, Pipeline):
+        if len(model.steps) != 2:
+            return None
+        scaler, knn = model.steps[0][1], model.steps[1][1]
+        if not isinstance(scaler, StandardScaler) or not scaler.with_std:
+            return None
+    if not isinstance(knn, KNeighborsClassifier):
+        return None
+    if knn.weights not in ('uniform', 'distance') or knn.metric_params is not None:
+        return None
+    if not (knn.metric == 'euclidean' or (knn.metric == 'minkowski' and knn.p == 2)):
+        return None
+    return scaler, knn
+
+
+def _loo_feature_weights(X: np.ndarray) -> np.ndarray:
+    """
+    每折 StandardScaler 的 1/scale²（第 i 行对应留出样本 i 的折）
+    由全体样本的均值/平方和按 Welford 公式扣除样本 i 得到，常数特征的判定与 StandardScaler 相同。
+    """
+    n = X.shape[0]
+    m = n - 1
+    mean = X.mean(axis=0)
+    delta = X - mean
+    m2 = (delta ** 2).sum(axis=0)
+    mean_loo = (n * mean - X) / m
+    var_loo = np.maximum(m2 - delta ** 2 * (n / m), 0.0) / m
+    eps = np.finfo(np.float64).eps
+    constant = var_loo <= m * eps * var_loo + (m * mean_loo * eps) ** 2
+    scale = np.sqrt(var_loo)
+    scale[constant] = 1.0
+    return 1.0 / scale ** 2
+
+
+def knn_loo_predictions(model, X: np.ndarray, y: np.ndarray) -> Optional[List[FoldResult]]:
+    """
+    k-NN 的精确 LOO 预测（不适用时返回 None，由调用方回退为逐折拟合）
+
+    标准化时均值在样本差中抵消，只有每折的缩放因子影响距离：
+    d²(i, j) = Σ_f w_if (x_if - x_jf)²，按行展开为三次矩阵乘法即可得到所有折的距离。
+    """
+    parts = _knn_parts(model)
+    if parts is None:
+        return None
+    scaler, knn = parts
+    n = X.shape[0]
+    k = knn.n_neighbors
+    classes, y_idx, counts = np.unique(y, return_inverse=True, return_counts=True)
+    # 每折的类别集合必须与全体一致（否则 predict_proba 的列会变化），且邻居数足够
+    if len(classes) < 2 or counts.min() < 2 or k > n - 1:
+        return None
+
+    X = np.asarray(X, dtype=np.float64)
+    sq = X ** 2
+    if scaler is not None:
+        W = _loo_feature_weights(X)
+        d2 = (W * sq).sum(axis=1)[:, None] - 2.0 * (W * X) @ X.T + W @ sq.T
+    else:
+        norms = sq.sum(axis=1)
+        d2 = norms[:, None] - 2.0 * X @ X.T + norms[None, :]
+    np.maximum(d2, 0.0, out=d2)
+    d2[np.arange(n), np.arange(n)] = np.inf
+
+    neighbors = np.argpartition(d2, k - 1, axis=1)[:, :k]
+    if knn.weights == 'distance':
+        with np.errstate(divide='ignore'):
+            weights = 1.0 / np.sqrt(np.take_along_axis(d2, neighbors, axis=1))
+        inf_mask = np.isinf(weights)
+        inf_rows = inf_mask.any(axis=1)
+        weights[inf_rows] = inf_mask[inf_rows]
+    else:
+        weights = np.ones(neighbors.shape)
+
+    proba = np.zeros((n, len(classes)))
+    rows = np.repeat(np.arange(n), k)
+    np.add.at(proba, (rows, y_idx[neighbors].ravel()), weights.ravel())
+    normalizer = proba.sum(axis=1, keepdims=True)
+    normalizer[normalizer == 0.0] = 1.0
+    proba /= normalizer
+    y_pred = classes[np.argmax(proba, axis=1)]
+
+    return [(y[i:i + 1], np.array([int(y_pred[i])]), proba[i, 1:2].copy()) for i in range(n)]
+
+
+# ---------------------------------------------------------------------------- 调度
+
+def run_loo(models: Dict[Hashable, Tuple[str, Any]], X: np.ndarray, y: np.ndarray,
+            executor: str = 'process', report_errors: bool = True, token=None,
+            on_progress: Optional[Callable[[int, int, str], Any]] = None) -> Dict[Hashable, List[FoldResult]]:
+    """
+    对多个模型同时运行 LOO-CV
+
+    Args:
+        models: {key: (algo_name, model)}，algo_name 决定逐折预测逻辑（'PLS-DA' / 'PCA + LDA' / 其他）
+        executor: 'process'（默认）或 'thread'
+        report_errors: 打印失败折的异常（成分数优化时关闭，失败的折按 0 分计）
+        token: CancellationToken
+        on_progress: 进度回调 callback(done, total, message)，在工作线程中调用
+
+    Returns:
+        {key: 每折结果列表（按样本顺序）}
+    """
+    from src.services.task_runner import runner
+
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    n = X.shape[0]
+    results: Dict[Hashable, List[FoldResult]] = {}
+
+    jobs = []
+    job_keys = []
+    chunk = max(1, n // (2 * runner.max_workers))
+    for key, (algo_name, model) in models.items():
+        if algo_name not in ('PLS-DA', 'PCA + LDA'):
+            fast = knn_loo_predictions(model, X, y)
+            if fast is not None:
+                results[key] = fast
+                continue
+        for start in range(0, n, chunk):
+            jobs.append((algo_name, model, list(range(start, min(n, start + chunk))), report_errors))
+            job_keys.append(key)
+
+    if jobs:
+        chunk_results = runner.map(_predict_fold_chunk, jobs, X, y, name="LOO 验证", category='analysis',
+                                   executor=executor, token=token,
+                                   describe=lambda job: job[0], on_progress=on_progress)
+        for key in job_keys:
+            results.setdefault(key, [])
+        for key, fold_results in zip(job_keys, chunk_results):
+            results[key].extend(fold_results)
+
+    return {key: results[key] for key in models}
+
+
+def collect_predictions(fold_results: List[FoldResult]) -> Tuple[list, list, list]:
+    """拼接成功各折的 (y_true, y_pred, y_proba) 列表（失败的折跳过）"""
+    y_true, y_pred, y_proba = [], [], []
+    for result in fold_results:
+        if result is None:
+            continue
+        y_true.extend(result[0])
+        y_pred.extend(result[1])
+        y_proba.extend(result[2])
+    return y_true, y_pred, y_proba
+
+
+def loo_accuracy(fold_results: List[FoldResult]) -> float:
+    """LOO 平均准确率（失败的折记为 0，用于成分数优化）"""
+    if not fold_results:
+        return 0
+    scores = [0 if r is None else accuracy_score(r[0], r[1]) for r in fold_results]
+    return float(np.mean(scores))
+
+
+def compute_metrics(y_true, y_pred, y_proba) -> Dict[str, float]:
+    """LOO 预测的性能指标（accuracy / precision / recall / f1_score / auc）"""
+    metrics = {
+        'accuracy': accuracy_score(y_true, y_pred),
+        'precision': precision_score(y_true, y_pred, zero_division=0),
+        'recall': recall_score(y_true, y_pred, zero_division=0),
+        'f1_score': f1_score(y_true, y_pred, zero_division=0),
+    }
+    try:
+        metrics['auc'] = roc_auc_score(y_true, y_proba)
+    except Exception:
+        metrics['auc'] = 0.5  # 默认值
+    return metrics
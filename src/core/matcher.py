@@ -37,6 +37,24 @@ class SpectralMatcher:
                 print(f"加载标准库光谱失败 {file_path}: {e}")
                 continue
     
+    def library_matrix(self, query_wavenumbers):
+        """
+        把整个标准库插值对齐到给定波数轴并按行归一化，供批量（逐像素）匹配使用
+
+        Returns:
+            names: 库光谱名称列表
+            library: (n_library, n_wavenumbers) 单位范数矩阵；与 match 中的余弦相似度一致
+        """
+        from scipy.interpolate import interp1d
+        names = list(self.library_spectra.keys())
+        library = np.zeros((len(names), len(query_wavenumbers)))
+        for i, name in enumerate(names):
+            lib_x, lib_y = self.library_spectra[name]
+            f_interp = interp1d(lib_x, lib_y, kind='linear', fill_value=0, bounds_error=False)
+            aligned = f_interp(query_wavenumbers)
+            library[i] = aligned / (np.linalg.norm(aligned) + 1e-10)
+        return names, library
+
     def match(self, query_wavenumbers, query_spectrum, top_k=3):
         """
         匹配查询光谱与标准库
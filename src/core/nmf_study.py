@@ -0,0 +1,134 @@
+"""
+NMF 多种子 / 多组分数扫描
+
+对同一个（已缓存的）预处理矩阵，在进程池中并行拟合 (n_components × 随机种子) 的全部组合，
+每种组分数汇总：
+- 重构误差（最优 / 平均 / 标准差）
+- 稳定性：各次重启的 H 与最优一次按余弦相似度做最优匹配（匈牙利算法）后的平均相似度，1.0 表示完全一致
+- 耗时（各次拟合的累计 CPU 时间与整体墙钟时间）
+
+注意：init='nndsvd' 与随机种子无关（结果确定），多种子扫描应使用 'random' 或 'nndsvdar'。
+"""
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+def _fit_one(config, X: np.ndarray) -> Dict[str, Any]:
+    """子任务入口：config = (n_components, seed, init, max_iter, tol)"""
+    from sklearn.decomposition import NMF
+
+    n_components, seed, init, max_iter, tol = config
+    start = time.perf_counter()
+    try:
+        from threadpoolctl import threadpool_limits
+        limiter = threadpool_limits(limits=1)
+    except ImportError:
+        limiter = None
+    try:
+        model = NMF(n_components=n_components, init=init, random_state=seed, max_iter=max_iter, tol=tol)
+        W = model.fit_transform(X)
+        H = model.components_
+    finally:
+        if limiter is not None:
+            limiter.unregister()
+    return {
+        'n_components': n_components,
+        'seed': seed,
+        'W': W,
+        'H': H,
+        'reconstruction_err': float(model.reconstruction_err_),
+        'n_iter': int(model.n_iter_),
+        'elapsed': time.perf_counter() - start,
+    }
+
+
+def match_components(H_ref: np.ndarray, H: np.ndarray):
+    """
+    把 H 的组分与 H_ref 一一匹配（余弦相似度最大化）
+
+    Returns:
+        (order, similarities)：H[order] 与 H_ref 逐行对应，similarities 为各对的余弦相似度
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    def _normalize(M):
+        norms = np.linalg.norm(M, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return M / norms
+
+    sim = _normalize(H_ref) @ _normalize(H).T
+    rows, cols = linear_sum_assignment(-sim)
+    return cols[np.argsort(rows)], sim[rows, cols][np.argsort(rows)]
+
+
+def summarize_runs(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """汇总同一组分数的多次拟合：最优模型、误差统计与稳定性"""
+    errors = np.array([r['reconstruction_err'] for r in runs])
+    best = runs[int(np.argmin(errors))]
+    similarities = []
+    for run in runs:
+        if run is best:
+            continue
+        _, sim = match_components(best['H'], run['H'])
+        similarities.append(float(np.mean(sim)))
+    return {
+        'n_components': best['n_components'],
+        'n_runs': len(runs),
+        'best_seed': best['seed'],
+        'best_error': float(errors.min()),
+        'mean_error': float(errors.mean()),
+        'std_error': float(errors.std()),
+        'stability': float(np.mean(similarities)) if similarities else 1.0,
+        'min_stability': float(np.min(similarities)) if similarities else 1.0,
+        'mean_n_iter': float(np.mean([r['n_iter'] for r in runs])),
+        'fit_seconds': float(sum(r['elapsed'] for r in runs)),
+        'W': best['W'],
+        'H': best['H'],
+        'runs': [{k: r[k] for k in ('seed', 'reconstruction_err', 'n_iter', 'elapsed')} for r in runs],
+    }
+
+
+def run_nmf_study(X: np.ndarray, n_components_list: Iterable[int], seeds: Sequence[int],
+                  init: str = 'random', max_iter: int = 500, tol: float = 1e-4,
+                  executor: str = 'process', token=None,
+                  on_progress: Optional[Callable[[int, int, str], Any]] = None) -> List[Dict[str, Any]]:
+    """
+    并行运行 NMF 扫描
+
+    Args:
+        X: 预处理后的非负矩阵 (n_samples, n_features)
+        n_components_list: 要扫描的组分数
+        seeds: 随机种子列表
+        init: NMF 初始化方式（'random' / 'nndsvdar' / 'nndsvda' / 'nndsvd'）
+        token: CancellationToken（取消后抛出 TaskCancelled）
+        on_progress: 进度回调 callback(done, total, message)，在工作线程中调用
+
+    Returns:
+        每个组分数一条汇总（按组分数升序），见 summarize_runs；另含 'wall_seconds'
+    """
+    from src.services.task_runner import runner
+
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    max_components = min(X.shape)
+    n_components_list = sorted({int(k) for k in n_components_list if 1 <= int(k) <= max_components})
+    seeds = list(dict.fromkeys(int(s) for s in seeds))
+    configs = [(k, seed, init, max_iter, tol) for k in n_components_list for seed in seeds]
+    if not configs:
+        return []
+
+    start = time.perf_counter()
+    fits = runner.map(_fit_one, configs, X, name="NMF 扫描", category='analysis', executor=executor,
+                      token=token, describe=lambda c: f"k={c[0]}, seed={c[1]}", on_progress=on_progress)
+    wall = time.perf_counter() - start
+
+    by_k: Dict[int, List[Dict[str, Any]]] = {}
+    for fit in fits:
+        by_k.setdefault(fit['n_components'], []).append(fit)
+    summaries = []
+    for k in n_components_list:
+        summary = summarize_runs(by_k[k])
+        summary['wall_seconds'] = wall
+        summaries.append(summary)
+    return summaries
@@ -0,0 +1,173 @@
+"""
+峰值检测结果缓存（LRU）
+
+重绘时（例如只改了标记颜色或字体）同一条光谱会以相同参数反复做峰值检测。
+这里以（检测方法, 数据内容摘要, 六个峰值参数）为键缓存检测结果，
+所有绘图路径（peak_detection_helper、BatchPlotWindow、BasePlotRenderer）与
+RRUFFLibraryLoader._detect_peaks 共用同一个全局缓存 peak_cache。
+
+- 键：array_digest(y)（dtype + shape + 数据的 blake2b）+ (height, distance, prominence, width, wlen, rel_height)
+- 条目数上限 max_entries，超出按最近最少使用淘汰；线程安全
+- 可选的字节上限 max_bytes（按值中 numpy 数组的 nbytes 计），用于缓存大数组的实例
+- 命中时返回峰索引与属性的副本，调用方修改结果不会污染缓存
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from src.utils.profiling import profiler
+
+DEFAULT_MAX_ENTRIES = 4096
+
+
+def _param(value) -> Optional[float]:
+    """参数规范化：None 保持 None，数值统一为 float（10 与 10.0 视为同一键）"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def peak_params_key(height=0.0, distance=10, prominence=None, width=None,
+                    wlen=None, rel_height=None) -> Tuple:
+    """六个峰值检测参数组成的键"""
+    return tuple(_param(v) for v in (height, distance, prominence, width, wlen, rel_height))
+
+
+def _value_bytes(value: Any) -> int:
+    """值中 numpy 数组的总字节数（元组 / 列表 / 字典递归统计）"""
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sum(_value_bytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_value_bytes(v) for v in value.values())
+    return 0
+
+
+class PeakResultCache:
+    """线程安全的 LRU 峰值检测结果缓存"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, name: str = 'peak_cache',
+                 max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.name = name
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """是否已缓存（不计入命中统计，也不刷新顺序）"""
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """查询（命中计入 hits 并刷新为最近使用，未命中计入 misses）"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                profiler.count(self.name + '.hits')
+                return self._entries[key]
+            self.misses += 1
+        profiler.count(self.name + '.misses')
+        return default
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def _pop_oldest(self):
+        key, _ = self._entries.popitem(last=False)
+        self._bytes -= self._sizes.pop(key, 0)
+
+    def put(self, key: Hashable, value: Any):
+        size = _value_bytes(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes.pop(key, 0)
+                del self._entries[key]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return   # 单个值已超过上限，不缓存
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            while len(self._entries) > self.max_entries:
+                self._pop_oldest()
+            while self.max_bytes is not None and self._bytes > self.max_bytes:
+                self._pop_oldest()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """命中则返回缓存值，否则计算并存入（计算在锁外进行）"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                profiler.count(self.name + '.hits')
+                return self._entries[key]
+            self.misses += 1
+        profiler.count(self.name + '.misses')
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+peak_cache = PeakResultCache()
+
+
+def data_key(y: np.ndarray) -> str:
+    from src.core.project_hdf5 import array_digest
+    return array_digest(np.asarray(y))
+
+
+def _copy_result(peaks: np.ndarray, properties: Dict) -> Tuple[np.ndarray, Dict]:
+    return np.array(peaks, copy=True), {k: (np.array(v, copy=True) if isinstance(v, np.ndarray) else v)
+                                        for k, v in properties.items()}
+
+
+def detect_peaks_cached(x_data: np.ndarray, y_data: np.ndarray, height: float = 0.0, distance: int = 10,
+                        prominence: Optional[float] = None, width: Optional[float] = None,
+                        wlen: Optional[int] = None, rel_height: Optional[float] = None,
+                        cache: Optional[PeakResultCache] = None) -> Tuple[np.ndarray, Dict]:
+    """
+    带缓存的 PeakMatcher.detect_peaks（结果只依赖 y 与参数）
+
+    Returns:
+        (peak_indices, peak_properties)
+    """
+    from src.core.peak_matcher import PeakMatcher
+
+    cache = peak_cache if cache is None else cache
+    y_data = np.asarray(y_data)
+    key = ('matcher', data_key(y_data), peak_params_key(height, distance, prominence, width, wlen, rel_height))
+
+    def _compute():
+        peaks, properties = PeakMatcher().detect_peaks(
+            x_data, y_data, height=height, distance=distance, prominence=prominence,
+            width=width, wlen=wlen, rel_height=rel_height)
+        return _copy_result(np.asarray(peaks), properties)
+
+    peaks, properties = cache.get_or_compute(key, _compute)
+    return _copy_result(peaks, properties)
@@ -6,7 +6,7 @@ from typing import Dict, Any, Tuple, Optional
 import numpy as np
 from matplotlib.axes import Axes
 
-from src.core.peak_matcher import PeakMatcher
+from src.core.peak_cache import detect_peaks_cached
 
 
 def detect_and_plot_peaks(ax: Axes, x_data: np.ndarray, y_detect: np.ndarray, 
@@ -40,9 +40,8 @@ def detect_and_plot_peaks(ax: Axes, x_data: np.ndarray, y_detect: np.ndarray,
         # 调试：打印参数值以验证传递是否正确
         # print(f"[DEBUG] 峰值检测参数传递: height={peak_height}, distance={peak_distance}, prominence={peak_prominence}, width={peak_width}, wlen={peak_wlen}, rel_height={peak_rel_height}")
         
-        # 使用统一的峰值检测方法
-        peak_matcher = PeakMatcher()
-        peaks, properties = peak_matcher.detect_peaks(
+        # 使用统一的峰值检测方法（按数据内容 + 参数缓存，仅样式变化的重绘不再重新检测）
+        peaks, properties = detect_peaks_cached(
             x_data, y_detect,
             height=peak_height,
             distance=peak_distance,
@@ -0,0 +1,516 @@
+"""
+多峰拟合引擎：N 个重叠的 Lorentzian / Gaussian / Voigt 峰 + 线性基线
+
+- 峰形（均以半高全宽 FWHM 参数化，便于比较）：
+    lorentzian:  A / (1 + u²)，u = (x - x0) / (w/2)
+    gaussian:    A · exp(-z²/2)，z = (x - x0) / σ，σ = w / (2√(2 ln2))
+    voigt:       伪 Voigt η·L + (1-η)·G（共用 FWHM，η ∈ [0, 1] 随峰拟合）
+  Jacobian 全部解析给出（scipy.optimize.least_squares，trf），不做数值差分。
+- 初值来自 PeakMatcher.detect_peaks（按突出度取前 n_peaks 个，宽度由 peak_widths 在峰顶附近测量、按峰形换算为 FWHM），
+  检测到的峰不足时在残差最大处补峰。
+- 参数不确定度由解处的 Jacobian 给出：cov = s² (JᵀJ)⁻¹，s² = RSS / (m - n)；面积误差按一阶误差传播。
+- 系列拟合（fit_series / fit_folder）：整批光谱切成连续块并行拟合（进程池），
+  块内每条光谱以相邻（上一条）光谱的解为初值（热启动），所有光谱共用同一组峰，便于追踪谱带位置。
+- 结果为“整洁表”：每行一个（光谱, 峰），列见 TABLE_COLUMNS；results_table() 转为 DataFrame。
+"""
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+PROFILES = ('lorentzian', 'gaussian', 'voigt')
+BASELINES = ('none', 'constant', 'linear')
+
+TABLE_COLUMNS = [
+    'spectrum', 'label', 'peak', 'profile', 'center', 'center_err', 'fwhm', 'fwhm_err',
+    'amplitude', 'amplitude_err', 'area', 'area_err', 'eta', 'r2', 'success',
+]
+
+_SIGMA_PER_FWHM = 1.0 / (2.0 * np.sqrt(2.0 * np.log(2.0)))
+_SQRT_2PI = np.sqrt(2.0 * np.pi)
+
+
+def normalize_profile(profile: str) -> str:
+    """界面名称（'Lorentzian' / 'Gaussian' / 'Voigt'）转为内部名称"""
+    name = str(profile).strip().lower()
+    if name.startswith('lor'):
+        return 'lorentzian'
+    if name.startswith('gau'):
+        return 'gaussian'
+    if 'voigt' in name:
+        return 'voigt'
+    raise ValueError(f"未知的峰形: {profile}")
+
+
+def _n_peak_params(profile: str) -> int:
+    return 4 if profile == 'voigt' else 3
+
+
+def _n_baseline_params(baseline: str) -> int:
+    return {'none': 0, 'constant': 1, 'linear': 2}[baseline]
+
+
+def _profile_terms(x: np.ndarray, center, fwhm, profile: str, eta=None):
+    """
+    单位高度峰形及其对 x0 / w / η 的导数，x0、w、η 可为 (n_peaks,) 数组（广播为 (n_points, n_peaks)）
+
+    Returns:
+        (f, df_dx0, df_dw, df_deta)
+    """
+    d = x[:, None] - np.asarray(center)[None, :]
+    w = np.asarray(fwhm)[None, :]
+    f_l = df_l_x0 = df_l_w = None
+    f_g = df_g_x0 = df_g_w = None
+    if profile in ('lorentzian', 'voigt'):
+        g = 0.5 * w
+        u = d / g
+        denom = 1.0 + u * u
+        f_l = 1.0 / denom
+        t = 2.0 * u / (g * denom * denom)
+        df_l_x0 = t
+        df_l_w = 0.5 * t * u          # ∂/∂g = 2u²/(g·denom²)，∂g/∂w = 1/2
+    if profile in ('gaussian', 'voigt'):
+        s = _SIGMA_PER_FWHM * w
+        z = d / s
+        f_g = np.exp(-0.5 * z * z)
+        df_g_x0 = f_g * z / s
+        df_g_w = f_g * z * z / s * _SIGMA_PER_FWHM
+    if profile == 'lorentzian':
+        return f_l, df_l_x0, df_l_w, None
+    if profile == 'gaussian':
+        return f_g, df_g_x0, df_g_w, None
+    e = np.asarray(eta)[None, :]
+    f = e * f_l + (1.0 - e) * f_g
+    return f, e * df_l_x0 + (1.0 - e) * df_g_x0, e * df_l_w + (1.0 - e) * df_g_w, f_l - f_g
+
+
+class MultiPeakModel:
+    """
+    参数向量：[A_1, x0_1, w_1, (η_1), ..., A_n, x0_n, w_n, (η_n), 基线系数...]
+
+    线性基线以 (x - x_mid) / x_half 为自变量，改善条件数。
+    """
+
+    def __init__(self, x: np.ndarray, n_peaks: int, profile: str = 'lorentzian', baseline: str = 'linear'):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.n_peaks = int(n_peaks)
+        self.profile = normalize_profile(profile)
+        self.baseline = baseline
+        self.k = _n_peak_params(self.profile)
+        self.n_base = _n_baseline_params(baseline)
+        self.x_mid = 0.5 * (self.x.min() + self.x.max())
+        self.x_half = max(0.5 * (self.x.max() - self.x.min()), 1e-12)
+        self.t = (self.x - self.x_mid) / self.x_half
+
+    @property
+    def n_params(self) -> int:
+        return self.n_peaks * self.k + self.n_base
+
+    def split(self, p: np.ndarray):
+        peaks = np.asarray(p[:self.n_peaks * self.k]).reshape(self.n_peaks, self.k)
+        return peaks, np.asarray(p[self.n_peaks * self.k:])
+
+    def pack(self, peaks: np.ndarray, base: Optional[np.ndarray] = None) -> np.ndarray:
+        base = np.zeros(self.n_base) if base is None else np.asarray(base, dtype=np.float64)[:self.n_base]
+        return np.concatenate([np.asarray(peaks, dtype=np.float64)[:, :self.k].ravel(), base])
+
+    def _baseline(self, base: np.ndarray) -> np.ndarray:
+        if self.n_base == 0:
+            return np.zeros_like(self.x)
+        if self.n_base == 1:
+            return np.full_like(self.x, base[0])
+        return base[0] + base[1] * self.t
+
+    def components(self, p: np.ndarray) -> np.ndarray:
+        """各峰曲线 (n_points, n_peaks)，不含基线"""
+        peaks, _ = self.split(p)
+        eta = peaks[:, 3] if self.k == 4 else None
+        f, _, _, _ = _profile_terms(self.x, peaks[:, 1], peaks[:, 2], self.profile, eta)
+        return f * peaks[:, 0][None, :]
+
+    def evaluate(self, p: np.ndarray) -> np.ndarray:
+        peaks, base = self.split(p)
+        return self.components(p).sum(axis=1) + self._baseline(base)
+
+    def jacobian(self, p: np.ndarray) -> np.ndarray:
+        """解析 Jacobian (n_points, n_params)"""
+        peaks, _ = self.split(p)
+        eta = peaks[:, 3] if self.k == 4 else None
+        f, dx0, dw, deta = _profile_terms(self.x, peaks[:, 1], peaks[:, 2], self.profile, eta)
+        A = peaks[:, 0][None, :]
+        J = np.empty((self.x.size, self.n_params))
+        block = J[:, :self.n_peaks * self.k].reshape(self.x.size, self.n_peaks, self.k)
+        block[:, :, 0] = f
+        block[:, :, 1] = A * dx0
+        block[:, :, 2] = A * dw
+        if self.k == 4:
+            block[:, :, 3] = A * deta
+        J[:, :self.n_peaks * self.k] = block.reshape(self.x.size, -1)
+        if self.n_base >= 1:
+            J[:, -self.n_base] = 1.0
+        if self.n_base == 2:
+            J[:, -1] = self.t
+        return J
+
+    def areas(self, peaks: np.ndarray):
+        """各峰面积及其对 (A, x0, w, η) 的梯度 (n_peaks, k)"""
+        A, w = peaks[:, 0], peaks[:, 2]
+        c_l = np.pi * 0.5          # Lorentzian 面积 = A·π·w/2
+        c_g = _SIGMA_PER_FWHM * _SQRT_2PI   # Gaussian 面积 = A·σ·√(2π)
+        grad = np.zeros((peaks.shape[0], self.k))
+        if self.profile == 'lorentzian':
+            c = np.full_like(A, c_l)
+        elif self.profile == 'gaussian':
+            c = np.full_like(A, c_g)
+        else:
+            eta = peaks[:, 3]
+            c = eta * c_l + (1.0 - eta) * c_g
+            grad[:, 3] = A * w * (c_l - c_g)
+        grad[:, 0] = c * w
+        grad[:, 2] = c * A
+        return c * A * w, grad
+
+
+# 初始宽度在峰顶 75% 高度处测量（受相邻重叠峰和基线影响比半高处小），再按峰形换算为 FWHM：
+# lorentzian: w_f = FWHM·√(1/f - 1)；gaussian: w_f = FWHM·√(ln(1/f) / ln2)；voigt 取两者平均
+_WIDTH_LEVEL = 0.75
+_FWHM_PER_WIDTH = {
+    'lorentzian': 1.0 / np.sqrt(1.0 / _WIDTH_LEVEL - 1.0),
+    'gaussian': 1.0 / np.sqrt(np.log(1.0 / _WIDTH_LEVEL) / np.log(2.0)),
+}
+_FWHM_PER_WIDTH['voigt'] = 0.5 * (_FWHM_PER_WIDTH['lorentzian'] + _FWHM_PER_WIDTH['gaussian'])
+_INITIAL_ETA = {'lorentzian': 1.0, 'gaussian': 0.0, 'voigt': 0.5}
+
+
+def _estimate_widths(x: np.ndarray, y: np.ndarray, indices: np.ndarray, profile: str = 'lorentzian') -> np.ndarray:
+    """按峰形换算的 FWHM 初值（x 单位）"""
+    from scipy.signal import peak_widths
+
+    dx = np.abs(np.gradient(x)) if x.size > 1 else np.ones(1)
+    try:
+        widths = peak_widths(y, indices, rel_height=1.0 - _WIDTH_LEVEL)[0] * _FWHM_PER_WIDTH[profile]
+    except Exception:
+        widths = np.full(len(indices), 3.0)
+    widths = np.maximum(widths, 1.0) * dx[indices]
+    return widths
+
+
+def initial_peaks(x: np.ndarray, y: np.ndarray, n_peaks: Optional[int] = None,
+                  profile: str = 'lorentzian', detect_kwargs: Optional[Dict[str, Any]] = None,
+                  centers: Optional[Sequence[float]] = None) -> np.ndarray:
+    """
+    初值 (n_peaks, 4)：[高度, 中心, FWHM, η]（η 仅 voigt 使用，初值 0.5；lorentzian / gaussian 记为 1 / 0，与拟合结果一致）
+
+    Args:
+        n_peaks: 峰数；None 表示使用检测到的全部峰
+        profile: 峰形，决定由峰顶宽度换算 FWHM 的系数以及补峰时的模型
+        detect_kwargs: 传给 PeakMatcher.detect_peaks 的参数（height / distance / prominence 等）
+        centers: 直接给定峰中心（跳过检测）
+    """
+    from src.core.peak_matcher import PeakMatcher
+
+    profile = normalize_profile(profile)
+    eta = _INITIAL_ETA[profile]
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    y0 = y - np.min(y)
+    span = float(np.ptp(x)) or 1.0
+
+    if centers is not None:
+        idx = np.array([int(np.argmin(np.abs(x - c))) for c in centers], dtype=int)
+    else:
+        kwargs = {'prominence': 0.02 * float(np.ptp(y)) or None}
+        kwargs.update(detect_kwargs or {})
+        idx, props = PeakMatcher().detect_peaks(x, y, **kwargs)
+        idx = np.asarray(idx, dtype=int)
+        if idx.size and n_peaks is not None and idx.size > n_peaks:
+            if 'prominences' in props:
+                score = np.asarray(props['prominences'])
+            else:
+                score = y0[idx]
+            idx = np.sort(idx[np.argsort(score)[::-1][:n_peaks]])
+
+    peaks = []
+    if idx.size:
+        widths = _estimate_widths(x, y0, idx, profile)
+        for i, w in zip(idx, widths):
+            peaks.append([y0[i], x[i], min(float(w), span), eta])
+
+    # 检测到的峰不足：在当前初值的残差最大处补峰（例如散射尾部在数据边缘，find_peaks 找不到）
+    target = len(peaks) if n_peaks is None else int(n_peaks)
+    target = max(target, 1)
+    default_w = span / 20.0
+    while len(peaks) < target:
+        model = MultiPeakModel(x, len(peaks), profile, 'none')
+        residual = y0 - (model.evaluate(model.pack(np.array(peaks))) if peaks else 0.0)
+        i = int(np.argmax(residual))
+        peaks.append([max(residual[i], 0.0), x[i], default_w, eta])
+    peaks = np.array(peaks[:target], dtype=np.float64)
+    return peaks[np.argsort(peaks[:, 1])]   # 峰编号按中心升序，与波数轴方向无关
+
+
+def _bounds(model: MultiPeakModel, template: np.ndarray, max_shift: Optional[float],
+            min_fwhm: float, max_fwhm: float):
+    x_lo, x_hi = float(model.x.min()), float(model.x.max())
+    lower = np.full((model.n_peaks, model.k), -np.inf)
+    upper = np.full((model.n_peaks, model.k), np.inf)
+    lower[:, 0] = 0.0
+    lower[:, 1] = x_lo
+    upper[:, 1] = x_hi
+    if max_shift is not None:
+        lower[:, 1] = np.maximum(template[:, 1] - max_shift, x_lo)
+        upper[:, 1] = np.minimum(template[:, 1] + max_shift, x_hi)
+    lower[:, 2] = min_fwhm
+    upper[:, 2] = max_fwhm
+    if model.k == 4:
+        lower[:, 3] = 0.0
+        upper[:, 3] = 1.0
+    lo = np.concatenate([lower.ravel(), np.full(model.n_base, -np.inf)])
+    hi = np.concatenate([upper.ravel(), np.full(model.n_base, np.inf)])
+    return lo, hi
+
+
+def fit_spectrum(x: np.ndarray, y: np.ndarray, initial: np.ndarray, profile: str = 'lorentzian',
+                 baseline: str = 'linear', max_shift: Optional[float] = None,
+                 template: Optional[np.ndarray] = None, max_nfev: Optional[int] = None) -> Dict[str, Any]:
+    """
+    拟合单条光谱
+
+    Args:
+        initial: 初值 (n_peaks, 3 或 4)，见 initial_peaks；也可为上一条光谱的 'peaks'（热启动）
+        max_shift: 峰中心相对 template 允许的最大偏移（None 表示限制在数据范围内）
+        template: 中心约束的参照（默认 initial）
+
+    Returns:
+        {'peaks': (n_peaks, 4) [高度, 中心, FWHM, η], 'errors': 同形状标准误差,
+         'areas', 'area_errors', 'baseline', 'fitted', 'r2', 'success', 'nfev', 'message'}
+    """
+    from scipy.optimize import least_squares
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    order = np.argsort(x)
+    x, y = x[order], y[order]
+    initial = np.asarray(initial, dtype=np.float64)
+    if initial.shape[1] < 4:
+        initial = np.hstack([initial, np.full((initial.shape[0], 4 - initial.shape[1]), 0.5)])
+    template = initial if template is None else np.asarray(template, dtype=np.float64)
+    model = MultiPeakModel(x, initial.shape[0], profile, baseline)
+
+    dx = float(np.median(np.abs(np.diff(x)))) if x.size > 1 else 1.0
+    span = float(np.ptp(x)) or 1.0
+    min_fwhm, max_fwhm = 0.5 * dx, span
+    lo, hi = _bounds(model, template, max_shift, min_fwhm, max_fwhm)
+
+    base0 = np.zeros(model.n_base)
+    if model.n_base:
+        base0[0] = float(np.min(y))
+    p0 = np.clip(model.pack(initial, base0), lo, hi)
+    # least_squares 要求初值严格位于边界内
+    inside = (p0 <= lo) | (p0 >= hi)
+    if np.any(inside):
+        eps = 1e-9 * np.maximum(np.abs(p0), 1.0)
+        p0 = np.where(p0 <= lo, lo + eps, p0)
+        p0 = np.where(p0 >= hi, hi - eps, p0)
+
+    res = least_squares(lambda p: model.evaluate(p) - y, p0, jac=lambda p: model.jacobian(p),
+                        bounds=(lo, hi), method='trf', x_scale='jac',
+                        max_nfev=max_nfev or 100 * model.n_params)
+    p = res.x
+    peaks, base = model.split(p)
+    fitted = model.evaluate(p)
+    rss = float(np.sum(res.fun ** 2))
+    tss = float(np.sum((y - y.mean()) ** 2))
+
+    # 标准误差：cov = s² (JᵀJ)⁻¹（SVD 伪逆，与 curve_fit 相同做法）
+    dof = max(x.size - model.n_params, 1)
+    _, s, VT = np.linalg.svd(res.jac, full_matrices=False)
+    threshold = np.finfo(float).eps * max(res.jac.shape) * (s[0] if s.size else 0.0)
+    s = s[s > threshold]
+    VT = VT[:s.size]
+    cov = (VT.T / s ** 2) @ VT * (rss / dof)
+    errors = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+    peak_errors = errors[:model.n_peaks * model.k].reshape(model.n_peaks, model.k)
+
+    areas, grad = model.areas(peaks)
+    area_errors = np.empty(model.n_peaks)
+    for i in range(model.n_peaks):
+        sl = slice(i * model.k, (i + 1) * model.k)
+        area_errors[i] = np.sqrt(max(float(grad[i] @ cov[sl, sl] @ grad[i]), 0.0))
+
+    full = np.full((model.n_peaks, 4), np.nan)
+    full[:, :model.k] = peaks
+    full_err = np.full((model.n_peaks, 4), np.nan)
+    full_err[:, :model.k] = peak_errors
+    if model.k == 3:
+        full[:, 3] = 1.0 if model.profile == 'lorentzian' else 0.0
+        full_err[:, 3] = 0.0
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(order.size)
+    return {
+        'peaks': full,
+        'errors': full_err,
+        'areas': areas,
+        'area_errors': area_errors,
+        'baseline': base,
+        'fitted': fitted[inverse],
+        'r2': 1.0 - rss / tss if tss > 0 else 0.0,
+        'success': bool(res.success),
+        'nfev': int(res.nfev),
+        'message': res.message,
+    }
+
+
+def _rows(result: Dict[str, Any], index: int, label: str, profile: str) -> List[Dict[str, Any]]:
+    """单条光谱的结果展开为整洁表的行"""
+    rows = []
+    for k in range(result['peaks'].shape[0]):
+        pk, err = result['peaks'][k], result['errors'][k]
+        rows.append({
+            'spectrum': index, 'label': label, 'peak': k + 1, 'profile': profile,
+            'center': pk[1], 'center_err': err[1], 'fwhm': pk[2], 'fwhm_err': err[2],
+            'amplitude': pk[0], 'amplitude_err': err[0],
+            'area': result['areas'][k], 'area_err': result['area_errors'][k],
+            'eta': pk[3], 'r2': result['r2'], 'success': result['success'],
+        })
+    return rows
+
+
+def _failed_rows(index: int, label: str, profile: str, n_peaks: int) -> List[Dict[str, Any]]:
+    return [{**{c: np.nan for c in TABLE_COLUMNS}, 'spectrum': index, 'label': label, 'peak': k + 1,
+             'profile': profile, 'success': False} for k in range(n_peaks)]
+
+
+def _fit_sequence(spectra, template: np.ndarray, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    顺序拟合一段光谱，每条以上一条的解为初值（失败时退回模板）
+
+    spectra: 可迭代的 (index, label, x, y)；读取失败时 x 为 None
+    """
+    profile = normalize_profile(config['profile'])
+    rows: List[Dict[str, Any]] = []
+    previous = None
+    for index, label, x, y in spectra:
+        if x is None:
+            rows.extend(_failed_rows(index, label, profile, template.shape[0]))
+            previous = None
+            continue
+        try:
+            result = fit_spectrum(x, y, template if previous is None else previous, profile=profile,
+                                  baseline=config['baseline'], max_shift=config['max_shift'], template=template)
+            rows.extend(_rows(result, index, label, profile))
+            previous = result['peaks'] if result['success'] else None
+        except Exception as e:
+            print(f"峰拟合失败（{label}）: {e}")
+            rows.extend(_failed_rows(index, label, profile, template.shape[0]))
+            previous = None
+    return rows
+
+
+def _fit_array_block(block, x: np.ndarray, Y: np.ndarray, labels, template: np.ndarray,
+                     config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """子任务入口：拟合 Y[start:stop]（Y 由 runner 放入共享内存）"""
+    start, stop = block
+    return _fit_sequence(((i, labels[i], x, Y[i]) for i in range(start, stop)), template, config)
+
+
+def _read_spectrum(path: str, config: Dict[str, Any]):
+    from src.utils.spectrum_reader import read_spectrum
+
+    try:
+        x, y = read_spectrum(path, config.get('skip_rows', -1), config.get('x_min'), config.get('x_max'))
+        return np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    except Exception:
+        return None, None
+
+
+def _fit_file_block(block, template: np.ndarray, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """子任务入口：在工作进程中读取并拟合一段文件"""
+    def _spectra():
+        for index, path in block:
+            x, y = _read_spectrum(path, config)
+            yield index, os.path.basename(path), x, y
+    return _fit_sequence(_spectra(), template, config)
+
+
+def _blocks(n: int, n_blocks: Optional[int]) -> List[tuple]:
+    from src.services.task_runner import runner
+
+    if n_blocks is None:
+        n_blocks = max(1, int(getattr(runner, 'max_workers', 1) or 1))
+    n_blocks = max(1, min(n_blocks, n))
+    edges = np.linspace(0, n, n_blocks + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def fit_series(x: np.ndarray, Y: np.ndarray, initial: Optional[np.ndarray] = None,
+               n_peaks: Optional[int] = None, profile: str = 'lorentzian', baseline: str = 'linear',
+               max_shift: Optional[float] = None, labels: Optional[Sequence[str]] = None,
+               detect_kwargs: Optional[Dict[str, Any]] = None, n_blocks: Optional[int] = None,
+               executor: str = 'process', token=None,
+               on_progress: Optional[Callable[[int, int, str], Any]] = None) -> List[Dict[str, Any]]:
+    """
+    拟合共用波数轴的一组光谱（如时间/温度序列）
+
+    Args:
+        Y: (n_spectra, n_points)
+        initial: 峰初值（默认由第一条光谱检测，见 initial_peaks）
+        n_blocks: 并行块数（默认为任务调度器的工作线程数）；块内按顺序热启动
+
+    Returns:
+        整洁表的行（按光谱、峰排序）
+    """
+    from src.services.task_runner import runner
+
+    x = np.asarray(x, dtype=np.float64)
+    Y = np.ascontiguousarray(Y, dtype=np.float64)
+    if Y.ndim == 1:
+        Y = Y[None, :]
+    labels = [str(i) for i in range(Y.shape[0])] if labels is None else [str(l) for l in labels]
+    if initial is None:
+        initial = initial_peaks(x, Y[0], n_peaks=n_peaks, profile=profile, detect_kwargs=detect_kwargs)
+    config = {'profile': profile, 'baseline': baseline, 'max_shift': max_shift}
+    blocks = _blocks(Y.shape[0], n_blocks)
+    parts = runner.map(_fit_array_block, blocks, x, Y, labels, np.asarray(initial), config,
+                       name="多峰拟合", category='analysis', executor=executor, token=token,
+                       describe=lambda b: f"光谱 {b[0] + 1}-{b[1]}", on_progress=on_progress)
+    return [row for part in parts for row in part]
+
+
+def fit_folder(files: Sequence[str], initial: Optional[np.ndarray] = None, n_peaks: Optional[int] = None,
+               profile: str = 'lorentzian', baseline: str = 'linear', max_shift: Optional[float] = None,
+               skip_rows: int = -1, x_min: Optional[float] = None, x_max: Optional[float] = None,
+               detect_kwargs: Optional[Dict[str, Any]] = None, n_blocks: Optional[int] = None,
+               executor: str = 'process', token=None,
+               on_progress: Optional[Callable[[int, int, str], Any]] = None) -> List[Dict[str, Any]]:
+    """
+    拟合一组光谱文件（按给定顺序视为序列，读取与拟合都在工作进程中进行）
+
+    峰初值默认由第一个可读文件检测；各文件可有不同的波数轴。
+    """
+    from src.services.task_runner import runner
+
+    files = list(files)
+    config = {'profile': profile, 'baseline': baseline, 'max_shift': max_shift,
+              'skip_rows': skip_rows, 'x_min': x_min, 'x_max': x_max}
+    if initial is None:
+        for path in files:
+            x0, y0 = _read_spectrum(path, config)
+            if x0 is not None:
+                initial = initial_peaks(x0, y0, n_peaks=n_peaks, profile=profile, detect_kwargs=detect_kwargs)
+                break
+        else:
+            raise ValueError("没有可读取的光谱文件")
+    indexed = list(enumerate(files))
+    blocks = [indexed[a:b] for a, b in _blocks(len(files), n_blocks)]
+    parts = runner.map(_fit_file_block, blocks, np.asarray(initial), config,
+                       name="多峰拟合", category='analysis', executor=executor, token=token,
+                       describe=lambda b: os.path.basename(b[-1][1]), on_progress=on_progress)
+    return [row for part in parts for row in part]
+
+
+def results_table(rows: List[Dict[str, Any]]):
+    """整洁表的行转为 pandas DataFrame（列顺序见 TABLE_COLUMNS）"""
+    import pandas as pd
+
+    return pd.DataFrame(rows, columns=TABLE_COLUMNS)
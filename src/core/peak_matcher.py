@@ -1,6 +1,12 @@
 """
 峰值匹配模块
 实现多模式峰值匹配功能，支持所有绘图类型
+
+匹配引擎基于排序后的峰位数组：
+- match_sorted：双指针归并，每个参考峰取容差内最近的目标峰，一一对应且不交叉，O(n + m)
+- optimal=True：容差内的最优一对一分配（先最大化匹配数，再最小化总距离），
+  按“容差内相连的峰簇”分块调用匈牙利算法，簇通常只有几个峰
+- match_all_pairs：对预先计算（并已排序）的峰位列表，一次给出所有光谱对的匹配结果
 """
 from typing import List, Tuple, Dict, Optional
 import numpy as np
@@ -8,6 +14,129 @@ from scipy.signal import find_peaks
 from scipy.interpolate import interp1d
 
 
+def _cluster_bounds(ref: np.ndarray, tgt: np.ndarray, tolerance: float):
+    """把容差内相连的参考峰 / 目标峰划分成互不相关的簇，返回含两类峰的簇 [(r0, r1, t0, t1), ...]"""
+    events = np.concatenate([ref, tgt])
+    is_ref = np.concatenate([np.ones(ref.size, dtype=int), np.zeros(tgt.size, dtype=int)])
+    order = np.argsort(events, kind='mergesort')
+    events, is_ref = events[order], is_ref[order]
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(events) > tolerance) + 1])
+    n_ref = np.add.reduceat(is_ref, starts)
+    n_tgt = np.diff(np.append(starts, events.size)) - n_ref
+    r_end = np.cumsum(n_ref)
+    t_end = np.cumsum(n_tgt)
+    return [(int(re - nr), int(re), int(te - nt), int(te))
+            for nr, nt, re, te in zip(n_ref, n_tgt, r_end, t_end) if nr and nt]
+
+
+def match_sorted(ref: np.ndarray, tgt: np.ndarray, tolerance: float,
+                 optimal: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    匹配两组已升序排列的峰位
+
+    Args:
+        ref, tgt: 升序峰位（波数）
+        tolerance: 匹配容差
+        optimal: False 为双指针贪心（每个参考峰取最近的可用目标峰）；True 为容差内最优一对一分配
+
+    Returns:
+        (ref_index, tgt_index, distance)，均按参考峰升序
+    """
+    ref = np.asarray(ref, dtype=np.float64)
+    tgt = np.asarray(tgt, dtype=np.float64)
+    if ref.size == 0 or tgt.size == 0:
+        empty = np.array([], dtype=int)
+        return empty, empty, np.array([], dtype=np.float64)
+
+    ri: List[int] = []
+    ti: List[int] = []
+    if optimal:
+        from scipy.optimize import linear_sum_assignment
+
+        for r0, r1, t0, t1 in _cluster_bounds(ref, tgt, tolerance):
+            d = np.abs(ref[r0:r1, None] - tgt[None, t0:t1])
+            big = tolerance * (d.size + 1) + 1.0
+            cost = np.where(d <= tolerance, d, big)
+            rows, cols = linear_sum_assignment(cost)
+            keep = d[rows, cols] <= tolerance
+            ri.extend((rows[keep] + r0).tolist())
+            ti.extend((cols[keep] + t0).tolist())
+    else:
+        n_tgt = tgt.size
+        lo = 0      # 尚未使用的目标峰的起点（匹配不交叉）
+        k = 0       # 第一个 >= 当前参考峰的目标峰（随参考峰单调前进）
+        for i, r in enumerate(ref):
+            while k < n_tgt and tgt[k] < r:
+                k += 1
+            best = -1
+            best_d = tolerance
+            for j in (k - 1, k):
+                if lo <= j < n_tgt:
+                    d = abs(tgt[j] - r)
+                    if d <= best_d and (best < 0 or d < best_d):
+                        best, best_d = j, d
+            if best >= 0:
+                ri.append(i)
+                ti.append(best)
+                lo = best + 1
+                k = max(k, lo)
+    ri_arr = np.asarray(ri, dtype=int)
+    ti_arr = np.asarray(ti, dtype=int)
+    order = np.argsort(ri_arr, kind='mergesort')
+    ri_arr, ti_arr = ri_arr[order], ti_arr[order]
+    return ri_arr, ti_arr, np.abs(ref[ri_arr] - tgt[ti_arr])
+
+
+def sorted_peak_positions(x: np.ndarray, peaks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """峰索引 -> (升序峰位, 对应的原峰索引)"""
+    peaks = np.asarray(peaks, dtype=int)
+    positions = np.asarray(x, dtype=np.float64)[peaks]
+    order = np.argsort(positions, kind='mergesort')
+    return positions[order], peaks[order]
+
+
+def match_all_pairs(peak_positions: List[np.ndarray], tolerance: float, optimal: bool = False,
+                    pairs: Optional[List[Tuple[int, int]]] = None) -> Dict[Tuple[int, int], Tuple]:
+    """
+    所有光谱对的峰匹配（峰位列表只排序一次）
+
+    Args:
+        peak_positions: 每条光谱的峰位（波数）
+        pairs: 只计算这些 (i, j) 对；默认所有 i < j
+
+    Returns:
+        {(i, j): (i 中的峰序号, j 中的峰序号, 距离)}，峰序号指向 peak_positions[i] / [j] 原顺序
+    """
+    sorted_lists = []
+    for pos in peak_positions:
+        pos = np.asarray(pos, dtype=np.float64)
+        order = np.argsort(pos, kind='mergesort')
+        sorted_lists.append((pos[order], order))
+    n = len(sorted_lists)
+    if pairs is None:
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    results = {}
+    for i, j in pairs:
+        (pi, oi), (pj, oj) = sorted_lists[i], sorted_lists[j]
+        ri, tj, d = match_sorted(pi, pj, tolerance, optimal=optimal)
+        results[(i, j)] = (oi[ri], oj[tj], d)
+    return results
+
+
+def detection_kwargs(params: Optional[Dict]) -> Dict:
+    """绘图参数字典（peak_height_threshold 等键）-> detect_peaks 的关键字参数"""
+    if not params:
+        return {}
+    return {
+        'height': params.get('peak_height_threshold', 0.0),
+        'distance': params.get('peak_distance_min', 10),
+        'prominence': params.get('peak_prominence', None),
+        'width': params.get('peak_width', None),
+        'wlen': params.get('peak_wlen', None),
+        'rel_height': params.get('peak_rel_height', None),
+    }
+
+
 class PeakMatcher:
     """峰值匹配器"""
     
@@ -101,54 +230,53 @@ class PeakMatcher:
             return np.array([]), {}
     
     def match_peaks(self, reference_peaks: np.ndarray, target_peaks: np.ndarray,
-                   reference_x: np.ndarray, target_x: np.ndarray) -> List[Tuple[int, int, float]]:
+                   reference_x: np.ndarray, target_x: np.ndarray,
+                   optimal: bool = False) -> List[Tuple[int, int, float]]:
         """
-        匹配两个光谱的峰值
+        匹配两个光谱的峰值（排序后双指针归并，一一对应）
         
         Args:
             reference_peaks: 参考光谱的峰值索引
             target_peaks: 目标光谱的峰值索引
             reference_x: 参考光谱的X轴数据
             target_x: 目标光谱的X轴数据
+            optimal: 是否在容差内做最优一对一分配
         
         Returns:
-            List of (ref_idx, target_idx, distance) 匹配对列表
+            List of (ref_idx, target_idx, distance) 匹配对列表（按参考峰原顺序）
         """
         if len(reference_peaks) == 0 or len(target_peaks) == 0:
             return []
         
-        reference_positions = reference_x[reference_peaks]
-        target_positions = target_x[target_peaks]
-        
-        matches = []
-        used_target_indices = set()
-        
-        # 对每个参考峰值，找到最近的目标峰值
-        for ref_idx, ref_pos in enumerate(reference_positions):
-            distances = np.abs(target_positions - ref_pos)
-            min_dist_idx = np.argmin(distances)
-            min_dist = distances[min_dist_idx]
-            
-            if min_dist <= self.tolerance and min_dist_idx not in used_target_indices:
-                matches.append((reference_peaks[ref_idx], target_peaks[min_dist_idx], min_dist))
-                used_target_indices.add(min_dist_idx)
-        
-        return matches
+        reference_peaks = np.asarray(reference_peaks, dtype=int)
+        ref_pos = np.asarray(reference_x, dtype=np.float64)[reference_peaks]
+        ref_order = np.argsort(ref_pos, kind='mergesort')
+        tgt_pos, tgt_sorted = sorted_peak_positions(target_x, target_peaks)
+        ri, ti, d = match_sorted(ref_pos[ref_order], tgt_pos, self.tolerance, optimal=optimal)
+        original = ref_order[ri]
+        order = np.argsort(original, kind='mergesort')
+        return [(reference_peaks[original[k]], tgt_sorted[ti[k]], float(d[k])) for k in order]
     
     def match_multiple_spectra(self, spectra_data: List[Dict], 
                               reference_index: int = -1,
-                              mode: str = 'all_matched') -> Dict:
+                              mode: str = 'all_matched',
+                              detection_params: Optional[Dict] = None,
+                              optimal: bool = False) -> Dict:
         """
         匹配多个光谱的峰值
         
         Args:
-            spectra_data: 光谱数据列表，每个元素包含 {'x': x_data, 'y': y_data, 'color': color, 'label': label}
+            spectra_data: 光谱数据列表，每个元素包含 {'x': x_data, 'y': y_data, 'color': color, 'label': label}，
+                          可附带预先计算的 'peaks'（峰值索引），此时不再检测
             reference_index: 参考光谱索引（-1表示最后一个）
             mode: 匹配模式
                 - 'all_peaks': 只显示最下面谱峰检测的所有峰值
                 - 'matched_only': 只显示最下面匹配到的谱峰
                 - 'all_matched': 显示所有谱线都匹配的谱峰
                 - 'top_display': 在最上方谱线显示最下方谱峰匹配到的峰值
+            detection_params: 峰值检测参数（与绘图参数相同的 peak_* 键），None 时使用默认参数；
+                              检测结果经 peak_cache 缓存
+            optimal: 容差内最优一对一分配（默认双指针贪心）
         
         Returns:
             匹配结果字典
@@ -163,14 +291,22 @@ class PeakMatcher:
         if reference_index >= len(spectra_data):
             reference_index = len(spectra_data) - 1
         
-        reference_spectrum = spectra_data[reference_index]
+        kwargs = detection_kwargs(detection_params)
+        all_peaks = {}
         
-        # 检测参考光谱的峰值
-        ref_x = reference_spectrum['x']
-        ref_y = reference_spectrum['y']
+        def peaks_of(i):
+            if i not in all_peaks:
+                spectrum = spectra_data[i]
+                if spectrum.get('peaks') is not None:
+                    all_peaks[i] = np.asarray(spectrum['peaks'], dtype=int)
+                else:
+                    from src.core.peak_cache import detect_peaks_cached
+                    all_peaks[i] = np.asarray(detect_peaks_cached(spectrum['x'], spectrum['y'], **kwargs)[0], dtype=int)
+            return all_peaks[i]
         
-        # 使用默认参数检测峰值（实际应该从配置中获取）
-        ref_peaks, _ = self.detect_peaks(ref_x, ref_y)
+        reference_spectrum = spectra_data[reference_index]
+        ref_x = np.asarray(reference_spectrum['x'])
+        ref_peaks = peaks_of(reference_index)
         
         if len(ref_peaks) == 0:
             return {
@@ -180,13 +316,13 @@ class PeakMatcher:
                 'mode': mode
             }
         
-        # 检测所有光谱的峰值
-        all_peaks = {}
-        for i, spectrum in enumerate(spectra_data):
-            x = spectrum['x']
-            y = spectrum['y']
-            peaks, _ = self.detect_peaks(x, y)
-            all_peaks[i] = peaks
+        # 参考峰只排序一次，各目标光谱与之双指针归并
+        ref_pos, ref_sorted = sorted_peak_positions(ref_x, ref_peaks)
+        
+        def match_to(i):
+            tgt_pos, tgt_sorted = sorted_peak_positions(spectra_data[i]['x'], peaks_of(i))
+            ri, ti, d = match_sorted(ref_pos, tgt_pos, self.tolerance, optimal=optimal)
+            return ri, [(ref_sorted[a], tgt_sorted[b], float(dist)) for a, b, dist in zip(ri, ti, d)]
         
         # 根据模式进行匹配
         matches = {}
@@ -201,43 +337,39 @@ class PeakMatcher:
         
         elif mode == 'matched_only':
             # 只显示匹配到的峰值
-            for i, spectrum in enumerate(spectra_data):
+            for i in range(len(spectra_data)):
                 if i == reference_index:
                     matches[i] = {
                         'peaks': ref_peaks,
                         'positions': ref_x[ref_peaks],
                         'matched': True
                     }
-                else:
-                    target_peaks = all_peaks.get(i, np.array([]))
-                    if len(target_peaks) > 0:
-                        match_pairs = self.match_peaks(ref_peaks, target_peaks, ref_x, spectrum['x'])
-                        if match_pairs:
-                            matched_ref_indices = [pair[0] for pair in match_pairs]
-                            matches[i] = {
-                                'peaks': np.array(matched_ref_indices),
-                                'positions': ref_x[matched_ref_indices],
-                                'matched': True,
-                                'match_pairs': match_pairs
-                            }
+                elif len(peaks_of(i)) > 0:
+                    _, match_pairs = match_to(i)
+                    if match_pairs:
+                        matched_ref_indices = np.array([pair[0] for pair in match_pairs])
+                        matches[i] = {
+                            'peaks': matched_ref_indices,
+                            'positions': ref_x[matched_ref_indices],
+                            'matched': True,
+                            'match_pairs': match_pairs
+                        }
         
         elif mode == 'all_matched':
-            # 显示所有谱线都匹配的峰值
-            # 找到所有光谱都匹配的峰值
-            common_peaks = set(range(len(ref_peaks)))
-            
-            for i, spectrum in enumerate(spectra_data):
-                if i == reference_index:
+            # 显示所有谱线都匹配的峰值（按参考峰排序后的序号求交集）
+            common = np.ones(ref_sorted.size, dtype=bool)
+            for i in range(len(spectra_data)):
+                if i == reference_index or len(peaks_of(i)) == 0:
                     continue
-                
-                target_peaks = all_peaks.get(i, np.array([]))
-                if len(target_peaks) > 0:
-                    match_pairs = self.match_peaks(ref_peaks, target_peaks, ref_x, spectrum['x'])
-                    matched_ref_indices = {pair[0] for pair in match_pairs}
-                    common_peaks &= matched_ref_indices
+                ri, _ = match_to(i)
+                matched = np.zeros(ref_sorted.size, dtype=bool)
+                matched[ri] = True
+                common &= matched
+                if not common.any():
+                    break
             
-            if common_peaks:
-                common_peak_indices = np.array([ref_peaks[i] for i in common_peaks])
+            if common.any():
+                common_peak_indices = ref_sorted[common]
                 for i in range(len(spectra_data)):
                     matches[i] = {
                         'peaks': common_peak_indices,
@@ -263,4 +395,3 @@ class PeakMatcher:
             'matches': matches,
             'mode': mode
         }
-
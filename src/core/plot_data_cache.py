@@ -132,9 +132,11 @@ class PlotDataCache:
         # 限制缓存大小
         if len(self.file_cache) > self.max_cache_size:
             # 删除最旧的条目
-            oldest_key = min(self.file_cache.keys(), 
-                           key=lambda k: self.file_cache[k].timestamp)
-            del self.file_cache[oldest_key]
+            # 组统计会在多个工作线程中读取文件，淘汰时容忍并发删除
+            entries = list(self.file_cache.items())
+            if entries:
+                oldest_key = min(entries, key=lambda item: item[1].timestamp)[0]
+                self.file_cache.pop(oldest_key, None)
     
     def get_preprocess_data(self, file_path: str, preprocess_params: Dict) -> Optional[Any]:
         """
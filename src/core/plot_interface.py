@@ -10,6 +10,8 @@ from matplotlib.axes import Axes
 
 from src.core.plot_config_manager import PlotConfig, PlotConfigManager
 from src.core.peak_matcher import PeakMatcher
+from src.core.peak_cache import detect_peaks_cached
+from src.core.peak_detection_helper import get_peak_detection_params_from_config
 from src.core.spectrum_scanner import SpectrumScanner, StackOffsetManager
 
 
@@ -123,7 +125,7 @@ class BasePlotRenderer(IPlotRenderer):
             return
         
         pd = config.peak_detection
-        peak_indices, properties = self.peak_matcher.detect_peaks(
+        peak_indices, properties = detect_peaks_cached(
             x_data, y_data,
             height=pd.height_threshold,
             distance=pd.distance_min,
@@ -176,7 +178,8 @@ class BasePlotRenderer(IPlotRenderer):
         match_result = self.peak_matcher.match_multiple_spectra(
             spectra_list,
             reference_index=pm.reference_index,
-            mode=pm.mode
+            mode=pm.mode,
+            detection_params=get_peak_detection_params_from_config(config)
         )
         
         # 绘制匹配结果
@@ -406,6 +409,14 @@ class MeanShadowPlotRenderer(BasePlotRenderer):
             x = data.get('x', np.array([]))
             y_mean = data.get('y', np.array([]))  # 均值
             y_std = data.get('y_std', None)  # 标准差
+            stats = data.get('stats')  # group_stats 的流式统计结果（可直接传入）
+            if stats is not None:
+                if len(x) == 0:
+                    x = stats['x']
+                if len(y_mean) == 0:
+                    y_mean = stats['mean']
+                if y_std is None:
+                    y_std = stats['std']
             color = data.get('color', 'blue')
             label = data.get('label', 'Mean')
             std_label = data.get('std_label', 'Std Dev')
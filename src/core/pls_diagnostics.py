@@ -0,0 +1,153 @@
+"""
+PLS / PLS-DA 诊断量（向量化，适用于大型光谱矩阵）
+
+基于已拟合的 sklearn PLSRegression，全部以矩阵运算实现，不含逐特征 / 逐组分的 Python 循环：
+- vip_scores：VIP（Variable Importance in Projection）
+      VIP_i = sqrt( p · Σ_a (w_ia / ||w_a||)² · SS_a / Σ_a SS_a )，SS_a = (t_aᵀ t_a) · ||q_a||²
+- selectivity_ratio：选择性比（目标投影，Rajalahti et al. 2009），每个变量被目标投影成分解释的方差 / 残差方差
+- regression_coefficients：回归系数（原始尺度，(n_features,) 或 (n_features, n_targets)）
+- explained_variance：每个组分解释的 X / Y 方差比例
+- pls_diagnostics：以上各项一次算完（共享中心化矩阵与得分）
+
+与界面无关，可供分类验证窗口与脚本化流程直接调用。
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+def _scaled(model, X: np.ndarray) -> np.ndarray:
+    """按模型训练时的均值 / 标准差标准化 X（与 PLSRegression.transform 一致）"""
+    X = np.asarray(X, dtype=np.float64)
+    mean = getattr(model, '_x_mean', None)
+    std = getattr(model, '_x_std', None)
+    if mean is None:
+        mean = X.mean(axis=0)
+    Xc = X - mean
+    if std is not None:
+        Xc = Xc / std
+    return Xc
+
+
+def _scaled_y(model, y: np.ndarray) -> np.ndarray:
+    y = np.asarray(y, dtype=np.float64)
+    if y.ndim == 1:
+        y = y[:, None]
+    mean = getattr(model, '_y_mean', None)
+    std = getattr(model, '_y_std', None)
+    if mean is None:
+        mean = y.mean(axis=0)
+    yc = y - mean
+    if std is not None:
+        yc = yc / std
+    return yc
+
+
+def vip_scores(model, X: np.ndarray, T: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    VIP 分数 (n_features,)
+
+    Args:
+        model: 已拟合的 PLSRegression
+        X: 计算得分所用的数据（通常为训练集）
+        T: 可选，已算好的得分 model.transform(X)
+    """
+    W = np.asarray(model.x_weights_, dtype=np.float64)      # (p, A)
+    Q = np.asarray(model.y_loadings_, dtype=np.float64)     # (n_targets, A)
+    if T is None:
+        T = model.transform(X)
+    T = np.asarray(T, dtype=np.float64)
+    ss = np.einsum('ij,ij->j', T, T) * np.einsum('ij,ij->j', Q, Q)   # (A,)
+    total = ss.sum()
+    n_features = W.shape[0]
+    if total <= 0:
+        return np.zeros(n_features)
+    norms = np.linalg.norm(W, axis=0)
+    norms[norms == 0] = 1.0
+    Wn2 = (W / norms) ** 2
+    return np.sqrt(n_features * (Wn2 @ ss) / total)
+
+
+def regression_coefficients(model) -> np.ndarray:
+    """原始尺度的回归系数：单目标时 (n_features,)，多目标时 (n_features, n_targets)"""
+    coef = np.asarray(model.coef_, dtype=np.float64)
+    # sklearn >= 1.3: (n_targets, n_features)；更早版本为 (n_features, n_targets)
+    n_features = np.asarray(model.x_weights_).shape[0]
+    if coef.shape[0] != n_features:
+        coef = coef.T
+    return coef[:, 0] if coef.shape[1] == 1 else coef
+
+
+def selectivity_ratio(model, X: np.ndarray, target: int = 0, Xc: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    选择性比 (n_features,)：目标投影成分解释的方差 / 残差方差
+
+    在模型的标准化空间中计算：w_TP = b / ||b||，t_TP = X w_TP，p_TP = Xᵀ t_TP / (t_TPᵀ t_TP)
+    """
+    if Xc is None:
+        Xc = _scaled(model, X)
+    coef = regression_coefficients(model)
+    b = coef if coef.ndim == 1 else coef[:, target]
+    std = getattr(model, '_x_std', None)
+    if std is not None:
+        b = b * std     # 换算到标准化空间
+    norm = np.linalg.norm(b)
+    if norm == 0:
+        return np.zeros(Xc.shape[1])
+    t = Xc @ (b / norm)
+    tt = float(t @ t)
+    if tt == 0:
+        return np.zeros(Xc.shape[1])
+    p_tp = (Xc.T @ t) / tt
+    explained = p_tp ** 2 * tt
+    total = np.einsum('ij,ij->j', Xc, Xc)
+    residual = np.maximum(total - explained, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sr = np.where(residual > 0, explained / residual, np.inf)
+    sr[(total == 0)] = 0.0
+    return sr
+
+
+def explained_variance(model, X: np.ndarray, y: Optional[np.ndarray] = None,
+                       Xc: Optional[np.ndarray] = None, T: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    每个组分解释的方差比例（标准化空间）
+
+    Returns:
+        {'x': (A,), 'y': (A,) 或 None}，X 部分为 ||t_a p_aᵀ||² / ||X||²，Y 部分为 ||t_a q_aᵀ||² / ||Y||²
+    """
+    if Xc is None:
+        Xc = _scaled(model, X)
+    if T is None:
+        T = model.transform(X)
+    T = np.asarray(T, dtype=np.float64)
+    tt = np.einsum('ij,ij->j', T, T)
+    P = np.asarray(model.x_loadings_, dtype=np.float64)
+    total_x = float(np.einsum('ij,ij->', Xc, Xc))
+    x_ratio = tt * np.einsum('ij,ij->j', P, P) / total_x if total_x > 0 else np.zeros_like(tt)
+    y_ratio = None
+    if y is not None:
+        yc = _scaled_y(model, y)
+        total_y = float(np.einsum('ij,ij->', yc, yc))
+        Q = np.asarray(model.y_loadings_, dtype=np.float64)
+        y_ratio = tt * np.einsum('ij,ij->j', Q, Q) / total_y if total_y > 0 else np.zeros_like(tt)
+    return {'x': x_ratio, 'y': y_ratio}
+
+
+def pls_diagnostics(model, X: np.ndarray, y: Optional[np.ndarray] = None, target: int = 0) -> Dict[str, Any]:
+    """
+    一次计算全部诊断量（共享标准化矩阵与得分）
+
+    Returns:
+        {'vip', 'selectivity_ratio', 'coefficients', 'explained_variance_x', 'explained_variance_y'}
+    """
+    Xc = _scaled(model, X)
+    T = np.asarray(model.transform(X), dtype=np.float64)
+    ev = explained_variance(model, X, y, Xc=Xc, T=T)
+    return {
+        'vip': vip_scores(model, X, T=T),
+        'selectivity_ratio': selectivity_ratio(model, X, target=target, Xc=Xc),
+        'coefficients': regression_coefficients(model),
+        'explained_variance_x': ev['x'],
+        'explained_variance_y': ev['y'],
+    }
@@ -5,6 +5,7 @@ from scipy.signal import savgol_filter
 from scipy.sparse.linalg import spsolve
 
 from .registry import register_preprocessor
+from src.utils.profiling import profiler
 
 # 物理常数 (用于 Bose-Einstein 校正)
 C_H = 6.62607015e-34  # 普朗克常数 (J*s)
@@ -169,6 +170,7 @@ class DataPreProcessor:
             return y_data
     
     @staticmethod
+    @profiler.timed('preprocess.spectrum')
     def preprocess_spectrum(x_data, y_data, preprocess_params):
         """
         统一的预处理函数，包含所有预处理步骤
@@ -0,0 +1,215 @@
+"""
+项目目录索引（SQLite）
+位于项目目录旁（~/SpectraPro_Projects.catalog.db），缓存每个项目的保存时间、备注、CSV 路径等元数据：
+- ProjectSaveManager 每次保存后更新对应条目
+- 项目列表对话框按文件 mtime/大小校验条目，只有新增或被外部修改的文件才重新读取
+列出、排序、搜索项目时每个项目只需一次 stat，不再逐个解析项目文件。
+"""
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROJECT_EXTENSIONS = ('.json', '.hdf5', '.h5')
+INFO_KEYS = ('save_time', 'note', 'csv_folder_path')
+
+_JSON_HEADER_BYTES = 64 * 1024  # JSON 项目的元数据键位于文件开头，只读取这一段
+
+
+def _read_json_header(file_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    只解析 JSON 项目开头的顶层标量键（save_time、note 等位于大数据部分之前）
+    遇到非标量值或缓冲区不足时停止；未取到全部键时返回 None。
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        text = f.read(_JSON_HEADER_BYTES)
+    decoder = json.JSONDecoder()
+    info: Dict[str, Any] = {}
+    pos = text.find('{') + 1
+    if pos <= 0:
+        return None
+    try:
+        while len(info) < len(INFO_KEYS):
+            while pos < len(text) and text[pos] in ' \t\r\n,':
+                pos += 1
+            key, pos = decoder.raw_decode(text, pos)
+            pos = text.index(':', pos) + 1
+            while pos < len(text) and text[pos] in ' \t\r\n':
+                pos += 1
+            if pos >= len(text) or text[pos] in '{[':
+                break
+            value, pos = decoder.raw_decode(text, pos)
+            if key in INFO_KEYS:
+                info[key] = value if isinstance(value, str) else ('' if value is None else str(value))
+    except ValueError:
+        return None
+    return info if len(info) == len(INFO_KEYS) else None
+
+
+def read_project_info(project_file: Path) -> Dict[str, str]:
+    """读取项目文件的基本信息（save_time、note、csv_folder_path）"""
+    project_file = Path(project_file)
+    info = {}
+
+    try:
+        if project_file.suffix.lower() == '.json':
+            header = _read_json_header(project_file)
+            if header is None:
+                # 键顺序不符合预期（如手工编辑过的文件）：回退到完整解析
+                with open(project_file, 'r', encoding='utf-8') as f:
+                    header = json.load(f)
+            for key in INFO_KEYS:
+                info[key] = header.get(key, '') or ''
+        else:
+            # HDF5 格式（v1/v2 均把元数据存放在根节点 attrs 中）
+            try:
+                import h5py
+                with h5py.File(project_file, 'r') as f:
+                    for key in INFO_KEYS:
+                        value = f.attrs.get(key, '')
+                        if isinstance(value, bytes):
+                            value = value.decode('utf-8')
+                        info[key] = str(value)
+            except ImportError:
+                pass
+    except Exception as e:
+        print(f"读取项目文件失败: {e}")
+
+    return info
+
+
+class ProjectCatalog:
+    """项目元数据索引"""
+
+    def __init__(self, projects_dir, db_path=None):
+        """
+        Args:
+            projects_dir: 项目目录
+            db_path: 索引文件路径（默认在项目目录旁：<projects_dir>.catalog.db）
+        """
+        self.projects_dir = Path(projects_dir)
+        if db_path is None:
+            db_path = self.projects_dir.parent / f"{self.projects_dir.name}.catalog.db"
+        self.db_path = str(db_path)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        # 每次操作使用独立连接：后台自动保存线程与 UI 线程可能同时访问
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        """初始化索引表"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS projects (
+                path TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                save_time TEXT,
+                note TEXT,
+                csv_folder_path TEXT
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_projects_mtime ON projects (mtime_ns)')
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _row(path: Path, st: os.stat_result, info: Dict[str, Any]):
+        return (
+            str(path), path.stem, st.st_mtime_ns, st.st_size,
+            str(info.get('save_time', '') or ''),
+            str(info.get('note', '') or ''),
+            str(info.get('csv_folder_path', '') or ''),
+        )
+
+    def record(self, file_path, info: Optional[Dict[str, Any]] = None):
+        """
+        保存后更新条目（info 为空时从文件读取）
+        只索引项目目录中的文件；其他位置的项目不会出现在项目列表中。
+        """
+        path = Path(file_path).resolve()
+        if path.parent != self.projects_dir.resolve() or path.suffix.lower() not in PROJECT_EXTENSIONS:
+            return
+        try:
+            st = path.stat()
+            if info is None:
+                info = read_project_info(path)
+            conn = self._connect()
+            conn.execute('INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?, ?, ?)', self._row(path, st, info))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"更新项目索引失败 {path}: {e}")
+
+    def remove(self, file_path):
+        """删除条目"""
+        conn = self._connect()
+        conn.execute('DELETE FROM projects WHERE path = ?', (str(Path(file_path).resolve()),))
+        conn.commit()
+        conn.close()
+
+    def sync(self) -> int:
+        """
+        按 mtime/大小校验索引：新增或被外部修改的文件重新读取，已删除的文件移除条目
+
+        Returns:
+            重新读取的项目文件数
+        """
+        projects_dir = self.projects_dir.resolve()
+        on_disk = {}
+        with os.scandir(projects_dir) as it:
+            for entry in it:
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in PROJECT_EXTENSIONS:
+                    on_disk[str(projects_dir / entry.name)] = entry.stat()
+
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT path, mtime_ns, size FROM projects')
+        indexed = {path: (mtime_ns, size) for path, mtime_ns, size in cursor.fetchall()}
+
+        stale = [path for path, st in on_disk.items() if indexed.get(path) != (st.st_mtime_ns, st.st_size)]
+        missing = [path for path in indexed if path not in on_disk
+                   and os.path.dirname(path) == str(projects_dir)]
+
+        rows = [self._row(Path(path), on_disk[path], read_project_info(Path(path))) for path in stale]
+        cursor.executemany('INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        cursor.executemany('DELETE FROM projects WHERE path = ?', [(path,) for path in missing])
+        conn.commit()
+        conn.close()
+        return len(stale)
+
+    def list_projects(self, search: Optional[str] = None, limit: Optional[int] = None,
+                      validate: bool = True) -> List[Dict[str, Any]]:
+        """
+        列出项目（按修改时间倒序）
+
+        Args:
+            search: 按名称/备注/CSV 路径模糊搜索
+            limit: 最多返回条数
+            validate: 先按 mtime 校验索引
+        """
+        if validate:
+            self.sync()
+
+        query = 'SELECT path, name, mtime_ns, size, save_time, note, csv_folder_path FROM projects WHERE path LIKE ?'
+        params: list = [os.path.join(str(self.projects_dir.resolve()), '%')]
+        if search:
+            query += ' AND (name LIKE ? OR note LIKE ? OR csv_folder_path LIKE ?)'
+            pattern = f"%{search}%"
+            params += [pattern, pattern, pattern]
+        query += ' ORDER BY mtime_ns DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(int(limit))
+
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        columns = [c[0] for c in cursor.description]
+        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        conn.close()
+        return results
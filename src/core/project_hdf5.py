@@ -0,0 +1,327 @@
+"""
+项目 HDF5 v2 存储格式
+- 根节点 attrs：小型元数据头（版本、保存时间、备注、CSV 路径），可在不读取数据的情况下列出项目
+- /sections/<name>：各部分的 JSON 结构（数组以引用形式存储）
+- /arrays/<digest>：按内容寻址的分块 + 压缩数据集（光谱、NMF W/H、匹配结果、2D-COS 图等）
+
+加载时数组以 LazyArray 代理返回，首次访问时才从文件读取；
+保存时内容未变的数组直接从旧文件按原始分块复制（不重新压缩），写入量与改动量成正比。
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+FORMAT_VERSION = 2
+SECTIONS = ('plot_config', 'peak_matching_results', 'data_states', 'other_info')
+HEADER_ATTRS = ('version', 'save_time', 'note', 'csv_folder_path')
+
+_ARRAY_TAG = '__ndarray__'
+_INLINE_TAG = '__ndarray_inline__'
+_INLINE_MAX_ELEMENTS = 16          # 很小的数组直接内联到 JSON 头中
+_COMPRESS_MIN_BYTES = 4096         # 小于该大小的数组不分块、不压缩
+_CHUNK_TARGET_BYTES = 256 * 1024   # 目标分块大小
+
+
+def array_digest(arr: np.ndarray) -> str:
+    """计算数组内容摘要（dtype + shape + 数据），用作数据集名称"""
+    arr = np.ascontiguousarray(arr)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(arr.dtype.str.encode())
+    h.update(repr(arr.shape).encode())
+    h.update(memoryview(arr).cast('B'))
+    return h.hexdigest()
+
+
+def chunk_shape(shape: Tuple[int, ...], itemsize: int,
+                target_bytes: int = _CHUNK_TARGET_BYTES) -> Optional[Tuple[int, ...]]:
+    """按行（每条光谱）切分的分块形状，单块约 target_bytes"""
+    if not shape or 0 in shape:
+        return None
+    if len(shape) == 1:
+        return (max(1, min(shape[0], target_bytes // itemsize)),)
+    row_bytes = itemsize * int(np.prod(shape[1:]))
+    if row_bytes <= target_bytes:
+        rows = max(1, min(shape[0], target_bytes // row_bytes))
+        return (rows,) + tuple(shape[1:])
+    # 单行就超过目标大小（如大型 2D-COS 图）：同时按列切分
+    cols = max(1, min(shape[1], target_bytes // (itemsize * int(np.prod(shape[2:], dtype=int)))))
+    return (1, cols) + tuple(shape[2:])
+
+
+class LazyArray:
+    """
+    HDF5 数据集的延迟加载代理
+    首次调用 np.asarray()/load() 时读取并缓存；切片访问只读取所需部分。
+    """
+
+    def __init__(self, file_path: str, digest: str, shape, dtype):
+        self.file_path = str(file_path)
+        self.digest = digest
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self._value = None
+
+    @property
+    def dataset_name(self) -> str:
+        return f"arrays/{self.digest}"
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._value is not None
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape, dtype=int))
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def load(self) -> np.ndarray:
+        """读取完整数组（仅首次访问时读取文件）"""
+        if self._value is None:
+            import h5py
+            with h5py.File(self.file_path, 'r') as f:
+                if self.dataset_name not in f:
+                    raise KeyError(f"项目文件 {self.file_path} 中不存在数据集 {self.dataset_name}")
+                self._value = f[self.dataset_name][()]
+        return self._value
+
+    def __array__(self, dtype=None, copy=None):
+        value = self.load()
+        if dtype is not None and np.dtype(dtype) != value.dtype:
+            return value.astype(dtype)
+        return value.copy() if copy else value
+
+    def __getitem__(self, item):
+        if self._value is not None:
+            return self._value[item]
+        import h5py
+        with h5py.File(self.file_path, 'r') as f:
+            return f[self.dataset_name][item]
+
+    def __len__(self):
+        return self.shape[0] if self.shape else 0
+
+    def __bool__(self):
+        return self.size > 0
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def tolist(self):
+        return self.load().tolist()
+
+    def __repr__(self):
+        state = "loaded" if self.is_loaded else "lazy"
+        return f"LazyArray(shape={self.shape}, dtype={self.dtype}, {state})"
+
+
+def materialize(obj):
+    """递归把 LazyArray 转为 numpy 数组（需要完整数据时使用）"""
+    if isinstance(obj, LazyArray):
+        return obj.load()
+    if isinstance(obj, dict):
+        return {k: materialize(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [materialize(v) for v in obj]
+    return obj
+
+
+def _is_numeric_array(value) -> bool:
+    return isinstance(value, np.ndarray) and value.dtype.kind in 'biufc'
+
+
+class _SectionEncoder:
+    """把一个部分的数据树编码为 JSON 结构，数组替换为内容摘要引用"""
+
+    def __init__(self, target_path: str):
+        self.target_path = os.path.abspath(target_path)
+        self.arrays: Dict[str, Any] = {}  # digest -> ndarray 或 LazyArray
+
+    def encode(self, obj):
+        if isinstance(obj, LazyArray):
+            # 来自同一目标文件的延迟数组：无需加载即可复用摘要
+            if os.path.abspath(obj.file_path) == self.target_path or obj.is_loaded:
+                self.arrays.setdefault(obj.digest, obj)
+                return {_ARRAY_TAG: obj.digest, 'shape': list(obj.shape), 'dtype': obj.dtype.str}
+            return self.encode(obj.load())
+        if isinstance(obj, np.ndarray):
+            if not _is_numeric_array(obj):
+                return [self.encode(v) for v in obj.tolist()]
+            if obj.size <= _INLINE_MAX_ELEMENTS:
+                return {_INLINE_TAG: obj.tolist(), 'dtype': obj.dtype.str, 'shape': list(obj.shape)}
+            digest = array_digest(obj)
+            self.arrays.setdefault(digest, obj)
+            return {_ARRAY_TAG: digest, 'shape': list(obj.shape), 'dtype': obj.dtype.str}
+        if isinstance(obj, dict):
+            return {str(k): self.encode(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [self.encode(v) for v in obj]
+        if isinstance(obj, np.integer):
+            return int(obj)
+        if isinstance(obj, np.floating):
+            return float(obj)
+        if isinstance(obj, np.bool_):
+            return bool(obj)
+        if obj is None or isinstance(obj, (str, int, float, bool)):
+            return obj
+        return str(obj)
+
+
+def _decode(obj, file_path: str):
+    if isinstance(obj, dict):
+        if _ARRAY_TAG in obj:
+            return LazyArray(file_path, obj[_ARRAY_TAG], obj.get('shape', ()), obj.get('dtype', '<f8'))
+        if _INLINE_TAG in obj:
+            arr = np.array(obj[_INLINE_TAG], dtype=np.dtype(obj.get('dtype', '<f8')))
+            return arr.reshape(obj.get('shape', arr.shape))
+        return {k: _decode(v, file_path) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(v, file_path) for v in obj]
+    return obj
+
+
+def _as_str(value) -> str:
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return '' if value is None else str(value)
+
+
+def is_v2_file(file_path: str) -> bool:
+    """判断文件是否为 v2 项目格式"""
+    import h5py
+    try:
+        with h5py.File(file_path, 'r') as f:
+            return int(f.attrs.get('format_version', 1)) >= FORMAT_VERSION
+    except (OSError, ValueError, TypeError):
+        return False
+
+
+def read_header(file_path: str) -> Dict[str, str]:
+    """只读取根节点小型元数据头"""
+    import h5py
+    with h5py.File(file_path, 'r') as f:
+        return {key: _as_str(f.attrs.get(key, '')) for key in HEADER_ATTRS}
+
+
+def read_project(file_path: str, sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    读取 v2 项目：元数据头 + 各部分 JSON 结构，数组以 LazyArray 返回
+
+    Args:
+        file_path: 项目文件路径
+        sections: 只读取指定部分（默认全部）
+    """
+    import h5py
+    file_path = os.path.abspath(file_path)
+    project_data: Dict[str, Any] = {}
+    with h5py.File(file_path, 'r') as f:
+        for key in HEADER_ATTRS:
+            project_data[key] = _as_str(f.attrs.get(key, ''))
+        if 'sections' in f:
+            wanted = set(sections) if sections is not None else None
+            for name in f['sections'].keys():
+                if wanted is not None and name not in wanted:
+                    continue
+                raw = _as_str(f['sections'][name][()])
+                project_data[name] = _decode(json.loads(raw), file_path)
+    return project_data
+
+
+def _referenced_digests(obj, out: set) -> set:
+    """收集已编码 JSON 结构中引用的数组摘要"""
+    if isinstance(obj, dict):
+        if _ARRAY_TAG in obj:
+            out.add(obj[_ARRAY_TAG])
+        else:
+            for v in obj.values():
+                _referenced_digests(v, out)
+    elif isinstance(obj, list):
+        for v in obj:
+            _referenced_digests(v, out)
+    return out
+
+
+def write_project(file_path: str, header: Dict[str, Any], sections: Dict[str, Any],
+                  reuse_sections: Iterable[str] = (),
+                  compression: str = 'gzip', compression_opts: int = 4) -> Dict[str, int]:
+    """
+    以 v2 格式写入项目（先写临时文件，再原子替换）
+
+    旧文件中已存在的数组（按内容摘要）直接复制原始分块，无需重新压缩。
+
+    Args:
+        sections: 需要重新编码写入的部分 {name: data}
+        reuse_sections: 未改动的部分名称，连同其引用的数组从旧文件原样复制
+
+    Returns:
+        统计信息 {'written': 新写入数组数, 'reused': 复用数组数, 'sections_written': 重新编码的部分数}
+    """
+    import h5py
+
+    file_path = os.path.abspath(file_path)
+    tmp_path = f"{file_path}.tmp"
+    stats = {'written': 0, 'reused': 0, 'sections_written': 0}
+
+    old_file = None
+    if os.path.exists(file_path) and is_v2_file(file_path):
+        old_file = h5py.File(file_path, 'r')
+
+    try:
+        encoded_sections = {}
+        arrays: Dict[str, Any] = {}
+        for name in reuse_sections:
+            if name in sections or old_file is None or f"sections/{name}" not in old_file:
+                continue
+            text = _as_str(old_file['sections'][name][()])
+            encoded_sections[name] = text
+            for digest in _referenced_digests(json.loads(text), set()):
+                arrays.setdefault(digest, None)
+        for name, data in sections.items():
+            encoder = _SectionEncoder(file_path)
+            encoded_sections[name] = json.dumps(encoder.encode(data), ensure_ascii=False)
+            arrays.update(encoder.arrays)
+            stats['sections_written'] += 1
+
+        with h5py.File(tmp_path, 'w') as f:
+            f.attrs['format_version'] = FORMAT_VERSION
+            for key in HEADER_ATTRS:
+                f.attrs[key] = _as_str(header.get(key, ''))
+
+            arrays_group = f.create_group('arrays')
+            for digest, value in arrays.items():
+                dataset_name = f"arrays/{digest}"
+                if old_file is not None and dataset_name in old_file:
+                    old_file.copy(old_file[dataset_name], arrays_group, name=digest)
+                    stats['reused'] += 1
+                    continue
+                arr = np.asarray(value)
+                kwargs = {}
+                if arr.nbytes >= _COMPRESS_MIN_BYTES:
+                    kwargs = {
+                        'chunks': chunk_shape(arr.shape, arr.dtype.itemsize),
+                        'compression': compression,
+                        'compression_opts': compression_opts,
+                        'shuffle': True,
+                    }
+                arrays_group.create_dataset(digest, data=arr, **kwargs)
+                stats['written'] += 1
+
+            str_dtype = h5py.string_dtype('utf-8')
+            sections_group = f.create_group('sections')
+            for name, text in encoded_sections.items():
+                sections_group.create_dataset(name, data=text, dtype=str_dtype)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        if old_file is not None:
+            old_file.close()
+
+    os.replace(tmp_path, file_path)
+    return stats
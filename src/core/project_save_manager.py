@@ -4,10 +4,15 @@
 - CSV 路径
 - PlotConfig（所有绘图参数）
 - 峰值匹配结果
-- 各层数据状态（预处理后的数据、NMF结果等）
+- 各层数据状态（预处理后的数据、NMF结果、2D-COS 图等）
+
+HDF5 使用 v2 格式（见 project_hdf5.py）：数组存为分块压缩数据集并延迟加载。
+保存分两步：snapshot_project（UI 线程，只收集引用）+ save_snapshot（可在后台线程，
+增量编码有改动的部分，临时文件 + 原子替换）。
 """
 import json
 import os
+import threading
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
@@ -15,6 +20,7 @@ import numpy as np
 import pandas as pd
 
 from src.core.plot_config_manager import PlotConfig, PlotConfigManager
+from src.core.project_catalog import ProjectCatalog, INFO_KEYS
 
 
 class ProjectSaveManager:
@@ -23,6 +29,19 @@ class ProjectSaveManager:
     def __init__(self):
         self.version = "1.0"
         self.projects_dir = self._get_projects_directory()
+        
+        # 后台自动保存与手动保存共用写锁；按文件记录上次写入的各部分指纹，用于增量保存
+        self._write_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._saved_state: Dict[str, Dict[str, Any]] = {}
+        self._forced_dirty: set = set()
+        
+        # 项目目录索引（供项目列表对话框快速读取元数据）
+        try:
+            self.catalog = ProjectCatalog(self.projects_dir)
+        except Exception as e:
+            print(f"初始化项目索引失败: {e}")
+            self.catalog = None
     
     def _get_projects_directory(self) -> Path:
         """获取项目保存目录"""
@@ -32,7 +51,7 @@ class ProjectSaveManager:
     
     def save_project(self, file_path: str, main_window, note: Optional[str] = None) -> bool:
         """
-        保存项目到文件
+        保存项目到文件（在调用线程中同步完成：收集快照 + 写入）
         
         Args:
             file_path: 保存路径（.json 或 .hdf5）
@@ -42,15 +61,53 @@ class ProjectSaveManager:
             是否保存成功
         """
         try:
-            file_ext = Path(file_path).suffix.lower()
-            
-            if file_ext == '.json':
-                return self._save_as_json(file_path, main_window, note)
-            elif file_ext in ['.hdf5', '.h5']:
-                return self._save_as_hdf5(file_path, main_window, note)
-            else:
-                # 默认使用 JSON
-                return self._save_as_json(file_path, main_window, note)
+            project_data = self.snapshot_project(main_window, note)
+        except Exception as e:
+            print(f"保存项目失败: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+        return self.save_snapshot(file_path, project_data)
+    
+    def snapshot_project(self, main_window, note: Optional[str] = None) -> Dict[str, Any]:
+        """
+        收集项目快照（必须在 UI 线程调用）
+        
+        快照只持有数组引用，不做序列化或复制；序列化由 save_snapshot 完成，可在后台线程执行。
+        """
+        return self._collect_project_data(main_window, note)
+    
+    def mark_dirty(self, *sections: str):
+        """强制指定部分（默认全部）在下次保存时重新编码"""
+        from src.core.project_hdf5 import SECTIONS
+        with self._state_lock:
+            self._forced_dirty.update(sections or SECTIONS)
+    
+    def save_snapshot(self, file_path: str, project_data: Dict[str, Any]) -> bool:
+        """
+        将快照写入文件（线程安全，可在后台线程调用）
+        
+        - 先写临时文件再原子替换，写入中途崩溃不会损坏原文件
+        - 只重新编码内容有变化的部分，其余部分沿用上次写入的结果
+        """
+        try:
+            with self._write_lock:
+                file_ext = Path(file_path).suffix.lower()
+                if file_ext in ['.hdf5', '.h5']:
+                    try:
+                        import h5py  # noqa: F401
+                    except ImportError:
+                        print("警告: h5py 未安装，无法使用 HDF5 格式，改用 JSON")
+                        file_path = file_path.replace('.hdf5', '.json').replace('.h5', '.json')
+                        success = self._write_json(file_path, project_data)
+                    else:
+                        success = self._write_hdf5(file_path, project_data)
+                else:
+                    # 默认使用 JSON
+                    success = self._write_json(file_path, project_data)
+            if success and self.catalog is not None:
+                self.catalog.record(file_path, {key: project_data.get(key, '') for key in INFO_KEYS})
+            return success
         except Exception as e:
             print(f"保存项目失败: {e}")
             import traceback
@@ -84,18 +141,53 @@ class ProjectSaveManager:
             traceback.print_exc()
             return False
     
-    def _save_as_json(self, file_path: str, main_window, note: Optional[str] = None) -> bool:
-        """保存为 JSON 格式"""
-        project_data = self._collect_project_data(main_window, note)
+    def _write_json(self, file_path: str, project_data: Dict[str, Any]) -> bool:
+        """写入 JSON 格式（未改动部分复用上次编码的文本）"""
+        from src.core.project_hdf5 import SECTIONS
         
-        # 转换 numpy 数组为列表
-        project_data = self._convert_numpy_to_list(project_data)
+        fingerprints, dirty, forced = self._dirty_sections(file_path, project_data)
+        cached_text = self._saved_state.get(os.path.abspath(file_path), {}).get('json_text', {})
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(project_data, f, indent=2, ensure_ascii=False)
+        section_text = {}
+        parts = []
+        for key, value in project_data.items():
+            if key in SECTIONS and key not in dirty and key in cached_text:
+                text = cached_text[key]
+            else:
+                # numpy 数组在序列化时按需转换为列表（不预先复制整棵数据树）
+                text = json.dumps(value, indent=2, ensure_ascii=False,
+                                  default=self._json_default).replace('\n', '\n  ')
+            if key in SECTIONS:
+                section_text[key] = text
+            parts.append(f"  {json.dumps(key, ensure_ascii=False)}: {text}")
+        
+        tmp_path = f"{file_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write("{\n" + ",\n".join(parts) + "\n}")
+            os.replace(tmp_path, file_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
         
+        self._remember_saved(file_path, fingerprints, forced, json_text=section_text)
         return True
     
+    @staticmethod
+    def _json_default(obj):
+        """json.dump 的回调：转换 numpy 类型与延迟加载数组"""
+        from src.core.project_hdf5 import LazyArray
+        if isinstance(obj, (np.ndarray, LazyArray)):
+            return obj.tolist()
+        if isinstance(obj, np.integer):
+            return int(obj)
+        if isinstance(obj, np.floating):
+            return float(obj)
+        if isinstance(obj, np.bool_):
+            return bool(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    
     def _load_from_json(self, file_path: str, main_window) -> bool:
         """从 JSON 格式加载"""
         with open(file_path, 'r', encoding='utf-8') as f:
@@ -106,54 +198,119 @@ class ProjectSaveManager:
         
         return self._restore_project_data(project_data, main_window)
     
-    def _save_as_hdf5(self, file_path: str, main_window, note: Optional[str] = None) -> bool:
-        """保存为 HDF5 格式"""
-        try:
-            import h5py
-        except ImportError:
-            print("警告: h5py 未安装，无法使用 HDF5 格式，改用 JSON")
-            return self._save_as_json(file_path.replace('.hdf5', '.json').replace('.h5', '.json'), main_window, note)
+    def _write_hdf5(self, file_path: str, project_data: Dict[str, Any]) -> bool:
+        """将已收集的项目数据写入 HDF5 v2 文件（未改动部分从旧文件原样复制）"""
+        from src.core import project_hdf5
         
-        project_data = self._collect_project_data(main_window, note)
-        
-        with h5py.File(file_path, 'w') as f:
-            # 保存元数据
-            f.attrs['version'] = self.version
-            f.attrs['save_time'] = datetime.now().isoformat()
-            f.attrs['note'] = note or ''
-            
-            # 保存配置（JSON 格式）
-            config_dict = project_data.get('plot_config', {})
-            f.attrs['plot_config'] = json.dumps(config_dict, ensure_ascii=False)
-            
-            # 保存路径信息
-            f.attrs['csv_folder_path'] = project_data.get('csv_folder_path', '')
-            
-            # 保存峰值匹配结果
-            if 'peak_matching_results' in project_data:
-                peak_group = f.create_group('peak_matching_results')
-                self._save_dict_to_hdf5(peak_group, project_data['peak_matching_results'])
-            
-            # 保存数据状态
-            if 'data_states' in project_data:
-                data_group = f.create_group('data_states')
-                self._save_dict_to_hdf5(data_group, project_data['data_states'])
-            
-            # 保存其他信息
-            if 'other_info' in project_data:
-                other_group = f.create_group('other_info')
-                self._save_dict_to_hdf5(other_group, project_data['other_info'])
+        fingerprints, dirty, forced = self._dirty_sections(file_path, project_data)
+        header = {
+            'version': self.version,
+            'save_time': project_data.get('save_time', datetime.now().isoformat()),
+            'note': project_data.get('note', ''),
+            'csv_folder_path': project_data.get('csv_folder_path', ''),
+        }
+        present = [name for name in project_hdf5.SECTIONS if name in project_data]
+        sections = {name: project_data[name] for name in present if name in dirty}
+        reuse = [name for name in present if name not in dirty]
+        stats = project_hdf5.write_project(file_path, header, sections, reuse_sections=reuse)
+        print(f"HDF5 项目已保存: 重新编码 {stats['sections_written']}/{len(present)} 个部分, "
+              f"新写入数组 {stats['written']} 个, 复用 {stats['reused']} 个")
         
+        self._remember_saved(file_path, fingerprints, forced)
         return True
     
+    def _dirty_sections(self, file_path: str, project_data: Dict[str, Any]) -> Tuple[Dict[str, str], set, set]:
+        """
+        计算各部分指纹并与上次写入同一文件时比较，返回 (指纹, 需重新编码的部分, 本次处理的强制标记)
+        文件在外部被修改（mtime/大小变化）时全部视为已改动。
+        强制标记在这里只读取不清除，写入成功后由 _remember_saved 清除（写入失败时保留到下次保存）。
+        """
+        from src.core.project_hdf5 import SECTIONS
+        
+        fingerprints = {name: self._section_fingerprint(project_data[name])
+                        for name in SECTIONS if name in project_data}
+        key = os.path.abspath(file_path)
+        with self._state_lock:
+            forced = set(self._forced_dirty)
+            saved = self._saved_state.get(key)
+        
+        if not saved or saved.get('stat') != self._file_stat(key):
+            return fingerprints, set(fingerprints), forced
+        previous = saved.get('fingerprints', {})
+        dirty = {name for name, fp in fingerprints.items() if previous.get(name) != fp}
+        return fingerprints, dirty | (forced & set(fingerprints)), forced
+    
+    def _remember_saved(self, file_path: str, fingerprints: Dict[str, str], forced: set = frozenset(),
+                        json_text: Optional[Dict[str, str]] = None):
+        """
+        写入成功后记录各部分指纹（及 JSON 文本），供下次增量保存比较；
+        同时清除本次已处理的强制标记（写入期间新加的标记保留）
+        """
+        key = os.path.abspath(file_path)
+        with self._state_lock:
+            self._forced_dirty.difference_update(forced)
+            self._saved_state[key] = {
+                'stat': self._file_stat(key),
+                'fingerprints': fingerprints,
+                'json_text': json_text or {},
+            }
+    
+    @staticmethod
+    def _file_stat(file_path: str):
+        try:
+            st = os.stat(file_path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+    
+    @staticmethod
+    def _section_fingerprint(data) -> str:
+        """部分内容指纹：数组按内容摘要（延迟数组直接使用其摘要，无需读取），其余按 repr"""
+        import hashlib
+        from src.core.project_hdf5 import LazyArray, array_digest
+        
+        h = hashlib.blake2b(digest_size=16)
+        stack = [data]
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, LazyArray):
+                h.update(f"A{obj.digest};".encode())
+            elif isinstance(obj, np.ndarray):
+                if obj.dtype.kind in 'biufc':
+                    h.update(f"A{array_digest(obj)};".encode())
+                else:
+                    h.update(f"O{obj.tolist()!r};".encode())
+            elif isinstance(obj, dict):
+                h.update(f"D{len(obj)};".encode())
+                for k, v in obj.items():
+                    h.update(f"K{k!r};".encode())
+                    stack.append(v)
+            elif isinstance(obj, (list, tuple)):
+                h.update(f"S{len(obj)};".encode())
+                stack.extend(reversed(obj))
+            else:
+                h.update(f"V{obj!r};".encode())
+        return h.hexdigest()
+    
     def _load_from_hdf5(self, file_path: str, main_window) -> bool:
-        """从 HDF5 格式加载"""
+        """从 HDF5 格式加载（v2 格式的数组在首次访问时才读取）"""
         try:
             import h5py
         except ImportError:
             print("警告: h5py 未安装，无法使用 HDF5 格式")
             return False
         
+        from src.core import project_hdf5
+        if project_hdf5.is_v2_file(file_path):
+            project_data = project_hdf5.read_project(file_path)
+            return self._restore_project_data(project_data, main_window)
+        
+        return self._load_from_hdf5_v1(file_path, main_window)
+    
+    def _load_from_hdf5_v1(self, file_path: str, main_window) -> bool:
+        """从旧版（v1）HDF5 格式加载"""
+        import h5py
+        
         with h5py.File(file_path, 'r') as f:
             project_data = {}
             
@@ -242,13 +399,33 @@ class ProjectSaveManager:
             if hasattr(main_window, 'nmf_window') and main_window.nmf_window:
                 nmf_win = main_window.nmf_window
                 if hasattr(nmf_win, 'W') and hasattr(nmf_win, 'H'):
+                    # 数组保持为 ndarray：HDF5 写入分块压缩数据集，JSON 在序列化时转换
                     states['nmf'] = {
-                        'W': nmf_win.W.tolist() if isinstance(nmf_win.W, np.ndarray) else nmf_win.W,
-                        'H': nmf_win.H.tolist() if isinstance(nmf_win.H, np.ndarray) else nmf_win.H,
-                        'common_x': nmf_win.common_x.tolist() if hasattr(nmf_win, 'common_x') and isinstance(nmf_win.common_x, np.ndarray) else [],
+                        'W': nmf_win.W,
+                        'H': nmf_win.H,
+                        'common_x': nmf_win.common_x if hasattr(nmf_win, 'common_x') and isinstance(nmf_win.common_x, np.ndarray) else [],
                         'sample_labels': nmf_win.sample_labels if hasattr(nmf_win, 'sample_labels') else [],
                     }
             
+            # 标准 NMF 的拟合空间 W/H（重新打开项目后可热启动/小批量更新）
+            nmf_model = getattr(main_window, 'last_nmf_model', None)
+            if nmf_model is not None:
+                states['nmf_model'] = {
+                    'W': nmf_model['W'],
+                    'H': nmf_model['H'],
+                    'sample_labels': list(nmf_model.get('sample_labels', [])),
+                }
+            
+            # 2D-COS 数据（同步/异步相关谱不保存，恢复时由 X_matrix 重新计算并走引擎缓存）
+            cos_win = getattr(main_window, 'cos_window', None)
+            if cos_win is not None and getattr(cos_win, 'X_matrix', None) is not None:
+                states['two_dcos'] = {
+                    'X_matrix': cos_win.X_matrix,
+                    'wavenumbers': cos_win.wavenumbers,
+                    'group_names': list(cos_win.group_names) if cos_win.group_names is not None else [],
+                    'wavenumbers_roi': cos_win.current_wavenumbers_roi,
+                }
+            
             # 预处理后的数据
             if hasattr(main_window, 'processed_data'):
                 # 只保存元数据，不保存完整数据（避免文件过大）
@@ -277,16 +454,18 @@ class ProjectSaveManager:
                             plot_data_dict = {}
                             for key, data in window.current_plot_data.items():
                                 if isinstance(data, dict):
+                                    shadow_upper = data.get('shadow_upper')
+                                    shadow_lower = data.get('shadow_lower')
                                     plot_data_dict[key] = {
-                                        'x': data.get('x', []).tolist() if isinstance(data.get('x'), np.ndarray) else data.get('x', []),
-                                        'y': data.get('y', []).tolist() if isinstance(data.get('y'), np.ndarray) else data.get('y', []),
+                                        'x': data.get('x', []),
+                                        'y': data.get('y', []),
                                         'label': data.get('label', ''),
                                         'color': data.get('color', 'gray'),
                                         'type': data.get('type', 'Individual'),
                                         'linewidth': data.get('linewidth', 1.2),
                                         'linestyle': data.get('linestyle', '-'),
-                                        'shadow_upper': data.get('shadow_upper', []).tolist() if isinstance(data.get('shadow_upper'), np.ndarray) else data.get('shadow_upper', []),
-                                        'shadow_lower': data.get('shadow_lower', []).tolist() if isinstance(data.get('shadow_lower'), np.ndarray) else data.get('shadow_lower', []),
+                                        'shadow_upper': shadow_upper if shadow_upper is not None else [],
+                                        'shadow_lower': shadow_lower if shadow_lower is not None else [],
                                     }
                             window_data['plot_data'] = plot_data_dict
                         
@@ -307,7 +486,8 @@ class ProjectSaveManager:
                                             'y_len': len(y_data) if isinstance(y_data, np.ndarray) else 0,
                                         })
                                 last_params['grouped_files_data'] = grouped_files_meta
-                            window_data['last_plot_params'] = self._convert_numpy_to_list(last_params)
+                            # 数组保持引用，序列化时再转换（快照在 UI 线程收集，需尽量轻量）
+                            window_data['last_plot_params'] = last_params
                         
                         plot_windows_data[name] = window_data
                 states['plot_windows'] = plot_windows_data
@@ -512,7 +692,6 @@ class ProjectSaveManager:
                 if hasattr(main_window, 'nmf_window') and main_window.nmf_window:
                     nmf_win = main_window.nmf_window
                     if 'W' in nmf_data and 'H' in nmf_data:
-                        import numpy as np
                         W = np.array(nmf_data['W'])
                         H = np.array(nmf_data['H'])
                         common_x = np.array(nmf_data.get('common_x', []))
@@ -535,6 +714,26 @@ class ProjectSaveManager:
                             style_params = config.to_dict()
                             nmf_win.plot_results(style_params)
             
+            # 标准 NMF 的拟合空间 W/H（热启动/小批量更新的起点）
+            if 'nmf_model' in states:
+                nmf_model = states['nmf_model']
+                if nmf_model.get('W') is not None and nmf_model.get('H') is not None:
+                    main_window.last_nmf_model = {
+                        'W': np.asarray(nmf_model['W'], dtype=np.float64),
+                        'H': np.asarray(nmf_model['H'], dtype=np.float64),
+                        'sample_labels': list(nmf_model.get('sample_labels', [])),
+                    }
+                    main_window._nmf_minibatch_updater = None
+            
+            # 2D-COS 数据：恢复到 2D-COS 窗口（HDF5 项目中的数组为惰性加载，这里一次性读出）
+            if 'two_dcos' in states and hasattr(main_window, 'restore_2d_cos_data'):
+                from src.core.project_hdf5 import materialize
+                cos_data = materialize(states['two_dcos'])
+                X_matrix = cos_data.get('X_matrix')
+                if X_matrix is not None and len(X_matrix) > 0:
+                    main_window.restore_2d_cos_data(np.asarray(X_matrix), np.asarray(cos_data['wavenumbers']),
+                                                    list(cos_data.get('group_names') or []))
+            
             # 恢复绘图窗口状态和绘图数据
             if 'plot_windows' in states:
                 print("[DEBUG] _restore_data_states: 开始恢复绘图窗口...")
@@ -543,7 +742,6 @@ class ProjectSaveManager:
                 
                 if hasattr(main_window, 'plot_windows'):
                     from src.ui.windows.plot_window import MplPlotWindow
-                    import numpy as np
                     
                     for name, window_data in plot_windows_data.items():
                         print(f"[DEBUG] _restore_data_states: 恢复窗口 '{name}'...")
@@ -587,8 +785,8 @@ class ProjectSaveManager:
                                             'type': data.get('type', 'Individual'),
                                             'linewidth': data.get('linewidth', 1.2),
                                             'linestyle': data.get('linestyle', '-'),
-                                            'shadow_upper': np.array(data.get('shadow_upper', [])) if data.get('shadow_upper') else None,
-                                            'shadow_lower': np.array(data.get('shadow_lower', [])) if data.get('shadow_lower') else None,
+                                            'shadow_upper': np.array(data['shadow_upper']) if data.get('shadow_upper') is not None and len(data['shadow_upper']) > 0 else None,
+                                            'shadow_lower': np.array(data['shadow_lower']) if data.get('shadow_lower') is not None and len(data['shadow_lower']) > 0 else None,
                                         }
                             
                             # 如果有保存的plot_params，尝试重新绘制
@@ -777,26 +975,6 @@ class ProjectSaveManager:
         else:
             return obj
     
-    def _save_dict_to_hdf5(self, group, data: Dict[str, Any]):
-        """将字典保存到 HDF5 组"""
-        import h5py
-        
-        for key, value in data.items():
-            if isinstance(value, dict):
-                sub_group = group.create_group(key)
-                self._save_dict_to_hdf5(sub_group, value)
-            elif isinstance(value, (list, np.ndarray)):
-                if len(value) > 0 and isinstance(value[0], (int, float)):
-                    group.create_dataset(key, data=np.array(value))
-                else:
-                    # 复杂列表，保存为 JSON
-                    group.attrs[key] = json.dumps(value, ensure_ascii=False)
-            elif isinstance(value, (str, int, float, bool)):
-                group.attrs[key] = value
-            else:
-                # 其他类型，保存为 JSON
-                group.attrs[key] = json.dumps(value, ensure_ascii=False)
-    
     def _load_dict_from_hdf5(self, group) -> Dict[str, Any]:
         """从 HDF5 组加载字典"""
         import h5py
@@ -0,0 +1,472 @@
+"""
+拉曼面扫（Raman map / 高光谱）数据集
+
+现有流程把每个文件视为一条光谱，200×200 的面扫（4 万条光谱）无法整体载入内存。这里：
+- import_map：流式解析多光谱导出文件，写入磁盘上的内存映射数组（.npy，按行即按像素存储），
+  解析过程只保留一个块（chunk_rows 行）在内存中。支持两种常见导出格式：
+    * 宽表：首行为波数（前两列为空/坐标列名），其后每行 X, Y, I1..In
+    * 长表：每行 X, Y, 波数, 强度（同一像素的各波数点连续排列，如 WiRE 导出）
+- RamanMap：数据集目录（spectra.npy / wavenumbers.npy / coords.npy / meta.json），
+  spectra 以 mmap 方式打开；像素坐标映射到规则网格 (ny, nx)，缺失像素在图像中为 NaN
+- 所有逐像素运算（DataPreProcessor 预处理链、峰波段积分、NMF 丰度、SpectralMatcher 库匹配得分）
+  按行块在全局 runner 上并行（进程执行，子任务只接收数据集路径与行范围，自行以 mmap 打开），
+  内存占用与块大小成正比，与面扫像素数无关；库匹配在子任务内即归约为每像素前 k 名
+- 预处理结果作为派生数据集写入 derived/pre_<参数摘要>/，相同参数再次预处理直接复用
+
+图像：image(values) 把 (n_pixels,) 的逐像素值排成 (ny, nx) 数组，供界面 imshow。
+"""
+import json
+import os
+import re
+import shutil
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MAP_SUFFIX = '.ramanmap'
+DEFAULT_CHUNK_ROWS = 1024
+DEFAULT_MATCH_TOP_K = 3
+_COORD_DECIMALS = 6
+_COUNT_BLOCK_BYTES = 1 << 20
+
+_NUMBER = re.compile(r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$')
+
+
+# ------------------------------------------------------------------ 解析
+def _sniff_delimiter(line: str) -> Optional[str]:
+    """推断分隔符：制表符 / 逗号 / 分号，否则为任意空白（返回 None）"""
+    for sep in ('\t', ',', ';'):
+        if sep in line:
+            return sep
+    return None
+
+
+def _split(line: str, sep: Optional[str]) -> List[str]:
+    return [f.strip() for f in (line.rstrip('\r\n').split(sep) if sep else line.split())]
+
+
+def _is_number(text: str) -> bool:
+    return bool(_NUMBER.match(text))
+
+
+def _count_lines(path: str) -> int:
+    """按字节块统计行数（不逐行解析），用于预分配内存映射数组"""
+    count = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(_COUNT_BLOCK_BYTES)
+            if not block:
+                break
+            count += block.count(b'\n')
+            last = block[-1:]
+    return count + (0 if last == b'\n' else 1)
+
+
+def _read_head(path: str, n_lines: int = 8) -> List[str]:
+    lines = []
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            if line.strip():
+                lines.append(line)
+            if len(lines) >= n_lines:
+                break
+    return lines
+
+
+def detect_format(path: str) -> Dict[str, Any]:
+    """
+    识别面扫导出格式
+
+    Returns:
+        {'layout': 'wide' | 'long', 'sep', 'header_lines', 'wavenumbers'（宽表）}
+    """
+    head = _read_head(path)
+    if len(head) < 2:
+        raise ValueError("文件内容过少，无法识别面扫格式")
+    sep = _sniff_delimiter(head[1])
+    rows = [_split(line, sep) for line in head]
+
+    # 宽表：首行数值个数比数据行少 2（坐标列），首行即波数
+    first_numbers = [f for f in rows[0] if _is_number(f)]
+    data_numbers = [f for f in rows[1] if _is_number(f)]
+    if len(first_numbers) >= 3 and len(data_numbers) == len(first_numbers) + 2:
+        return {'layout': 'wide', 'sep': sep, 'header_lines': 1,
+                'wavenumbers': np.array([float(v) for v in first_numbers])}
+
+    # 长表：每行 4 个数值（X, Y, 波数, 强度），允许若干表头行
+    header_lines = 0
+    for fields in rows:
+        if len(fields) >= 4 and all(_is_number(f) for f in fields[:4]):
+            return {'layout': 'long', 'sep': sep, 'header_lines': header_lines}
+        header_lines += 1
+    raise ValueError("无法识别的面扫格式：需要宽表（首行波数 + 每行 X, Y, 强度...）"
+                     "或长表（每行 X, Y, 波数, 强度）")
+
+
+def _read_chunks(path: str, sep: Optional[str], skiprows: int, chunk_rows: int):
+    import pandas as pd
+    return pd.read_csv(path, sep=sep if sep else r'\s+', header=None, skiprows=skiprows,
+                       chunksize=chunk_rows, dtype=np.float64, engine='c', skip_blank_lines=True)
+
+
+def _default_out_dir(source: str) -> str:
+    return os.path.splitext(source)[0] + MAP_SUFFIX
+
+
+def _write_meta(out_dir: str, meta: Dict[str, Any]):
+    with open(os.path.join(out_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+def import_map(source: str, out_dir: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+               dtype=np.float32, token=None,
+               on_progress: Optional[Callable[[int, int, str], Any]] = None) -> 'RamanMap':
+    """
+    流式导入面扫导出文件为磁盘数据集
+
+    Args:
+        source: 导出文件（txt/csv）
+        out_dir: 数据集目录（默认与源文件同名，后缀 .ramanmap；已存在则覆盖）
+        chunk_rows: 每次解析的行数（宽表为像素数，长表为数据行数）
+        dtype: 光谱存储类型（默认 float32，4 万像素 × 1000 点约 160 MB 磁盘）
+    """
+    fmt = detect_format(source)
+    out_dir = out_dir or _default_out_dir(source)
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+    n_lines = max(_count_lines(source) - fmt['header_lines'], 0)
+
+    if fmt['layout'] == 'wide':
+        wavenumbers = fmt['wavenumbers']
+        n_features = wavenumbers.size
+        capacity = n_lines
+    else:
+        wavenumbers, n_features = _long_first_pixel(source, fmt)
+        capacity = n_lines // n_features + 1
+
+    spectra = np.lib.format.open_memmap(os.path.join(out_dir, 'spectra.npy'), mode='w+',
+                                        dtype=dtype, shape=(capacity, n_features))
+    coords = np.zeros((capacity, 2), dtype=np.float64)
+    n_pixels = 0
+    done_lines = 0
+
+    if fmt['layout'] == 'wide':
+        for chunk in _read_chunks(source, fmt['sep'], fmt['header_lines'], chunk_rows):
+            if token is not None:
+                token.raise_if_cancelled()
+            values = chunk.to_numpy(dtype=np.float64)
+            values = values[:, ~np.all(np.isnan(values), axis=0)]   # 行尾分隔符产生的空列
+            if values.shape[1] != n_features + 2:
+                raise ValueError(f"数据列数 {values.shape[1]} 与波数个数 {n_features} + 2 不一致")
+            k = values.shape[0]
+            spectra[n_pixels:n_pixels + k] = values[:, 2:]
+            coords[n_pixels:n_pixels + k] = values[:, :2]
+            n_pixels += k
+            done_lines += k
+            if on_progress is not None:
+                on_progress(done_lines, n_lines, "导入面扫")
+    else:
+        pending = np.empty((0, 4))
+        for chunk in _read_chunks(source, fmt['sep'], fmt['header_lines'], chunk_rows * n_features):
+            if token is not None:
+                token.raise_if_cancelled()
+            values = np.vstack([pending, chunk.to_numpy(dtype=np.float64)[:, :4]])
+            k = values.shape[0] // n_features
+            block = values[:k * n_features].reshape(k, n_features, 4)
+            pending = values[k * n_features:]
+            if not (np.all(block[:, :, 0] == block[:, :1, 0]) and np.all(block[:, :, 1] == block[:, :1, 1])):
+                raise ValueError("长表中各像素的光谱点数不一致或坐标未连续排列")
+            spectra[n_pixels:n_pixels + k] = block[:, :, 3]
+            coords[n_pixels:n_pixels + k] = block[:, 0, :2]
+            n_pixels += k
+            done_lines += values.shape[0] - pending.shape[0]
+            if on_progress is not None:
+                on_progress(done_lines, n_lines, "导入面扫")
+        if pending.shape[0]:
+            raise ValueError(f"文件末尾有 {pending.shape[0]} 行不足一个像素的数据")
+
+    spectra.flush()
+    del spectra
+    np.save(os.path.join(out_dir, 'wavenumbers.npy'), np.asarray(wavenumbers, dtype=np.float64))
+    np.save(os.path.join(out_dir, 'coords.npy'), coords[:n_pixels])
+    _write_meta(out_dir, {'version': FORMAT_VERSION, 'source': os.path.abspath(source),
+                          'layout': fmt['layout'], 'n_pixels': int(n_pixels), 'n_features': int(n_features)})
+    return RamanMap(out_dir)
+
+
+def _long_first_pixel(source: str, fmt: Dict[str, Any]) -> Tuple[np.ndarray, int]:
+    """长表：读取第一个像素的全部行，得到波数轴与每像素点数"""
+    wavenumbers = []
+    first = None
+    with open(source, 'r', encoding='utf-8', errors='ignore') as f:
+        skipped = 0
+        for line in f:
+            if not line.strip():
+                continue
+            if skipped < fmt['header_lines']:
+                skipped += 1
+                continue
+            fields = _split(line, fmt['sep'])
+            xy = (float(fields[0]), float(fields[1]))
+            if first is None:
+                first = xy
+            elif xy != first:
+                break
+            wavenumbers.append(float(fields[2]))
+    if len(wavenumbers) < 2:
+        raise ValueError("长表中第一个像素的光谱点数不足")
+    return np.array(wavenumbers), len(wavenumbers)
+
+
+# ------------------------------------------------------------------ 子任务（进程执行，按路径打开 mmap）
+def _open_spectra(path: str, n_pixels: int, mode: str = 'r') -> np.ndarray:
+    return np.load(os.path.join(path, 'spectra.npy'), mmap_mode=mode)[:n_pixels]
+
+
+def _preprocess_block(block, src: str, dst: str, n_pixels: int, x: np.ndarray, params: Dict[str, Any]) -> int:
+    from src.core.preprocessor import DataPreProcessor
+
+    start, stop = block
+    source = _open_spectra(src, n_pixels)
+    target = np.load(os.path.join(dst, 'spectra.npy'), mmap_mode='r+')
+    Y = np.asarray(source[start:stop], dtype=np.float64)
+    out = np.empty_like(Y)
+    for i in range(Y.shape[0]):
+        out[i] = DataPreProcessor.preprocess_spectrum(x, Y[i], params)
+    target[start:stop] = out
+    target.flush()
+    return stop - start
+
+
+def band_integrals_block(Y: np.ndarray, x: np.ndarray, bands: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """一块光谱的波段积分 (n_rows, n_bands)（梯形法，积分方向按波数升序）"""
+    order = np.argsort(x)
+    xs = x[order]
+    Ys = Y[:, order]
+    out = np.zeros((Y.shape[0], len(bands)))
+    for j, (lo, hi) in enumerate(bands):
+        lo, hi = min(lo, hi), max(lo, hi)
+        mask = (xs >= lo) & (xs <= hi)
+        if mask.sum() >= 2:
+            out[:, j] = np.trapezoid(Ys[:, mask], xs[mask], axis=1)
+        elif mask.any():
+            out[:, j] = Ys[:, mask][:, 0]
+    return out
+
+
+def _bands_block(block, src: str, n_pixels: int, x: np.ndarray, bands) -> np.ndarray:
+    start, stop = block
+    Y = np.asarray(_open_spectra(src, n_pixels)[start:stop], dtype=np.float64)
+    return band_integrals_block(Y, x, bands)
+
+
+def _nnls_block(block, src: str, n_pixels: int, H: np.ndarray) -> np.ndarray:
+    from src.core.batch_nnls import batch_nnls
+
+    start, stop = block
+    Y = np.asarray(_open_spectra(src, n_pixels)[start:stop], dtype=np.float64)
+    np.maximum(Y, 0.0, out=Y)
+    return batch_nnls(H, Y)[0]
+
+
+def _score_block(block, src: str, n_pixels: int, library: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """块内各像素与库的余弦相似度，只返回得分最高的 top_k 条：(索引 (rows, k) int32, 得分 (rows, k) float32)"""
+    start, stop = block
+    Y = np.asarray(_open_spectra(src, n_pixels)[start:stop], dtype=np.float64)
+    norms = np.linalg.norm(Y, axis=1, keepdims=True) + 1e-10
+    scores = (Y / norms) @ library.T
+    k = min(top_k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return (np.take_along_axis(top, order, axis=1).astype(np.int32),
+            np.take_along_axis(top_scores, order, axis=1).astype(np.float32))
+
+
+class _NonNegativeRows:
+    """按行切片时把负值截为 0 的只读视图（NMF 要求非负输入，避免复制整个面扫）"""
+
+    def __init__(self, data):
+        self.data = data
+        self.shape = data.shape
+
+    def __getitem__(self, index):
+        return np.maximum(np.asarray(self.data[index], dtype=np.float64), 0.0)
+
+
+# ------------------------------------------------------------------ 数据集
+class RamanMap:
+    """磁盘上的面扫数据集（spectra 以 mmap 只读打开）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.n_pixels = int(self.meta['n_pixels'])
+        self.spectra = _open_spectra(path, self.n_pixels)
+        self.wavenumbers = np.load(os.path.join(path, 'wavenumbers.npy'))
+        self.coords = np.load(os.path.join(path, 'coords.npy'))
+        self._grid = None
+
+    @property
+    def n_features(self) -> int:
+        return self.spectra.shape[1]
+
+    @property
+    def name(self) -> str:
+        return os.path.splitext(os.path.basename(os.path.normpath(self.path)))[0]
+
+    # ---------------- 网格
+    def grid(self) -> Dict[str, np.ndarray]:
+        """{'xs', 'ys', 'rows', 'cols'}：坐标轴（升序）与每个像素所在的行/列"""
+        if self._grid is None:
+            cx = np.round(self.coords[:, 0], _COORD_DECIMALS)
+            cy = np.round(self.coords[:, 1], _COORD_DECIMALS)
+            xs, cols = np.unique(cx, return_inverse=True)
+            ys, rows = np.unique(cy, return_inverse=True)
+            self._grid = {'xs': xs, 'ys': ys, 'rows': rows, 'cols': cols}
+        return self._grid
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        g = self.grid()
+        return len(g['ys']), len(g['xs'])
+
+    def image(self, values: np.ndarray) -> np.ndarray:
+        """逐像素值 (n_pixels,) -> 图像 (ny, nx)，缺失像素为 NaN"""
+        g = self.grid()
+        img = np.full(self.shape, np.nan)
+        img[g['rows'], g['cols']] = np.asarray(values, dtype=np.float64)
+        return img
+
+    def extent(self) -> Tuple[float, float, float, float]:
+        """imshow 的 extent（origin='lower'）"""
+        g = self.grid()
+        xs, ys = g['xs'], g['ys']
+        dx = (xs[-1] - xs[0]) / (len(xs) - 1) if len(xs) > 1 else 1.0
+        dy = (ys[-1] - ys[0]) / (len(ys) - 1) if len(ys) > 1 else 1.0
+        return xs[0] - dx / 2, xs[-1] + dx / 2, ys[0] - dy / 2, ys[-1] + dy / 2
+
+    def spectrum_at(self, x: float, y: float) -> Tuple[int, np.ndarray]:
+        """离 (x, y) 最近的像素的索引与光谱"""
+        index = int(np.argmin((self.coords[:, 0] - x) ** 2 + (self.coords[:, 1] - y) ** 2))
+        return index, np.asarray(self.spectra[index], dtype=np.float64)
+
+    # ---------------- 分块并行
+    def blocks(self, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> List[Tuple[int, int]]:
+        step = max(1, int(chunk_rows))
+        return [(s, min(s + step, self.n_pixels)) for s in range(0, self.n_pixels, step)]
+
+    def _map(self, fn, *args, chunk_rows: int = DEFAULT_CHUNK_ROWS, name: str = "面扫处理",
+             executor: str = 'process', token=None, on_progress=None) -> List[Any]:
+        from src.services.task_runner import runner
+        return runner.map(fn, self.blocks(chunk_rows), *args, name=name, category='analysis',
+                          executor=executor, token=token, on_progress=on_progress)
+
+    def mean_spectrum(self, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> np.ndarray:
+        total = np.zeros(self.n_features)
+        for start, stop in self.blocks(chunk_rows):
+            total += np.asarray(self.spectra[start:stop], dtype=np.float64).sum(axis=0)
+        return total / max(self.n_pixels, 1)
+
+    # ---------------- 运算
+    def preprocess(self, params: Dict[str, Any], chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                   executor: str = 'process', token=None, on_progress=None) -> 'RamanMap':
+        """
+        按块并行执行 DataPreProcessor.preprocess_spectrum，结果写入派生数据集
+
+        相同参数的派生数据集已存在时直接返回（不重复计算）。
+        """
+        from src.core.group_stats import params_digest
+
+        out_dir = os.path.join(self.path, 'derived', 'pre_' + params_digest(params)[:16])
+        if os.path.isfile(os.path.join(out_dir, 'meta.json')):
+            return RamanMap(out_dir)
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)   # 上次未完成的残留
+        os.makedirs(out_dir)
+        target = np.lib.format.open_memmap(os.path.join(out_dir, 'spectra.npy'), mode='w+',
+                                           dtype=self.spectra.dtype, shape=(self.n_pixels, self.n_features))
+        del target
+        try:
+            self._map(_preprocess_block, self.path, out_dir, self.n_pixels, self.wavenumbers, dict(params),
+                      chunk_rows=chunk_rows, name="面扫预处理", executor=executor, token=token,
+                      on_progress=on_progress)
+        except BaseException:
+            shutil.rmtree(out_dir, ignore_errors=True)
+            raise
+        np.save(os.path.join(out_dir, 'wavenumbers.npy'), self.wavenumbers)
+        np.save(os.path.join(out_dir, 'coords.npy'), self.coords)
+        meta = dict(self.meta)
+        meta.update({'parent': os.path.abspath(self.path), 'preprocess': params})
+        _write_meta(out_dir, json.loads(json.dumps(meta, default=repr)))   # meta.json 最后写入，标志完成
+        return RamanMap(out_dir)
+
+    def band_integrals(self, bands: Sequence[Tuple[float, float]], chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                       executor: str = 'process', token=None, on_progress=None) -> np.ndarray:
+        """各像素的峰波段积分强度 (n_pixels, n_bands)"""
+        bands = [(float(lo), float(hi)) for lo, hi in bands]
+        parts = self._map(_bands_block, self.path, self.n_pixels, self.wavenumbers, bands,
+                          chunk_rows=chunk_rows, name="面扫波段积分", executor=executor, token=token,
+                          on_progress=on_progress)
+        return np.vstack(parts) if parts else np.zeros((0, len(bands)))
+
+    def nmf(self, n_components: int, batch_size: int = 512, max_epochs: int = 20, random_state: int = 42,
+            chunk_rows: int = DEFAULT_CHUNK_ROWS, executor: str = 'process', token=None,
+            on_progress=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        面扫 NMF：MiniBatchNMF 逐块遍历 mmap 数据拟合组分 H，再按块并行 NNLS 求丰度 W
+
+        Returns:
+            (W (n_pixels, n_components), H (n_components, n_features))
+        """
+        from src.core.incremental_nmf import MiniBatchNMFUpdater
+
+        updater = MiniBatchNMFUpdater(n_components=n_components, batch_size=batch_size,
+                                      max_epochs=max_epochs, random_state=random_state)
+        updater.fit(_NonNegativeRows(self.spectra))
+        if token is not None:
+            token.raise_if_cancelled()
+        H = np.array(updater.components_)
+        return self.abundances(H, chunk_rows=chunk_rows, executor=executor, token=token,
+                               on_progress=on_progress), H
+
+    def abundances(self, H: np.ndarray, chunk_rows: int = DEFAULT_CHUNK_ROWS, executor: str = 'process',
+                   token=None, on_progress=None) -> np.ndarray:
+        """给定组分 H 的逐像素非负丰度 (n_pixels, n_components)（批量 NNLS）"""
+        H = np.asarray(H, dtype=np.float64)
+        parts = self._map(_nnls_block, self.path, self.n_pixels, H, chunk_rows=chunk_rows,
+                          name="面扫丰度", executor=executor, token=token, on_progress=on_progress)
+        return np.vstack(parts) if parts else np.zeros((0, H.shape[0]))
+
+    def match_scores(self, matcher, top_k: int = DEFAULT_MATCH_TOP_K, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                     executor: str = 'process', token=None, on_progress=None) -> Dict[str, Any]:
+        """
+        SpectralMatcher 库匹配：每个像素与库中光谱的余弦相似度，按块只保留前 top_k 名
+        （内存与 n_pixels × top_k 成正比，与库大小无关）
+
+        Returns:
+            {'names', 'top_index' (n_pixels, k), 'top_score' (n_pixels, k), 'best_index', 'best_score'}
+        """
+        names, library = matcher.library_matrix(self.wavenumbers)
+        if not names:
+            return {'names': [], 'top_index': np.zeros((self.n_pixels, 0), dtype=np.int32),
+                    'top_score': np.zeros((self.n_pixels, 0), dtype=np.float32),
+                    'best_index': np.full(self.n_pixels, -1), 'best_score': np.zeros(self.n_pixels)}
+        parts = self._map(_score_block, self.path, self.n_pixels, library, int(max(top_k, 1)),
+                          chunk_rows=chunk_rows, name="面扫库匹配", executor=executor, token=token,
+                          on_progress=on_progress)
+        top_index = np.vstack([p[0] for p in parts])
+        top_score = np.vstack([p[1] for p in parts])
+        return {'names': names, 'top_index': top_index, 'top_score': top_score,
+                'best_index': top_index[:, 0].astype(np.int64), 'best_score': top_score[:, 0].astype(np.float64)}
+
+
+def open_map(path: str) -> RamanMap:
+    """打开已导入的数据集目录（也接受目录内的 meta.json 路径）"""
+    if os.path.basename(path) == 'meta.json':
+        path = os.path.dirname(path)
+    return RamanMap(path)
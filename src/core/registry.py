@@ -9,11 +9,22 @@
 获取：
 - get_preprocessors() / get_models() / get_plot_styles()
 
+持久化模型注册表（训练好的模型按 训练数据摘要 + 超参数 + 代码版本 保存与复用）：
+- model_registry.fit(estimator, X, y=None, fit_params=None) -> (fitted, loaded)
+- model_registry.entries() / remove(key) / clear() / prune()
+
 测试：
 - reset_registry() 仅用于测试清空注册表。
 """
 
-from typing import Callable, Dict
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.utils.profiling import profiler
 
 _preprocessors: Dict[str, Callable] = {}
 _models: Dict[str, Callable] = {}
@@ -53,3 +64,337 @@ def reset_registry():
     _models.clear()
     _plot_styles.clear()
 
+
+
+# ---------------------------------------------------------------------------- 持久化模型注册表
+#
+# 训练好的模型按 (训练数据摘要, 超参数, 代码版本) 作为键保存到磁盘，输入一致时直接加载，不再重新训练：
+# - 带 get_fitted_state / set_fitted_state 的模型（如 AutoencoderTransformer）：torch.save 保存 state_dict 等状态
+# - 其他 sklearn 模型 / Pipeline：joblib 序列化整个已拟合对象
+# - 每个条目另存 metadata.json（类型、超参数、数据形状、代码版本、训练耗时、创建时间）
+# 代码版本取模型类源码的摘要（再加 sklearn / torch 版本），修改模型实现后旧条目自动失效。
+# 环境变量 SPECTRA_MODEL_REGISTRY=0 可关闭（始终重新训练）。
+# 注册表总大小有上限（默认 2 GB，环境变量 SPECTRA_MODEL_REGISTRY_MB 可调整）：每次保存后按最近使用时间
+# （条目目录的 mtime，加载命中时刷新）删除最久未用的条目，直到总大小不超过上限。
+
+DEFAULT_MAX_REGISTRY_MB = 2048
+
+_code_versions: Dict[type, str] = {}
+
+
+def _hash_value(h, value):
+    """把数组 / 标量 / 容器写入摘要"""
+    import numpy as np
+
+    if value is None:
+        h.update(b'None')
+    elif isinstance(value, np.ndarray) or hasattr(value, '__array__') and not isinstance(value, (str, bytes)):
+        arr = np.ascontiguousarray(np.asarray(value))
+        if arr.dtype == object:
+            h.update(repr(arr.tolist()).encode())
+        else:
+            h.update(arr.dtype.str.encode())
+            h.update(repr(arr.shape).encode())
+            h.update(memoryview(arr).cast('B'))
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            h.update(str(key).encode())
+            _hash_value(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        h.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _hash_value(h, item)
+    else:
+        h.update(repr(value).encode())
+
+
+def data_fingerprint(*values) -> str:
+    """训练数据摘要（数组内容 + dtype + 形状）"""
+    h = hashlib.blake2b(digest_size=16)
+    for value in values:
+        _hash_value(h, value)
+    return h.hexdigest()
+
+
+def _estimator_classes(estimator) -> List[type]:
+    classes = [type(estimator)]
+    for _, step in getattr(estimator, 'steps', []) or []:
+        if step is not None and step != 'passthrough':
+            classes.extend(_estimator_classes(step))
+    return classes
+
+
+def code_version(estimator) -> str:
+    """模型实现的版本：类（含 Pipeline 各步骤）源码摘要 + sklearn / torch 版本"""
+    import inspect
+
+    parts = []
+    for cls in _estimator_classes(estimator):
+        if cls not in _code_versions:
+            try:
+                source = inspect.getsource(cls)
+                # 训练逻辑在其他模块中的类可声明 _registry_dependencies（模块名），一并计入版本
+                for module_name in getattr(cls, '_registry_dependencies', ()):
+                    import importlib
+                    source += inspect.getsource(importlib.import_module(module_name))
+            except (OSError, TypeError, ImportError):
+                source = f'{cls.__module__}.{cls.__qualname__}'
+            _code_versions[cls] = hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+        parts.append(f'{cls.__name__}:{_code_versions[cls]}')
+    try:
+        import sklearn
+        parts.append(f'sklearn:{sklearn.__version__}')
+    except ImportError:
+        pass
+    if any(hasattr(cls, 'get_fitted_state') for cls in _estimator_classes(estimator)):
+        try:
+            import torch
+            parts.append(f'torch:{torch.__version__}')
+        except ImportError:
+            pass
+    return '|'.join(parts)
+
+
+def _json_safe(value):
+    """超参数转为 JSON 可保存的形式（嵌套的估计器记录为类名 + 参数）"""
+    if hasattr(value, 'get_params') and not isinstance(value, type):
+        return {'__class__': type(value).__name__,
+                'params': _json_safe(value.get_params(deep=False))}
+    if isinstance(value, dict):
+        return {str(k): _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+def estimator_params(estimator) -> Dict[str, Any]:
+    """模型超参数（sklearn get_params，不含嵌套展开）"""
+    if hasattr(estimator, 'get_params'):
+        return _json_safe(estimator.get_params(deep=False))
+    return {}
+
+
+class ModelRegistry:
+    """
+    训练模型的磁盘注册表
+
+    用法：
+        model, loaded = model_registry.fit(AutoencoderTransformer(...), X)
+        model, loaded = model_registry.fit(obs_filter, X, fit_params={'wavenumbers': x})
+    """
+
+    def __init__(self, root: Optional[str] = None, enabled: Optional[bool] = None,
+                 max_bytes: Optional[int] = None):
+        if root is None:
+            root = os.path.join(os.path.expanduser("~"), ".spectrapro_models")
+        if enabled is None:
+            enabled = os.environ.get('SPECTRA_MODEL_REGISTRY', '1').strip().lower() not in ('0', 'false', 'off', 'no')
+        if max_bytes is None:
+            try:
+                max_mb = float(os.environ.get('SPECTRA_MODEL_REGISTRY_MB', DEFAULT_MAX_REGISTRY_MB))
+            except ValueError:
+                max_mb = DEFAULT_MAX_REGISTRY_MB
+            max_bytes = int(max_mb * 1024 * 1024)
+        self.root = root
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+
+    def make_key(self, estimator, X, y=None, fit_params: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
+        """(键, 元数据)：键 = 摘要(类型, 超参数, 代码版本, 训练数据)"""
+        params = estimator_params(estimator)
+        version = code_version(estimator)
+        data_hash = data_fingerprint(X, y, fit_params or {})
+        kind = type(estimator).__name__
+        key_source = json.dumps({'kind': kind, 'params': params, 'code_version': version, 'data': data_hash},
+                                sort_keys=True)
+        key = hashlib.blake2b(key_source.encode(), digest_size=16).hexdigest()
+        shape = list(getattr(X, 'shape', ()))
+        metadata = {
+            'key': key,
+            'kind': kind,
+            'params': params,
+            'code_version': version,
+            'data_hash': data_hash,
+            'data_shape': shape,
+        }
+        return key, metadata
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def load(self, key: str, estimator=None):
+        """加载已保存的模型；不存在或加载失败时返回 None"""
+        if not self.enabled:
+            return None
+        entry = self._entry_dir(key)
+        try:
+            state_path = os.path.join(entry, 'model.pt')
+            if os.path.exists(state_path) and estimator is not None and hasattr(estimator, 'set_fitted_state'):
+                import torch
+                try:
+                    state = torch.load(state_path, map_location='cpu', weights_only=False)
+                except TypeError:
+                    state = torch.load(state_path, map_location='cpu')
+                estimator.set_fitted_state(state)
+                self._touch(entry)
+                return estimator
+            model_path = os.path.join(entry, 'model.joblib')
+            if os.path.exists(model_path):
+                import joblib
+                model = joblib.load(model_path)
+                self._touch(entry)
+                return model
+        except Exception as e:
+            print(f"[ModelRegistry] 加载模型 {key} 失败，将重新训练: {e}")
+        return None
+
+    def save(self, key: str, estimator, metadata: Dict[str, Any]):
+        """保存模型与元数据（失败只打印警告，不影响调用方）"""
+        if not self.enabled:
+            return
+        entry = self._entry_dir(key)
+        tmp = entry + '.tmp'
+        try:
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp, exist_ok=True)
+            if hasattr(estimator, 'get_fitted_state') and getattr(estimator, 'use_deep', False):
+                import torch
+                torch.save(estimator.get_fitted_state(), os.path.join(tmp, 'model.pt'))
+                metadata = dict(metadata, format='torch')
+            else:
+                import joblib
+                joblib.dump(estimator, os.path.join(tmp, 'model.joblib'))
+                metadata = dict(metadata, format='joblib')
+            with open(os.path.join(tmp, 'metadata.json'), 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+            self._touch(entry)
+        except Exception as e:
+            shutil.rmtree(tmp, ignore_errors=True)
+            print(f"[ModelRegistry] 保存模型 {key} 失败: {e}")
+            return
+        self.prune(keep=key)
+
+    @staticmethod
+    def _touch(entry: str):
+        """刷新条目的最近使用时间（目录 mtime）"""
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _entry_bytes(entry: str) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(entry):
+            for name in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+        return total
+
+    def prune(self, max_bytes: Optional[int] = None, keep: Optional[str] = None) -> int:
+        """
+        按最近使用时间删除最久未用的条目，直到总大小不超过 max_bytes（默认 self.max_bytes）
+
+        Args:
+            keep: 不删除的条目键（刚保存的模型）
+
+        Returns:
+            删除的条目数
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes is None or max_bytes <= 0 or not os.path.isdir(self.root):
+            return 0
+        entries = []
+        for name in os.listdir(self.root):
+            entry = os.path.join(self.root, name)
+            if name.endswith('.tmp') or not os.path.isdir(entry):
+                continue
+            try:
+                last_used = os.path.getmtime(entry)
+            except OSError:
+                continue
+            entries.append((last_used, name, self._entry_bytes(entry)))
+        total = sum(size for _, _, size in entries)
+        removed = 0
+        for _, name, size in sorted(entries):
+            if total <= max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed:
+            profiler.count('model_registry.evictions', removed)
+            print(f"[ModelRegistry] 注册表超过 {max_bytes / 1024 / 1024:.1f} MB，已删除 {removed} 个最久未用的模型")
+        return removed
+
+    def fit(self, estimator, X, y=None, fit_params: Optional[Dict[str, Any]] = None):
+        """
+        训练或加载模型
+
+        Args:
+            estimator: 未拟合的模型（超参数参与键的计算）
+            fit_params: 传给 fit 的额外参数（如 wavenumbers），同样参与数据摘要
+
+        Returns:
+            (已拟合的模型, 是否从注册表加载)
+        """
+        fit_params = fit_params or {}
+        if not self.enabled:
+            return estimator.fit(X, y, **fit_params) if y is not None else estimator.fit(X, **fit_params), False
+        key, metadata = self.make_key(estimator, X, y, fit_params)
+        loaded = self.load(key, estimator)
+        if loaded is not None:
+            print(f"[ModelRegistry] 复用已训练的 {metadata['kind']}（{key[:8]}）")
+            profiler.count('model_registry.hits')
+            return loaded, True
+        profiler.count('model_registry.misses')
+        start = time.perf_counter()
+        with profiler.span('model_registry.fit', kind=metadata['kind']):
+            fitted = estimator.fit(X, y, **fit_params) if y is not None else estimator.fit(X, **fit_params)
+        if fitted is None:
+            fitted = estimator
+        metadata['train_seconds'] = round(time.perf_counter() - start, 3)
+        metadata['created'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.save(key, fitted, metadata)
+        return fitted, False
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """所有条目的元数据（按创建时间排序）"""
+        result = []
+        if not os.path.isdir(self.root):
+            return result
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name, 'metadata.json')
+            if name.endswith('.tmp') or not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    result.append(json.load(f))
+            except Exception:
+                continue
+        return sorted(result, key=lambda m: m.get('created', ''))
+
+    def remove(self, key: str):
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def clear(self):
+        """删除所有已保存的模型"""
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+
+# 全局模型注册表实例
+model_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    return model_registry
@@ -8,11 +8,18 @@ import numpy as np
 import pandas as pd
 from scipy.signal import find_peaks
 from scipy.interpolate import interp1d
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import multiprocessing
+import threading
 from functools import partial
 from io import StringIO
 
+from src.core.spectral_library import SpectralLibrary
+from src.utils.profiling import profiler
+
+PREPROCESS_BLOCK_ROWS = 4         # update_preprocessing 每个并行任务处理的光谱条数
+VARIANT_CACHE_BYTES = 256 << 20   # 按参数缓存的预处理结果（y 缓冲区、峰值 CSR）总字节上限
+CLUSTER_SCORE_MARGIN = 0.15       # 聚类检索：代表得分 + 该裕量仍低于当前第 k 名时不再展开后续簇
+
 
 class RRUFFLibraryLoader:
     """RRUFF标准库加载器"""
@@ -26,10 +33,26 @@ class RRUFFLibraryLoader:
         self.library_folder = library_folder
         self.preprocess_params = preprocess_params or {}
         self.peak_detection_params = {}  # 峰值检测参数（与主菜单一致）
-        self.library_spectra = {}  # {name: {'x': wavenumbers, 'y': spectrum, 'y_raw': raw_spectrum, 'peaks': peaks, 'metadata': metadata}}
+        # 数组化存储（见 src.core.spectral_library），按名称访问得到类字典视图：
+        # {name: {'x': wavenumbers, 'y': spectrum, 'y_raw': raw_spectrum, 'peaks': peaks, 'metadata': metadata}}
+        self._library = SpectralLibrary()
+        # 按 (库内容, 参数摘要) 缓存的预处理 y 缓冲区与峰值 CSR，见 update_preprocessing
+        from src.core.peak_cache import PeakResultCache
+        self._variant_cache = PeakResultCache(max_entries=64, max_bytes=VARIANT_CACHE_BYTES, name='rruff_variants')
+        self._clusters = None  # 聚类压缩结果（见 compact_library），库数据变化后自动重建
+        self._clusters_lock = threading.Lock()
         if library_folder:
             self.load_library()
     
+    @property
+    def library_spectra(self) -> SpectralLibrary:
+        return self._library
+    
+    @library_spectra.setter
+    def library_spectra(self, spectra):
+        """接受 SpectralLibrary 或旧格式字典（例如旧版数据库中保存的库）"""
+        self._library = SpectralLibrary.from_dict(spectra or {})
+    
     def load_library(self, library_folder=None, preprocess_params=None, progress_callback=None, max_workers=None):
         """
         加载RRUFF库中的所有光谱文件（使用多线程并行加载）
@@ -49,6 +72,7 @@ class RRUFFLibraryLoader:
             return
         
         self.library_spectra.clear()
+        collected = {}  # 加载期间先按旧格式收集，结束后一次性转为数组化存储
         
         # 支持多种文件格式
         files = glob.glob(os.path.join(self.library_folder, '*.txt')) + \
@@ -178,8 +202,7 @@ class RRUFFLibraryLoader:
                 print(f"加载RRUFF库光谱失败 {file_path}: {e}")
                 return None
         
-        # 使用线程池并行加载
-        loaded_count = 0
+        # 并行加载
         successful_count = 0
         failed_count = 0
         failed_reasons = {}  # 统计失败原因
@@ -187,63 +210,63 @@ class RRUFFLibraryLoader:
         from threading import Lock
         spectra_lock = Lock()
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交所有任务
-            future_to_file = {executor.submit(load_single_file, file_path): file_path 
-                             for file_path in files}
-            
-            # 处理完成的任务
-            for future in as_completed(future_to_file):
-                file_path = future_to_file[future]
-                loaded_count += 1
+        def collect_result(file_path, result):
+            """按完成顺序收集结果（在调度器工作线程中调用）"""
+            nonlocal successful_count, failed_count
+            with spectra_lock:
+                if result is None:
+                    failed_count += 1
+                    failed_reasons['返回None'] = failed_reasons.get('返回None', 0) + 1
+                    profiler.count('rruff.files_failed')
+                    return
+                profiler.count('rruff.files_parsed')
+                # 检查是否已经有同名光谱（避免重复）
+                name = result['name']
                 
-                try:
-                    result = future.result()
-                    if result is not None:
-                        # 使用锁保护字典操作（虽然通常不需要，但为了保险）
-                        with spectra_lock:
-                            # 检查是否已经有同名光谱（避免重复）
-                            name = result['name']
-                            
-                            # 过滤processed版本：如果存在xxx-processed和xxx-raw，只保留xxx-raw
-                            # 检查是否是processed版本
-                            is_processed = 'processed' in name.lower() or '-processed' in name.lower()
-                            if is_processed:
-                                # 尝试找到对应的raw版本
-                                raw_name = name.replace('-processed', '').replace('processed', 'raw')
-                                if raw_name in self.library_spectra:
-                                    # 如果raw版本已存在，跳过processed版本
-                                    successful_count += 1
-                                    continue
-                            
-                            # 如果当前是raw版本，检查是否有对应的processed版本需要删除
-                            if 'raw' in name.lower() or '-raw' in name.lower():
-                                processed_name = name.replace('-raw', '').replace('raw', 'processed')
-                                if processed_name in self.library_spectra:
-                                    # 删除processed版本
-                                    del self.library_spectra[processed_name]
-                            
-                            if name in self.library_spectra:
-                                # 如果已存在同名光谱，使用更完整的路径作为key
-                                name = os.path.basename(file_path)
-                            self.library_spectra[name] = result['data']
+                # 过滤processed版本：如果存在xxx-processed和xxx-raw，只保留xxx-raw
+                # 检查是否是processed版本
+                is_processed = 'processed' in name.lower() or '-processed' in name.lower()
+                if is_processed:
+                    # 尝试找到对应的raw版本
+                    raw_name = name.replace('-processed', '').replace('processed', 'raw')
+                    if raw_name in collected:
+                        # 如果raw版本已存在，跳过processed版本
                         successful_count += 1
-                    else:
-                        failed_count += 1
-                        failed_reasons['返回None'] = failed_reasons.get('返回None', 0) + 1
-                except Exception as e:
-                    error_msg = str(e)[:100]  # 截取前100个字符
-                    failed_reasons[error_msg] = failed_reasons.get(error_msg, 0) + 1
-                    if failed_count < 10:  # 只打印前10个错误，避免输出太多
-                        print(f"处理文件 {os.path.basename(file_path)} 时出错: {e}")
-                    failed_count += 1
+                        return
                 
-                # 更新进度
-                if progress_callback:
-                    try:
-                        progress_callback(loaded_count, total_files, os.path.basename(file_path))
-                    except:
-                        pass
+                # 如果当前是raw版本，检查是否有对应的processed版本需要删除
+                if 'raw' in name.lower() or '-raw' in name.lower():
+                    processed_name = name.replace('-raw', '').replace('raw', 'processed')
+                    if processed_name in collected:
+                        # 删除processed版本
+                        del collected[processed_name]
+                
+                if name in collected:
+                    # 如果已存在同名光谱，使用更完整的路径作为key
+                    name = os.path.basename(file_path)
+                collected[name] = result['data']
+                successful_count += 1
+        
+        def report_progress(done, total, filename):
+            if progress_callback:
+                try:
+                    progress_callback(done, total, filename)
+                except:
+                    pass
+        
+        # 通过全局调度器并行加载（io 类别，与其他窗口的任务共享并发上限）
+        from src.services.task_runner import runner
+        try:
+            with profiler.span('rruff.load_library', files=total_files):
+                runner.map(load_single_file, files, name="加载RRUFF库", category='io',
+                           max_concurrency=max_workers, describe=os.path.basename,
+                           on_progress=report_progress, on_result=collect_result)
+        except Exception as e:
+            error_msg = str(e)[:100]  # 截取前100个字符
+            failed_reasons[error_msg] = failed_reasons.get(error_msg, 0) + 1
+            print(f"加载RRUFF库时出错: {e}")
+        
+        self.library_spectra = SpectralLibrary.from_dict(collected)
         
         # 打印加载统计信息
         final_count = len(self.library_spectra)
@@ -282,18 +305,20 @@ class RRUFFLibraryLoader:
         # 由于load_single_file现在会自动过滤所有无效行，这里直接返回0
         return 0
     
-    def _apply_preprocessing(self, x, y):
+    def _apply_preprocessing(self, x, y, preprocess_params=None):
         """
         应用预处理到光谱数据
         
         Args:
             x: 波数数组
             y: 强度数组
+            preprocess_params: 预处理参数字典（默认使用 self.preprocess_params）
             
         Returns:
             y_processed: 预处理后的强度数组
         """
-        if not self.preprocess_params:
+        params = self.preprocess_params if preprocess_params is None else preprocess_params
+        if not params:
             return y
         
         from src.core.preprocessor import DataPreProcessor
@@ -301,24 +326,24 @@ class RRUFFLibraryLoader:
         y_proc = y.astype(float)
         
         # 获取预处理参数
-        qc_enabled = self.preprocess_params.get('qc_enabled', False)
-        qc_threshold = self.preprocess_params.get('qc_threshold', 5.0)
-        is_be_correction = self.preprocess_params.get('is_be_correction', False)
-        be_temp = self.preprocess_params.get('be_temp', 300.0)
-        is_smoothing = self.preprocess_params.get('is_smoothing', False)
-        smoothing_window = self.preprocess_params.get('smoothing_window', 15)
-        smoothing_poly = self.preprocess_params.get('smoothing_poly', 3)
-        is_baseline_als = self.preprocess_params.get('is_baseline_als', False)
-        als_lam = self.preprocess_params.get('als_lam', 10000)
-        als_p = self.preprocess_params.get('als_p', 0.005)
-        normalization_mode = self.preprocess_params.get('normalization_mode', 'None')
-        global_transform_mode = self.preprocess_params.get('global_transform_mode', '无')
-        global_log_base_text = self.preprocess_params.get('global_log_base', '10')
+        qc_enabled = params.get('qc_enabled', False)
+        qc_threshold = params.get('qc_threshold', 5.0)
+        is_be_correction = params.get('is_be_correction', False)
+        be_temp = params.get('be_temp', 300.0)
+        is_smoothing = params.get('is_smoothing', False)
+        smoothing_window = params.get('smoothing_window', 15)
+        smoothing_poly = params.get('smoothing_poly', 3)
+        is_baseline_als = params.get('is_baseline_als', False)
+        als_lam = params.get('als_lam', 10000)
+        als_p = params.get('als_p', 0.005)
+        normalization_mode = params.get('normalization_mode', 'None')
+        global_transform_mode = params.get('global_transform_mode', '无')
+        global_log_base_text = params.get('global_log_base', '10')
         global_log_base = float(global_log_base_text) if global_log_base_text == '10' else np.e
-        global_log_offset = self.preprocess_params.get('global_log_offset', 1.0)
-        global_sqrt_offset = self.preprocess_params.get('global_sqrt_offset', 0.0)
-        global_y_offset = self.preprocess_params.get('global_y_offset', 0.0)
-        is_derivative = self.preprocess_params.get('is_derivative', False)
+        global_log_offset = params.get('global_log_offset', 1.0)
+        global_sqrt_offset = params.get('global_sqrt_offset', 0.0)
+        global_y_offset = params.get('global_y_offset', 0.0)
+        is_derivative = params.get('is_derivative', False)
         
         # QC检查
         if qc_enabled and np.max(y_proc) < qc_threshold:
@@ -362,78 +387,178 @@ class RRUFFLibraryLoader:
         
         return y_proc
     
-    def update_preprocessing(self, preprocess_params, peak_detection_params=None, progress_callback=None):
+    def update_preprocessing(self, preprocess_params, peak_detection_params=None, progress_callback=None,
+                             token=None):
         """
         更新预处理参数并重新处理所有已加载的光谱
         
+        按块（PREPROCESS_BLOCK_ROWS 条）交给全局调度器并行处理；每组参数的结果（y 缓冲区、峰值 CSR）
+        按库内容 + 参数摘要缓存（总大小不超过 VARIANT_CACHE_BYTES），切换回之前用过的参数时直接恢复。
+        取消时库与参数保持原样。
+        
         Args:
             preprocess_params: 预处理参数字典
             peak_detection_params: 峰值检测参数字典（如果提供，将使用这些参数检测峰值）
-            progress_callback: 进度回调函数 callback(current, total, message)
+            progress_callback: 进度回调函数 callback(current, total, message)，只在调用线程中触发，
+                               current 为所有线程已处理的光谱总数（逐条更新）
+            token: CancellationToken，可选
         
         Returns:
             bool: 如果参数真正改变并重新处理了光谱，返回True；否则返回False
+        
+        Raises:
+            TaskCancelled: token 被取消
         """
+        from src.core.group_stats import params_digest
+        from src.services.task_runner import TaskCancelled
+        
+        peak_detection_params = peak_detection_params or {}
         # 检查参数是否真正改变
         preprocess_changed = (self.preprocess_params != preprocess_params)
-        peak_detection_changed = (self.peak_detection_params != (peak_detection_params or {}))
+        peak_detection_changed = (self.peak_detection_params != peak_detection_params)
         
         # 如果参数没有改变，直接返回
         if not preprocess_changed and not peak_detection_changed:
             return False
         
-        self.preprocess_params = preprocess_params
-        self.peak_detection_params = peak_detection_params or {}
-        
-        # 获取需要处理的光谱列表
-        spectra_to_process = []
-        if preprocess_changed:
-            # 预处理参数改变，需要重新处理所有光谱
-            for name, spectrum in self.library_spectra.items():
-                if 'y_raw' in spectrum:
-                    spectra_to_process.append((name, spectrum, 'full'))
-        elif peak_detection_changed:
-            # 只有峰值检测参数改变，只重新检测峰值（不重新预处理，更快）
-            for name, spectrum in self.library_spectra.items():
-                if 'y' in spectrum:
-                    spectra_to_process.append((name, spectrum, 'peaks_only'))
-        
-        total = len(spectra_to_process)
-        
-        # 只在参数改变时才重新处理光谱
-        # 如果只有峰值检测参数改变，只重新检测峰值（更快）
-        for idx, (name, spectrum, process_type) in enumerate(spectra_to_process):
-            # 更新进度
-            if progress_callback:
+        library = self.library_spectra
+        total = len(library)
+        caller = threading.get_ident()
+        
+        def report(current, message):
+            # 工作线程只更新共享计数，回调（通常会刷新界面、检查取消）留在调用线程里执行
+            if progress_callback and threading.get_ident() == caller:
                 try:
-                    if process_type == 'full':
-                        message = f"重新处理: {name[:30]}..."
-                    else:
-                        message = f"重新检测峰值: {name[:30]}..."
-                    progress_callback(idx + 1, total, message)
-                except:
+                    progress_callback(current, total, message)
+                except Exception:
                     pass
-            
-            if process_type == 'full':
-                # 预处理参数改变，需要重新处理所有光谱
-                spectrum['y'] = self._apply_preprocessing(spectrum['x'], spectrum['y_raw'].copy())
-                # 重新检测峰值
-                spectrum['peaks'] = self._detect_peaks(spectrum['x'], spectrum['y'], peak_detection_params=self.peak_detection_params)
-            else:
-                # 只有峰值检测参数改变，只重新检测峰值（不重新预处理，更快）
-                # 使用已有的预处理后的光谱重新检测峰值
-                spectrum['peaks'] = self._detect_peaks(spectrum['x'], spectrum['y'], peak_detection_params=self.peak_detection_params)
         
-        # 最终进度
-        if progress_callback:
-            try:
-                progress_callback(total, total, "完成")
-            except:
-                pass
+        # 切换前先记下当前参数的结果，之后切回时可直接恢复
+        raw_key = library.raw_key
+        current_pre = params_digest(self.preprocess_params)
+        current_peak = params_digest(self.peak_detection_params)
+        buffers = library.buffers()
+        if ('y', raw_key, current_pre) not in self._variant_cache:
+            self._variant_cache.put(('y', raw_key, current_pre), buffers['y'].copy())
+        if ('peaks', raw_key, current_pre, current_peak) not in self._variant_cache:
+            peak_offsets, peak_indices, _ = library.peaks_csr()
+            self._variant_cache.put(('peaks', raw_key, current_pre, current_peak),
+                                    (peak_offsets.copy(), peak_indices.copy()))
+        
+        pre_digest = params_digest(preprocess_params)
+        peak_digest = params_digest(peak_detection_params)
+        y_key = ('y', raw_key, pre_digest)
+        peaks_key = ('peaks', raw_key, pre_digest, peak_digest)
+        
+        with profiler.span('rruff.update_preprocessing', n_spectra=total, preprocess_changed=preprocess_changed):
+            y_buffer = self._variant_cache.get(y_key) if preprocess_changed else buffers['y']
+            peaks_csr = self._variant_cache.get(peaks_key)
+            if y_buffer is not None and peaks_csr is not None:
+                report(total, "从缓存恢复预处理结果")
+            else:
+                y_buffer, peaks_csr = self._reprocess_blocks(
+                    library, preprocess_params, peak_detection_params, y_buffer, report, token)
+                self._variant_cache.put(y_key, y_buffer)
+                self._variant_cache.put(peaks_key, peaks_csr)
+            if token is not None and token.cancelled:
+                raise TaskCancelled("预处理已取消")
+            
+            # 全部完成后才写回，取消或出错时库保持原样
+            if preprocess_changed:
+                library.replace_y(y_buffer)
+            library.set_peaks_csr(*peaks_csr)
+            self.preprocess_params = preprocess_params
+            self.peak_detection_params = peak_detection_params
         
+        report(total, "完成")
         return True
     
+    def _reprocess_blocks(self, library, preprocess_params, peak_detection_params, y_buffer, report, token):
+        """
+        分块并行预处理 + 峰值检测
+        
+        Args:
+            y_buffer: 已有的预处理结果（只需重新检测峰值时传入），为 None 时按 preprocess_params 重新预处理
+        Returns:
+            (y_buffer, (peak_offsets, peak_indices))
+        """
+        from src.services.task_runner import runner
+        
+        total = len(library)
+        offsets = library.offsets
+        reuse_y = y_buffer is not None
+        x_buffer, y_raw_buffer = library.buffers()['x'], library.buffers()['y_raw']
+        blocks = [(start, min(start + PREPROCESS_BLOCK_ROWS, total))
+                  for start in range(0, total, PREPROCESS_BLOCK_ROWS)]
+        
+        stage = "重新检测峰值" if reuse_y else "重新处理"
+        lock = threading.Lock()
+        rows_done = [0]
+        
+        def process_block(block):
+            start, stop = block
+            ys, peaks = [], []
+            for row in range(start, stop):
+                # 逐条检查取消，不必等整块完成
+                if token is not None:
+                    token.raise_if_cancelled()
+                sl = slice(int(offsets[row]), int(offsets[row + 1]))
+                x = x_buffer[sl].astype(np.float64)
+                if reuse_y:
+                    # 只有峰值检测参数改变，使用已有的预处理后的光谱重新检测峰值
+                    y = y_buffer[sl].astype(np.float64)
+                else:
+                    y = np.asarray(self._apply_preprocessing(x, y_raw_buffer[sl].astype(np.float64),
+                                                             preprocess_params), dtype=np.float64)
+                    if len(y) != len(x):
+                        raise ValueError(f"光谱 {library.name_of(row)} 预处理后长度改变")
+                    ys.append(y)
+                peaks.append(self._detect_peaks(x, y, peak_detection_params=peak_detection_params)[0])
+                with lock:
+                    rows_done[0] += 1
+                    done = rows_done[0]
+                # 调用线程每处理一条就汇报一次全部线程的累计进度
+                report(done, f"{stage}: {done}/{total} {library.name_of(row)[:30]}")
+            return ys, peaks
+        
+        results = runner.map(process_block, blocks, name="库光谱预处理", category='analysis',
+                             executor='thread', token=token,
+                             describe=lambda block: library.name_of(block[1] - 1)[:30])
+        
+        peaks_per_row = [p for _, block_peaks in results for p in block_peaks]
+        counts = np.fromiter((len(p) for p in peaks_per_row), dtype=np.int64, count=len(peaks_per_row))
+        peak_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        peak_indices = (np.concatenate(peaks_per_row).astype(np.int32) if peaks_per_row
+                        else np.zeros(0, dtype=np.int32))
+        if not reuse_y:
+            rows = [y for block_ys, _ in results for y in block_ys]
+            y_buffer = np.concatenate(rows).astype(np.float32) if rows else np.zeros(0, dtype=np.float32)
+        y_buffer = np.asarray(y_buffer)
+        y_buffer.flags.writeable = False
+        return y_buffer, (peak_offsets, peak_indices)
+    
     def _detect_peaks(self, x, y, prominence_factor=0.01, distance_factor=0.01, peak_detection_params=None):
+        """
+        检测光谱峰值（结果按 y 的内容摘要 + 峰值参数缓存在共享的 peak_cache 中）
+        参数与返回值同 _detect_peaks_uncached
+        """
+        from src.core.peak_cache import peak_cache, peak_params_key, data_key
+        
+        if len(y) == 0:
+            return np.array([]), np.array([])
+        params = peak_detection_params or {}
+        params_key = peak_params_key(
+            params.get('peak_height_threshold', 0.0), params.get('peak_distance_min', 10),
+            params.get('peak_prominence'), params.get('peak_width'),
+            params.get('peak_wlen'), params.get('peak_rel_height')) if peak_detection_params else None
+        key = ('rruff', data_key(y), params_key, float(prominence_factor), float(distance_factor))
+        peaks = peak_cache.get_or_compute(
+            key, lambda: np.asarray(self._detect_peaks_uncached(
+                x, y, prominence_factor, distance_factor, peak_detection_params)[0], dtype=int))
+        peaks = peaks.copy()
+        return peaks, np.asarray(x)[peaks]
+    
+    def _detect_peaks_uncached(self, x, y, prominence_factor=0.01, distance_factor=0.01, peak_detection_params=None):
         """
         检测光谱峰值（使用主菜单的峰值检测参数，确保与查询光谱一致）
         
@@ -563,6 +688,30 @@ class RRUFFLibraryLoader:
         """获取指定名称的光谱数据"""
         return self.library_spectra.get(name)
     
+    def compact_library(self, threshold=None):
+        """
+        库聚类压缩：相关系数 ≥ threshold 的近似重复光谱归为一簇，保存代表与成员
+        （见 src.core.library_clusters）。结果按库数据版本缓存，库或预处理结果变化后下次调用时重建。
+        
+        Args:
+            threshold: 成员与代表的最小相关系数（默认 library_clusters.DEFAULT_THRESHOLD）
+        
+        Returns:
+            LibraryClusters
+        """
+        from src.core.library_clusters import cluster_library, DEFAULT_THRESHOLD
+        
+        threshold = DEFAULT_THRESHOLD if threshold is None else float(threshold)
+        library = self.library_spectra
+        with self._clusters_lock:
+            clusters = self._clusters
+            if clusters is None or clusters.key[:2] != (library.version_key, threshold):
+                clusters = cluster_library(library, threshold)
+                self._clusters = clusters
+                print(f"RRUFF库聚类完成: {clusters.n_spectra} 条光谱 → {clusters.n_clusters} 个簇 "
+                      f"(阈值 {threshold})")
+        return clusters
+    
     def remove_spectrum(self, name):
         """从库中移除指定光谱"""
         if name in self.library_spectra:
@@ -591,12 +740,18 @@ class RRUFFLibraryLoader:
 class PeakMatcher:
     """峰值匹配器：匹配实验光谱峰值与RRUFF库峰值"""
     
-    def __init__(self, tolerance=5.0):
+    def __init__(self, tolerance=5.0, use_clusters=False, cluster_threshold=None, cluster_margin=CLUSTER_SCORE_MARGIN):
         """
         Args:
             tolerance: 峰值匹配容差（cm^-1）
+            use_clusters: find_best_matches 是否先检索簇代表、再展开获胜簇（见 RRUFFLibraryLoader.compact_library）
+            cluster_threshold: 聚类相关系数阈值（None 使用默认值）
+            cluster_margin: 聚类检索的展开裕量，越大越保守（结果越接近逐条检索）
         """
         self.tolerance = tolerance
+        self.use_clusters = use_clusters
+        self.cluster_threshold = cluster_threshold
+        self.cluster_margin = cluster_margin
     
     def match_peaks(self, query_peaks, library_peaks, tolerance=None):
         """
@@ -622,22 +777,12 @@ class PeakMatcher:
             # 如果只有一个有峰值，返回0匹配
             return [], 0.0
         
-        matches = []
-        matched_lib_indices = set()
-        
-        # 对查询峰值进行排序，优先匹配最接近的峰值
-        sorted_query_indices = np.argsort(query_peaks)
-        
-        for q_idx in sorted_query_indices:
-            q_peak = query_peaks[q_idx]
-            # 找到最近的库峰值
-            distances = np.abs(library_peaks - q_peak)
-            min_idx = np.argmin(distances)
-            min_dist = distances[min_idx]
-            
-            if min_dist <= tolerance and min_idx not in matched_lib_indices:
-                matches.append((q_peak, library_peaks[min_idx], min_dist))
-                matched_lib_indices.add(min_idx)
+        # 排序后双指针归并（一一对应，每个查询峰取容差内最近的可用库峰）
+        from src.core.peak_matcher import match_sorted
+        q_sorted = np.sort(np.asarray(query_peaks, dtype=np.float64))
+        l_sorted = np.sort(np.asarray(library_peaks, dtype=np.float64))
+        q_idx, l_idx, distances = match_sorted(q_sorted, l_sorted, tolerance)
+        matches = list(zip(q_sorted[q_idx], l_sorted[l_idx], distances))
         
         # 统一匹配分数计算：使用对称匹配分数
         # 如果峰值数量相同且所有峰值都匹配，返回100%
@@ -650,7 +795,9 @@ class PeakMatcher:
         
         return matches, match_score
     
-    def find_best_matches(self, query_wavenumbers, query_spectrum, query_peaks, library_loader, top_k=5, excluded_names=None, progress_callback=None, max_workers=None):
+    @profiler.timed('rruff.find_best_matches')
+    def find_best_matches(self, query_wavenumbers, query_spectrum, query_peaks, library_loader, top_k=5, excluded_names=None, progress_callback=None, max_workers=None,
+                          use_clusters=None):
         """
         在库中查找最佳匹配的光谱
         
@@ -661,6 +808,7 @@ class PeakMatcher:
             library_loader: RRUFFLibraryLoader实例
             top_k: 返回前k个最佳匹配
             excluded_names: 要排除的光谱名称列表
+            use_clusters: 是否使用聚类检索（None 时使用 self.use_clusters）
         
         Returns:
             best_matches: 列表 [(name, match_score, matches, spectrum_data), ...]
@@ -668,6 +816,10 @@ class PeakMatcher:
         if not library_loader.library_spectra:
             return []
         
+        if self.use_clusters if use_clusters is None else use_clusters:
+            return self._find_best_matches_clustered(query_wavenumbers, query_spectrum, query_peaks,
+                                                     library_loader, top_k, excluded_names, progress_callback)
+        
         # 获取过滤后的库
         filtered_library = library_loader.get_filtered_library(excluded_names)
         
@@ -682,57 +834,133 @@ class PeakMatcher:
                     progress_callback(processed_count, total_items, name)
                 except:
                     pass
-            lib_peaks = lib_data['peaks'][1]  # 获取峰值波数数组
-            lib_x = lib_data['x']
-            lib_y = lib_data['y']
-            
-            # 峰值匹配（统一匹配逻辑，不区分自身匹配）
-            matches, peak_match_score = self.match_peaks(query_peaks, lib_peaks)
-            
-            # 计算光谱相似度（使用相关系数）
-            spectrum_similarity = 0.0
-            try:
-                # 插值对齐到公共波数范围
-                from scipy.interpolate import interp1d
-                common_x_min = max(query_wavenumbers.min(), lib_x.min())
-                common_x_max = min(query_wavenumbers.max(), lib_x.max())
-                
-                if common_x_min < common_x_max:
-                    # 创建公共波数轴
-                    common_x = np.linspace(common_x_min, common_x_max, min(len(query_wavenumbers), len(lib_x)))
-                    
-                    # 插值对齐
-                    f_query = interp1d(query_wavenumbers, query_spectrum, kind='linear', fill_value=0, bounds_error=False)
-                    f_lib = interp1d(lib_x, lib_y, kind='linear', fill_value=0, bounds_error=False)
-                    
-                    query_aligned = f_query(common_x)
-                    lib_aligned = f_lib(common_x)
-                    
-                    # 计算相关系数
-                    if np.std(query_aligned) > 0 and np.std(lib_aligned) > 0:
-                        correlation = np.corrcoef(query_aligned, lib_aligned)[0, 1]
-                        spectrum_similarity = max(0.0, correlation)  # 确保非负
-            except:
-                pass
-            
-            # 综合匹配分数：峰值匹配分数和光谱相似度的加权平均
-            # 峰值匹配权重0.6，光谱相似度权重0.4
-            combined_score = 0.6 * peak_match_score + 0.4 * spectrum_similarity
-            
-            match_results.append({
-                'name': name,
-                'match_score': combined_score,
-                'peak_match_score': peak_match_score,
-                'spectrum_similarity': spectrum_similarity,
-                'matches': matches,
-                'spectrum_data': lib_data
-            })
+            match_results.append(self._score_library_spectrum(
+                query_wavenumbers, query_spectrum, query_peaks, name, lib_data))
         
         # 按综合匹配分数排序
         match_results.sort(key=lambda x: x['match_score'], reverse=True)
         
         return match_results[:top_k]
     
+    def _find_best_matches_clustered(self, query_wavenumbers, query_spectrum, query_peaks, library_loader,
+                                     top_k, excluded_names, progress_callback):
+        """
+        聚类检索：先对各簇代表打分，再按代表得分从高到低展开各簇逐条打分
+        
+        同簇光谱与代表的相关系数 ≥ 聚类阈值，但峰值匹配分数仍可能不同（实测簇内最高分比代表分
+        高出约 0.1~0.16），因此展开到“下一簇代表得分 + cluster_margin < 当前第 k 名得分”为止。
+        代表被排除时由簇内第一条未排除的成员代替。
+        """
+        import heapq
+        
+        library = library_loader.library_spectra
+        clusters = library_loader.compact_library(self.cluster_threshold)
+        names = library.names
+        excluded = set(excluded_names or ())
+        
+        # 各簇可用成员与代表
+        available = {}
+        for cluster in range(clusters.n_clusters):
+            rows = [int(r) for r in clusters.members(cluster) if names[r] not in excluded]
+            if rows:
+                available[cluster] = rows
+        
+        total_items = len(available)
+        processed_count = 0
+        
+        def score(row):
+            nonlocal processed_count
+            processed_count += 1
+            if progress_callback:
+                try:
+                    progress_callback(processed_count, total_items, names[row])
+                except:
+                    pass
+            return self._score_library_spectrum(query_wavenumbers, query_spectrum, query_peaks,
+                                                names[row], library[names[row]])
+        
+        with profiler.span('rruff.match_representatives', n_clusters=len(available)):
+            representative_results = {cluster: score(rows[0]) for cluster, rows in available.items()}
+        ranked = sorted(representative_results, key=lambda c: representative_results[c]['match_score'],
+                        reverse=True)
+        
+        match_results = list(representative_results.values())
+        best_scores = []  # 当前前 top_k 名得分（小顶堆）
+        for result in match_results:
+            heapq.heappush(best_scores, result['match_score'])
+            if len(best_scores) > top_k:
+                heapq.heappop(best_scores)
+        expanded = 0
+        with profiler.span('rruff.match_expanded_clusters'):
+            for cluster in ranked:
+                if (len(best_scores) >= top_k and
+                        representative_results[cluster]['match_score'] + self.cluster_margin < best_scores[0]):
+                    break
+                rows = available[cluster][1:]
+                total_items += len(rows)
+                for row in rows:
+                    result = score(row)
+                    match_results.append(result)
+                    heapq.heappush(best_scores, result['match_score'])
+                    if len(best_scores) > top_k:
+                        heapq.heappop(best_scores)
+                expanded += 1
+        profiler.count('rruff.cluster_search.expanded_clusters', expanded)
+        profiler.count('rruff.cluster_search.scored', processed_count)
+        profiler.count('rruff.cluster_search.skipped', len(library) - len(excluded & set(names)) - processed_count)
+        
+        match_results.sort(key=lambda x: x['match_score'], reverse=True)
+        return match_results[:top_k]
+    
+    def _score_library_spectrum(self, query_wavenumbers, query_spectrum, query_peaks, name, lib_data):
+        """单条库光谱的匹配结果：峰值匹配分数与光谱相关系数的加权"""
+        lib_peaks = lib_data['peaks'][1]  # 获取峰值波数数组
+        lib_x = lib_data['x']
+        lib_y = lib_data['y']
+        
+        # 峰值匹配（统一匹配逻辑，不区分自身匹配）
+        matches, peak_match_score = self.match_peaks(query_peaks, lib_peaks)
+        
+        # 计算光谱相似度（使用相关系数）
+        spectrum_similarity = 0.0
+        try:
+            # 插值对齐到公共波数范围
+            from scipy.interpolate import interp1d
+            common_x_min = max(query_wavenumbers.min(), lib_x.min())
+            common_x_max = min(query_wavenumbers.max(), lib_x.max())
+            
+            if common_x_min < common_x_max:
+                # 创建公共波数轴
+                common_x = np.linspace(common_x_min, common_x_max, min(len(query_wavenumbers), len(lib_x)))
+                
+                # 插值对齐
+                f_query = interp1d(query_wavenumbers, query_spectrum, kind='linear', fill_value=0, bounds_error=False)
+                f_lib = interp1d(lib_x, lib_y, kind='linear', fill_value=0, bounds_error=False)
+                
+                query_aligned = f_query(common_x)
+                lib_aligned = f_lib(common_x)
+                
+                # 计算相关系数
+                if np.std(query_aligned) > 0 and np.std(lib_aligned) > 0:
+                    correlation = np.corrcoef(query_aligned, lib_aligned)[0, 1]
+                    spectrum_similarity = max(0.0, correlation)  # 确保非负
+        except:
+            pass
+        
+        # 综合匹配分数：峰值匹配分数和光谱相似度的加权平均
+        # 峰值匹配权重0.6，光谱相似度权重0.4
+        combined_score = 0.6 * peak_match_score + 0.4 * spectrum_similarity
+        
+        return {
+            'name': name,
+            'match_score': combined_score,
+            'peak_match_score': peak_match_score,
+            'spectrum_similarity': spectrum_similarity,
+            'matches': matches,
+            'spectrum_data': lib_data
+        }
+    
+    @profiler.timed('rruff.find_best_combination_matches')
     def find_best_combination_matches(self, query_wavenumbers, query_spectrum, query_peaks, library_loader, 
                                       max_phases=3, top_k=10, excluded_names=None, use_gpu=False, progress_callback=None, 
                                       min_peak_coverage=0.8):
@@ -1060,137 +1288,42 @@ class PeakMatcher:
                 # 如果组合失败，返回None
                 return None
         
-        # 使用进程池并行处理（避免GIL限制，更适合CPU密集型任务）
-        # 优化并行处理配置
-        # Windows上ProcessPoolExecutor可能有性能问题，优先使用ThreadPoolExecutor
+        # 通过全局调度器并行处理（matching 类别，并发受全局上限约束）
+        # 注意：process_single_combination_fast 是闭包，无法 pickle 到子进程，因此使用线程执行；
+        # nnls 与 numpy 运算在计算期间会释放 GIL
         import threading
-        import sys
-        
-        # 计算最优worker数量
-        cpu_count = multiprocessing.cpu_count()
-        # 使用估算的总组合数来计算worker数量（因为生成器不能直接获取长度）
-        total_combinations = estimated_total
+        from src.services.task_runner import runner
         
-        # 初始化锁（用于线程安全的结果收集）
+        # 使用估算的总组合数显示进度（因为生成器不能直接获取长度）
         results_lock = threading.Lock()
         
-        if use_gpu and xp != np:
-            # GPU模式：使用线程池，充分利用GPU并行能力
-            # GPU模式下，线程数可以更多（因为GPU操作是异步的）
-            max_workers = min(max_total_combinations, max(32, cpu_count * 2))
-            executor_class = ThreadPoolExecutor
-        else:
-            # CPU模式：Windows上使用线程池，Linux/Mac可以使用进程池
-            # 对于CPU密集型任务，Windows上线程池可能更高效（避免进程间通信开销）
-            if sys.platform == 'win32':
-                # Windows: 使用线程池，避免进程间通信开销
-                max_workers = min(max_total_combinations, max(cpu_count, 16))
-                executor_class = ThreadPoolExecutor
-            else:
-                # Linux/Mac: 使用进程池，充分利用多核
-                max_workers = min(max_total_combinations, max(cpu_count, 16))
-                executor_class = ProcessPoolExecutor
-        
-        # progress_callback 已在函数参数中定义
-        
-        # 分批提交任务，避免一次性提交太多任务导致内存爆炸
-        # 使用生成器按需生成组合，而不是一次性生成所有组合
-        batch_size = max_workers * 2  # 每批提交的任务数（减少批次大小，降低内存压力）
-        
-        with executor_class(max_workers=max_workers) as executor:
-            # 分批提交和处理任务
-            future_to_combo = {}
-            processed_count = 0
-            submitted_count = 0
-            generator_exhausted = False
-            
-            # 从生成器中按需获取组合并提交任务
-            while not generator_exhausted:
-                # 提交一批新任务（从生成器中获取）
-                while len(future_to_combo) < batch_size and not generator_exhausted:
-                    try:
-                        combo = next(combinations_generator)
-                        future = executor.submit(process_single_combination_fast, combo)
-                        future_to_combo[future] = combo
-                        submitted_count += 1
-                    except StopIteration:
-                        generator_exhausted = True
-                        break
-                
-                # 处理已完成的任务（不等待所有任务完成）
-                completed_futures = []
-                for future in list(future_to_combo.keys()):
-                    if future.done():
-                        completed_futures.append(future)
-                
-                for future in completed_futures:
-                    processed_count += 1
-                    
-                    # 更新进度（使用估算值）
-                    if progress_callback:
-                        try:
-                            progress_callback(processed_count, estimated_total, 
-                                           f"组合 {processed_count}/{estimated_total} (已提交: {submitted_count})")
-                        except:
-                            pass
-                    
-                    try:
-                        result = future.result()
-                        if result is not None:
-                            # 线程池模式需要锁，进程池模式不需要
-                            if executor_class == ThreadPoolExecutor:
-                                with results_lock:
-                                    combination_results.append(result)
-                            else:
-                                combination_results.append(result)
-                            
-                            # 提前终止：如果top_k不为None且找到很好的匹配（>0.95），且已收集足够的结果
-                            if top_k is not None and result['match_score'] > 0.95 and len(combination_results) >= top_k * 2:
-                                # 取消剩余任务
-                                for f in future_to_combo:
-                                    if not f.done():
-                                        f.cancel()
-                                generator_exhausted = True
-                                break
-                    except Exception as e:
-                        # 忽略单个组合的错误，继续处理其他组合
-                        pass
-                    
-                    del future_to_combo[future]
-                
-                # 如果已经提前终止，跳出循环
-                if top_k is not None and len(combination_results) >= top_k * 2:
-                    break
-                
-                # 如果生成器已耗尽且没有待处理任务，退出循环
-                if generator_exhausted and len(future_to_combo) == 0:
-                    break
-            
-            # 处理剩余的任务
-            for future in as_completed(future_to_combo):
-                processed_count += 1
-                
-                # 更新进度
-                if progress_callback:
-                    try:
-                        progress_callback(processed_count, estimated_total, 
-                                       f"组合 {processed_count}/{estimated_total}")
-                    except:
-                        pass
-                
+        def collect_result(combo, result):
+            """收集结果；找到足够多的优秀匹配后请求提前结束"""
+            if result is None:
+                return False
+            with results_lock:
+                combination_results.append(result)
+                # 提前终止：如果top_k不为None且找到很好的匹配（>0.95），且已收集足够的结果
+                return (top_k is not None and result['match_score'] > 0.95
+                        and len(combination_results) >= top_k * 2)
+        
+        def report_progress(done, total, message):
+            if progress_callback:
                 try:
-                    result = future.result()
-                    if result is not None:
-                        # 线程池模式需要锁，进程池模式不需要
-                        if executor_class == ThreadPoolExecutor:
-                            with results_lock:
-                                combination_results.append(result)
-                        else:
-                            combination_results.append(result)
-                except Exception as e:
-                    # 忽略单个组合的错误
+                    progress_callback(done, estimated_total, f"组合 {done}/{estimated_total}")
+                except:
                     pass
         
+        def safe_process(combo):
+            try:
+                return process_single_combination_fast(combo)
+            except Exception:
+                # 忽略单个组合的错误，继续处理其他组合
+                return None
+        
+        runner.map(safe_process, combinations_generator, name="多物相组合匹配", category='matching',
+                   total=estimated_total, on_progress=report_progress, on_result=collect_result)
+        
         # 按匹配分数排序，优先显示分数高的
         # 排序规则：1) 匹配分数（越高越好，降序），2) 未匹配峰值数（越少越好）
         # 确保结果按分数从大到小排序
@@ -0,0 +1,537 @@
+"""
+紧凑的数组化光谱库（structure-of-arrays）
+
+RRUFFLibraryLoader.library_spectra 原先是 {name: {'x','y','y_raw','peaks','file_path','metadata'}}，
+每条光谱 5~6 个小数组 + 若干 Python 对象，内存碎片多、遍历缓存局部性差、pickle 体积大。
+SpectralLibrary 把全部光谱放进少量连续数组：
+
+- x / y / y_raw：拼接的 float32 一维缓冲区 + 行偏移 offsets（各行长度可不同，三者共享偏移）
+- 峰值：CSR 结构（peak_indices 拼接 + peak_offsets），峰位波数由 x 按索引取出
+- 名称 → 行号字典，file_path / metadata 为按行的列表
+- 未做预处理时 y 与 y_raw 相同，两者共用同一缓冲区（写入 y 时再复制）
+- resampled(n_points)：所有光谱插值到公共波数网格的 float32 矩阵（按需构建，数据变化后失效），
+  用于向量化的相似度计算（correlate）
+- replace_y / set_peaks_csr：整体替换预处理结果与峰值（RRUFFLibraryLoader 按参数缓存的结果据此恢复），
+  raw_key 标识原始数据，y 与峰值变化时不变
+
+兼容旧接口：library[name] 返回 SpectrumView（类字典视图），读取 'x'/'y'/'y_raw'/'peaks'/'file_path'/'metadata'，
+对 'y'/'y_raw'/'peaks' 等键赋值会写回缓冲区；其它键存放在按行的附加字典中。
+逐行赋值峰值时先记入覆盖表，访问 CSR 时统一合并，逐条循环更新的总代价仍为 O(总峰数)。
+按行读取 x/y/y_raw 时返回 float64 副本：与旧格式 dtype 一致（scipy 插值等仍走 float64 快速路径），
+调用方修改返回值也不会影响缓冲区。
+"""
+import itertools
+import threading
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+STORAGE_DTYPE = np.float32
+DEFAULT_GRID_POINTS = 1024
+ARRAY_FIELDS = ('x', 'y', 'y_raw')
+BASE_FIELDS = ('x', 'y', 'y_raw', 'peaks', 'file_path', 'metadata')
+
+_instance_ids = itertools.count(1)
+
+
+def _readonly(arr: np.ndarray) -> np.ndarray:
+    view = arr.view()
+    view.flags.writeable = False
+    return view
+
+
+class SpectrumView(MutableMapping):
+    """单条光谱的类字典视图（数据仍在 SpectralLibrary 的缓冲区中）"""
+
+    __slots__ = ('_library', '_row')
+
+    def __init__(self, library: 'SpectralLibrary', row: int):
+        self._library = library
+        self._row = row
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    def __getitem__(self, key):
+        return self._library._get_field(self._row, key)
+
+    def __setitem__(self, key, value):
+        self._library._set_field(self._row, key, value)
+
+    def __delitem__(self, key):
+        if key in BASE_FIELDS:
+            raise KeyError(f"不能删除基本字段 {key}")
+        extras = self._library._extras[self._row]
+        if not extras or key not in extras:
+            raise KeyError(key)
+        del extras[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from BASE_FIELDS
+        extras = self._library._extras[self._row]
+        if extras:
+            yield from extras
+
+    def __len__(self) -> int:
+        extras = self._library._extras[self._row]
+        return len(BASE_FIELDS) + (len(extras) if extras else 0)
+
+    def __contains__(self, key) -> bool:
+        if key in BASE_FIELDS:
+            return True
+        extras = self._library._extras[self._row]
+        return bool(extras) and key in extras
+
+    def to_dict(self) -> Dict[str, Any]:
+        """独立副本（旧格式的字典）"""
+        return {key: (np.array(value) if isinstance(value, np.ndarray) else
+                      tuple(np.array(v) for v in value) if key == 'peaks' else value)
+                for key, value in self.items()}
+
+    def __repr__(self):
+        return f"SpectrumView({self._library.name_of(self._row)!r}, n_points={self._library.length(self._row)})"
+
+
+class SpectralLibrary(MutableMapping):
+    """数组化光谱库：{name: SpectrumView} 的映射接口 + 批量数组接口"""
+
+    def __init__(self):
+        self._names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._x = np.zeros(0, dtype=STORAGE_DTYPE)
+        self._y_raw = np.zeros(0, dtype=STORAGE_DTYPE)
+        self._y = self._y_raw
+        self._peak_offsets = np.zeros(1, dtype=np.int64)
+        self._peak_indices = np.zeros(0, dtype=np.int32)
+        self._peak_overrides: Dict[int, np.ndarray] = {}
+        self._file_paths: List[Optional[str]] = []
+        self._metadata: List[Optional[dict]] = []
+        self._extras: List[Optional[dict]] = []
+        self._version = 0
+        self._uid = next(_instance_ids)
+        self._raw_version = 0   # 只在 x / y_raw / 行集合变化时递增（y、峰值变化不计）
+        self._resampled: Dict[int, Tuple[int, np.ndarray, np.ndarray]] = {}
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------ 构建
+    @classmethod
+    def from_dict(cls, spectra: Mapping) -> 'SpectralLibrary':
+        """从旧格式 {name: {'x','y','y_raw','peaks',...}} 构建（数据库中保存的旧库同样适用）"""
+        if isinstance(spectra, SpectralLibrary):
+            return spectra
+        library = cls()
+        library.extend(spectra.items())
+        return library
+
+    def extend(self, items: Iterable[Tuple[str, Mapping]]):
+        """批量追加（一次性拼接缓冲区）；同名条目覆盖"""
+        items = list(items)
+        if not items:
+            return
+        with self._lock:
+            replaced = [name for name, _ in items if name in self._index]
+            for name in replaced:
+                del self[name]
+            xs, ys, y_raws, peaks = [], [], [], []
+            for name, spectrum in items:
+                x = np.asarray(spectrum['x'], dtype=STORAGE_DTYPE).ravel()
+                y = spectrum.get('y')
+                y = x * 0 if y is None else np.asarray(y, dtype=STORAGE_DTYPE).ravel()
+                y_raw = spectrum.get('y_raw')
+                y_raw = y if y_raw is None else np.asarray(y_raw, dtype=STORAGE_DTYPE).ravel()
+                if not (len(x) == len(y) == len(y_raw)):
+                    raise ValueError(f"光谱 {name} 的 x/y/y_raw 长度不一致")
+                xs.append(x)
+                ys.append(y)
+                y_raws.append(y_raw)
+                peaks.append(self._peak_index_array(spectrum.get('peaks')))
+                self._index[name] = len(self._names)
+                self._names.append(name)
+                self._file_paths.append(spectrum.get('file_path'))
+                metadata = spectrum.get('metadata')
+                self._metadata.append(None if metadata == {'name': name} else metadata)
+                extras = {k: v for k, v in spectrum.items() if k not in BASE_FIELDS}
+                self._extras.append(extras or None)
+            lengths = np.fromiter((len(x) for x in xs), dtype=np.int64, count=len(xs))
+            self._offsets = np.concatenate([self._offsets, self._offsets[-1] + np.cumsum(lengths)])
+            shared = self._y is self._y_raw and all(y is y_raw or np.array_equal(y, y_raw)
+                                                    for y, y_raw in zip(ys, y_raws))
+            self._x = np.concatenate([self._x] + xs)
+            self._y_raw = np.concatenate([self._y_raw] + y_raws)
+            self._y = self._y_raw if shared else np.concatenate([self._y] + ys)
+            self._consolidate_peaks()
+            peak_counts = np.fromiter((len(p) for p in peaks), dtype=np.int64, count=len(peaks))
+            self._peak_offsets = np.concatenate([self._peak_offsets, self._peak_offsets[-1] + np.cumsum(peak_counts)])
+            self._peak_indices = np.concatenate([self._peak_indices] + [p.astype(np.int32) for p in peaks])
+            self._raw_version += 1
+            self._touch()
+
+    @staticmethod
+    def _peak_index_array(peaks) -> np.ndarray:
+        """旧格式的 peaks 为 (索引, 峰位波数) 元组；也接受单独的索引数组"""
+        if peaks is None:
+            return np.zeros(0, dtype=np.int32)
+        if isinstance(peaks, tuple) and len(peaks) == 2:
+            peaks = peaks[0]
+        return np.asarray(peaks, dtype=np.int64).ravel().astype(np.int32)
+
+    def _touch(self):
+        self._version += 1
+        self._resampled.clear()
+
+    @property
+    def raw_key(self) -> Tuple[int, int]:
+        """原始数据（x / y_raw / 行集合）的标识；预处理结果缓存以此区分不同的库内容"""
+        return self._uid, self._raw_version
+
+    @property
+    def version_key(self) -> Tuple[int, int]:
+        """当前数据（含预处理后的 y）的标识，任何数组写入后都会变化；派生结果（如聚类）以此判断是否过期"""
+        return self._uid, self._version
+
+    # ------------------------------------------------------------------ 映射接口
+    def __getitem__(self, name: str) -> SpectrumView:
+        return SpectrumView(self, self._index[name])
+
+    def __setitem__(self, name: str, spectrum: Mapping):
+        if isinstance(spectrum, SpectrumView):
+            spectrum = spectrum.to_dict()
+        self.extend([(name, spectrum)])
+
+    def __delitem__(self, name: str):
+        with self._lock:
+            row = self._index[name]
+            keep = np.ones(len(self._names), dtype=bool)
+            keep[row] = False
+            self._take_rows(np.flatnonzero(keep))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._names))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name) -> bool:
+        return name in self._index
+
+    def clear(self):
+        with self._lock:
+            self.__init__()
+
+    def _take_rows(self, rows: np.ndarray):
+        """只保留指定行（按给定顺序），重建所有缓冲区"""
+        self._consolidate_peaks()
+        starts, ends = self._offsets[rows], self._offsets[rows + 1]
+        point_index = _ranges(starts, ends)
+        shared = self._y is self._y_raw
+        self._x, self._y_raw = self._x[point_index], self._y_raw[point_index]
+        self._y = self._y_raw if shared else self._y[point_index]
+        self._offsets = np.concatenate([[0], np.cumsum(ends - starts)]).astype(np.int64)
+        p_starts, p_ends = self._peak_offsets[rows], self._peak_offsets[rows + 1]
+        self._peak_indices = self._peak_indices[_ranges(p_starts, p_ends)]
+        self._peak_offsets = np.concatenate([[0], np.cumsum(p_ends - p_starts)]).astype(np.int64)
+        self._names = [self._names[i] for i in rows]
+        self._file_paths = [self._file_paths[i] for i in rows]
+        self._metadata = [self._metadata[i] for i in rows]
+        self._extras = [self._extras[i] for i in rows]
+        self._index = {name: i for i, name in enumerate(self._names)}
+        self._raw_version += 1
+        self._touch()
+
+    # ------------------------------------------------------------------ 按行访问
+    @property
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    def index_of(self, name: str) -> int:
+        return self._index[name]
+
+    def name_of(self, row: int) -> str:
+        return self._names[row]
+
+    def length(self, row: int) -> int:
+        return int(self._offsets[row + 1] - self._offsets[row])
+
+    def _slice(self, row: int) -> slice:
+        return slice(int(self._offsets[row]), int(self._offsets[row + 1]))
+
+    def x(self, row: int) -> np.ndarray:
+        return self._x[self._slice(row)].astype(np.float64)
+
+    def y(self, row: int) -> np.ndarray:
+        return self._y[self._slice(row)].astype(np.float64)
+
+    def y_raw(self, row: int) -> np.ndarray:
+        return self._y_raw[self._slice(row)].astype(np.float64)
+
+    def peak_indices(self, row: int) -> np.ndarray:
+        override = self._peak_overrides.get(row)
+        if override is not None:
+            return override.astype(np.int64)
+        return self._peak_indices[self._peak_offsets[row]:self._peak_offsets[row + 1]].astype(np.int64)
+
+    def peaks(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(峰索引, 峰位波数)，与旧格式一致"""
+        idx = self.peak_indices(row)
+        return idx, self._x[self._slice(row)][idx].astype(np.float64)
+
+    def _get_field(self, row: int, key: str):
+        if key == 'x':
+            return self.x(row)
+        if key == 'y':
+            return self.y(row)
+        if key == 'y_raw':
+            return self.y_raw(row)
+        if key == 'peaks':
+            return self.peaks(row)
+        if key == 'file_path':
+            return self._file_paths[row]
+        if key == 'metadata':
+            metadata = self._metadata[row]
+            return {'name': self._names[row]} if metadata is None else metadata
+        extras = self._extras[row]
+        if extras and key in extras:
+            return extras[key]
+        raise KeyError(key)
+
+    def _set_field(self, row: int, key: str, value):
+        with self._lock:
+            if key in ARRAY_FIELDS:
+                self.set_array(row, key, value)
+            elif key == 'peaks':
+                self.set_peaks(row, value)
+            elif key == 'file_path':
+                self._file_paths[row] = value
+            elif key == 'metadata':
+                self._metadata[row] = value
+            else:
+                if self._extras[row] is None:
+                    self._extras[row] = {}
+                self._extras[row][key] = value
+
+    def set_array(self, row: int, field: str, values):
+        """写回一行的 x / y / y_raw（长度不变时原地写入，否则重建缓冲区）"""
+        values = np.asarray(values, dtype=STORAGE_DTYPE).ravel()
+        buffer = {'x': '_x', 'y': '_y', 'y_raw': '_y_raw'}[field]
+        with self._lock:
+            self._unshare()
+            if len(values) == self.length(row):
+                getattr(self, buffer)[self._slice(row)] = values
+            else:
+                self._resize_row(row, field, values)
+            if field != 'y':
+                self._raw_version += 1
+            self._touch()
+
+    def _unshare(self):
+        """y 与 y_raw 共用缓冲区时，写入前先分开（写时复制）"""
+        if self._y is self._y_raw:
+            self._y = self._y_raw.copy()
+
+    def _resize_row(self, row: int, field: str, values: np.ndarray):
+        """行长度改变：三个缓冲区一起重建（另外两列按新长度截断/补零，峰值清空）"""
+        self._consolidate_peaks()
+        sl = self._slice(row)
+        new = {}
+        for name, attr in (('x', '_x'), ('y', '_y'), ('y_raw', '_y_raw')):
+            old = getattr(self, attr)[sl]
+            if name == field:
+                new[attr] = values
+            else:
+                padded = np.zeros(len(values), dtype=STORAGE_DTYPE)
+                n = min(len(old), len(values))
+                padded[:n] = old[:n]
+                new[attr] = padded
+        for attr, row_values in new.items():
+            buffer = getattr(self, attr)
+            setattr(self, attr, np.concatenate([buffer[:sl.start], row_values, buffer[sl.stop:]]))
+        delta = len(values) - (sl.stop - sl.start)
+        self._offsets[row + 1:] += delta
+        self.set_peaks(row, np.zeros(0, dtype=np.int64))
+
+    def set_peaks(self, row: int, peaks):
+        """写回一行的峰值（接受旧格式元组或索引数组）"""
+        idx = self._peak_index_array(peaks)
+        with self._lock:
+            start, end = self._peak_offsets[row], self._peak_offsets[row + 1]
+            if row not in self._peak_overrides and len(idx) == end - start:
+                self._peak_indices[start:end] = idx
+            else:
+                self._peak_overrides[row] = idx
+
+    def set_all_peaks(self, peaks_per_row: List):
+        """按行顺序批量替换全部峰值（一次性重建 CSR）"""
+        arrays = [self._peak_index_array(p) for p in peaks_per_row]
+        if len(arrays) != len(self._names):
+            raise ValueError("峰值行数与光谱数不一致")
+        with self._lock:
+            counts = np.fromiter((len(a) for a in arrays), dtype=np.int64, count=len(arrays))
+            self._peak_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+            self._peak_indices = (np.concatenate(arrays).astype(np.int32) if arrays
+                                  else np.zeros(0, dtype=np.int32))
+            self._peak_overrides.clear()
+
+    def replace_y(self, buffer):
+        """整体替换预处理后的 y 缓冲区（与 offsets 对齐的拼接数组）；与 y_raw 相同时恢复共用"""
+        buffer = np.asarray(buffer, dtype=STORAGE_DTYPE).ravel()
+        with self._lock:
+            if len(buffer) != len(self._y_raw):
+                raise ValueError("y 缓冲区长度与库不一致")
+            self._y = self._y_raw if np.array_equal(buffer, self._y_raw) else buffer.copy()
+            self._touch()
+
+    def set_peaks_csr(self, peak_offsets, peak_indices):
+        """整体替换峰值 CSR（peaks_csr 返回的前两项）"""
+        peak_offsets = np.asarray(peak_offsets, dtype=np.int64).ravel()
+        if len(peak_offsets) != len(self._names) + 1:
+            raise ValueError("峰值行数与光谱数不一致")
+        with self._lock:
+            self._peak_offsets = peak_offsets.copy()
+            self._peak_indices = np.asarray(peak_indices, dtype=np.int32).ravel().copy()
+            self._peak_overrides.clear()
+
+    def _consolidate_peaks(self):
+        """把逐行覆盖的峰值合并回 CSR"""
+        if not self._peak_overrides:
+            return
+        n = len(self._names)
+        arrays = [self._peak_overrides.get(row) if row in self._peak_overrides else
+                  self._peak_indices[self._peak_offsets[row]:self._peak_offsets[row + 1]]
+                  for row in range(n)]
+        self._peak_overrides.clear()
+        self.set_all_peaks(arrays)
+
+    # ------------------------------------------------------------------ 批量数组接口
+    @property
+    def offsets(self) -> np.ndarray:
+        return _readonly(self._offsets)
+
+    def buffers(self) -> Dict[str, np.ndarray]:
+        """底层只读缓冲区：{'x','y','y_raw','offsets'}"""
+        return {'x': _readonly(self._x), 'y': _readonly(self._y), 'y_raw': _readonly(self._y_raw),
+                'offsets': _readonly(self._offsets)}
+
+    def peaks_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns:
+            (peak_offsets, peak_indices, peak_wavenumbers)：第 i 行的峰为 [peak_offsets[i], peak_offsets[i+1])，
+            peak_indices 为行内索引，peak_wavenumbers 为对应波数
+        """
+        with self._lock:
+            self._consolidate_peaks()
+            rows = np.repeat(np.arange(len(self._names)), np.diff(self._peak_offsets))
+            wavenumbers = self._x[self._offsets[rows] + self._peak_indices] if len(rows) else \
+                np.zeros(0, dtype=STORAGE_DTYPE)
+            return _readonly(self._peak_offsets), _readonly(self._peak_indices), wavenumbers
+
+    def grid(self, n_points: int = DEFAULT_GRID_POINTS) -> np.ndarray:
+        """覆盖全部光谱的公共升序波数网格"""
+        if len(self._x) == 0:
+            return np.zeros(0)
+        return np.linspace(float(self._x.min()), float(self._x.max()), int(n_points))
+
+    def resampled(self, n_points: int = DEFAULT_GRID_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        全部光谱（预处理后的 y）插值到公共网格的 float32 矩阵（范围外补 0），按需构建并缓存
+
+        Returns:
+            (grid, matrix (n_spectra, n_points))
+        """
+        n_points = int(n_points)
+        with self._lock:
+            cached = self._resampled.get(n_points)
+            if cached is not None and cached[0] == self._version:
+                return cached[1], cached[2]
+            grid = self.grid(n_points)
+            matrix = np.zeros((len(self._names), n_points), dtype=np.float32)
+            for row in range(len(self._names)):
+                sl = self._slice(row)
+                x, y = self._x[sl], self._y[sl]
+                if len(x) < 2:
+                    continue
+                if x[0] > x[-1]:
+                    x, y = x[::-1], y[::-1]
+                matrix[row] = np.interp(grid, x, y, left=0.0, right=0.0)
+            matrix.flags.writeable = False
+            self._resampled[n_points] = (self._version, grid, matrix)
+            return grid, matrix
+
+    def correlate(self, query_x, query_y, rows: Optional[np.ndarray] = None,
+                  n_points: int = DEFAULT_GRID_POINTS) -> np.ndarray:
+        """
+        查询光谱与库中各光谱在公共网格上的 Pearson 相关系数（一次矩阵乘法）
+
+        只在查询光谱覆盖的网格范围内比较；rows 为 None 时计算全部行。
+        """
+        grid, matrix = self.resampled(n_points)
+        query_x = np.asarray(query_x, dtype=np.float64)
+        query_y = np.asarray(query_y, dtype=np.float64)
+        if query_x[0] > query_x[-1]:
+            query_x, query_y = query_x[::-1], query_y[::-1]
+        mask = (grid >= query_x[0]) & (grid <= query_x[-1])
+        block = matrix[:, mask] if rows is None else matrix[np.asarray(rows)][:, mask]
+        if block.shape[1] < 2:
+            return np.zeros(block.shape[0])
+        q = np.interp(grid[mask], query_x, query_y)
+        q = q - q.mean()
+        centered = block - block.mean(axis=1, keepdims=True)
+        denom = np.linalg.norm(centered, axis=1) * np.linalg.norm(q)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores = (centered @ q.astype(np.float32)) / denom
+        return np.nan_to_num(scores, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def subset(self, names: Iterable[str]) -> 'SpectralLibrary':
+        """指定名称组成的新库（复制数据）"""
+        other = SpectralLibrary()
+        with self._lock:
+            other.__setstate__(self.__getstate__())
+        keep = np.array([other._index[name] for name in names if name in other._index], dtype=np.int64)
+        other._take_rows(keep)
+        return other
+
+    def nbytes(self) -> int:
+        arrays = [self._offsets, self._x, self._y_raw, self._peak_offsets, self._peak_indices]
+        if self._y is not self._y_raw:
+            arrays.append(self._y)
+        return int(sum(a.nbytes for a in arrays))
+
+    # ------------------------------------------------------------------ pickle（数据库保存）
+    def __getstate__(self):
+        with self._lock:
+            self._consolidate_peaks()
+            return {
+                'names': self._names, 'offsets': self._offsets, 'x': self._x,
+                'y': None if self._y is self._y_raw else self._y, 'y_raw': self._y_raw,
+                'peak_offsets': self._peak_offsets, 'peak_indices': self._peak_indices,
+                'file_paths': self._file_paths, 'metadata': self._metadata, 'extras': self._extras,
+            }
+
+    def __setstate__(self, state):
+        self.__init__()
+        self._names = list(state['names'])
+        self._index = {name: i for i, name in enumerate(self._names)}
+        self._offsets = np.array(state['offsets'], dtype=np.int64)
+        self._x = np.array(state['x'], dtype=STORAGE_DTYPE)
+        self._y_raw = np.array(state['y_raw'], dtype=STORAGE_DTYPE)
+        self._y = self._y_raw if state['y'] is None else np.array(state['y'], dtype=STORAGE_DTYPE)
+        self._peak_offsets = np.array(state['peak_offsets'], dtype=np.int64)
+        self._peak_indices = np.array(state['peak_indices'], dtype=np.int32)
+        self._file_paths = list(state['file_paths'])
+        self._metadata = list(state['metadata'])
+        self._extras = list(state['extras'])
+
+    def __repr__(self):
+        return f"SpectralLibrary(n_spectra={len(self)}, n_points={len(self._x)}, nbytes={self.nbytes()})"
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """拼接多个 [start, end) 区间的索引（向量化）"""
+    lengths = (ends - starts).astype(np.int64)
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    row_starts = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return np.arange(total, dtype=np.int64) + row_starts
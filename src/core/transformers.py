@@ -59,9 +59,12 @@ if TORCH_AVAILABLE:
 
 class AutoencoderTransformer(BaseEstimator, TransformerMixin):
     """Hybrid Transformer: Uses PyTorch if available, falls back to sklearn MLP."""
+    _registry_dependencies = ('src.core.ae_training',)  # training loop lives there
+    
     def __init__(self, n_components=6, hidden_nodes=128, max_iter=1000, use_deep=True,
                  l1_lambda=0.01, learning_rate=0.001, batch_size=32, n_epochs=200, 
-                 dropout_rate=0.2, normalize=True, random_state=42):
+                 dropout_rate=0.2, normalize=True, random_state=42,
+                 validation_fraction=0.1, patience=20, n_threads=None, verbose=False):
         self.n_components = n_components
         self.hidden_nodes = hidden_nodes
         self.max_iter = max_iter
@@ -73,7 +76,12 @@ class AutoencoderTransformer(BaseEstimator, TransformerMixin):
         self.dropout_rate = dropout_rate
         self.normalize = normalize
         self.random_state = random_state
+        self.validation_fraction = validation_fraction  # 留出验证集比例（早停依据）
+        self.patience = patience
+        self.n_threads = n_threads  # torch intra-op 线程数，None 表示不改变
+        self.verbose = verbose  # 打印逐 epoch 的损失与耗时
         self.model = None
+        self.training_info_ = None
         self.mean_ = None
         self.std_ = None
         self.n_features = None  # 保存训练时的特征维度，用于维度对齐
@@ -81,15 +89,34 @@ class AutoencoderTransformer(BaseEstimator, TransformerMixin):
     def _set_random_seed(self):
         """Set random seeds for reproducibility"""
         if TORCH_AVAILABLE:
-            torch.manual_seed(self.random_state)
-            torch.cuda.manual_seed_all(self.random_state)
-            # For deterministic behavior
-            torch.backends.cudnn.deterministic = True
-            torch.backends.cudnn.benchmark = False
+            from .ae_training import set_deterministic
+            set_deterministic(self.random_state)  # cudnn flags only when CUDA is present
         np.random.seed(self.random_state)
         import random
         random.seed(self.random_state)
     
+    def get_fitted_state(self):
+        """Fitted state for the model registry (torch state_dict + normalization arrays)"""
+        state = {'mean_': self.mean_, 'std_': self.std_, 'n_features': self.n_features, 'use_deep': self.use_deep}
+        if self.use_deep:
+            state['state_dict'] = self.model.state_dict()
+        else:
+            state['mlp'] = self.model
+        return state
+    
+    def set_fitted_state(self, state):
+        """Restore a state produced by get_fitted_state"""
+        self.mean_ = state['mean_']
+        self.std_ = state['std_']
+        self.n_features = state['n_features']
+        if state.get('use_deep') and TORCH_AVAILABLE:
+            self.model = DeepSpectralAE(self.n_features, self.n_components, self.dropout_rate)
+            self.model.load_state_dict(state['state_dict'])
+            self.model.eval()
+        else:
+            self.model = state['mlp']
+        return self
+    
     def _normalize(self, X):
         """Normalize data to zero mean and unit variance"""
         if self.mean_ is None:
@@ -116,63 +143,18 @@ class AutoencoderTransformer(BaseEstimator, TransformerMixin):
         
         if self.use_deep:
             n_features = X.shape[1]
-            n_samples = X.shape[0]
             
             # Set random seeds for reproducibility
             self._set_random_seed()
             
             self.model = DeepSpectralAE(n_features, self.n_components, self.dropout_rate)
-            optimizer = optim.Adam(self.model.parameters(), lr=self.learning_rate, weight_decay=1e-5)
-            # Remove verbose parameter (deprecated in newer PyTorch versions)
-            scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, mode='min', factor=0.5, 
-                                                             patience=10)
-            
-            # Convert to tensor
-            data_tensor = torch.tensor(X, dtype=torch.float32)
-            
-            # Improved training loop with batching and early stopping
-            self.model.train()
-            best_loss = float('inf')
-            patience_counter = 0
-            patience = 20  # Early stopping patience
-            
-            # Create a random number generator with fixed seed for reproducible shuffling
-            rng = np.random.RandomState(self.random_state)
-            
-            for epoch in range(self.n_epochs):
-                # Shuffle data for each epoch (reproducible)
-                indices = rng.permutation(n_samples)
-                total_loss = 0.0
-                n_batches = 0
-                
-                # Mini-batch training
-                for i in range(0, n_samples, self.batch_size):
-                    batch_indices = indices[i:i + self.batch_size]
-                    batch_data = data_tensor[batch_indices]
-                    
-                    optimizer.zero_grad()
-                    recon, z = self.model(batch_data)
-                    loss, mse_loss, l1_loss = self.model.compute_loss(batch_data, recon, z, self.l1_lambda)
-                    loss.backward()
-                    
-                    # Gradient clipping to prevent exploding gradients
-                    torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=1.0)
-                    
-                    optimizer.step()
-                    total_loss += loss.item()
-                    n_batches += 1
-                
-                avg_loss = total_loss / n_batches if n_batches > 0 else total_loss
-                scheduler.step(avg_loss)
-                
-                # Early stopping
-                if avg_loss < best_loss:
-                    best_loss = avg_loss
-                    patience_counter = 0
-                else:
-                    patience_counter += 1
-                    if patience_counter >= patience:
-                        break  # Early stop if no improvement
+            # Pre-shuffled contiguous batches, validation-based early stopping, best checkpoint
+            from .ae_training import train_autoencoder
+            self.training_info_ = train_autoencoder(
+                self.model, X, n_epochs=self.n_epochs, batch_size=self.batch_size,
+                learning_rate=self.learning_rate, l1_lambda=self.l1_lambda,
+                validation_fraction=self.validation_fraction, patience=self.patience,
+                n_threads=self.n_threads, random_state=self.random_state, verbose=self.verbose)
         else:
             # Fallback to sklearn
             self.model = MLPRegressor(hidden_layer_sizes=(self.n_components, self.hidden_nodes),
@@ -0,0 +1,398 @@
+"""
+2D-COS（二维相关光谱）计算引擎
+
+同步谱 Φ = ỹᵀỹ / (n-1)，异步谱 Ψ = ỹᵀN / (n-1)，其中 ỹ 为动态光谱（减去平均谱），
+N 为 ỹ 沿扰动方向的 Hilbert 变换（Hilbert-Noda 矩阵反对称，因此 Ψ 反对称）。
+
+- 存储：float32；Φ 对称、Ψ 反对称，只保存上三角分块（tile × tile），内存约为完整 float64 矩阵的 1/4
+- 分块：大 ROI 按块计算，不生成完整的 n_points × n_points 中间矩阵
+- 高斯平滑：gaussian_filter 是可分离的线性滤波，对 Ψ 平滑等价于先对 ỹ 与 N 沿波数方向做一维平滑再相乘，
+  结果与对完整 Ψ 调用 gaussian_filter 一致（同样的 reflect 边界与截断）
+- 显示：块平均同样是线性算子，显示分辨率的图直接由块平均后的动态光谱相乘得到，
+  与完整矩阵做块平均的结果一致，绘图只处理不超过 max_points × max_points 的矩阵
+- 缓存：按（数据摘要, ROI, 平滑参数）缓存，改变等高线层数、噪声阈值、参考峰等只重新绘图
+- 移动窗口：MW2D 与 PCMW2D（扰动-波数图）由前缀和计算，每个窗口位置 O(n_points)，按（数据, ROI, 窗口, 扰动值）缓存
+"""
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_TILE = 1024
+DEFAULT_DISPLAY_POINTS = 600
+
+
+class CorrelationMap:
+    """
+    对称（sign=+1）或反对称（sign=-1）矩阵的上三角分块存储（float32）
+
+    支持 M[i, j]（标量）、column(j)、take(rows, cols) 取任意子矩阵，
+    np.asarray(M) 会生成完整矩阵（仅在导出/保存时使用）。
+    """
+
+    def __init__(self, A: np.ndarray, B: np.ndarray, scale: float, sign: int, tile: int = DEFAULT_TILE):
+        """由 M = scale · AᵀB 逐块计算（A、B: (n_groups, n_points)）"""
+        self.n = A.shape[1]
+        self.sign = sign
+        self.tile = max(1, int(tile))
+        self.dtype = np.float32
+        self.tiles: Dict[Tuple[int, int], np.ndarray] = {}
+        A = np.asarray(A, dtype=np.float32)
+        B = np.asarray(B, dtype=np.float32)
+        max_abs = 0.0
+        for bi in range(self.n_blocks):
+            rows = self._block_slice(bi)
+            A_rows = np.ascontiguousarray(A[:, rows].T)
+            for bj in range(bi, self.n_blocks):
+                block = A_rows @ B[:, self._block_slice(bj)]
+                block *= np.float32(scale)
+                self.tiles[(bi, bj)] = block
+                if block.size:
+                    max_abs = max(max_abs, float(np.max(np.abs(block))))
+        self.max_abs = max_abs
+
+    @property
+    def n_blocks(self) -> int:
+        return (self.n + self.tile - 1) // self.tile
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.n, self.n)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(block.nbytes for block in self.tiles.values())
+
+    def _block_slice(self, b: int) -> slice:
+        return slice(b * self.tile, min(self.n, (b + 1) * self.tile))
+
+    def take(self, rows, cols) -> np.ndarray:
+        """取子矩阵 M[np.ix_(rows, cols)]"""
+        rows = np.atleast_1d(np.asarray(rows, dtype=np.intp)) % max(self.n, 1)
+        cols = np.atleast_1d(np.asarray(cols, dtype=np.intp)) % max(self.n, 1)
+        out = np.empty((rows.size, cols.size), dtype=self.dtype)
+        row_blocks = rows // self.tile
+        col_blocks = cols // self.tile
+        for bi in np.unique(row_blocks):
+            r_sel = np.flatnonzero(row_blocks == bi)
+            r_local = rows[r_sel] - bi * self.tile
+            for bj in np.unique(col_blocks):
+                c_sel = np.flatnonzero(col_blocks == bj)
+                c_local = cols[c_sel] - bj * self.tile
+                if bi <= bj:
+                    values = self.tiles[(bi, bj)][np.ix_(r_local, c_local)]
+                else:
+                    values = self.tiles[(bj, bi)][np.ix_(c_local, r_local)].T
+                    if self.sign < 0:
+                        values = -values
+                out[np.ix_(r_sel, c_sel)] = values
+        return out
+
+    def column(self, j: int) -> np.ndarray:
+        return self.take(np.arange(self.n), [j])[:, 0]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple) and len(key) == 2 and all(np.isscalar(k) for k in key):
+            return self.take([key[0]], [key[1]])[0, 0]
+        return np.asarray(self)[key]
+
+    def __array__(self, dtype=None, copy=None):
+        full = self.take(np.arange(self.n), np.arange(self.n))
+        return full if dtype is None else full.astype(dtype, copy=False)
+
+
+def max_abs(M) -> float:
+    """最大绝对值（CorrelationMap 直接返回计算时记录的值）"""
+    if isinstance(M, CorrelationMap):
+        return M.max_abs
+    return float(np.max(np.abs(M)))
+
+
+def dynamic_spectra(X_roi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """动态光谱 ỹ 及其 Hilbert 变换 N（沿扰动/组方向）"""
+    from scipy.signal import hilbert
+
+    X_roi = np.asarray(X_roi, dtype=np.float64)
+    y_tilde = X_roi - np.mean(X_roi, axis=0)[np.newaxis, :]
+    N = np.imag(hilbert(y_tilde, axis=0))
+    return y_tilde, N
+
+
+def smooth_along_wavenumber(Y: np.ndarray, sigma: Optional[float]) -> np.ndarray:
+    """沿波数方向一维高斯平滑（与对相关矩阵做 gaussian_filter 等价的可分离形式）"""
+    if not sigma or sigma <= 0:
+        return Y
+    from scipy.ndimage import gaussian_filter1d
+    return gaussian_filter1d(Y, sigma=sigma, axis=1, mode='reflect')
+
+
+def block_average(Y: np.ndarray, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    沿最后一维做块平均，使点数不超过 max_points
+
+    Returns:
+        (块平均后的数组, 块起始索引)
+    """
+    n = Y.shape[-1]
+    factor = max(1, int(np.ceil(n / max(1, max_points))))
+    starts = np.arange(0, n, factor)
+    if factor == 1:
+        return Y, starts
+    counts = np.diff(np.append(starts, n))
+    return np.add.reduceat(Y, starts, axis=-1) / counts, starts
+
+
+class TwoDCOSResult:
+    """某个（数据, ROI, 平滑参数）下的 2D-COS 结果"""
+
+    def __init__(self, wavenumbers_roi, X_roi, y_tilde, N, Phi: CorrelationMap, Psi: CorrelationMap, sigma):
+        self.wavenumbers_roi = wavenumbers_roi
+        self.X_roi = X_roi
+        self.y_tilde = y_tilde
+        self.N = N
+        self.Phi = Phi
+        self.Psi = Psi
+        self.sigma = sigma
+        self._display: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return self.Phi.nbytes + self.Psi.nbytes + self.y_tilde.nbytes + self.N.nbytes
+
+    def display_maps(self, max_points: int = DEFAULT_DISPLAY_POINTS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        显示分辨率的 (波数, Φ, Ψ)，等于完整矩阵按块平均的结果
+
+        由块平均后的动态光谱直接相乘得到，无需读取完整矩阵。
+        """
+        if max_points not in self._display:
+            n = self.y_tilde.shape[0]
+            scale = 1.0 / (n - 1)
+            Y_s = smooth_along_wavenumber(self.y_tilde, self.sigma)
+            N_s = smooth_along_wavenumber(self.N, self.sigma)
+            Y_d, _ = block_average(self.y_tilde, max_points)
+            Ys_d, _ = block_average(Y_s, max_points)
+            Ns_d, _ = block_average(N_s, max_points)
+            x_d, _ = block_average(np.asarray(self.wavenumbers_roi, dtype=np.float64), max_points)
+            Phi_d = (scale * (Y_d.T @ Y_d)).astype(np.float32)
+            Psi_d = (scale * (Ys_d.T @ Ns_d)).astype(np.float32)
+            self._display[max_points] = (x_d, Phi_d, Psi_d)
+        return self._display[max_points]
+
+
+# ---------------------------------------------------------------------------- 移动窗口 2D-COS
+
+def perturbation_values(group_names) -> np.ndarray:
+    """从组名中解析扰动值（如 '25mg' → 25）；无法全部解析或不单调时退回 0, 1, 2, ..."""
+    import re
+    values = []
+    for name in group_names or []:
+        match = re.search(r'[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?', str(name))
+        if match is None:
+            return np.arange(len(group_names), dtype=np.float64)
+        values.append(float(match.group()))
+    values = np.asarray(values, dtype=np.float64)
+    if values.size < 2 or np.any(np.diff(values) <= 0):
+        return np.arange(len(values), dtype=np.float64)
+    return values
+
+
+def window_sums(Y: np.ndarray, window: int) -> np.ndarray:
+    """沿第 0 维的滑动窗口和：前缀和相减，每个窗口位置 O(n_points)"""
+    S = np.cumsum(Y, axis=0)
+    S = np.concatenate([np.zeros((1,) + Y.shape[1:]), S], axis=0)
+    return S[window:] - S[:-window]
+
+
+def hilbert_noda(window: int) -> np.ndarray:
+    """Hilbert-Noda 矩阵 N_kl = 1 / (π (l - k))，对角线为 0"""
+    k = np.arange(window)
+    diff = k[None, :] - k[:, None]
+    with np.errstate(divide='ignore'):
+        N = np.where(diff == 0, 0.0, 1.0 / (np.pi * diff))
+    return N
+
+
+class MovingWindowResult:
+    """移动窗口 2D-COS 结果：行 = 窗口中心的扰动值，列 = 波数"""
+
+    def __init__(self, wavenumbers_roi, perturbation, window, mw2d, pc_sync, pc_async):
+        self.wavenumbers_roi = wavenumbers_roi
+        self.perturbation = perturbation      # 窗口中心的扰动值 (n_windows,)
+        self.window = window
+        self.mw2d = mw2d                      # MW2D 自相关（窗口内方差）(n_windows, n_points)
+        self.pc_sync = pc_sync                # PCMW2D 同步 (n_windows, n_points)
+        self.pc_async = pc_async              # PCMW2D 异步 (n_windows, n_points)
+
+    @property
+    def nbytes(self) -> int:
+        return self.mw2d.nbytes + self.pc_sync.nbytes + self.pc_async.nbytes
+
+
+def moving_window_2dcos(X_roi: np.ndarray, perturbation: np.ndarray, window: int,
+                        wavenumbers_roi: Optional[np.ndarray] = None) -> MovingWindowResult:
+    """
+    MW2D（Thomas & Richardson）与 PCMW2D（Morita 等）
+
+    窗口大小 w = 2m+1，沿扰动方向滑动，对窗口 j：
+        MW2D(j, ν)   = 1/(w-1) · Σ_k (y_k(ν) - ȳ_j(ν))²
+        Φ(p_j, ν)    = 1/(w-1) · Σ_k (p_k - p̄_j)(y_k(ν) - ȳ_j(ν))
+        Ψ(p_j, ν)    = 1/(w-1) · Σ_k (y_k(ν) - ȳ_j(ν)) · Σ_l N_kl (p_l - p̄_j)
+    MW2D 与 Φ 由 y、y²、p·y 的前缀和得到，每个窗口位置 O(n_points)；
+    Ψ 的权重 Σ_l N_kl p̃_l 只依赖窗口内的 w 个扰动值，对所有窗口一次张量积完成（O(w · n_points)）。
+    光谱先减去全局平均谱，避免前缀和相减时的精度损失（方差/协方差对平移不变）。
+    """
+    Y = np.asarray(X_roi, dtype=np.float64)
+    p = np.asarray(perturbation, dtype=np.float64)
+    n = Y.shape[0]
+    window = int(window)
+    if window < 3 or window > n:
+        raise ValueError(f"窗口大小需在 3 到组数（{n}）之间")
+    Y = Y - Y.mean(axis=0)
+    p_shift = p - p.mean()
+    scale = 1.0 / (window - 1)
+
+    s_y = window_sums(Y, window)                              # Σ y
+    s_yy = window_sums(Y ** 2, window)                        # Σ y²
+    s_py = window_sums(p_shift[:, None] * Y, window)          # Σ p y
+    s_p = window_sums(p_shift[:, None], window)               # Σ p
+    mw2d = np.maximum(s_yy - s_y ** 2 / window, 0.0) * scale
+    pc_sync = (s_py - s_p * s_y / window) * scale
+
+    from numpy.lib.stride_tricks import sliding_window_view
+    p_win = sliding_window_view(p_shift, window)              # (n_windows, w)
+    p_tilde = p_win - p_win.mean(axis=1, keepdims=True)
+    q = p_tilde @ hilbert_noda(window).T                      # q_k = Σ_l N_kl p̃_l
+    q -= q.mean(axis=1, keepdims=True)                        # Σ_k q_k ȳ_j 项：等价于对 y 去窗口均值
+    Y_win = sliding_window_view(Y, window, axis=0)            # (n_windows, n_points, w)
+    pc_async = np.einsum('jk,jvk->jv', q, Y_win) * scale
+
+    m = window // 2
+    centers = p[m:m + mw2d.shape[0]] if window % 2 else 0.5 * (p[m - 1:m - 1 + mw2d.shape[0]] + p[m:m + mw2d.shape[0]])
+    return MovingWindowResult(wavenumbers_roi, centers, window, mw2d, pc_sync, pc_async)
+
+
+class TwoDCOSEngine:
+    """
+    2D-COS 计算与缓存
+
+    用法：
+        engine = TwoDCOSEngine()
+        engine.set_data(X_matrix, wavenumbers)   # 可选：登记后摘要只算一次
+        result = engine.compute(X_matrix, wavenumbers, roi_min, roi_max, sigma=0.8)
+        x_d, Phi_d, Psi_d = result.display_maps()
+    """
+
+    def __init__(self, tile: int = DEFAULT_TILE, max_cache_bytes: int = 512 * 1024 * 1024):
+        self.tile = tile
+        self.max_cache_bytes = max_cache_bytes
+        self._phi_cache: "OrderedDict[tuple, CorrelationMap]" = OrderedDict()
+        self._result_cache: "OrderedDict[tuple, TwoDCOSResult]" = OrderedDict()
+        self._moving_cache: "OrderedDict[tuple, MovingWindowResult]" = OrderedDict()
+        self._data = None
+        self._digest = None
+
+    def clear(self):
+        self._phi_cache.clear()
+        self._result_cache.clear()
+        self._moving_cache.clear()
+
+    def set_data(self, X_matrix: np.ndarray, wavenumbers: np.ndarray):
+        """登记当前数据并计算其内容摘要（数据替换或原地修改后需再次调用）"""
+        self._data = (X_matrix, wavenumbers)
+        self._digest = self._content_digest(X_matrix, wavenumbers)
+
+    @staticmethod
+    def _content_digest(X_matrix: np.ndarray, wavenumbers: np.ndarray) -> str:
+        from src.core.project_hdf5 import array_digest
+        return array_digest(np.asarray(X_matrix)) + array_digest(np.asarray(wavenumbers))
+
+    def _data_key(self, X_matrix: np.ndarray, wavenumbers: np.ndarray) -> str:
+        """数据摘要：set_data 登记过的数组直接用其摘要，其他数据每次按内容计算"""
+        if self._data is not None and X_matrix is self._data[0] and wavenumbers is self._data[1]:
+            return self._digest
+        return self._content_digest(X_matrix, wavenumbers)
+
+    def _evict(self):
+        def total():
+            return (sum(m.nbytes for m in self._phi_cache.values())
+                    + sum(r.Psi.nbytes + r.y_tilde.nbytes + r.N.nbytes for r in self._result_cache.values()))
+        while len(self._result_cache) > 1 and total() > self.max_cache_bytes:
+            self._result_cache.popitem(last=False)
+        while len(self._phi_cache) > 1 and total() > self.max_cache_bytes:
+            self._phi_cache.popitem(last=False)
+
+    def compute(self, X_matrix: np.ndarray, wavenumbers: np.ndarray, roi_min: float, roi_max: float,
+                sigma: Optional[float] = None) -> TwoDCOSResult:
+        """
+        计算（或从缓存取出）ROI 内的同步/异步相关谱
+
+        Args:
+            X_matrix: 扰动矩阵 (n_groups, n_wavenumbers)
+            sigma: 异步谱高斯平滑的 sigma（点数），None/0 表示不平滑
+
+        Raises:
+            ValueError: ROI 内无数据点或组数不足
+        """
+        sigma = float(sigma) if sigma and sigma > 0 else None
+        data_key = self._data_key(X_matrix, wavenumbers)
+        roi_key = (data_key, float(roi_min), float(roi_max))
+        result_key = roi_key + (sigma,)
+        if result_key in self._result_cache:
+            self._result_cache.move_to_end(result_key)
+            return self._result_cache[result_key]
+
+        wavenumbers = np.asarray(wavenumbers)
+        mask = (wavenumbers >= roi_min) & (wavenumbers <= roi_max)
+        wavenumbers_roi = wavenumbers[mask]
+        X_roi = np.asarray(X_matrix)[:, mask]
+        if X_roi.shape[1] == 0:
+            raise ValueError("ROI范围内无数据点")
+        n = X_roi.shape[0]
+        if n < 2:
+            raise ValueError("组数不足（至少需要2组）")
+
+        y_tilde, N = dynamic_spectra(X_roi)
+        scale = 1.0 / (n - 1)
+        Phi = self._phi_cache.get(roi_key)
+        if Phi is None:
+            Phi = CorrelationMap(y_tilde, y_tilde, scale, sign=1, tile=self.tile)
+            self._phi_cache[roi_key] = Phi
+        else:
+            self._phi_cache.move_to_end(roi_key)
+        Psi = CorrelationMap(smooth_along_wavenumber(y_tilde, sigma), smooth_along_wavenumber(N, sigma),
+                             scale, sign=-1, tile=self.tile)
+
+        result = TwoDCOSResult(wavenumbers_roi, X_roi, y_tilde, N, Phi, Psi, sigma)
+        self._result_cache[result_key] = result
+        self._evict()
+        return result
+
+    def moving_window(self, X_matrix: np.ndarray, wavenumbers: np.ndarray, roi_min: float, roi_max: float,
+                      window: int, perturbation: Optional[np.ndarray] = None) -> MovingWindowResult:
+        """
+        计算（或从缓存取出）ROI 内的 MW2D / PCMW2D 图
+
+        Args:
+            window: 窗口大小（组数，≥ 3，建议取奇数）
+            perturbation: 各组的扰动值（如浓度），None 时使用 0, 1, 2, ...
+
+        Raises:
+            ValueError: ROI 内无数据点或窗口大小不合法
+        """
+        n_groups = np.asarray(X_matrix).shape[0]
+        p = np.arange(n_groups, dtype=np.float64) if perturbation is None else np.asarray(perturbation, dtype=np.float64)
+        key = (self._data_key(X_matrix, wavenumbers), float(roi_min), float(roi_max), int(window), p.tobytes())
+        if key in self._moving_cache:
+            self._moving_cache.move_to_end(key)
+            return self._moving_cache[key]
+
+        wavenumbers = np.asarray(wavenumbers)
+        mask = (wavenumbers >= roi_min) & (wavenumbers <= roi_max)
+        if not np.any(mask):
+            raise ValueError("ROI范围内无数据点")
+        result = moving_window_2dcos(np.asarray(X_matrix)[:, mask], p, window, wavenumbers[mask])
+        self._moving_cache[key] = result
+        while len(self._moving_cache) > 1 and sum(r.nbytes for r in self._moving_cache.values()) > self.max_cache_bytes:
+            self._moving_cache.popitem(last=False)
+        return result
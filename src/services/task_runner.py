@@ -1,23 +1,558 @@
 """
-轻量任务调度器：统一后台执行入口，避免 UI 线程阻塞。
-默认基于 ThreadPoolExecutor，后续可切换 QThreadPool。
+任务调度服务：统一后台执行入口，避免 UI 线程阻塞，并限制全局并发。
+
+- 命名任务类别（io / analysis / matching / autosave / default），每个类别有并发上限，
+  所有类别共享全局工作线程上限（默认 CPU 核数），多个窗口同时运行任务也不会超额占用核心
+- 优先级：同时排队时高优先级任务先执行
+- 协作式取消：CancellationToken，任务在循环中调用 token.raise_if_cancelled()
+- 结构化进度事件：ProgressEvent，可通过 qt_signals() 桥接为 Qt 信号（槽函数在 UI 线程执行）
+- 线程或进程执行：进程执行时较大的 numpy 输入放入共享内存，子进程直接映射而不经 pickle 复制；
+  进程池以 spawn 方式启动（不 fork 已有多个线程的 Qt 进程，避免继承 fork 时被持有的锁），
+  子任务函数须定义在模块顶层
+
+兼容旧接口：runner.submit(fn, *args, **kwargs) 返回 Future。
 """
-from concurrent.futures import ThreadPoolExecutor, Future
-from typing import Callable, Any
+import heapq
+import itertools
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Callable, Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.utils.profiling import profiler
+
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 10
+PRIORITY_HIGH = 20
+
+# 各类别的并发上限；None 表示只受全局上限约束
+DEFAULT_CATEGORY_LIMITS = {
+    'default': 2,
+    'io': 4,
+    'autosave': 1,
+    'analysis': None,
+    'matching': None,
+}
+
+SHARED_MEMORY_MIN_BYTES = 1 << 20  # 进程执行时，超过该大小的数组放入共享内存
+
+
+class TaskCancelled(Exception):
+    """任务被取消"""
+
+
+class CancellationToken:
+    """协作式取消标记（可嵌套：父标记取消时子标记也视为已取消）"""
+
+    def __init__(self, parent: Optional['CancellationToken'] = None):
+        self._event = threading.Event()
+        self._parent = parent
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self._parent is not None and self._parent.cancelled)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise TaskCancelled()
+
+
+@dataclass
+class ProgressEvent:
+    """进度事件"""
+    task_id: int
+    name: str
+    category: str
+    current: int
+    total: int
+    message: str = ''
+
+    @property
+    def fraction(self) -> float:
+        return self.current / self.total if self.total else 0.0
+
+
+class TaskContext:
+    """传给任务函数的上下文（submit_task(with_context=True) 时作为第一个参数）"""
+
+    def __init__(self, handle: 'TaskHandle', runner: 'TaskRunner'):
+        self._handle = handle
+        self._runner = runner
+
+    @property
+    def token(self) -> CancellationToken:
+        return self._handle.token
+
+    @property
+    def cancelled(self) -> bool:
+        return self._handle.token.cancelled
+
+    def check(self):
+        """已取消时抛出 TaskCancelled"""
+        self._handle.token.raise_if_cancelled()
+
+    def progress(self, current: int, total: int, message: str = ''):
+        self._runner._emit_progress(self._handle, current, total, message)
+
+
+class TaskHandle:
+    """已提交任务的句柄"""
+
+    def __init__(self, task_id: int, name: str, category: str, priority: int,
+                 token: CancellationToken, on_progress: Optional[Callable] = None):
+        self.id = task_id
+        self.name = name
+        self.category = category
+        self.priority = priority
+        self.token = token
+        self.on_progress = on_progress
+        self.future: Future = Future()
+
+    def cancel(self) -> bool:
+        """请求取消：未开始的任务直接取消，运行中的任务在下次检查 token 时退出"""
+        self.token.cancel()
+        return self.future.cancel()
+
+    def result(self, timeout: Optional[float] = None):
+        return self.future.result(timeout)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def running(self) -> bool:
+        return self.future.running()
+
+    def add_done_callback(self, fn: Callable[['TaskHandle'], Any]):
+        self.future.add_done_callback(lambda _f: fn(self))
+
+    def __repr__(self):
+        state = 'done' if self.done() else ('running' if self.running() else 'pending')
+        return f"<TaskHandle #{self.id} {self.category}:{self.name} {state}>"
+
+
+class SharedArray:
+    """
+    共享内存中的 numpy 数组（可 pickle：只传递名称、形状与类型）
+    由创建方负责 release()；子进程中通过 array() 零拷贝映射，只读使用。
+    """
+
+    def __init__(self, arr: np.ndarray):
+        from multiprocessing import shared_memory
+        arr = np.ascontiguousarray(arr)
+        self.shape = arr.shape
+        self.dtype = arr.dtype.str
+        self._shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        self.name = self._shm.name
+        self._owner = True
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=self._shm.buf)[...] = arr
+
+    def __getstate__(self):
+        return {'name': self.name, 'shape': self.shape, 'dtype': self.dtype}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = None
+        self._owner = False
+
+    def array(self) -> np.ndarray:
+        if self._shm is None:
+            from multiprocessing import shared_memory
+            if sys.version_info >= (3, 13):
+                self._shm = shared_memory.SharedMemory(name=self.name, track=False)
+            else:
+                self._shm = shared_memory.SharedMemory(name=self.name)
+        return np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=self._shm.buf)
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def release(self):
+        """创建方释放共享内存"""
+        shm = self._shm
+        self.close()
+        if self._owner and shm is not None:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._owner = False
+
+
+def _resolve_shared(value):
+    return value.array() if isinstance(value, SharedArray) else value
+
+
+def _call_with_shared(fn, args, kwargs):
+    """子进程入口：把 SharedArray 参数映射为数组后调用 fn"""
+    shared = [a for a in list(args) + list(kwargs.values()) if isinstance(a, SharedArray)]
+    try:
+        return fn(*[_resolve_shared(a) for a in args],
+                  **{k: _resolve_shared(v) for k, v in kwargs.items()})
+    finally:
+        for s in shared:
+            s.close()
+
+
+class _Task:
+    __slots__ = ('handle', 'fn', 'args', 'kwargs', 'executor', 'with_context')
+
+    def __init__(self, handle, fn, args, kwargs, executor, with_context):
+        self.handle = handle
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.executor = executor
+        self.with_context = with_context
 
 
 class TaskRunner:
-    def __init__(self, max_workers: int = 2):
-        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="worker")
+    def __init__(self, max_workers: Optional[int] = None, category_limits: Optional[Dict[str, Optional[int]]] = None):
+        """
+        Args:
+            max_workers: 全局工作线程上限（默认 CPU 核数）
+            category_limits: 各类别并发上限（覆盖 DEFAULT_CATEGORY_LIMITS）
+        """
+        self.max_workers = max(1, max_workers or os.cpu_count() or 2)
+        self.category_limits = dict(DEFAULT_CATEGORY_LIMITS)
+        if category_limits:
+            self.category_limits.update(category_limits)
+
+        self._cond = threading.Condition()
+        self._queues: Dict[str, list] = {}    # 类别 -> 堆 [(-priority, seq, task)]
+        self._running: Dict[str, int] = {}    # 类别 -> 运行中任务数
+        self._active: Dict[int, TaskHandle] = {}
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+        self._threads: List[threading.Thread] = []
+        self._idle_threads = 0
+        self._shutdown = False
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._progress_listeners: List[Callable[[ProgressEvent], Any]] = []
 
+    # ------------------------------------------------------------------ 提交
     def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
-        """提交后台任务，返回 Future，便于 UI 绑定进度/完成回调。"""
-        return self.executor.submit(fn, *args, **kwargs)
+        """提交后台任务，返回 Future，便于 UI 绑定进度/完成回调（兼容旧接口）。"""
+        return self.submit_task(fn, *args, **kwargs).future
+
+    def submit_task(self, fn: Callable[..., Any], *args, name: Optional[str] = None,
+                    category: str = 'default', priority: int = PRIORITY_NORMAL,
+                    executor: str = 'thread', with_context: bool = False,
+                    token: Optional[CancellationToken] = None,
+                    on_progress: Optional[Callable[[ProgressEvent], Any]] = None, **kwargs) -> TaskHandle:
+        """
+        提交任务
+
+        Args:
+            category: 任务类别（决定并发上限）
+            priority: 优先级（PRIORITY_LOW / NORMAL / HIGH）
+            executor: 'thread' 或 'process'（进程执行要求 fn 可 pickle，即模块级函数）
+            with_context: 为 True 时以 TaskContext 作为第一个参数调用 fn（仅线程执行）
+            token: 取消标记（默认新建）
+            on_progress: 进度回调（在工作线程中调用；UI 更新请使用 qt_signals()）
+        """
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"未知的执行方式: {executor}")
+        if executor == 'process' and with_context:
+            raise ValueError("进程执行的任务不支持 TaskContext（进度/取消需在线程中处理）")
+        handle = TaskHandle(next(self._ids), name or getattr(fn, '__name__', 'task'), category, priority,
+                            token or CancellationToken(), on_progress)
+        self._enqueue(_Task(handle, fn, args, kwargs, executor, with_context))
+        return handle
+
+    def map(self, fn: Callable[..., Any], items: Iterable, *common_args, name: Optional[str] = None,
+            category: str = 'analysis', priority: int = PRIORITY_NORMAL, executor: str = 'thread',
+            max_concurrency: Optional[int] = None, token: Optional[CancellationToken] = None,
+            total: Optional[int] = None, describe: Optional[Callable[[Any], str]] = None,
+            on_progress: Optional[Callable[[int, int, str], Any]] = None,
+            on_result: Optional[Callable[[Any, Any], Optional[bool]]] = None) -> List[Any]:
+        """
+        并行执行 fn(item, *common_args)，阻塞直到完成，按 items 顺序返回结果
+
+        items 可以是生成器（按需取用）。调用线程也参与执行，因此可在任务内部嵌套调用而不会死锁。
+        进程执行时 common_args 中较大的数组只放入共享内存一次，供所有子任务复用。
+
+        Args:
+            max_concurrency: 本批最大并发数（默认受类别/全局上限约束）
+            total: 总数（items 为生成器时用于进度显示）
+            describe: 把 item 转为进度消息
+            on_progress: 进度回调 callback(done, total, message)
+            on_result: 每项完成后的回调 callback(item, result)；返回 True 则提前结束，
+                       此时只返回已完成项的结果
+        Raises:
+            TaskCancelled: token 被取消
+            子任务抛出的第一个异常
+        """
+        token = token or CancellationToken()
+        iterator = iter(items)
+        if total is None and hasattr(items, '__len__'):
+            total = len(items)
+        total = total or 0
+
+        shared: List[SharedArray] = []
+        if executor == 'process':
+            common_args = tuple(self._share(a, shared) for a in common_args)
+
+        lock = threading.Lock()
+        state = {'index': 0, 'exhausted': False, 'done': 0, 'stopped': False, 'error': None}
+        results: Dict[int, Any] = {}
+        handle = TaskHandle(next(self._ids), name or getattr(fn, '__name__', 'map'), category, priority, token)
+
+        def claim():
+            with lock:
+                if state['exhausted'] or state['stopped'] or state['error'] is not None or token.cancelled:
+                    return None
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    state['exhausted'] = True
+                    return None
+                index = state['index']
+                state['index'] += 1
+                return index, item
+
+        def drain():
+            while True:
+                claimed = claim()
+                if claimed is None:
+                    return
+                index, item = claimed
+                try:
+                    if executor == 'process':
+                        result = self._run_process(fn, (item,) + tuple(common_args), {}, token)
+                    else:
+                        result = fn(item, *common_args)
+                except BaseException as e:
+                    with lock:
+                        if state['error'] is None:
+                            state['error'] = e
+                    return
+                stop = False
+                if on_result is not None:
+                    stop = bool(on_result(item, result))
+                with lock:
+                    results[index] = result
+                    state['done'] += 1
+                    done = state['done']
+                    if stop:
+                        state['stopped'] = True
+                message = describe(item) if describe else ''
+                if on_progress is not None:
+                    try:
+                        on_progress(done, max(total, done), message)
+                    except Exception:
+                        pass
+                self._emit_progress(handle, done, max(total, done), message)
+
+        limit = self._effective_limit(category)
+        if max_concurrency is not None:
+            limit = min(limit, max(1, int(max_concurrency)))
+        if total:
+            limit = min(limit, total)
+        helpers = [self.submit_task(drain, name=f"{handle.name}[worker]", category=category,
+                                    priority=priority, token=token)
+                   for _ in range(max(0, limit - 1))]
+        with self._cond:
+            self._active[handle.id] = handle
+        try:
+            with profiler.span(f'runner.map:{handle.name}', category=category, executor=executor, workers=limit):
+                drain()  # 调用线程同样领取并执行子任务
+                for helper in helpers:
+                    # 尚未开始的辅助任务已无事可做，直接取消（避免工作线程全忙时互相等待）
+                    if helper.future.cancel():
+                        continue
+                    try:
+                        helper.future.result()
+                    except Exception:
+                        pass
+        finally:
+            with self._cond:
+                self._active.pop(handle.id, None)
+            for s in shared:
+                s.release()
+
+        if state['error'] is not None:
+            raise state['error']
+        if token.cancelled and not state['stopped']:
+            raise TaskCancelled()
+        return [results[i] for i in sorted(results)]
+
+    # ------------------------------------------------------------------ 进度
+    def add_progress_listener(self, listener: Callable[[ProgressEvent], Any]):
+        """注册全局进度监听（在工作线程中调用）"""
+        self._progress_listeners.append(listener)
+
+    def remove_progress_listener(self, listener: Callable[[ProgressEvent], Any]):
+        if listener in self._progress_listeners:
+            self._progress_listeners.remove(listener)
+
+    def _emit_progress(self, handle: TaskHandle, current: int, total: int, message: str):
+        event = ProgressEvent(handle.id, handle.name, handle.category, current, total, message)
+        callbacks = ([handle.on_progress] if handle.on_progress else []) + list(self._progress_listeners)
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception:
+                pass
+        if _qt_signals is not None:
+            _qt_signals.progress.emit(event)
+
+    # ------------------------------------------------------------------ 状态
+    def active_tasks(self) -> List[TaskHandle]:
+        """排队中与运行中的任务"""
+        with self._cond:
+            return [h for h in self._active.values() if not h.done()]
+
+    def _effective_limit(self, category: str) -> int:
+        limit = self.category_limits.get(category, self.category_limits.get('default'))
+        return self.max_workers if limit is None else max(1, min(limit, self.max_workers))
+
+    # ------------------------------------------------------------------ 调度
+    def _enqueue(self, task: _Task):
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("TaskRunner 已关闭")
+            category = task.handle.category
+            heapq.heappush(self._queues.setdefault(category, []),
+                           (-task.handle.priority, next(self._seq), task))
+            self._active[task.handle.id] = task.handle
+            if self._idle_threads == 0 and len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._worker, name=f"worker-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+
+    def _pop_runnable(self) -> Optional[_Task]:
+        """在未达到并发上限的类别中取优先级最高（同级先入先出）的任务"""
+        best = None
+        for category, queue in self._queues.items():
+            if not queue or self._running.get(category, 0) >= self._effective_limit(category):
+                continue
+            if best is None or queue[0][:2] < self._queues[best][0][:2]:
+                best = category
+        if best is None:
+            return None
+        return heapq.heappop(self._queues[best])[2]
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                task = None
+                while task is None:
+                    if self._shutdown:
+                        return
+                    task = self._pop_runnable()
+                    if task is None:
+                        self._idle_threads += 1
+                        self._cond.wait()
+                        self._idle_threads -= 1
+                category = task.handle.category
+                self._running[category] = self._running.get(category, 0) + 1
+            try:
+                self._execute(task)
+            finally:
+                with self._cond:
+                    self._running[category] -= 1
+                    self._active.pop(task.handle.id, None)
+                    self._cond.notify_all()
+
+    def _execute(self, task: _Task):
+        handle = task.handle
+        future = handle.future
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            handle.token.raise_if_cancelled()
+            if task.executor == 'process':
+                result = self._run_process(task.fn, task.args, task.kwargs, handle.token)
+            elif task.with_context:
+                result = task.fn(TaskContext(handle, self), *task.args, **task.kwargs)
+            else:
+                result = task.fn(*task.args, **task.kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            if _qt_signals is not None:
+                _qt_signals.failed.emit(handle, e)
+        else:
+            future.set_result(result)
+            if _qt_signals is not None:
+                _qt_signals.finished.emit(handle)
+
+    # ------------------------------------------------------------------ 进程执行
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        with self._cond:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+            return self._process_pool
+
+    def _share(self, value, shared: List[SharedArray]):
+        if isinstance(value, np.ndarray) and value.nbytes >= SHARED_MEMORY_MIN_BYTES:
+            shared_array = SharedArray(value)
+            shared.append(shared_array)
+            return shared_array
+        return value
+
+    def _run_process(self, fn, args, kwargs, token: CancellationToken):
+        """在进程池中执行（调用线程等待结果，期间占用一个调度名额，保证全局并发上限）"""
+        shared: List[SharedArray] = []
+        args = tuple(self._share(a, shared) for a in args)
+        kwargs = {k: self._share(v, shared) for k, v in kwargs.items()}
+        try:
+            future = self._get_process_pool().submit(_call_with_shared, fn, args, kwargs)
+            while True:
+                try:
+                    return future.result(timeout=0.1)
+                except FutureTimeoutError:
+                    if token.cancelled:
+                        future.cancel()  # 已在子进程中运行的任务无法中断，结果将被丢弃
+                        raise TaskCancelled()
+        finally:
+            for s in shared:
+                s.release()
 
     def shutdown(self):
-        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self._cond:
+            self._shutdown = True
+            for queue in self._queues.values():
+                for _, _, task in queue:
+                    task.handle.future.cancel()
+                queue.clear()
+            self._cond.notify_all()
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+
+
+_qt_signals = None
+
+
+def qt_signals():
+    """
+    返回任务事件的 Qt 信号桥（首次调用须在 UI 线程，以保证槽函数在 UI 线程执行）
+    信号：progress(ProgressEvent)、finished(TaskHandle)、failed(TaskHandle, Exception)
+    """
+    global _qt_signals
+    if _qt_signals is None:
+        from PyQt6.QtCore import QObject, pyqtSignal
+
+        class TaskSignals(QObject):
+            progress = pyqtSignal(object)
+            finished = pyqtSignal(object)
+            failed = pyqtSignal(object, object)
+
+        _qt_signals = TaskSignals()
+    return _qt_signals
 
 
 # 默认全局实例，UI 可直接复用
 runner = TaskRunner()
-
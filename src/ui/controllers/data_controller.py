@@ -1,9 +1,9 @@
-import os
 import numpy as np
-import pandas as pd
 
+from src.core.group_stats import compute_group_stats, params_digest
 from src.utils.helpers import group_files_by_name
 from src.utils.skip_rows_detector import SkipRowsDetector
+from src.utils.spectrum_reader import read_spectrum
 
 
 class DataController:
@@ -24,39 +24,7 @@ class DataController:
             (x, y) 截断后的波数与强度
         """
         try:
-            # 如果skip_rows为-1，自动检测跳过行数
-            if skip_rows == -1:
-                skip_rows = self._auto_detect_skip_rows(file_path)
-            
-            try:
-                df = pd.read_csv(file_path, header=None, skiprows=skip_rows, sep=None, engine='python')
-            except Exception:
-                df = pd.read_csv(file_path, header=None, skiprows=skip_rows)
-
-            if df.shape[1] < 2:
-                raise ValueError("数据列不足2列")
-
-            x = df.iloc[:, 0].values.astype(float)
-            y = df.iloc[:, 1].values.astype(float)
-
-            # 强制 X 降序 (Wavenumber 高->低)
-            if len(x) > 1 and x[0] < x[-1]:
-                x = x[::-1]
-                y = y[::-1]
-
-            # 物理截断
-            mask = np.ones_like(x, dtype=bool)
-            if x_min_phys is not None:
-                mask &= (x >= x_min_phys)
-            if x_max_phys is not None:
-                mask &= (x <= x_max_phys)
-
-            if not np.any(mask):
-                raise ValueError(f"文件 {os.path.basename(file_path)} 在 X-Range [{x_min_phys}-{x_max_phys}] 内无数据。")
-
-            x = x[mask]
-            y = y[mask]
-            return x, y
+            return read_spectrum(file_path, skip_rows, x_min_phys, x_max_phys)
         except Exception as exc:  # pragma: no cover - 打印错误路径方便定位
             print(f"Error reading file {file_path}: {exc}")
             raise
@@ -102,51 +70,31 @@ class DataController:
         """
         将重复样本（如 sample-1, sample-2）分组并计算平均光谱。
 
+        各组统计量流式累加（见 src.core.group_stats），不再整组驻留内存。
+
         Returns:
-            averaged_data: {group: {'x','y','label','files'}}
+            averaged_data: {group: {'x','y','y_std','count','label','files'}}
             common_x: 公共波数轴
         """
         grouped_files = group_files_by_name(file_list, n_chars)
-        averaged_data = {}
-        common_x = None
-
-        for group_key, files_in_group in grouped_files.items():
-            group_spectra = []
-            group_x_list = []
-
-            for file_path in files_in_group:
-                try:
-                    x, y = self.read_data(file_path, skip_rows, x_min_phys, x_max_phys)
-                    group_x_list.append(x)
-                    group_spectra.append(y)
-                except Exception as exc:
-                    print(f"警告：跳过文件 {os.path.basename(file_path)}: {exc}")
-                    continue
 
-            if not group_spectra:
-                continue
-
-            if common_x is None:
-                common_x = group_x_list[0]
-            else:
-                aligned_spectra = []
-                for x_local, y_local in zip(group_x_list, group_spectra):
-                    if len(x_local) == len(common_x) and np.allclose(x_local, common_x):
-                        aligned_spectra.append(y_local)
-                    else:
-                        from scipy.interpolate import interp1d
-                        f_interp = interp1d(x_local, y_local, kind='linear', fill_value=0, bounds_error=False)
-                        aligned_spectra.append(f_interp(common_x))
-                group_spectra = aligned_spectra
-
-            group_matrix = np.array(group_spectra)
-            y_averaged = np.mean(group_matrix, axis=0)
+        def load_spectrum(file_path):
+            return self.read_data(file_path, skip_rows, x_min_phys, x_max_phys)
 
+        # 流式累加（按组/块并行，结果按文件签名与参数缓存）
+        group_stats, common_x = compute_group_stats(
+            grouped_files, load_spectrum, params_digest(('read', skip_rows, x_min_phys, x_max_phys)),
+            name="组平均")
+
+        averaged_data = {}
+        for group_key, stats in group_stats.items():
             averaged_data[group_key] = {
                 'x': common_x,
-                'y': y_averaged,
+                'y': np.array(stats['mean']),
+                'y_std': np.array(stats['std']),
+                'count': stats['count'],
                 'label': group_key,
-                'files': files_in_group
+                'files': grouped_files[group_key]
             }
 
         return averaged_data, common_x
@@ -27,9 +27,8 @@ from matplotlib.backends.backend_qtagg import NavigationToolbar2QT as Navigation
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from scipy.signal import find_peaks
-from scipy.optimize import nnls
 
-from PyQt6.QtCore import Qt, QPoint, QSize, QSettings, QTimer
+from PyQt6.QtCore import Qt, QPoint, QSize, QSettings, QTimer, QObject, pyqtSignal
 from PyQt6.QtGui import QColor
 from PyQt6.QtWidgets import (
     QApplication, QDialog, QVBoxLayout, 
@@ -47,19 +46,27 @@ from src.config.constants import C_H, C_C, C_K, C_CM_TO_HZ
 from src.config.plot_config import PlotStyleConfig
 from src.utils.fonts import setup_matplotlib_fonts
 from src.utils.helpers import natural_sort_key, group_files_by_name
-from src.utils.lazy_import import lazy_import
+from src.utils.lazy_import import lazy_import, lazy_attr
 from src.utils.cache import get_cache_manager
+from src.utils.profiling import profiler
 # 延迟导入非必需的模块
 from src.core.preprocessor import DataPreProcessor
+from src.core.batch_nnls import WarmStartNNLS
+from src.core import incremental_nmf
+from src.core.registry import model_registry
+from src.core.group_stats import compute_group_stats, params_digest
 # 以下模块延迟导入
 # from src.core.generators import SyntheticDataGenerator
 # from src.core.matcher import SpectralMatcher
 # from src.core.transformers import AutoencoderTransformer, AdaptiveMineralFilter, TORCH_AVAILABLE
 # from src.core.rruff_loader import RRUFFLibraryLoader, PeakMatcher
-# NonNegativeTransformer 需要立即导入，因为NMF分析中会用到
-from src.core.transformers import NonNegativeTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.decomposition import PCA, NMF
+# sklearn / torch（经由 transformers）与大型分析窗口在首次使用时才导入，
+# 主窗口显示后由 src.utils.startup 在后台线程预热
+NonNegativeTransformer = lazy_attr('src.core.transformers', 'NonNegativeTransformer')
+AutoencoderTransformer = lazy_attr('src.core.transformers', 'AutoencoderTransformer')
+Pipeline = lazy_attr('sklearn.pipeline', 'Pipeline')
+PCA = lazy_attr('sklearn.decomposition', 'PCA')
+NMF = lazy_attr('sklearn.decomposition', 'NMF')
 from src.ui.widgets.custom_widgets import (
     CollapsibleGroupBox,
     SmartDoubleSpinBox,
@@ -71,12 +78,17 @@ from src.ui.windows.plot_window import MplPlotWindow
 
 from src.ui.controllers import DataController
 
-from src.ui.windows.quantitative_window import QuantitativeResultWindow, QuantitativeAnalysisDialog
-from src.ui.windows.nmf_validation_window import NMFFitValidationWindow
-from src.ui.windows.two_dcos_window import TwoDCOSWindow, TwoDCOSMarginalPlotWindow
-from src.ui.windows.classification_window import ClassificationResultWindow
-from src.ui.windows.dae_window import DAEComparisonWindow
-from src.ui.windows.batch_plot_window import BatchPlotWindow
+QuantitativeResultWindow = lazy_attr('src.ui.windows.quantitative_window', 'QuantitativeResultWindow')
+QuantitativeAnalysisDialog = lazy_attr('src.ui.windows.quantitative_window', 'QuantitativeAnalysisDialog')
+NMFFitValidationWindow = lazy_attr('src.ui.windows.nmf_validation_window', 'NMFFitValidationWindow')
+TwoDCOSWindow = lazy_attr('src.ui.windows.two_dcos_window', 'TwoDCOSWindow')
+TwoDCOSMarginalPlotWindow = lazy_attr('src.ui.windows.two_dcos_window', 'TwoDCOSMarginalPlotWindow')
+ClassificationResultWindow = lazy_attr('src.ui.windows.classification_window', 'ClassificationResultWindow')
+DAEComparisonWindow = lazy_attr('src.ui.windows.dae_window', 'DAEComparisonWindow')
+BatchPlotWindow = lazy_attr('src.ui.windows.batch_plot_window', 'BatchPlotWindow')
+NMFStudyWindow = lazy_attr('src.ui.windows.nmf_study_window', 'NMFStudyWindow')
+RamanMapWindow = lazy_attr('src.ui.windows.raman_map_window', 'RamanMapWindow')
+PerformancePanel = lazy_attr('src.ui.windows.performance_panel', 'PerformancePanel')
 from src.ui.windows.function_windows import FunctionWindow
 from src.ui.panels.nmf_panel import NMFPanelMixin
 from src.ui.panels.cos_panel import COSPanelMixin
@@ -84,7 +96,7 @@ from src.ui.panels.classify_panel import ClassifyPanelMixin
 from src.ui.panels.publication_style_panel import PublicationStylePanel
 from src.ui.panels.spectrum_scan_panel import SpectrumScanPanel
 from src.ui.panels.peak_matching_panel import PeakMatchingPanel
-from src.ui.windows.style_matching_window import StyleMatchingWindow
+StyleMatchingWindow = lazy_attr('src.ui.windows.style_matching_window', 'StyleMatchingWindow')
 # 导入新的 Tab 组件和工具类
 from src.ui.tabs import PlottingSettingsTab, FileControlsTab, PeakDetectionTab, PhysicsTab
 from src.ui.utils.config_binder import ConfigBinder
@@ -108,17 +120,26 @@ try:
 except ImportError:
     SyntheticDataGenerator = None
 
-try:
-    from src.core.transformers import TORCH_AVAILABLE, AutoencoderTransformer
-except ImportError:
-    TORCH_AVAILABLE = False
-    AutoencoderTransformer = None
+# 只检查 torch 是否已安装，不导入（导入 torch 需要数秒）
+TORCH_AVAILABLE = util.find_spec('torch') is not None
 
 try:
     from scipy.optimize import curve_fit
 except ImportError:
     curve_fit = None
 
+
+class _AutoSaveNotifier(QObject):
+    """后台自动保存完成通知：信号跨线程发出，槽函数在 UI 线程执行"""
+    finished = pyqtSignal(str, bool, bool, int)  # (文件路径, 是否成功, 是否新文件, 快照时的更改计数)
+
+
+class _PeakFitNotifier(QObject):
+    """后台批量峰拟合通知：信号跨线程发出，槽函数在 UI 线程执行"""
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object, str, str)  # (整洁表的行或 None, 文件夹, 错误信息)
+
+
 class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMixin):
     def __init__(self):
         import sys
@@ -179,6 +200,11 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
         self.current_project_path = None  # 当前项目路径
         self.project_unsaved_changes = False  # 是否有未保存的更改
         self.auto_save_timer = None  # 自动保存定时器
+        self._auto_save_future = None  # 正在进行的后台自动保存
+        self._project_change_seq = 0  # 更改计数，用于判断后台保存期间是否又有新更改
+        self._auto_save_notifier = None  # 后台自动保存完成通知（延迟创建）
+        self._peak_fit_notifier = None  # 后台批量峰拟合通知（延迟创建）
+        self._peak_fit_handle = None
 
         # 数据增强与光谱匹配相关
         self.library_matcher = None  # 存储 SpectralMatcher 实例
@@ -191,6 +217,13 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
         # 绘图与功能窗口管理
         self.plot_windows = {}          # 所有绘图窗口
         self.nmf_window = None          # NMF 结果窗口
+        self.nmf_study_window = None    # NMF 多种子/组分数扫描窗口
+        self.raman_map_window = None    # 拉曼面扫窗口
+        self.performance_panel = None   # 性能面板
+        self._nmf_study_input = None    # 最近一次 NMF 的预处理输入（供扫描复用）
+        self.last_nmf_model = None      # 最近一次标准 NMF 的拟合空间 W/H（热启动/小批量更新用，随项目保存）
+        self.nmf_regression_solver = WarmStartNNLS()  # 组分回归的批量 NNLS（按样本名热启动）
+        self._nmf_minibatch_updater = None
         # 存储当前激活的绘图窗口引用，用于叠加分析
         self.active_plot_window = None
         # 功能配置窗口缓存，避免重复创建
@@ -242,6 +275,7 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
     def _mark_project_changed(self):
         """标记项目有未保存的更改"""
         self.project_unsaved_changes = True
+        self._project_change_seq += 1
         # 更新窗口标题和项目名称栏显示未保存标记
         if self.current_project_path:
             base_title = "光谱数据处理工作站（GTzhou组 - Pro版）"
@@ -1475,9 +1509,17 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
             raise ValueError("多段截断范围内无数据，请检查输入。")
         return x[mask], y[mask]
 
-    def read_data(self, file_path, skip_rows, x_min_phys=None, x_max_phys=None):
-        """委托 DataController 读取光谱数据，并根据 UI 进行多段截断。"""
+    def read_data(self, file_path, skip_rows, x_min_phys=None, x_max_phys=None, segments_text=None):
+        """
+        委托 DataController 读取光谱数据，并根据 UI 进行多段截断。
+
+        segments_text 为多段截断文本的快照（None 表示读取界面输入框）；
+        在工作线程中读取时应传入快照，避免跨线程访问控件。
+        """
         import numpy as np
+        if segments_text is None:
+            segments_text = self.x_segments_input.text() if getattr(self, "x_segments_input", None) is not None else ""
+        segments_text = segments_text.strip()
         # 检查文件缓存
         if hasattr(self, 'plot_data_cache'):
             cached_data = self.plot_data_cache.get_file_data(file_path)
@@ -1493,11 +1535,9 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
                     x = x[mask]
                     y = y[mask]
                 # 应用多段截断
-                if hasattr(self, "x_segments_input") and self.x_segments_input is not None:
-                    text = self.x_segments_input.text().strip()
-                    if text:
-                        segments = self._parse_segment_ranges(text)
-                        x, y = self._apply_segment_ranges(x, y, segments)
+                if segments_text:
+                    segments = self._parse_segment_ranges(segments_text)
+                    x, y = self._apply_segment_ranges(x, y, segments)
                 return x, y
         
         # 如果skip_rows为-1，使用缓存的检测结果或自动检测
@@ -1527,11 +1567,9 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
         x, y = self.data_controller.read_data(file_path, skip_rows, x_min_phys, x_max_phys)
         
         # 如果存在多段截断输入，则进一步裁剪
-        if hasattr(self, "x_segments_input") and self.x_segments_input is not None:
-            text = self.x_segments_input.text().strip()
-            if text:
-                segments = self._parse_segment_ranges(text)
-                x, y = self._apply_segment_ranges(x, y, segments)
+        if segments_text:
+            segments = self._parse_segment_ranges(segments_text)
+            x, y = self._apply_segment_ranges(x, y, segments)
         
         # 缓存最终数据（应用所有截断后）- 使用numpy数组
         if hasattr(self, 'plot_data_cache'):
@@ -1861,6 +1899,12 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
         self.btn_rerun_nmf_plot.setToolTip("使用当前设置重新绘制NMF图，不重新运行NMF分析")
         right_buttons_layout.addWidget(self.btn_rerun_nmf_plot)
         
+        self.btn_nmf_study = QPushButton("🎲 NMF 多种子/组分数扫描")
+        self.btn_nmf_study.setStyleSheet("font-size: 12pt; padding: 10px;")
+        self.btn_nmf_study.clicked.connect(self.open_nmf_study_window)
+        self.btn_nmf_study.setToolTip("基于最近一次NMF的预处理数据，并行拟合多个随机种子和组分数，比较误差与稳定性")
+        right_buttons_layout.addWidget(self.btn_nmf_study)
+        
         # 其他功能按钮
         self.btn_batch_plot = QPushButton("📸 光谱+镜下图绘制")
         self.btn_batch_plot.setStyleSheet("font-size: 12pt; padding: 10px;")
@@ -2191,6 +2235,8 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
                 self.physics_tab.btn_run_fit.clicked.connect(self.run_scattering_fit_overlay)
             if hasattr(self.physics_tab, 'btn_clear_fits'):
                 self.physics_tab.btn_clear_fits.clicked.connect(self.clear_all_fit_curves)
+            if hasattr(self.physics_tab, 'btn_fit_folder'):
+                self.physics_tab.btn_fit_folder.clicked.connect(self.run_peak_fit_folder)
             # 为了兼容性，将 Tab 中的控件也添加到主窗口（通过属性访问）
             for attr_name, widget in self.physics_tab.get_widgets_dict().items():
                 setattr(self, attr_name, widget)
@@ -2238,14 +2284,8 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
                 'peak_wlen': self.peak_wlen_spin.value() if hasattr(self, 'peak_wlen_spin') else None,
                 'peak_rel_height': self.peak_rel_height_spin.value() if hasattr(self, 'peak_rel_height_spin') else None,
             }
-            # 更新峰值检测参数并重新检测峰值
-            for name, spectrum in self.rruff_loader.library_spectra.items():
-                if 'y_raw' in spectrum:
-                    spectrum['peaks'] = self.rruff_loader._detect_peaks(
-                        spectrum['x'], spectrum['y'], 
-                        peak_detection_params=peak_detection_params
-                    )
-            self.rruff_loader.peak_detection_params = peak_detection_params
+            # 更新峰值检测参数并重新检测峰值（并行，按参数缓存）
+            self.rruff_loader.update_preprocessing(self.rruff_loader.preprocess_params, peak_detection_params)
             
             n_rruff = len(self.rruff_loader.library_spectra)
             
@@ -3957,6 +3997,80 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
             # 标准NMF模式
             self.run_nmf_analysis()
 
+    def _fit_standard_nmf(self, X, sample_labels, nmf_components, nmf_init, max_iter, tol):
+        """
+        标准 NMF 拟合，按“增量模式”选项：
+        - 冷启动：NMF(init=nmf_init) 从头拟合
+        - 热启动：沿用上一次的 W/H（随项目保存），新增样本先投影到旧 H，再少量迭代
+        - 小批量：MiniBatchNMF 只用新增样本更新 H，W 由批量 NNLS 求解
+        上一次的模型与当前组分数/特征数不一致时自动退回冷启动。
+        """
+        mode = self.nmf_incremental_combo.currentIndex() if hasattr(self, 'nmf_incremental_combo') else 0
+        previous = self.last_nmf_model
+        compatible = incremental_nmf.is_compatible(previous, nmf_components, X.shape[1])
+        
+        if mode == 1 and compatible:
+            W, H, info = incremental_nmf.warm_start_nmf(X, sample_labels, previous, max_iter=max_iter, tol=tol)
+        elif mode == 2:
+            W, H, self._nmf_minibatch_updater, info = incremental_nmf.minibatch_nmf(
+                X, sample_labels, nmf_components, previous=previous if compatible else None,
+                updater=self._nmf_minibatch_updater, tol=tol)
+        else:
+            model = NMF(n_components=nmf_components, init=nmf_init, random_state=42, max_iter=max_iter, tol=tol)
+            W = model.fit_transform(X)
+            H = model.components_
+            info = {'mode': 'cold', 'n_new': X.shape[0], 'n_known': 0, 'n_iter': int(model.n_iter_),
+                    'reconstruction_err': float(model.reconstruction_err_)}
+        print(f"[NMF] 模式={info['mode']}, 新增样本={info['n_new']}, 沿用样本={info['n_known']}, "
+              f"迭代={info['n_iter']}, 重构误差={info['reconstruction_err']:.6g}")
+        
+        # 保存拟合空间（加权后）的 W/H，供下次热启动/小批量更新（随项目保存）
+        self.last_nmf_model = {'W': W, 'H': np.array(H, copy=True), 'sample_labels': list(sample_labels)}
+        return W, H
+    
+    def open_raman_map_window(self):
+        """打开拉曼面扫（高光谱）窗口"""
+        if getattr(self, 'raman_map_window', None) is None:
+            self.raman_map_window = RamanMapWindow(self)
+        self.raman_map_window.show()
+        self.raman_map_window.raise_()
+    
+    def open_nmf_study_window(self):
+        """打开 NMF 多种子/组分数扫描窗口"""
+        if getattr(self, 'nmf_study_window', None) is None:
+            self.nmf_study_window = NMFStudyWindow(self)
+        self.nmf_study_window.refresh_input_info()
+        self.nmf_study_window.show()
+        self.nmf_study_window.raise_()
+    
+    def apply_nmf_study_result(self, W, H):
+        """把扫描中选出的模型作为标准 NMF 结果应用（不重新预处理/拟合）"""
+        study_input = getattr(self, '_nmf_study_input', None)
+        if study_input is None:
+            return
+        H_fit = H
+        region_weights = study_input['region_weights']
+        if region_weights is not None:
+            # H 在加权空间中，除以权重恢复物理形状
+            H = H / region_weights[np.newaxis, :]
+            H[H < 0] = 0
+        common_x = study_input['common_x']
+        
+        self.last_pca_model = None
+        self.last_fixed_H = H.copy()
+        self.last_fixed_H_original = H.copy()
+        self.last_common_x = common_x.copy()
+        self.last_nmf_model = {'W': W, 'H': np.array(H_fit, copy=True), 'sample_labels': list(study_input['sample_labels'])}
+        self._create_nmf_component_controls(H.shape[0], preserve_values=True)
+        
+        if getattr(self, 'nmf_window', None) is not None:
+            self.nmf_window.set_data(W, H, common_x, self.nmf_window.style_params, study_input['sample_labels'])
+            self.nmf_window.show()
+            self.nmf_window.raise_()
+        else:
+            QMessageBox.information(self, "提示", "模型已应用为组分回归的固定H矩阵；NMF结果窗口尚未打开，请重新运行NMF以绘图。")
+        self._mark_project_changed()
+    
     def _run_nmf_regression_mode_legacy(self):
         """
         组分回归模式的完整流程：收集文件、调用run_nmf_regression、显示结果
@@ -4275,6 +4389,7 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
             QMessageBox.critical(self, "NMF-CR Error", f"非负组分回归运行失败: {str(e)}")
             traceback.print_exc()
 
+    @profiler.timed('nmf.analysis')
     def _run_nmf_analysis_legacy(self):
         import numpy as np  # 确保在方法内部导入
         try:
@@ -4582,6 +4697,19 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
             # 获取收敛容差（如果存在，否则使用默认值）
             tol = self.nmf_tol.value() if hasattr(self, 'nmf_tol') else 1e-4
             
+            # 缓存预处理后的 NMF 输入矩阵，供多种子/组分数扫描复用（无需重新预处理）
+            self._nmf_study_input = {
+                'X': X,
+                'common_x': common_x,
+                'sample_labels': list(sample_labels),
+                'region_weights': region_weights,
+                'max_iter': max_iter,
+                'tol': tol,
+                'prefiltered': pca_filter_enabled,
+            }
+            if getattr(self, 'nmf_study_window', None) is not None:
+                self.nmf_study_window.refresh_input_info()
+            
             # 检查成分数合法性
             if pca_filter_enabled and filter_components < nmf_components:
                 QMessageBox.warning(self, "警告", "预滤波成分数必须大于或等于 NMF 组件数。请检查输入。")
@@ -4647,7 +4775,14 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
                     ])
                 
                 # 训练 Pipeline（在加权数据上）
-                W = pipeline.fit_transform(X)
+                # 自编码器预滤波经模型注册表训练：相同数据 + 超参数 + 代码版本时直接加载已训练的模型
+                with profiler.span('nmf.fit', filter=filter_algorithm, k=nmf_components):
+                    if 'Autoencoder' in filter_algorithm:
+                        ae_filter, _ = model_registry.fit(pipeline.named_steps['filter'], X)
+                        pipeline.steps[0] = ('filter', ae_filter)
+                        W = pipeline[1:].fit_transform(ae_filter.transform(X))
+                    else:
+                        W = pipeline.fit_transform(X)
                 H_filtered = pipeline.named_steps['nmf'].components_  # 在预滤波空间中的 H (用于回归)
                 
                 # Deep Autoencoder 可视化（如果使用）
@@ -4766,9 +4901,7 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
                 self.last_common_x = common_x.copy()
             else:
                 # 标准 NMF (不启用预滤波)
-                model = NMF(n_components=nmf_components, init=nmf_init, random_state=42, max_iter=max_iter, tol=tol)
-                W = model.fit_transform(X)
-                H = model.components_
+                W, H = self._fit_standard_nmf(X, sample_labels, nmf_components, nmf_init, max_iter, tol)
                 
                 # 如果使用了区域权重，恢复 H 的物理形状
                 if region_weights is not None:
@@ -5058,14 +5191,8 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
                         QMessageBox.warning(self, "NMF 警告", f"预滤波转换后的特征数 ({n_features_filtered}) 与固定H矩阵的特征数 ({fixed_H.shape[1]}) 不匹配。请确保使用相同的预滤波设置。")
                         return None, None, None, None
                     
-                    # NMF 回归现在在预滤波空间中进行
-                    W = np.zeros((n_samples, n_components))
-                    H_T = fixed_H.T  # (n_features_filtered, n_components)
-                    
-                    for i in range(n_samples):
-                        x_i_filtered = X_target[i, :]  # 在预滤波空间中的行向量
-                        w_i_T, _ = nnls(H_T, x_i_filtered)
-                        W[i, :] = w_i_T
+                    # NMF 回归现在在预滤波空间中进行（批量 NNLS，所有样本一次求解）
+                    W = self.nmf_regression_solver.solve(fixed_H, X_target, sample_labels)
                         
                 except Exception as e:
                     QMessageBox.critical(self, "回归错误", f"预滤波转换或 NNLS 求解失败: {e}")
@@ -5078,16 +5205,8 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
                 n_components = fixed_H.shape[0]
                 
                 # 使用非负最小二乘求解 W
-                # 对于每条光谱 x_i（行向量），求解 H^T * w_i^T ≈ x_i^T
-                # 即求解 w_i^T = nnls(H^T, x_i^T)[0]
-                W = np.zeros((n_samples, n_components))
-                H_T = fixed_H.T  # (n_features, n_components)
-                
-                for i in range(n_samples):
-                    x_i = X_target[i, :]  # 第i条光谱 (n_features,)
-                    # 求解 H^T * w_i^T ≈ x_i^T，即 w_i^T = nnls(H^T, x_i^T)[0]
-                    w_i_T, _ = nnls(H_T, x_i)
-                    W[i, :] = w_i_T  # w_i^T 已经是列向量，直接赋值
+                # 对于每条光谱 x_i（行向量），求解 H^T * w_i^T ≈ x_i^T（批量 NNLS，所有样本一次求解）
+                W = self.nmf_regression_solver.solve(fixed_H, X_target, sample_labels)
             
             return W, fixed_H, common_x, sample_labels
             
@@ -5124,17 +5243,14 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
             QMessageBox.warning(self, "警告", f"已达到最大拟合曲线数量 ({max_fit_count})。请先清除部分拟合曲线或增加最大数量。")
             return
             
-        # 1. 定义散射拟合模型
-        def lorentzian(x, A, x0, gamma):
-            return A * (gamma**2 / ((x - x0)**2 + gamma**2))
-
-        def gaussian(x, A, x0, sigma):
-            return A * np.exp(-((x - x0)**2) / (2 * sigma**2))
+        # 1. 散射拟合模型（多峰引擎：解析 Jacobian，见 src/core/peak_fitting.py）
+        from src.core import peak_fitting
 
         try:
             cutoff = self.fit_cutoff_spin.value()
             model_name = self.fit_model_combo.currentText()
-            model_func = lorentzian if model_name == 'Lorentzian' else gaussian
+            n_peaks = self.fit_n_peaks_spin.value() if hasattr(self, 'fit_n_peaks_spin') else 1
+            baseline = self._fit_baseline_mode()
             
             # 2. 选择第一个有效的个体光谱进行拟合
             data_key = next((k for k, v in plot_data.items() if v['type'] in ['Individual', 'Mean']), None)
@@ -5161,21 +5277,20 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
             y_fit_zeroed = y_fit - min_y_fit 
             y_fit_zeroed[y_fit_zeroed < 0] = 0 # 保证非负
             
-            # 初始参数猜测 (基于零基线数据)
-            A_guess = np.max(y_fit_zeroed)
-            x0_guess = x_fit[np.argmax(y_fit_zeroed)]
-            gamma_sigma_guess = 10 
-            
-            p0 = [A_guess, x0_guess, gamma_sigma_guess]
-            bounds = ([0, x_fit.min(), 0], [np.inf, x_fit.max(), np.inf])
-            
-            popt, pcov = curve_fit(model_func, x_fit, y_fit_zeroed, p0=p0, bounds=bounds)
+            # 初始参数：峰值检测（PeakMatcher）给出，不足时在残差最大处补峰
+            initial = peak_fitting.initial_peaks(x_fit, y_fit_zeroed, n_peaks=n_peaks, profile=model_name)
+            result = peak_fitting.fit_spectrum(x_fit, y_fit_zeroed, initial, profile=model_name, baseline=baseline)
+            popt = result['peaks']
             
             # 3. 报告结果
-            if model_name == 'Lorentzian':
-                params_str = f"A={popt[0]:.2f}, x0={popt[1]:.2f}, $\\gamma$={popt[2]:.2f}"
-            else:
-                params_str = f"A={popt[0]:.2f}, x0={popt[1]:.2f}, $\\sigma$={popt[2]:.2f}"
+            peak_lines = []
+            for k, (pk, err, area) in enumerate(zip(result['peaks'], result['errors'], result['areas']), 1):
+                line = (f"峰{k}: A={pk[0]:.2f}, x0={pk[1]:.2f}±{err[1]:.2f}, "
+                        f"FWHM={pk[2]:.2f}±{err[2]:.2f}, 面积={area:.2f}")
+                if model_name == 'Voigt':
+                    line += f", η={pk[3]:.2f}"
+                peak_lines.append(line)
+            params_str = "\n".join(peak_lines) + f"\nR²={result['r2']:.4f}"
             
             fit_index = current_fit_count + 1
             self.fit_output_text.append(f"✅ 拟合曲线 #{fit_index}: {data_key} ({model_name} 拟合)\n参数: {params_str}\n---")
@@ -5201,7 +5316,7 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
                 legend_label = f"Fit #{fit_index}: {data_key}"
             
             # 5. 计算拟合曲线 Y 值并绘制
-            y_fit_curve = model_func(x_fit, *popt)
+            y_fit_curve = result['fitted']
             y_fit_final = y_fit_curve + min_y_fit
             
             # 准备绘图参数
@@ -5287,6 +5402,85 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
             QMessageBox.critical(self, "拟合错误", f"拟合失败: {str(e)}")
             traceback.print_exc()
     
+    def _fit_baseline_mode(self):
+        """物理验证 Tab 中的基线选项转为 peak_fitting 的基线名称"""
+        text = self.fit_baseline_combo.currentText() if hasattr(self, 'fit_baseline_combo') else '无'
+        return {'无': 'none', '常数': 'constant', '线性': 'linear'}.get(text, 'none')
+    
+    def run_peak_fit_folder(self):
+        """批量拟合当前文件夹的全部光谱（后台并行，块内以相邻光谱的解热启动），结果导出为 CSV"""
+        if self._peak_fit_handle is not None:
+            QMessageBox.information(self, "提示", "批量拟合正在进行中。")
+            return
+        folder = self.folder_input.text()
+        if not folder or not os.path.isdir(folder):
+            QMessageBox.warning(self, "警告", "请先选择有效的数据文件夹。")
+            return
+        files = sorted(glob.glob(os.path.join(folder, '*.csv')) + glob.glob(os.path.join(folder, '*.txt')),
+                       key=lambda f: natural_sort_key(os.path.basename(f)))
+        if not files:
+            QMessageBox.warning(self, "警告", "文件夹中没有 .csv / .txt 光谱文件。")
+            return
+        
+        from src.core import peak_fitting
+        from src.services.task_runner import runner
+        
+        model_name = self.fit_model_combo.currentText()
+        n_peaks = self.fit_n_peaks_spin.value()
+        baseline = self._fit_baseline_mode()
+        skip_rows = self.skip_rows_spin.value() if hasattr(self, 'skip_rows_spin') else -1
+        x_min = self._parse_optional_float(self.x_min_phys_input.text()) if hasattr(self, 'x_min_phys_input') else None
+        x_max = self.fit_cutoff_spin.value()
+        
+        if self._peak_fit_notifier is None:
+            self._peak_fit_notifier = _PeakFitNotifier(self)
+            self._peak_fit_notifier.progress.connect(
+                lambda done, total, msg: self.fit_output_text.append(f"批量拟合进度 {done}/{total}（{msg}）"))
+            self._peak_fit_notifier.finished.connect(self._on_peak_fit_folder_finished)
+        notifier = self._peak_fit_notifier
+        
+        def _run(context):
+            try:
+                rows = peak_fitting.fit_folder(
+                    files, n_peaks=n_peaks, profile=model_name, baseline=baseline,
+                    skip_rows=skip_rows, x_min=x_min, x_max=x_max, token=context.token,
+                    on_progress=lambda done, total, msg: notifier.progress.emit(done, total, msg))
+                notifier.finished.emit(rows, folder, "")
+            except Exception as e:
+                if not context.cancelled:
+                    traceback.print_exc()
+                notifier.finished.emit(None, folder, "已取消" if context.cancelled else str(e))
+        
+        self._peak_fit_handle = runner.submit_task(_run, name="批量峰拟合", category='analysis', with_context=True)
+        self.fit_output_text.append(f"开始批量拟合 {len(files)} 个文件（{model_name}，{n_peaks} 个峰）...")
+    
+    def _on_peak_fit_folder_finished(self, rows, folder, error):
+        """批量拟合完成（UI 线程）：导出整洁表并报告各峰位置范围"""
+        self._peak_fit_handle = None
+        if rows is None:
+            self.fit_output_text.append(f"❌ 批量拟合失败: {error}\n---")
+            return
+        from src.core import peak_fitting
+        
+        table = peak_fitting.results_table(rows)
+        out_path = os.path.join(folder, f"peak_fit_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        try:
+            table.to_csv(out_path, index=False, encoding='utf-8-sig')
+        except Exception as e:
+            print(f"保存批量拟合结果失败: {e}")
+            out_path = None
+        n_spectra = table['spectrum'].nunique()
+        n_failed = table.loc[~table['success'].astype(bool), 'spectrum'].nunique()
+        lines = [f"✅ 批量拟合完成：{n_spectra} 条光谱（失败 {n_failed} 条）"]
+        for peak, group in table.groupby('peak'):
+            centers = group['center'].dropna()
+            if len(centers):
+                lines.append(f"峰{peak}: 位置 {centers.min():.2f} ~ {centers.max():.2f}，"
+                             f"平均 FWHM {group['fwhm'].mean():.2f}")
+        if out_path:
+            lines.append(f"结果表: {out_path}")
+        self.fit_output_text.append("\n".join(lines) + "\n---")
+    
     def clear_all_fit_curves(self):
         """清除所有拟合曲线"""
         if self.active_plot_window is None or not self.active_plot_window.isVisible():
@@ -5388,51 +5582,57 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
             # 获取重命名映射（在循环外计算一次，使用安全方法）
             rename_map = self._safe_get_legend_rename_map()
             
-            # 4. 循环处理每一组
+            # 4. 流式计算各组平均值和标准差（按组/块并行；结果按文件签名与参数缓存，仅改样式的重绘直接复用）
+            settings = {
+                'skip': skip, 'x_min_phys': x_min_phys, 'x_max_phys': x_max_phys,
+                'segments': self.x_segments_input.text() if getattr(self, 'x_segments_input', None) is not None else '',
+                'qc': self.qc_check.isChecked(), 'qc_threshold': self.qc_threshold_spin.value(),
+                'be': self.be_check.isChecked(), 'be_temp': self.be_temp_spin.value(),
+                'smoothing': self.smoothing_check.isChecked(),
+                'smoothing_window': self.smoothing_window_spin.value(),
+                'smoothing_poly': self.smoothing_poly_spin.value(),
+                'als': self.baseline_als_check.isChecked(), 'lam': self.lam_spin.value(), 'p': self.p_spin.value(),
+                'normalization': self.normalization_combo.currentText(),
+            }
+
+            def load_spectrum(path):
+                # 在工作线程中执行：只使用上面的参数快照，不访问控件
+                x, y = self.read_data(path, settings['skip'], settings['x_min_phys'], settings['x_max_phys'],
+                                      segments_text=settings['segments'])
+                # --- 预处理流程 (复用配置) ---
+                # A. QC
+                if settings['qc'] and np.max(y) < settings['qc_threshold']:
+                    return x, None
+                # B. BE 校正
+                if settings['be']:
+                    y = DataPreProcessor.apply_bose_einstein_correction(x, y, settings['be_temp'])
+                # C. 平滑
+                if settings['smoothing']:
+                    y = DataPreProcessor.apply_smoothing(y, settings['smoothing_window'], settings['smoothing_poly'])
+                # D. 基线 (AsLS优先)
+                if settings['als']:
+                    b = DataPreProcessor.apply_baseline_als(y, settings['lam'], settings['p'])
+                    y = y - b
+                    y[y < 0] = 0
+                # E. 归一化 (SNV推荐)
+                if settings['normalization'] == 'snv':
+                    y = DataPreProcessor.apply_snv(y)
+                elif settings['normalization'] == 'max':
+                    y = DataPreProcessor.apply_normalization(y, 'max')
+                return x, y
+
+            group_stats, _ = compute_group_stats({g: groups[g] for g in sorted_keys}, load_spectrum,
+                                                 params_digest(settings), align='group', name="组平均瀑布图")
+
             for i, g_name in enumerate(sorted_keys):
                 g_files = groups[g_name]
-                y_list = []
-                common_x = None
+                stats = group_stats.get(g_name)
+                if stats is None: continue
                 
-                # 组内处理：收集所有有效光谱
-                for f in g_files:
-                    try:
-                        x, y = self.read_data(f, skip, x_min_phys, x_max_phys) # 使用物理截断
-                        if common_x is None: common_x = x
-                        
-                        # --- 预处理流程 (复用配置) ---
-                        # A. QC
-                        if self.qc_check.isChecked() and np.max(y) < self.qc_threshold_spin.value(): continue
-                        
-                        # B. BE 校正
-                        if self.be_check.isChecked(): 
-                            y = DataPreProcessor.apply_bose_einstein_correction(x, y, self.be_temp_spin.value())
-                            
-                        # C. 平滑
-                        if self.smoothing_check.isChecked():
-                            y = DataPreProcessor.apply_smoothing(y, self.smoothing_window_spin.value(), self.smoothing_poly_spin.value())
-                            
-                        # D. 基线 (AsLS优先)
-                        if self.baseline_als_check.isChecked():
-                            b = DataPreProcessor.apply_baseline_als(y, self.lam_spin.value(), self.p_spin.value())
-                            y = y - b
-                            y[y<0] = 0
-                        
-                        # E. 归一化 (SNV推荐)
-                        if self.normalization_combo.currentText() == 'snv':
-                            y = DataPreProcessor.apply_snv(y)
-                        elif self.normalization_combo.currentText() == 'max':
-                            y = DataPreProcessor.apply_normalization(y, 'max')
-                            
-                        y_list.append(y)
-                    except: pass
-                
-                if not y_list: continue
-                
-                # 5. 计算该组平均值和标准差
-                y_array = np.array(y_list)
-                y_avg = np.mean(y_array, axis=0)
-                y_std = np.std(y_array, axis=0)
+                # 5. 该组平均值和标准差
+                common_x = stats['x']
+                y_avg = stats['mean']
+                y_std = stats['std']
                 
                 # 6. 堆叠绘图
                 y_plot = y_avg * scale
@@ -5612,7 +5812,8 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
                             matched_result = peak_matcher.match_multiple_spectra(
                                 match_data,
                                 reference_index=pm.reference_index if pm.reference_index >= 0 else len(match_data) - 1,
-                                mode=pm.mode
+                                mode=pm.mode,
+                                detection_params=self._get_peak_detection_params()
                             )
                             
                             # 绘制匹配的峰值
@@ -5975,6 +6176,10 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
         cos_2d_action = tools_menu.addAction("📈 2D-COS分析")
         cos_2d_action.triggered.connect(self.run_2d_cos_analysis)
         
+        # 拉曼面扫（高光谱）
+        raman_map_action = tools_menu.addAction("🗺️ 拉曼面扫")
+        raman_map_action.triggered.connect(self.open_raman_map_window)
+        
         tools_menu.addSeparator()
         
         # 清除缓存
@@ -5992,6 +6197,19 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
         user_guide_action = help_menu.addAction("📖 使用说明")
         user_guide_action.triggered.connect(self.show_user_guide)
         
+        # 启动性能报告（导入耗时、后台预热状态）
+        startup_report_action = help_menu.addAction("⏱️ 启动性能报告")
+        startup_report_action.triggered.connect(self.show_startup_report)
+        
+        # 性能面板（各阶段耗时区间与计数器，可导出 Chrome Trace）
+        performance_panel_action = help_menu.addAction("📊 性能面板")
+        performance_panel_action.triggered.connect(self.show_performance_panel)
+        
+        self.profiling_action = help_menu.addAction("启用性能分析")
+        self.profiling_action.setCheckable(True)
+        self.profiling_action.setChecked(profiler.enabled)
+        self.profiling_action.toggled.connect(profiler.set_enabled)
+        
         help_menu.addSeparator()
         
         # 联系方式
@@ -6159,6 +6377,19 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
                 QMessageBox.critical(self, "错误", f"重置设置失败: {str(e)}")
     
     # === 帮助菜单相关方法 ===
+    def show_startup_report(self):
+        """显示启动性能报告"""
+        from src.ui.windows.startup_report_dialog import StartupReportDialog
+        StartupReportDialog(self).exec()
+    
+    def show_performance_panel(self):
+        """显示性能面板（非模态，定时刷新）"""
+        if self.performance_panel is None:
+            self.performance_panel = PerformancePanel(self, toggle_action=self.profiling_action)
+        self.performance_panel.show()
+        self.performance_panel.raise_()
+        self.performance_panel.activateWindow()
+    
     def show_user_guide(self):
         """显示使用说明"""
         from PyQt6.QtWidgets import QDialog, QVBoxLayout, QTextEdit, QPushButton
@@ -6396,25 +6627,62 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
             QMessageBox.information(self, "自动保存", "自动保存已禁用")
     
     def _auto_save_project(self):
-        """自动保存项目"""
+        """
+        自动保存项目（后台执行）
+        UI 线程只收集快照（仅持有数组引用），序列化与写盘在后台线程完成；
+        写入采用临时文件 + 原子替换，只重新编码有改动的部分。
+        """
+        if self._auto_save_future is not None and not self._auto_save_future.done():
+            print("[自动保存] 上一次自动保存尚未完成，跳过本次")
+            return
+        
         if self.current_project_path:
-            success = self.project_save_manager.save_project(self.current_project_path, self, note=None)
-            if success:
-                self._mark_project_saved()  # 更新窗口标题
-                print(f"[自动保存] 项目已自动保存: {self.current_project_path}")
-            else:
-                print(f"[自动保存] 自动保存失败: {self.current_project_path}")
+            file_path, note, is_new = self.current_project_path, None, False
         else:
             # 如果没有当前项目路径，尝试使用默认名称保存
             projects_dir = self.project_save_manager.projects_dir
             default_name = f"自动保存_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            default_path = str(projects_dir / default_name)
-            success = self.project_save_manager.save_project(default_path, self, note="自动保存")
-            if success:
-                self.current_project_path = default_path
-                self.project_unsaved_changes = False
-                self._mark_project_saved()  # 更新窗口标题
-                print(f"[自动保存] 项目已自动保存到新文件: {default_path}")
+            file_path, note, is_new = str(projects_dir / default_name), "自动保存", True
+        
+        try:
+            snapshot = self.project_save_manager.snapshot_project(self, note=note)
+        except Exception as e:
+            print(f"[自动保存] 收集项目数据失败: {e}")
+            traceback.print_exc()
+            return
+        
+        if self._auto_save_notifier is None:
+            self._auto_save_notifier = _AutoSaveNotifier(self)
+            self._auto_save_notifier.finished.connect(self._on_auto_save_finished)
+        
+        from src.services.task_runner import runner
+        notifier = self._auto_save_notifier
+        change_seq = self._project_change_seq
+        
+        def _save():
+            success = self.project_save_manager.save_snapshot(file_path, snapshot)
+            notifier.finished.emit(file_path, success, is_new, change_seq)
+        
+        self._auto_save_future = runner.submit_task(_save, name="自动保存", category='autosave').future
+    
+    def _on_auto_save_finished(self, file_path: str, success: bool, is_new: bool, change_seq: int):
+        """后台自动保存完成（UI 线程）"""
+        if not success:
+            print(f"[自动保存] 自动保存失败: {file_path}")
+            return
+        if is_new:
+            if self.current_project_path:
+                # 保存期间用户已另存/打开了其他项目，不覆盖当前项目路径
+                return
+            self.current_project_path = file_path
+        if change_seq == self._project_change_seq:
+            self._mark_project_saved()  # 更新窗口标题
+        else:
+            self._mark_project_changed()  # 保存期间又有新更改，保留未保存标记
+        if is_new:
+            print(f"[自动保存] 项目已自动保存到新文件: {file_path}")
+        else:
+            print(f"[自动保存] 项目已自动保存: {file_path}")
     
     # --- 核心：导出数据 (保留原功能) ---
     def export_processed_data(self):
@@ -7248,13 +7516,8 @@ class SpectraConfigDialog(QDialog, NMFPanelMixin, COSPanelMixin, ClassifyPanelMi
             }
             # 如果峰值检测参数已改变，重新检测RRUFF库的峰值
             if hasattr(self.rruff_loader, 'peak_detection_params') and self.rruff_loader.peak_detection_params != peak_detection_params:
-                for name, spectrum in self.rruff_loader.library_spectra.items():
-                    if 'y_raw' in spectrum:
-                        spectrum['peaks'] = self.rruff_loader._detect_peaks(
-                            spectrum['x'], spectrum['y'], 
-                            peak_detection_params=peak_detection_params
-                        )
-                self.rruff_loader.peak_detection_params = peak_detection_params
+                # 只重新检测峰值（并行，按参数缓存）
+                self.rruff_loader.update_preprocessing(self.rruff_loader.preprocess_params, peak_detection_params)
             
             # 匹配RRUFF光谱
             matches = self.rruff_peak_matcher.find_best_matches(
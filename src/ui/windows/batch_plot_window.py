@@ -32,6 +32,7 @@ from src.ui.canvas import MplCanvas
 from src.ui.controllers.data_controller import DataController
 from src.core.preprocessor import DataPreProcessor
 from matplotlib.backends.backend_qtagg import NavigationToolbar2QT as NavigationToolbar
+from src.services.task_runner import CancellationToken, TaskCancelled
 
 
 class BatchPlotWindow(QDialog):
@@ -282,6 +283,15 @@ class BatchPlotWindow(QDialog):
         )
         rruff_ref_lines_layout.addRow(self.rruff_filter_variants_check)
 
+        # 聚类检索：近似重复的库光谱归为一簇，先比较簇代表再展开得分高的簇
+        self.rruff_cluster_search_check = QCheckBox("聚类加速检索", checked=False)
+        self.rruff_cluster_search_check.setToolTip(
+            "把库中几乎相同的光谱（同一矿物的不同晶向/激光/raw 与 processed 版本）按相关系数聚为一簇，"
+            "匹配时先比较各簇代表，只展开得分高的簇。库很大时可明显加快单物相匹配。"
+        )
+        self.rruff_cluster_search_check.toggled.connect(self._on_rruff_cluster_search_changed)
+        rruff_ref_lines_layout.addRow(self.rruff_cluster_search_check)
+
         # 组合匹配显示模式
         self.rruff_combination_as_single_check = QCheckBox("组合匹配显示为整体光谱", checked=False)
         self.rruff_combination_as_single_check.setToolTip("勾选：组合匹配显示为一条组合光谱；取消：组合匹配的各个物相分别显示为独立谱线")
@@ -724,18 +734,13 @@ class BatchPlotWindow(QDialog):
                     progress.setValue(0)
                     QApplication.processEvents()
                     
-                    peak_count = 0
-                    for name, spectrum in self.rruff_loader.library_spectra.items():
-                        if 'y_raw' in spectrum:
-                            spectrum['peaks'] = self.rruff_loader._detect_peaks(
-                                spectrum['x'], spectrum['y'], 
-                                peak_detection_params=peak_detection_params
-                            )
-                        peak_count += 1
-                        progress.setValue(peak_count)
+                    def peak_progress(current, total, message):
+                        progress.setValue(current)
                         QApplication.processEvents()
                     
-                    self.rruff_loader.peak_detection_params = peak_detection_params
+                    self.rruff_loader.update_preprocessing(
+                        self.rruff_loader.preprocess_params, peak_detection_params,
+                        progress_callback=peak_progress)
                     
                     # 更新数据库（包含新的峰值检测参数）
                     if db_name:
@@ -1027,21 +1032,29 @@ class BatchPlotWindow(QDialog):
                     progress.setValue(0)
                 
                 # 定义进度回调
+                token = CancellationToken()
+                
                 def progress_callback(current, total, message):
                     if progress:
                         if progress.wasCanceled():
+                            token.cancel()
                             return
                         progress.setMaximum(total)
                         progress.setValue(current)
                         progress.setLabelText(message)
                         QApplication.processEvents()
                 
-                # 更新预处理参数（只在参数真正改变时才重新处理）
-                params_changed = self.rruff_loader.update_preprocessing(
-                    preprocess_params, 
-                    peak_detection_params,
-                    progress_callback=progress_callback if total_spectra > 50 else None
-                )
+                # 更新预处理参数（只在参数真正改变时才重新处理；取消时库和参数保持不变）
+                try:
+                    params_changed = self.rruff_loader.update_preprocessing(
+                        preprocess_params, 
+                        peak_detection_params,
+                        progress_callback=progress_callback if total_spectra > 50 else None,
+                        token=token
+                    )
+                except TaskCancelled:
+                    print("[RRUFF] 库光谱重新预处理已取消，保留原结果")
+                    params_changed = False
                 
                 # 关闭进度条
                 if progress:
@@ -1426,6 +1439,11 @@ class BatchPlotWindow(QDialog):
     def _on_rruff_tolerance_changed(self, value):
         """RRUFF匹配容差改变时更新匹配器"""
         self.peak_matcher.tolerance = value
+    
+    def _on_rruff_cluster_search_changed(self, checked):
+        """聚类加速检索开关（聚类结果由库加载器按需构建并缓存）"""
+        self.peak_matcher.use_clusters = checked
+        self._match_cache.clear()
 
     @staticmethod
     def _filter_combinations_by_variants(combinations):
@@ -1563,13 +1581,8 @@ class BatchPlotWindow(QDialog):
             }
             # 如果峰值检测参数已改变，重新检测RRUFF库的峰值
             if self.rruff_loader.peak_detection_params != peak_detection_params:
-                for name, spectrum in self.rruff_loader.library_spectra.items():
-                    if 'y_raw' in spectrum:
-                        spectrum['peaks'] = self.rruff_loader._detect_peaks(
-                            spectrum['x'], spectrum['y'], 
-                            peak_detection_params=peak_detection_params
-                        )
-                self.rruff_loader.peak_detection_params = peak_detection_params
+                # 只重新检测峰值（并行，按参数缓存）
+                self.rruff_loader.update_preprocessing(self.rruff_loader.preprocess_params, peak_detection_params)
             
             # 创建进度对话框（设置足够大的maximum值，避免255限制）
             total_spectra = len(self.rruff_loader.library_spectra)
@@ -1735,13 +1748,8 @@ class BatchPlotWindow(QDialog):
                 'peak_rel_height': plot_params.get('peak_rel_height', None),
             }
             if self.rruff_loader.peak_detection_params != peak_detection_params:
-                for name, spectrum in self.rruff_loader.library_spectra.items():
-                    if 'y_raw' in spectrum:
-                        spectrum['peaks'] = self.rruff_loader._detect_peaks(
-                            spectrum['x'], spectrum['y'], 
-                            peak_detection_params=peak_detection_params
-                        )
-                self.rruff_loader.peak_detection_params = peak_detection_params
+                # 只重新检测峰值（并行，按参数缓存）
+                self.rruff_loader.update_preprocessing(self.rruff_loader.preprocess_params, peak_detection_params)
             
             # 执行组合匹配
             tolerance = self.rruff_match_tolerance_spin.value()
@@ -1979,13 +1987,8 @@ class BatchPlotWindow(QDialog):
                 'peak_rel_height': plot_params.get('peak_rel_height', None),
             }
             if self.rruff_loader.peak_detection_params != peak_detection_params:
-                for name, spectrum in self.rruff_loader.library_spectra.items():
-                    if 'y_raw' in spectrum:
-                        spectrum['peaks'] = self.rruff_loader._detect_peaks(
-                            spectrum['x'], spectrum['y'], 
-                            peak_detection_params=peak_detection_params
-                        )
-                self.rruff_loader.peak_detection_params = peak_detection_params
+                # 只重新检测峰值（并行，按参数缓存）
+                self.rruff_loader.update_preprocessing(self.rruff_loader.preprocess_params, peak_detection_params)
             
             # 计算排除列表
             excluded_names = list(self.spectrum_exclusions.get(txt_basename, []))
@@ -2119,195 +2122,15 @@ class BatchPlotWindow(QDialog):
     
     def _detect_and_plot_peaks(self, ax, x_data, y_detect, y_final, plot_params, color='blue'):
         """
-        通用的波峰检测和绘制函数（使用统一的峰值检测辅助函数）
+        通用的波峰检测和绘制函数（使用统一的峰值检测辅助函数，检测结果经 peak_cache 缓存）
         x_data: X轴数据（波数）
         y_detect: 用于检测的Y数据（去除偏移）
         y_final: 用于绘制的Y数据（包含偏移）
         plot_params: 绘图参数字典
         color: 线条颜色（用于标记颜色默认值）
         """
-        # 使用统一的峰值检测辅助函数
-        try:
-            from src.core.peak_detection_helper import detect_and_plot_peaks as unified_detect_and_plot_peaks
-            unified_detect_and_plot_peaks(ax, x_data, y_detect, y_final, plot_params, color)
-        except ImportError:
-            # 如果导入失败，使用原有的逻辑（向后兼容）
-            if not plot_params.get('peak_detection_enabled', False):
-                return
-        
-        # 计算数据的统计信息，用于智能调整参数
-        y_max = np.max(y_detect)
-        y_min = np.min(y_detect)
-        y_range = y_max - y_min
-        y_mean = np.mean(y_detect)
-        y_std = np.std(y_detect)
-        
-        # 构建find_peaks的参数
-        peak_kwargs = {}
-        
-        # 基础参数（智能调整：如果用户设置的height为0，使用相对值；否则使用用户设置的值）
-        peak_height = plot_params.get('peak_height_threshold', 0.0)
-        # 如果height为0，使用相对值（数据最大值的0.01%，极低阈值以检测所有小峰）
-        if peak_height == 0:
-            if y_max > 0:
-                peak_height = y_max * 0.0001  # 进一步降低到0.01%以检测所有小峰
-            else:
-                peak_height = abs(y_mean) + y_std * 0.05  # 如果最大值<=0，使用均值+0.05倍标准差
-        # 如果用户设置了height，直接使用（不再强制降低，允许用户设置极小的值，甚至负数）
-        # 只有当height明显不合理（大于数据范围）时才调整
-        if peak_height > y_range * 2 and y_range > 0:
-            peak_height = y_max * 0.0001  # 只有在明显不合理时才调整到0.01%
-        # 允许任何值（包括极小的正负值），甚至可以为负（检测负峰）
-        # 始终添加height参数（即使是负数），让find_peaks使用它
-        peak_kwargs['height'] = peak_height
-        
-        peak_distance = plot_params.get('peak_distance_min', 10)
-        # 如果distance为0，使用数据点数的0.1%（极低阈值以检测所有峰值）
-        if peak_distance == 0:
-            peak_distance = max(1, int(len(y_detect) * 0.001))  # 降低到0.1%，最小为1
-        # 如果用户设置了distance，直接使用（允许设置为1以检测所有峰值）
-        # 只有当distance明显不合理（大于数据长度的一半）时才调整
-        if peak_distance > len(y_detect) * 0.5:
-            peak_distance = max(1, int(len(y_detect) * 0.001))  # 只有在明显不合理时才调整
-        # 确保distance至少为1（find_peaks的要求）
-        peak_distance = max(1, peak_distance)
-        # 如果用户设置了极小的height（包括负数），完全移除distance限制以检测所有峰值
-        # 或者如果distance=1，也尝试不使用distance
-        use_distance = True
-        if 'height' in peak_kwargs:
-            height_val = peak_kwargs['height']
-            # 如果height是负数或极小值（小于数据最大值的0.1%），不使用distance
-            if height_val < 0 or (y_max > 0 and height_val < y_max * 0.001):
-                use_distance = False
-            # 或者如果distance=1，也不使用distance
-            elif peak_distance == 1:
-                use_distance = False
-        
-        if use_distance:
-            peak_kwargs['distance'] = peak_distance
-        
-        # 添加可选参数（如果设置了且不为0）
-        peak_prominence = plot_params.get('peak_prominence', None)
-        if peak_prominence is not None and peak_prominence != 0:
-            # 如果prominence为0或未设置，不使用此参数（允许检测更多峰值）
-            # 如果用户设置了prominence，直接使用（允许设置为极小的值）
-            # 只有当prominence明显不合理（大于数据范围）时才调整
-            if peak_prominence > y_range * 2 and y_range > 0:
-                peak_prominence = y_range * 0.001  # 只有在明显不合理时才调整到0.1%
-            peak_kwargs['prominence'] = peak_prominence
-        
-        # width、wlen、rel_height 只有在明确设置且大于0时才使用
-        # 如果为0或未设置，不使用这些参数（避免过滤掉峰值）
-        peak_width = plot_params.get('peak_width', None)
-        if peak_width is not None and peak_width > 0:
-            peak_kwargs['width'] = peak_width
-        
-        peak_wlen = plot_params.get('peak_wlen', None)
-        if peak_wlen is not None and peak_wlen > 0:
-            # 如果wlen太大，限制为数据长度的一半
-            if peak_wlen > len(y_detect) * 0.5:
-                peak_wlen = max(1, int(len(y_detect) * 0.3))
-            peak_kwargs['wlen'] = peak_wlen
-        
-        peak_rel_height = plot_params.get('peak_rel_height', None)
-        if peak_rel_height is not None and peak_rel_height > 0:
-            peak_kwargs['rel_height'] = peak_rel_height
-        
-        try:
-            # 确保至少有一个参数
-            if len(peak_kwargs) == 0:
-                # 如果没有参数，使用基于数据统计的智能默认值（极低阈值以检测所有小峰）
-                # 只使用height，不使用distance，以检测所有峰值（包括相邻的）
-                if y_max > 0:
-                    peak_kwargs = {
-                        'height': y_max * 0.0001  # 降低到0.01%
-                    }
-                else:
-                    peak_kwargs = {
-                        'height': abs(y_mean) + y_std * 0.05
-                    }
-            
-            # 如果height是负数或极小值，尝试不使用任何限制参数，只使用height
-            # 这样可以检测到所有峰值，包括噪音峰
-            if 'height' in peak_kwargs:
-                height_val = peak_kwargs['height']
-                # 如果height是负数或极小值（小于数据最大值的0.1%），完全移除所有限制
-                if height_val < 0 or (y_max > 0 and height_val < y_max * 0.001):
-                    # 移除distance、prominence等限制参数，只保留height
-                    filtered_kwargs = {'height': height_val}
-                    # 如果width、wlen、rel_height被设置，也移除它们（避免过滤噪音峰）
-                    for key in ['width', 'wlen', 'rel_height']:
-                        if key in peak_kwargs:
-                            # 只有在用户明确设置且>0时才保留
-                            if peak_kwargs[key] > 0:
-                                filtered_kwargs[key] = peak_kwargs[key]
-                    peak_kwargs = filtered_kwargs
-                # 如果height非常小（接近0），尝试完全不使用任何参数（检测所有局部最大值）
-                elif height_val < y_max * 0.00001 and y_max > 0:
-                    # 尝试不使用任何参数，让find_peaks检测所有局部最大值
-                    try:
-                        peaks_all, _ = find_peaks(y_detect)
-                        if len(peaks_all) > 0:
-                            peak_kwargs = {}  # 空参数，检测所有峰值
-                    except:
-                        pass
-            
-            # 如果peak_kwargs为空，使用极小的height值
-            if len(peak_kwargs) == 0:
-                if y_max > 0:
-                    peak_kwargs = {'height': y_max * 0.00001}  # 极小的阈值
-                else:
-                    peak_kwargs = {'height': abs(y_mean) + y_std * 0.01}
-            
-            peaks, properties = find_peaks(y_detect, **peak_kwargs)
-            
-            if len(peaks) > 0:
-                # 获取标记样式参数
-                peak_marker_shape = plot_params.get('peak_marker_shape', 'x')
-                peak_marker_size = plot_params.get('peak_marker_size', 10)
-                peak_marker_color = plot_params.get('peak_marker_color', None)
-                # 如果未指定颜色，使用线条颜色
-                if peak_marker_color is None or peak_marker_color == '':
-                    peak_marker_color = color
-                
-                # 绘制峰值标记
-                ax.plot(x_data[peaks], y_final[peaks], peak_marker_shape, 
-                       color=peak_marker_color, markersize=peak_marker_size)
-                
-                # 显示波数值
-                if plot_params.get('peak_show_label', True):
-                    peak_x_coords = x_data[peaks]
-                    peak_y_coords = y_final[peaks]
-                    
-                    # 获取标签样式参数
-                    label_font = plot_params.get('peak_label_font', 'Times New Roman')
-                    label_size = plot_params.get('peak_label_size', 10)
-                    label_color = plot_params.get('peak_label_color', 'black')
-                    label_bold = plot_params.get('peak_label_bold', False)
-                    label_rotation = plot_params.get('peak_label_rotation', 0.0)
-                    
-                    # 构建字体属性
-                    font_props = {
-                        'fontsize': label_size,
-                        'color': label_color,
-                        'fontfamily': label_font,
-                        'ha': 'center',
-                        'va': 'bottom'
-                    }
-                    if label_bold:
-                        font_props['weight'] = 'bold'
-                    if label_rotation != 0:
-                        font_props['rotation'] = label_rotation
-                    
-                    # 为每个峰值添加波数标签（移除白色方框）
-                    for px, py in zip(peak_x_coords, peak_y_coords):
-                        # 格式化波数（保留1位小数）
-                        wavenumber_str = f"{px:.1f}"
-                        ax.text(px, py, wavenumber_str, **font_props)
-        except Exception as e:
-            # 如果峰值检测失败，打印错误信息以便调试
-            print(f"波峰检测失败: {e}, 参数={peak_kwargs}, 数据范围=[{y_min:.2f}, {y_max:.2f}]")
-            pass
+        from src.core.peak_detection_helper import detect_and_plot_peaks as unified_detect_and_plot_peaks
+        unified_detect_and_plot_peaks(ax, x_data, y_detect, y_final, plot_params, color)
     
     def _core_plot_spectrum(self, ax, plot_params):
         """
@@ -3315,13 +3138,8 @@ class BatchPlotWindow(QDialog):
                     'peak_rel_height': plot_params.get('peak_rel_height', None),
                 }
                 if self.rruff_loader.peak_detection_params != peak_detection_params:
-                    for name, spectrum in self.rruff_loader.library_spectra.items():
-                        if 'y_raw' in spectrum:
-                            spectrum['peaks'] = self.rruff_loader._detect_peaks(
-                                spectrum['x'], spectrum['y'],
-                                peak_detection_params=peak_detection_params
-                            )
-                    self.rruff_loader.peak_detection_params = peak_detection_params
+                    # 只重新检测峰值（并行，按参数缓存）
+                    self.rruff_loader.update_preprocessing(self.rruff_loader.preprocess_params, peak_detection_params)
 
                 # 计算排除列表
                 excluded_names = list(self.spectrum_exclusions.get(basename, []))
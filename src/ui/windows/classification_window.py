@@ -25,7 +25,7 @@ from matplotlib.backends.backend_qtagg import NavigationToolbar2QT as Navigation
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from scipy.signal import find_peaks
-from scipy.optimize import curve_fit, nnls
+from scipy.optimize import curve_fit
 from scipy.signal import savgol_filter
 
 from PyQt6.QtCore import Qt, QPoint, QSize, QSettings, QTimer
@@ -47,6 +47,7 @@ from src.config.plot_config import PlotStyleConfig
 from src.utils.fonts import setup_matplotlib_fonts
 from src.utils.helpers import natural_sort_key, group_files_by_name
 from src.core.preprocessor import DataPreProcessor
+from src.core.batch_nnls import WarmStartNNLS
 from src.core.generators import SyntheticDataGenerator
 from src.core.matcher import SpectralMatcher
 from src.core.transformers import AutoencoderTransformer, NonNegativeTransformer, AdaptiveMineralFilter, TORCH_AVAILABLE
@@ -1142,6 +1143,7 @@ class SpectraConfigDialog(QDialog):
         self.group_waterfall_control_widgets = {}  # 组瀑布图的独立堆叠位移控制
         self.last_fixed_H = None  # 存储上一次标准NMF运行得到的H矩阵，用于组分回归模式（预滤波空间）
         self.last_fixed_H_original = None  # 存储原始空间的H矩阵，用于绘图和验证
+        self.nmf_regression_solver = WarmStartNNLS()  # 组分回归的批量 NNLS（按样本名热启动）
         self.last_pca_model = None  # 存储训练好的 PCA 模型实例
         self.last_common_x = None  # 存储NMF分析时的波数轴，用于定量分析
         self.nmf_target_component_index = 0  # 存储NMF目标组分索引，默认选择Component 1
@@ -5872,14 +5874,8 @@ class SpectraConfigDialog(QDialog):
                         QMessageBox.warning(self, "NMF 警告", f"预滤波转换后的特征数 ({n_features_filtered}) 与固定H矩阵的特征数 ({fixed_H.shape[1]}) 不匹配。请确保使用相同的预滤波设置。")
                         return None, None, None, None
                     
-                    # NMF 回归现在在预滤波空间中进行
-                    W = np.zeros((n_samples, n_components))
-                    H_T = fixed_H.T  # (n_features_filtered, n_components)
-                    
-                    for i in range(n_samples):
-                        x_i_filtered = X_target[i, :]  # 在预滤波空间中的行向量
-                        w_i_T, _ = nnls(H_T, x_i_filtered)
-                        W[i, :] = w_i_T
+                    # NMF 回归现在在预滤波空间中进行（批量 NNLS，所有样本一次求解）
+                    W = self.nmf_regression_solver.solve(fixed_H, X_target, sample_labels)
                         
                 except Exception as e:
                     QMessageBox.critical(self, "回归错误", f"预滤波转换或 NNLS 求解失败: {e}")
@@ -5892,16 +5888,8 @@ class SpectraConfigDialog(QDialog):
                 n_components = fixed_H.shape[0]
                 
                 # 使用非负最小二乘求解 W
-                # 对于每条光谱 x_i（行向量），求解 H^T * w_i^T ≈ x_i^T
-                # 即求解 w_i^T = nnls(H^T, x_i^T)[0]
-                W = np.zeros((n_samples, n_components))
-                H_T = fixed_H.T  # (n_features, n_components)
-                
-                for i in range(n_samples):
-                    x_i = X_target[i, :]  # 第i条光谱 (n_features,)
-                    # 求解 H^T * w_i^T ≈ x_i^T，即 w_i^T = nnls(H^T, x_i^T)[0]
-                    w_i_T, _ = nnls(H_T, x_i)
-                    W[i, :] = w_i_T  # w_i^T 已经是列向量，直接赋值
+                # 对于每条光谱 x_i（行向量），求解 H^T * w_i^T ≈ x_i^T（批量 NNLS，所有样本一次求解）
+                W = self.nmf_regression_solver.solve(fixed_H, X_target, sample_labels)
             
             return W, fixed_H, common_x, sample_labels
             
@@ -0,0 +1,227 @@
+"""
+NMF 多种子 / 组分数扫描窗口
+基于最近一次 NMF 分析缓存的预处理矩阵，在后台并行拟合多个 (组分数, 种子) 组合，
+列出每个组分数的重构误差、稳定性与耗时，选中一行即可把该组分数下的最优模型应用到 NMF 结果。
+"""
+import traceback
+
+import numpy as np
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QLineEdit, QSpinBox, QComboBox,
+    QPushButton, QProgressBar, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView,
+    QMessageBox
+)
+
+from src.core.nmf_study import run_nmf_study
+
+
+class _StudyNotifier(QObject):
+    """后台扫描通知：信号跨线程发出，槽函数在 UI 线程执行"""
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class NMFStudyWindow(QDialog):
+    """NMF 扫描窗口"""
+
+    COLUMNS = ["组分数", "最优种子", "最优误差", "平均误差 ± 标准差", "稳定性 (平均/最低)", "平均迭代", "拟合耗时 (s)"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("NMF 多种子 / 组分数扫描")
+        self.resize(820, 520)
+        self.parent_dialog = parent
+        self.summaries = []
+        self._handle = None
+        self._notifier = _StudyNotifier(self)
+        self._notifier.progress.connect(self._on_progress)
+        self._notifier.finished.connect(self._on_finished)
+        self._notifier.failed.connect(self._on_failed)
+        self._setup_ui()
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.input_label = QLabel()
+        self.input_label.setWordWrap(True)
+        layout.addWidget(self.input_label)
+
+        form = QFormLayout()
+        self.components_input = QLineEdit("2-6")
+        self.components_input.setToolTip("组分数列表，例如 2-6 或 2,3,5")
+        form.addRow("组分数 (k):", self.components_input)
+        self.n_seeds_spin = QSpinBox()
+        self.n_seeds_spin.setRange(1, 1000)
+        self.n_seeds_spin.setValue(8)
+        form.addRow("每个 k 的随机重启次数:", self.n_seeds_spin)
+        self.first_seed_spin = QSpinBox()
+        self.first_seed_spin.setRange(0, 999999999)
+        self.first_seed_spin.setValue(0)
+        form.addRow("起始种子:", self.first_seed_spin)
+        self.init_combo = QComboBox()
+        self.init_combo.addItems(['random', 'nndsvdar'])
+        self.init_combo.setToolTip("nndsvd 初始化与种子无关，多种子扫描使用 random 或 nndsvdar")
+        form.addRow("初始化:", self.init_combo)
+        layout.addLayout(form)
+
+        btn_layout = QHBoxLayout()
+        self.run_btn = QPushButton("▶️ 开始扫描")
+        self.run_btn.clicked.connect(self.start_study)
+        btn_layout.addWidget(self.run_btn)
+        self.cancel_btn = QPushButton("取消")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_study)
+        btn_layout.addWidget(self.cancel_btn)
+        btn_layout.addStretch()
+        layout.addLayout(btn_layout)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.itemDoubleClicked.connect(lambda _item: self.apply_selected())
+        layout.addWidget(self.table)
+
+        bottom_layout = QHBoxLayout()
+        self.status_label = QLabel("")
+        bottom_layout.addWidget(self.status_label)
+        bottom_layout.addStretch()
+        self.apply_btn = QPushButton("✅ 应用所选模型")
+        self.apply_btn.clicked.connect(self.apply_selected)
+        bottom_layout.addWidget(self.apply_btn)
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.close)
+        bottom_layout.addWidget(close_btn)
+        layout.addLayout(bottom_layout)
+
+        self.refresh_input_info()
+
+    def _study_input(self):
+        return getattr(self.parent_dialog, '_nmf_study_input', None)
+
+    def refresh_input_info(self):
+        study_input = self._study_input()
+        if study_input is None:
+            self.input_label.setText("尚无缓存的 NMF 输入矩阵，请先运行一次标准 NMF 分析。")
+            self.run_btn.setEnabled(False)
+            return
+        n_samples, n_features = study_input['X'].shape
+        text = f"输入矩阵：{n_samples} 个样本 × {n_features} 个波数点（最近一次 NMF 分析的预处理结果）。"
+        if study_input.get('prefiltered'):
+            text += "<br>注意：扫描基于标准 NMF，不包含预滤波/降维步骤。"
+        self.input_label.setText(text)
+        self.run_btn.setEnabled(self._handle is None)
+
+    @staticmethod
+    def _parse_components(text):
+        values = set()
+        for part in text.replace('，', ',').split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if '-' in part:
+                start, end = part.split('-', 1)
+                values.update(range(int(start), int(end) + 1))
+            else:
+                values.add(int(part))
+        return sorted(v for v in values if v > 0)
+
+    def start_study(self):
+        study_input = self._study_input()
+        if study_input is None or self._handle is not None:
+            return
+        try:
+            components = self._parse_components(self.components_input.text())
+        except ValueError:
+            QMessageBox.warning(self, "警告", "组分数格式错误，请使用如 2-6 或 2,3,5 的格式。")
+            return
+        if not components:
+            QMessageBox.warning(self, "警告", "请至少输入一个组分数。")
+            return
+
+        first_seed = self.first_seed_spin.value()
+        seeds = list(range(first_seed, first_seed + self.n_seeds_spin.value()))
+        X = study_input['X']
+        init = self.init_combo.currentText()
+        max_iter = study_input.get('max_iter', 500)
+        tol = study_input.get('tol', 1e-4)
+        notifier = self._notifier
+
+        def _run(context):
+            try:
+                summaries = run_nmf_study(
+                    X, components, seeds, init=init, max_iter=max_iter, tol=tol, token=context.token,
+                    on_progress=lambda done, total, msg: notifier.progress.emit(done, total, msg))
+                notifier.finished.emit(summaries)
+            except Exception as e:
+                if not context.cancelled:
+                    traceback.print_exc()
+                notifier.failed.emit("已取消" if context.cancelled else str(e))
+
+        from src.services.task_runner import runner
+        self._handle = runner.submit_task(_run, name="NMF 扫描", category='analysis', with_context=True)
+        self.run_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.progress_bar.setRange(0, len(components) * len(seeds))
+        self.progress_bar.setValue(0)
+        self.status_label.setText("扫描中...")
+
+    def cancel_study(self):
+        if self._handle is not None and self._handle.cancel():
+            # 任务尚未开始即被取消：_run 不会执行，也就不会发出完成/失败信号，这里直接复位
+            self._on_failed("已取消")
+
+    def _on_progress(self, done, total, message):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"已完成 {done}/{total}（{message}）")
+
+    def _study_done(self):
+        self._handle = None
+        self.cancel_btn.setEnabled(False)
+        self.refresh_input_info()
+
+    def _on_failed(self, message):
+        self._study_done()
+        self.status_label.setText(f"扫描失败: {message}")
+
+    def _on_finished(self, summaries):
+        self._study_done()
+        self.summaries = summaries
+        self.table.setRowCount(len(summaries))
+        for row, s in enumerate(summaries):
+            values = [
+                str(s['n_components']),
+                str(s['best_seed']),
+                f"{s['best_error']:.4g}",
+                f"{s['mean_error']:.4g} ± {s['std_error']:.2g}",
+                f"{s['stability']:.3f} / {s['min_stability']:.3f}",
+                f"{s['mean_n_iter']:.0f}",
+                f"{s['fit_seconds']:.2f}",
+            ]
+            for col, value in enumerate(values):
+                self.table.setItem(row, col, QTableWidgetItem(value))
+        wall = summaries[0]['wall_seconds'] if summaries else 0.0
+        self.status_label.setText(f"完成：{sum(s['n_runs'] for s in summaries)} 次拟合，总用时 {wall:.2f} s")
+
+    def apply_selected(self):
+        row = self.table.currentRow()
+        if row < 0 or row >= len(self.summaries):
+            QMessageBox.information(self, "提示", "请先在表格中选择一个组分数。")
+            return
+        summary = self.summaries[row]
+        if hasattr(self.parent_dialog, 'apply_nmf_study_result'):
+            self.parent_dialog.apply_nmf_study_result(summary['W'], summary['H'])
+
+    def closeEvent(self, event):
+        self.cancel_study()
+        super().closeEvent(event)
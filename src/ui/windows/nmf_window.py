@@ -23,7 +23,7 @@ from scipy.signal import find_peaks
 from matplotlib.backends.backend_qtagg import NavigationToolbar2QT as NavigationToolbar
 
 from src.core.preprocessor import DataPreProcessor
-from src.core.peak_detection_helper import detect_and_plot_peaks
+from src.core.peak_detection_helper import detect_and_plot_peaks, get_peak_detection_params_from_config
 from src.core.spectrum_scanner import SpectrumScanner
 from src.core.peak_matcher import PeakMatcher
 from src.ui.canvas import MplCanvas
@@ -465,7 +465,8 @@ class NMFResultWindow(QDialog):
                         matched_result = peak_matcher.match_multiple_spectra(
                             match_data,
                             reference_index=match_config.reference_index,
-                            mode=match_config.mode
+                            mode=match_config.mode,
+                            detection_params=get_peak_detection_params_from_config(global_config)
                         )
                         
                         # 绘制匹配的峰值（使用配置中的标记样式）
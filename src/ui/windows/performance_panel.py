@@ -0,0 +1,151 @@
+"""
+性能面板
+实时显示各阶段耗时区间（次数/总计/自身/平均/最大）与计数器，可导出 JSON 或 Chrome Trace
+"""
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox, QComboBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QFileDialog, QMessageBox
+)
+
+from src.utils.profiling import profiler, ENV_VAR
+
+REFRESH_INTERVAL_MS = 1000
+
+
+class PerformancePanel(QDialog):
+    """性能面板（非模态，每秒刷新）"""
+
+    def __init__(self, parent=None, toggle_action=None):
+        super().__init__(parent)
+        self.setWindowTitle("性能面板")
+        self.resize(820, 640)
+        self.setModal(False)
+        self._toggle_action = toggle_action
+        self._setup_ui()
+        if toggle_action is not None:
+            toggle_action.toggled.connect(lambda _checked: self.refresh())
+        self._timer = QTimer(self)
+        self._timer.setInterval(REFRESH_INTERVAL_MS)
+        self._timer.timeout.connect(self.refresh)
+        self.refresh()
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        control_layout = QHBoxLayout()
+        self.enable_check = QCheckBox("启用性能分析")
+        self.enable_check.setChecked(profiler.enabled)
+        self.enable_check.setToolTip(f"也可通过环境变量 {ENV_VAR}=1 在启动时开启")
+        self.enable_check.toggled.connect(self._set_enabled)
+        control_layout.addWidget(self.enable_check)
+        control_layout.addWidget(QLabel("排序:"))
+        self.sort_combo = QComboBox()
+        self.sort_combo.addItems(["总计耗时", "自身耗时", "次数", "最大耗时"])
+        self.sort_combo.currentIndexChanged.connect(self.refresh)
+        control_layout.addWidget(self.sort_combo)
+        control_layout.addStretch()
+        reset_btn = QPushButton("清空")
+        reset_btn.clicked.connect(self._reset)
+        control_layout.addWidget(reset_btn)
+        json_btn = QPushButton("导出 JSON")
+        json_btn.clicked.connect(self._export_json)
+        control_layout.addWidget(json_btn)
+        trace_btn = QPushButton("导出 Chrome Trace")
+        trace_btn.clicked.connect(self._export_trace)
+        control_layout.addWidget(trace_btn)
+        layout.addLayout(control_layout)
+
+        self.summary_label = QLabel()
+        self.summary_label.setStyleSheet("font-size: 10pt;")
+        layout.addWidget(self.summary_label)
+
+        self.span_table = QTableWidget()
+        self.span_table.setColumnCount(6)
+        self.span_table.setHorizontalHeaderLabels(["区间", "次数", "总计 (ms)", "自身 (ms)", "平均 (ms)", "最大 (ms)"])
+        self.span_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for col in range(1, 6):
+            self.span_table.horizontalHeader().setSectionResizeMode(col, QHeaderView.ResizeMode.ResizeToContents)
+        self.span_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.span_table, 3)
+
+        self.counter_table = QTableWidget()
+        self.counter_table.setColumnCount(2)
+        self.counter_table.setHorizontalHeaderLabels(["计数器", "值"])
+        self.counter_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.counter_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        self.counter_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.counter_table, 1)
+
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.close)
+        layout.addWidget(close_btn)
+
+    # ---------------- 开关与刷新
+    def _set_enabled(self, enabled: bool):
+        if self._toggle_action is not None:
+            # 菜单中的勾选项同步开关 profiler
+            self._toggle_action.setChecked(enabled)
+        else:
+            profiler.set_enabled(enabled)
+        self.refresh()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.enable_check.setChecked(profiler.enabled)
+        self._timer.start()
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        if self.enable_check.isChecked() != profiler.enabled:
+            self.enable_check.blockSignals(True)
+            self.enable_check.setChecked(profiler.enabled)
+            self.enable_check.blockSignals(False)
+
+        key = ('total', 'self', 'count', 'max')[self.sort_combo.currentIndex()]
+        rows = profiler.summary(sort_key=key)
+        counters = profiler.counters()
+        state = "记录中" if profiler.enabled else f"未启用（勾选上方开关或设置 {ENV_VAR}=1）"
+        self.summary_label.setText(f"状态: {state}；区间 {len(rows)} 个，计数器 {len(counters)} 个")
+
+        self.span_table.setRowCount(len(rows))
+        for i, r in enumerate(rows):
+            self.span_table.setItem(i, 0, QTableWidgetItem(r['name']))
+            self.span_table.setItem(i, 1, QTableWidgetItem(str(r['count'])))
+            self.span_table.setItem(i, 2, QTableWidgetItem(f"{r['total'] * 1e3:.1f}"))
+            self.span_table.setItem(i, 3, QTableWidgetItem(f"{r['self'] * 1e3:.1f}"))
+            self.span_table.setItem(i, 4, QTableWidgetItem(f"{r['mean'] * 1e3:.2f}"))
+            self.span_table.setItem(i, 5, QTableWidgetItem(f"{r['max'] * 1e3:.1f}"))
+
+        items = sorted(counters.items())
+        self.counter_table.setRowCount(len(items))
+        for i, (name, value) in enumerate(items):
+            self.counter_table.setItem(i, 0, QTableWidgetItem(name))
+            self.counter_table.setItem(i, 1, QTableWidgetItem(f"{value:g}"))
+
+    def _reset(self):
+        profiler.reset()
+        self.refresh()
+
+    # ---------------- 导出
+    def _export_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出性能数据", "profile.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            profiler.export_json(path)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"导出失败: {e}")
+
+    def _export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出 Chrome Trace", "trace.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            profiler.export_chrome_trace(path)
+            QMessageBox.information(self, "完成", "已导出，可在 chrome://tracing 或 ui.perfetto.dev 中打开")
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"导出失败: {e}")
@@ -11,6 +11,7 @@ from scipy.signal import find_peaks
 from src.core.preprocessor import DataPreProcessor
 from src.core.peak_detection_helper import detect_and_plot_peaks as unified_detect_and_plot_peaks
 from src.ui.canvas import MplCanvas
+from src.utils.profiling import profiler
 
 
 class MplPlotWindow(QDialog):
@@ -178,6 +179,7 @@ class MplPlotWindow(QDialog):
         # 使用统一的峰值检测函数
         unified_detect_and_plot_peaks(ax, x_data, y_detect, y_final, plot_params, color)
 
+    @profiler.timed('plot.update_plot')
     def update_plot(self, plot_params):
         # 延迟设置字体（首次绘图时）
         if not hasattr(self, '_fonts_setup'):
@@ -1089,7 +1091,8 @@ class MplPlotWindow(QDialog):
                     match_result = peak_matcher.match_multiple_spectra(
                         spectra_list,
                         reference_index=peak_matching_reference_index,
-                        mode=peak_matching_mode
+                        mode=peak_matching_mode,
+                        detection_params=plot_params
                     )
                     
                     # 绘制匹配结果
@@ -1277,7 +1280,8 @@ class MplPlotWindow(QDialog):
             except:
                 pass  # 如果都失败，继续执行
         
-        self.canvas.draw()
+        with profiler.span('plot.draw'):
+            self.canvas.draw()
         
         # 不自动显示窗口，保持窗口位置和可见性状态
         # 如果窗口已经存在，只更新绘图内容，不改变窗口状态
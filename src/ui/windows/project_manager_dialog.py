@@ -3,10 +3,9 @@
 用于显示、管理、加载保存的项目
 """
 import os
-import json
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from PyQt6.QtCore import Qt, QSize
 from PyQt6.QtWidgets import (
@@ -17,6 +16,7 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QFont
 
 from src.core.project_save_manager import ProjectSaveManager
+from src.core.project_catalog import read_project_info
 
 
 class ProjectManagerDialog(QDialog):
@@ -69,6 +69,13 @@ class ProjectManagerDialog(QDialog):
         header_layout.addWidget(path_label)
         layout.addLayout(header_layout)
         
+        # 搜索框（按名称/备注/CSV路径过滤）
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索项目名称、备注或CSV路径...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(lambda _: self._refresh_project_list())
+        layout.addWidget(self.search_input)
+        
         # 项目列表表格
         self.table = QTableWidget()
         self.table.setColumnCount(5)
@@ -113,38 +120,36 @@ class ProjectManagerDialog(QDialog):
         layout.addLayout(button_layout)
     
     def _refresh_project_list(self):
-        """刷新项目列表"""
+        """刷新项目列表（从项目索引读取，只重新读取新增或被修改的项目文件）"""
         self.table.setRowCount(0)
         
-        # 扫描项目目录
-        project_files = list(self.projects_dir.glob("*.json")) + list(self.projects_dir.glob("*.hdf5")) + list(self.projects_dir.glob("*.h5"))
-        
-        for project_file in sorted(project_files, key=lambda p: p.stat().st_mtime, reverse=True):
+        search = self.search_input.text().strip() if hasattr(self, 'search_input') else ''
+        for entry in self._list_projects(search):
             try:
-                # 读取项目信息
-                project_info = self._read_project_info(project_file)
+                project_file = Path(entry['path'])
                 
                 row = self.table.rowCount()
                 self.table.insertRow(row)
                 
                 # 项目名称（不含扩展名）
-                name_item = QTableWidgetItem(project_file.stem)
+                name_item = QTableWidgetItem(entry['name'])
                 self.table.setItem(row, 0, name_item)
                 
                 # 保存日期
-                save_time = project_info.get('save_time', '')
+                save_time = entry.get('save_time', '')
+                mtime_str = datetime.fromtimestamp(entry['mtime_ns'] / 1e9).strftime("%Y-%m-%d %H:%M:%S")
                 if save_time:
                     try:
                         dt = datetime.fromisoformat(save_time)
                         date_str = dt.strftime("%Y-%m-%d %H:%M:%S")
                     except:
-                        date_str = datetime.fromtimestamp(project_file.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+                        date_str = mtime_str
                 else:
-                    date_str = datetime.fromtimestamp(project_file.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+                    date_str = mtime_str
                 self.table.setItem(row, 1, QTableWidgetItem(date_str))
                 
                 # 文件大小
-                size_bytes = project_file.stat().st_size
+                size_bytes = entry['size']
                 if size_bytes < 1024:
                     size_str = f"{size_bytes} B"
                 elif size_bytes < 1024 * 1024:
@@ -154,51 +159,45 @@ class ProjectManagerDialog(QDialog):
                 self.table.setItem(row, 2, QTableWidgetItem(size_str))
                 
                 # CSV路径
-                csv_path = project_info.get('csv_folder_path', '')
+                csv_path = entry.get('csv_folder_path', '')
                 self.table.setItem(row, 3, QTableWidgetItem(csv_path if csv_path else "(未设置)"))
                 
                 # 备注（从项目数据中提取，如果有的话）
-                note = project_info.get('note', '')
+                note = entry.get('note', '')
                 self.table.setItem(row, 4, QTableWidgetItem(note if note else ""))
                 
                 # 存储文件路径到item的data中
                 name_item.setData(Qt.ItemDataRole.UserRole, str(project_file))
                 
             except Exception as e:
-                print(f"读取项目信息失败 {project_file}: {e}")
+                print(f"读取项目信息失败 {entry.get('path')}: {e}")
+                continue
+    
+    def _list_projects(self, search: str = '') -> List[Dict[str, Any]]:
+        """从项目索引获取项目列表；索引不可用时回退到逐个读取项目文件"""
+        catalog = getattr(self.project_save_manager, 'catalog', None)
+        if catalog is not None and Path(catalog.projects_dir).resolve() == self.projects_dir.resolve():
+            try:
+                return catalog.list_projects(search=search or None)
+            except Exception as e:
+                print(f"读取项目索引失败，改为扫描项目目录: {e}")
+        
+        entries = []
+        project_files = list(self.projects_dir.glob("*.json")) + list(self.projects_dir.glob("*.hdf5")) + list(self.projects_dir.glob("*.h5"))
+        for project_file in sorted(project_files, key=lambda p: p.stat().st_mtime, reverse=True):
+            info = self._read_project_info(project_file)
+            st = project_file.stat()
+            entry = {'path': str(project_file), 'name': project_file.stem,
+                     'mtime_ns': st.st_mtime_ns, 'size': st.st_size, **info}
+            if search and not any(search.lower() in str(entry.get(k, '')).lower()
+                                  for k in ('name', 'note', 'csv_folder_path')):
                 continue
+            entries.append(entry)
+        return entries
     
     def _read_project_info(self, project_file: Path) -> Dict[str, Any]:
         """读取项目文件的基本信息"""
-        info = {}
-        
-        try:
-            if project_file.suffix.lower() == '.json':
-                with open(project_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    info['save_time'] = data.get('save_time', '')
-                    info['csv_folder_path'] = data.get('csv_folder_path', '')
-                    info['note'] = data.get('note', '')
-            else:
-                # HDF5 格式
-                try:
-                    import h5py
-                    with h5py.File(project_file, 'r') as f:
-                        info['save_time'] = f.attrs.get('save_time', '')
-                        if isinstance(info['save_time'], bytes):
-                            info['save_time'] = info['save_time'].decode('utf-8')
-                        info['csv_folder_path'] = f.attrs.get('csv_folder_path', '')
-                        if isinstance(info['csv_folder_path'], bytes):
-                            info['csv_folder_path'] = info['csv_folder_path'].decode('utf-8')
-                        info['note'] = f.attrs.get('note', '')
-                        if isinstance(info['note'], bytes):
-                            info['note'] = info['note'].decode('utf-8')
-                except ImportError:
-                    pass
-        except Exception as e:
-            print(f"读取项目文件失败: {e}")
-        
-        return info
+        return read_project_info(project_file)
     
     def _on_table_double_clicked(self, index):
         """双击表格行时加载项目"""
@@ -306,6 +305,9 @@ class ProjectManagerDialog(QDialog):
         if reply == QMessageBox.StandardButton.Yes:
             try:
                 os.remove(project_path)
+                catalog = getattr(self.project_save_manager, 'catalog', None)
+                if catalog is not None:
+                    catalog.remove(project_path)
                 # 刷新列表，不显示删除成功提示
                 self._refresh_project_list()
             except Exception as e:
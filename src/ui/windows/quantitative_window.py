@@ -28,6 +28,14 @@ from scipy.signal import find_peaks
 from scipy.optimize import curve_fit
 from scipy.signal import savgol_filter
 from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.decomposition import PCA
+from sklearn.cross_decomposition import PLSCanonical
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
+from sklearn.svm import SVC
+from sklearn.linear_model import LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.ensemble import RandomForestClassifier, AdaBoostClassifier
 
 from PyQt6.QtCore import Qt, QPoint, QSize, QSettings, QTimer
 from PyQt6.QtGui import QColor
@@ -50,6 +58,9 @@ from src.utils.helpers import natural_sort_key, group_files_by_name
 from src.core.preprocessor import DataPreProcessor
 from src.core.generators import SyntheticDataGenerator
 from src.core.matcher import SpectralMatcher
+from src.core import loo_validation
+from src.core import pls_diagnostics
+from src.core.registry import model_registry
 from src.core.transformers import AutoencoderTransformer, NonNegativeTransformer, AdaptiveMineralFilter
 from src.ui.widgets.custom_widgets import CollapsibleGroupBox, SmartDoubleSpinBox
 from src.ui.canvas import MplCanvas
@@ -2145,160 +2156,45 @@ class QuantitativeAnalysisDialog(QDialog):
             traceback.print_exc()
             return None, None
     
-    def _calculate_vip_scores(self, pls_model, X, y):
+    def _calculate_pls_diagnostics(self, pls_model, X, y):
         """
-        计算PLS-DA的VIP (Variable Importance in Projection) 分数
+        计算PLS-DA诊断量：VIP分数、选择性比、回归系数、各组分解释方差（向量化，见 pls_diagnostics）
         """
         try:
-            # 获取PLS模型的权重和载荷
-            w = pls_model.x_weights_  # (n_features, n_components)
-            p = pls_model.x_loadings_  # (n_features, n_components)
-            q = pls_model.y_loadings_  # (n_outputs, n_components)
-            
-            # 计算每个组分的方差解释率
-            T = pls_model.transform(X)  # (n_samples, n_components)
-            explained_variance = np.var(T, axis=0)  # (n_components,)
-            
-            # 计算VIP分数
-            n_features = X.shape[1]
-            n_components = w.shape[1]
-            
-            vip_scores = np.zeros(n_features)
-            
-            for i in range(n_features):
-                numerator = 0
-                denominator = 0
-                
-                for j in range(n_components):
-                    # VIP公式: VIP_i = sqrt(p * sum((w_ij^2 * SSY_j) / SSY_total))
-                    w_ij = w[i, j]
-                    p_ij = p[i, j]
-                    q_j = q[0, j] if q.shape[0] == 1 else q[j, 0]
-                    
-                    # SSY_j = explained variance of component j
-                    ssy_j = explained_variance[j] * (q_j ** 2)
-                    
-                    numerator += (w_ij ** 2) * ssy_j
-                    denominator += ssy_j
-                
-                if denominator > 0:
-                    vip_scores[i] = np.sqrt(n_features * numerator / denominator)
-                else:
-                    vip_scores[i] = 0
-            
-            return vip_scores
-            
+            return pls_diagnostics.pls_diagnostics(pls_model, X, y)
         except Exception as e:
-            print(f"计算VIP分数时出错: {e}")
+            print(f"计算PLS诊断量时出错: {e}")
             traceback.print_exc()
             return None
     
-    def _run_algorithm_validation(self, algo_name, model_instance, X_train, y_train, X_test):
+    def _run_algorithm_validation(self, algo_name, model_instance, X_train, y_train, X_test, fold_results=None):
         """
         运行指定算法的LOO-CV并计算所有性能指标。
+        fold_results: 已由 loo_validation.run_loo 计算好的逐折结果（None 时在此计算）
         返回: (预测结果字典, 性能指标字典)
         """
-        n_samples = X_train.shape[0]
-        loo = LeaveOneOut()
-        y_true_cv_all = []
-        y_pred_cv_all = []
-        y_proba_pos_cv_all = []
-        
-        # 1. LOO-CV 训练与预测
-        for train_idx, val_idx in loo.split(X_train):
-            X_train_cv, X_val_cv = X_train[train_idx], X_train[val_idx]
-            y_train_cv, y_val_cv = y_train[train_idx], y_train[val_idx]
-            
-            try:
-                # 处理需要reshape的模型
-                if algo_name == 'PLS-DA':
-                    # PLS-DA需要复制模型实例
-                    n_comp = model_instance.n_components if hasattr(model_instance, 'n_components') else 2
-                    model_cv = PLSCanonical(n_components=n_comp)
-                    model_cv.fit(X_train_cv, y_train_cv.reshape(-1, 1))
-                    y_pred_cv = model_cv.predict(X_val_cv)
-                    y_proba = y_pred_cv.flatten()
-                    y_proba = np.clip(y_proba, 0, 1)
-                    y_pred = (y_proba > 0.5).astype(int)
-                elif algo_name == 'PCA + LDA':
-                    # PCA+LDA Pipeline需要复制
-                    model_cv = clone(model_instance)
-                    model_cv.fit(X_train_cv, y_train_cv)
-                    y_pred = model_cv.predict(X_val_cv)
-                    # PCA+LDA通常不支持predict_proba，使用decision_function（通过Pipeline调用）
-                    try:
-                        if hasattr(model_cv, 'decision_function'):
-                            # 通过Pipeline调用decision_function，Pipeline会自动处理PCA转换
-                            y_proba_cont = model_cv.decision_function(X_val_cv)
-                            y_proba = 1 / (1 + np.exp(-y_proba_cont))  # sigmoid转换
-                        else:
-                            y_proba = y_pred.astype(float)
-                    except:
-                        # 如果decision_function失败，使用预测值作为概率
-                        y_proba = y_pred.astype(float)
-                else:
-                    # 其他模型：尝试复制，如果失败则使用原模型类型创建新实例
-                    try:
-                        model_cv = clone(model_instance)
-                    except:
-                        # 如果clone失败，尝试使用get_params创建新实例
-                        if hasattr(model_instance, 'get_params'):
-                            model_cv = type(model_instance)(**model_instance.get_params())
-                        else:
-                            model_cv = type(model_instance)()
-                    
-                    model_cv.fit(X_train_cv, y_train_cv)
-                    
-                    # 预测概率（如果模型支持）
-                    if hasattr(model_cv, 'predict_proba'):
-                        y_proba = model_cv.predict_proba(X_val_cv)[:, 1]
-                        y_pred = model_cv.predict(X_val_cv)
-                    else:
-                        y_pred = model_cv.predict(X_val_cv)
-                        # 对于不支持predict_proba的模型，使用decision_function或默认值
-                        if hasattr(model_cv, 'decision_function'):
-                            y_proba_cont = model_cv.decision_function(X_val_cv)
-                            y_proba = 1 / (1 + np.exp(-y_proba_cont))  # sigmoid转换
-                        else:
-                            y_proba = y_pred.astype(float)
-                
-                y_true_cv_all.extend(y_val_cv)
-                y_pred_cv_all.extend(y_pred.flatten().astype(int))
-                y_proba_pos_cv_all.extend(y_proba.flatten())
-                
-            except Exception as e:
-                print(f"LOO-CV for {algo_name} failed: {e}")
-                traceback.print_exc()
-                continue
+        # 1. LOO-CV 训练与预测（各折并行执行）
+        if fold_results is None:
+            fold_results = loo_validation.run_loo({algo_name: (algo_name, model_instance)}, X_train, y_train)[algo_name]
+        y_true_cv_all, y_pred_cv_all, y_proba_pos_cv_all = loo_validation.collect_predictions(fold_results)
         
         if not y_true_cv_all:
             return None, None
         
         # 2. 性能指标计算
-        cv_accuracy = accuracy_score(y_true_cv_all, y_pred_cv_all)
+        metrics = loo_validation.compute_metrics(y_true_cv_all, y_pred_cv_all, y_proba_pos_cv_all)
+        cv_accuracy = metrics['accuracy']
         
-        metrics = {
-            'accuracy': cv_accuracy,
-            'precision': precision_score(y_true_cv_all, y_pred_cv_all, zero_division=0),
-            'recall': recall_score(y_true_cv_all, y_pred_cv_all, zero_division=0),
-            'f1_score': f1_score(y_true_cv_all, y_pred_cv_all, zero_division=0),
-        }
-        
-        try:
-            metrics['auc'] = roc_auc_score(y_true_cv_all, y_proba_pos_cv_all)
-        except:
-            metrics['auc'] = 0.5  # 默认值
-        
-        # 3. 最终模型训练与测试集预测
+        # 3. 最终模型训练与测试集预测（经模型注册表：相同训练数据 + 超参数 + 代码版本时直接加载）
         if algo_name == 'PLS-DA':
-            model_instance.fit(X_train, y_train.reshape(-1, 1))
+            model_instance, _ = model_registry.fit(model_instance, X_train, y_train.reshape(-1, 1))
             y_test_pred_cont = model_instance.predict(X_test)
             y_test_pred = (y_test_pred_cont.flatten() > 0.5).astype(int)
             y_test_proba_cont = y_test_pred_cont.flatten()
             y_test_proba_pos = np.clip(y_test_proba_cont, 0, 1)
             y_test_proba = np.column_stack([1 - y_test_proba_pos, y_test_proba_pos])
         elif algo_name == 'PCA + LDA':
-            model_instance.fit(X_train, y_train)
+            model_instance, _ = model_registry.fit(model_instance, X_train, y_train)
             y_test_pred = model_instance.predict(X_test).flatten().astype(int)
             # PCA+LDA使用decision_function（通过Pipeline调用）
             try:
@@ -2313,7 +2209,7 @@ class QuantitativeAnalysisDialog(QDialog):
                 y_test_proba_pos = y_test_pred.astype(float)
             y_test_proba = np.column_stack([1 - y_test_proba_pos, y_test_proba_pos])
         else:
-            model_instance.fit(X_train, y_train)
+            model_instance, _ = model_registry.fit(model_instance, X_train, y_train)
             y_test_pred = model_instance.predict(X_test).flatten().astype(int)
             
             if hasattr(model_instance, 'predict_proba'):
@@ -2517,7 +2413,8 @@ class QuantitativeAnalysisDialog(QDialog):
                 # 在训练集上拟合（只使用 Mineral Only 样本）
                 mineral_indices = y_train == 0
                 if np.any(mineral_indices):
-                    obs_filter.fit(X_train[mineral_indices], wavenumbers=common_x_final)
+                    obs_filter, _ = model_registry.fit(obs_filter, X_train[mineral_indices],
+                                                       fit_params={'wavenumbers': common_x_final})
                     # 对训练集和测试集都应用背景抑制
                     X_train = obs_filter.transform(X_train)
                     X_test = obs_filter.transform(X_test)
@@ -2587,80 +2484,65 @@ class QuantitativeAnalysisDialog(QDialog):
             results = {}  # 存储预测结果和模型
             summary_metrics = {}  # 存储所有算法的综合指标（用于对比图）
             
+            def build_pca_lda(n_comp):
+                # PCA+LDA 模型必须包含 StandardScaler（如果启用）
+                if use_scaler:
+                    return Pipeline([('scaler', StandardScaler()), ('pca', PCA(n_components=n_comp)), ('lda', LDA())])
+                return Pipeline([('pca', PCA(n_components=n_comp)), ('lda', LDA())])
+            
+            # --- 成分数优化：PLS-DA / PCA+LDA 的所有候选成分数的 LOO 一次性并行计算 ---
+            # 如果用户指定了成分数（>0），使用用户指定的值；否则自动优化
+            candidate_models = {}
+            candidate_range = range(1, min(10, X_train.shape[0], X_train.shape[1] + 1))
+            if 'PLS-DA' in algorithms_to_run and params['plsda_ncomp'] <= 0:
+                for n_comp in candidate_range:
+                    candidate_models[('PLS-DA', n_comp)] = ('PLS-DA', PLSCanonical(n_components=n_comp))
+            if 'PCA + LDA' in algorithms_to_run and params['pcalda_ncomp'] <= 0:
+                for n_comp in candidate_range:
+                    candidate_models[('PCA + LDA', n_comp)] = ('PCA + LDA', build_pca_lda(n_comp))
+            candidate_results = (loo_validation.run_loo(candidate_models, X_train, y_train, report_errors=False)
+                                 if candidate_models else {})
+            
+            def select_n_components(algo_name, default=2):
+                best_n, best_cv_score = default, 0
+                for n_comp in candidate_range:
+                    avg_score = loo_validation.loo_accuracy(candidate_results[(algo_name, n_comp)])
+                    if avg_score > best_cv_score:
+                        best_cv_score = avg_score
+                        best_n = n_comp
+                return best_n
+            
+            best_n_components = params['plsda_ncomp'] if params['plsda_ncomp'] > 0 else None
+            best_pca_comp = params['pcalda_ncomp'] if params['pcalda_ncomp'] > 0 else None
+            models_to_run = {}
             for algo_name in algorithms_to_run:
                 model = all_algorithms[algo_name]
-                
-                # --- 优化 PLS-DA 组件数 ---
                 if algo_name == 'PLS-DA':
-                    # 如果用户指定了成分数（>0），使用用户指定的值；否则自动优化
-                    if params['plsda_ncomp'] > 0:
-                        best_n_components = params['plsda_ncomp']
-                    else:
-                        best_n_components = 2
-                        best_cv_score = 0
-                        
-                        for n_comp in range(1, min(10, X_train.shape[0], X_train.shape[1] + 1)):
-                            loo = LeaveOneOut()
-                            cv_scores = []
-                            for train_idx, val_idx in loo.split(X_train):
-                                X_train_cv, X_val_cv = X_train[train_idx], X_train[val_idx]
-                                y_train_cv, y_val_cv = y_train[train_idx], y_train[val_idx]
-                                pls_model_cv = PLSCanonical(n_components=n_comp)
-                                try:
-                                    pls_model_cv.fit(X_train_cv, y_train_cv.reshape(-1, 1))
-                                    y_pred_cv = pls_model_cv.predict(X_val_cv)
-                                    y_pred_cv_binary = (y_pred_cv.flatten() > 0.5).astype(int)
-                                    cv_scores.append(accuracy_score([y_val_cv], [y_pred_cv_binary]))
-                                except:
-                                    cv_scores.append(0)
-                            
-                            avg_score = np.mean(cv_scores) if cv_scores else 0
-                            if avg_score > best_cv_score:
-                                best_cv_score = avg_score
-                                best_n_components = n_comp
-                    
+                    if best_n_components is None:
+                        best_n_components = select_n_components(algo_name)
                     model = PLSCanonical(n_components=best_n_components)
-                
-                # --- 优化 PCA + LDA 组件数 ---
                 elif algo_name == 'PCA + LDA':
-                    # 如果用户指定了成分数（>0），使用用户指定的值；否则自动优化
-                    if params['pcalda_ncomp'] > 0:
-                        best_pca_comp = params['pcalda_ncomp']
-                    else:
-                        best_pca_comp = 2
-                        best_cv_score = 0
-                        
-                        for n_comp in range(1, min(10, X_train.shape[0], X_train.shape[1] + 1)):
-                            loo = LeaveOneOut()
-                            cv_scores = []
-                            for train_idx, val_idx in loo.split(X_train):
-                                X_train_cv, X_val_cv = X_train[train_idx], X_train[val_idx]
-                                y_train_cv, y_val_cv = y_train[train_idx], y_train[val_idx]
-                                # 核心修正：PCA+LDA模型现在包含 StandardScaler（如果启用）
-                                if use_scaler:
-                                    pca_lda_model_cv = Pipeline([('scaler', StandardScaler()), ('pca', PCA(n_components=n_comp)), ('lda', LDA())])
-                                else:
-                                    pca_lda_model_cv = Pipeline([('pca', PCA(n_components=n_comp)), ('lda', LDA())])
-                                try:
-                                    pca_lda_model_cv.fit(X_train_cv, y_train_cv)
-                                    y_pred_cv = pca_lda_model_cv.predict(X_val_cv)
-                                    cv_scores.append(accuracy_score([y_val_cv], [y_pred_cv]))
-                                except:
-                                    cv_scores.append(0)
-                            
-                            avg_score = np.mean(cv_scores) if cv_scores else 0
-                            if avg_score > best_cv_score:
-                                best_cv_score = avg_score
-                                best_pca_comp = n_comp
-                    
-                    # 最终模型也必须包含 StandardScaler（如果启用）
-                    if use_scaler:
-                        model = Pipeline([('scaler', StandardScaler()), ('pca', PCA(n_components=best_pca_comp)), ('lda', LDA())])
-                    else:
-                        model = Pipeline([('pca', PCA(n_components=best_pca_comp)), ('lda', LDA())])
-                
+                    if best_pca_comp is None:
+                        best_pca_comp = select_n_components(algo_name)
+                    model = build_pca_lda(best_pca_comp)
+                models_to_run[algo_name] = model
+            
+            # --- 所有算法的 LOO-CV 一次性并行计算（优化阶段已算过的成分数直接复用） ---
+            fold_results_all = {}
+            pending = {}
+            for algo_name, model in models_to_run.items():
+                n_comp = best_n_components if algo_name == 'PLS-DA' else best_pca_comp if algo_name == 'PCA + LDA' else None
+                if (algo_name, n_comp) in candidate_results:
+                    fold_results_all[algo_name] = candidate_results[(algo_name, n_comp)]
+                else:
+                    pending[algo_name] = (algo_name, model)
+            if pending:
+                fold_results_all.update(loo_validation.run_loo(pending, X_train, y_train))
+            
+            for algo_name, model in models_to_run.items():
                 # --- 运行验证 ---
-                algo_results, algo_metrics = self._run_algorithm_validation(algo_name, model, X_train, y_train, X_test)
+                algo_results, algo_metrics = self._run_algorithm_validation(
+                    algo_name, model, X_train, y_train, X_test, fold_results=fold_results_all[algo_name])
                 
                 if algo_results:
                     results[algo_name] = algo_results
@@ -2668,8 +2550,9 @@ class QuantitativeAnalysisDialog(QDialog):
                     
                     if algo_name == 'PLS-DA':
                         # 计算 PLS-DA 的 VIP 分数并存储
-                        vip_scores = self._calculate_vip_scores(algo_results['model'], X_train, y_train.reshape(-1, 1))
-                        results[algo_name]['vip_scores'] = vip_scores
+                        diagnostics = self._calculate_pls_diagnostics(algo_results['model'], X_train, y_train.reshape(-1, 1))
+                        results[algo_name]['vip_scores'] = diagnostics['vip'] if diagnostics else None
+                        results[algo_name]['pls_diagnostics'] = diagnostics
                         results[algo_name]['n_components'] = best_n_components  # 存储组件数
                     elif algo_name == 'PCA + LDA':
                         results[algo_name]['n_components'] = best_pca_comp  # 存储组件数
@@ -2680,6 +2563,7 @@ class QuantitativeAnalysisDialog(QDialog):
             
             # 创建或更新分类结果窗口
             if self.classification_window is None or not self.classification_window.isVisible():
+                from src.ui.windows.classification_window import ClassificationResultWindow
                 self.classification_window = ClassificationResultWindow(self)
             
             # 如果启用了 Adaptive OBS，保存原始测试数据和 obs_filter
@@ -0,0 +1,369 @@
+"""
+拉曼面扫（高光谱）窗口
+导入多光谱面扫导出文件为磁盘数据集（src.core.raman_map），在后台按块并行计算：
+预处理（沿用主界面参数）、峰波段积分强度图、NMF 组分丰度图、标准库匹配得分图；
+左侧显示所选图层，点击像素在右侧显示该像素的光谱。
+"""
+import os
+import traceback
+
+import numpy as np
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qtagg import NavigationToolbar2QT as NavigationToolbar
+from matplotlib.figure import Figure
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QLineEdit, QSpinBox, QComboBox,
+    QPushButton, QProgressBar, QCheckBox, QFileDialog, QMessageBox, QGroupBox
+)
+
+from src.core.raman_map import import_map, open_map
+
+MAX_MATCH_LAYERS = 10  # 库匹配后最多为多少条库光谱单独生成得分图层（按成为最佳匹配的像素数排序）
+
+
+class _MapNotifier(QObject):
+    """后台任务通知：信号跨线程发出，槽函数在 UI 线程执行"""
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class RamanMapWindow(QDialog):
+    """面扫数据集窗口"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("拉曼面扫 (Raman Map)")
+        self.resize(1100, 680)
+        self.parent_dialog = parent
+        self.raman_map = None
+        self.layers = {}          # {图层名: (n_pixels,) 逐像素值}
+        self.nmf_components = None
+        self.match_names = []
+        self._preprocess_params = None
+        self._handle = None
+        self._on_done = None
+        self._notifier = _MapNotifier(self)
+        self._notifier.progress.connect(self._on_progress)
+        self._notifier.finished.connect(self._on_finished)
+        self._notifier.failed.connect(self._on_failed)
+        self._setup_ui()
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        file_layout = QHBoxLayout()
+        self.import_btn = QPushButton("📥 导入面扫文件...")
+        self.import_btn.clicked.connect(self.import_file)
+        file_layout.addWidget(self.import_btn)
+        self.open_btn = QPushButton("📂 打开数据集...")
+        self.open_btn.clicked.connect(self.open_dataset)
+        file_layout.addWidget(self.open_btn)
+        self.info_label = QLabel("尚未载入面扫数据集。")
+        file_layout.addWidget(self.info_label, 1)
+        layout.addLayout(file_layout)
+
+        controls = QHBoxLayout()
+        group = QGroupBox("计算")
+        form = QFormLayout(group)
+        self.preprocess_check = QCheckBox("先用主界面的预处理参数处理（结果缓存于数据集目录）")
+        self.preprocess_check.setChecked(True)
+        form.addRow(self.preprocess_check)
+        self.bands_input = QLineEdit("990-1010")
+        self.bands_input.setToolTip("波段积分范围，多个波段用逗号分隔，例如 990-1010, 1080-1100")
+        self.bands_btn = QPushButton("波段强度图")
+        self.bands_btn.clicked.connect(self.run_bands)
+        bands_row = QHBoxLayout()
+        bands_row.addWidget(self.bands_input)
+        bands_row.addWidget(self.bands_btn)
+        form.addRow("峰波段 (cm⁻¹):", bands_row)
+        self.nmf_spin = QSpinBox()
+        self.nmf_spin.setRange(1, 20)
+        self.nmf_spin.setValue(3)
+        self.nmf_btn = QPushButton("NMF 丰度图")
+        self.nmf_btn.clicked.connect(self.run_nmf)
+        nmf_row = QHBoxLayout()
+        nmf_row.addWidget(self.nmf_spin)
+        nmf_row.addWidget(self.nmf_btn)
+        form.addRow("NMF 组分数:", nmf_row)
+        self.library_input = QLineEdit()
+        self.library_input.setPlaceholderText("标准库文件夹（txt/csv）")
+        library_browse = QPushButton("...")
+        library_browse.setFixedWidth(40)
+        library_browse.clicked.connect(self._browse_library)
+        self.match_btn = QPushButton("库匹配得分图")
+        self.match_btn.clicked.connect(self.run_matching)
+        match_row = QHBoxLayout()
+        match_row.addWidget(self.library_input)
+        match_row.addWidget(library_browse)
+        match_row.addWidget(self.match_btn)
+        form.addRow("标准库:", match_row)
+        controls.addWidget(group, 1)
+
+        view_group = QGroupBox("显示")
+        view_form = QFormLayout(view_group)
+        self.layer_combo = QComboBox()
+        self.layer_combo.currentTextChanged.connect(lambda _text: self.redraw())
+        view_form.addRow("图层:", self.layer_combo)
+        self.cmap_combo = QComboBox()
+        self.cmap_combo.addItems(['viridis', 'magma', 'inferno', 'plasma', 'cividis', 'gray', 'jet'])
+        self.cmap_combo.currentTextChanged.connect(lambda _text: self.redraw())
+        view_form.addRow("色图:", self.cmap_combo)
+        controls.addWidget(view_group)
+        layout.addLayout(controls)
+
+        self.figure = Figure(figsize=(10, 5))
+        self.canvas = FigureCanvas(self.figure)
+        self.canvas.mpl_connect('button_press_event', self._on_click)
+        layout.addWidget(NavigationToolbar(self.canvas, self))
+        layout.addWidget(self.canvas, 1)
+
+        bottom = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        bottom.addWidget(self.progress_bar, 1)
+        self.status_label = QLabel("")
+        bottom.addWidget(self.status_label)
+        self.cancel_btn = QPushButton("取消")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_task)
+        bottom.addWidget(self.cancel_btn)
+        layout.addLayout(bottom)
+        self._update_buttons()
+
+    # ---------------- 后台任务
+    def _start(self, name, work, on_done):
+        """在全局 runner 上运行 work(token, on_progress)，完成后在 UI 线程调用 on_done(result)"""
+        if self._handle is not None:
+            return
+        notifier = self._notifier
+
+        def _run(context):
+            try:
+                result = work(context.token, lambda done, total, msg: notifier.progress.emit(done, total, msg))
+                notifier.finished.emit(result)
+            except Exception as e:
+                if not context.cancelled:
+                    traceback.print_exc()
+                notifier.failed.emit("已取消" if context.cancelled else str(e))
+
+        from src.services.task_runner import runner
+        self._on_done = on_done
+        self._handle = runner.submit_task(_run, name=name, category='analysis', with_context=True)
+        self.progress_bar.setRange(0, 0)
+        self.status_label.setText(f"{name}...")
+        self._update_buttons()
+
+    def cancel_task(self):
+        if self._handle is not None and self._handle.cancel():
+            # 任务尚未开始即被取消：_run 不会执行，也就不会发出完成/失败信号，这里直接复位
+            self._on_failed("已取消")
+
+    def _task_done(self):
+        self._handle = None
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(1)
+        self._update_buttons()
+
+    def _on_progress(self, done, total, message):
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"{message} {done}/{total}")
+
+    def _on_failed(self, message):
+        self._task_done()
+        self.status_label.setText(f"失败: {message}")
+
+    def _on_finished(self, result):
+        self._task_done()
+        self.status_label.setText("完成")
+        on_done, self._on_done = self._on_done, None
+        try:
+            if on_done is not None:
+                on_done(result)
+        except Exception as e:
+            traceback.print_exc()
+            self.status_label.setText(f"失败: {e}")
+
+    def _update_buttons(self):
+        busy = self._handle is not None
+        loaded = self.raman_map is not None
+        self.import_btn.setEnabled(not busy)
+        self.open_btn.setEnabled(not busy)
+        for btn in (self.bands_btn, self.nmf_btn, self.match_btn):
+            btn.setEnabled(loaded and not busy)
+        self.cancel_btn.setEnabled(busy)
+
+    # ---------------- 数据集
+    def import_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择面扫导出文件", "", "文本文件 (*.txt *.csv *.tsv);;所有文件 (*)")
+        if not path:
+            return
+        self._start("导入面扫", lambda token, progress: import_map(path, token=token, on_progress=progress),
+                    self._set_map)
+
+    def open_dataset(self):
+        path = QFileDialog.getExistingDirectory(self, "选择面扫数据集目录（*.ramanmap）")
+        if not path:
+            return
+        try:
+            self._set_map(open_map(path))
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"无法打开面扫数据集：{e}")
+
+    def _set_map(self, raman_map):
+        self.raman_map = raman_map
+        self.layers = {}
+        ny, nx = raman_map.shape
+        self.info_label.setText(f"{raman_map.name}: {raman_map.n_pixels} 像素（{ny} × {nx}）× "
+                                f"{raman_map.n_features} 波数点")
+        self._set_layers({'平均强度': None})
+        self.status_label.setText("已载入")
+        self._update_buttons()
+
+    def _set_layers(self, layers):
+        for name, values in layers.items():
+            if values is None:
+                values = self._row_means()
+            self.layers[name] = values
+        current = list(layers.keys())[-1]
+        self.layer_combo.blockSignals(True)
+        self.layer_combo.clear()
+        self.layer_combo.addItems(list(self.layers.keys()))
+        self.layer_combo.setCurrentText(current)
+        self.layer_combo.blockSignals(False)
+        self.redraw()
+
+    def _row_means(self):
+        """逐像素平均强度（按块读取）"""
+        parts = [np.asarray(self.raman_map.spectra[s:e], dtype=np.float64).mean(axis=1)
+                 for s, e in self.raman_map.blocks()]
+        return np.concatenate(parts) if parts else np.zeros(0)
+
+    def _source_map(self, token, progress):
+        """计算所用的数据集：勾选预处理时为（缓存的）派生数据集；在工作线程中执行，只读参数快照"""
+        if self._preprocess_params is not None:
+            return self.raman_map.preprocess(self._preprocess_params, token=token, on_progress=progress)
+        return self.raman_map
+
+    def _snapshot_params(self):
+        self._preprocess_params = None
+        if self.preprocess_check.isChecked() and hasattr(self.parent_dialog, '_get_preprocess_params'):
+            try:
+                self._preprocess_params = self.parent_dialog._get_preprocess_params()
+            except Exception as e:
+                print(f"警告：读取主界面预处理参数失败: {e}")
+
+    # ---------------- 计算
+    @staticmethod
+    def _parse_bands(text):
+        bands = []
+        for part in text.replace('，', ',').split(','):
+            part = part.strip()
+            if not part:
+                continue
+            lo, hi = part.split('-', 1)
+            bands.append((float(lo), float(hi)))
+        return bands
+
+    def run_bands(self):
+        try:
+            bands = self._parse_bands(self.bands_input.text())
+        except ValueError:
+            QMessageBox.warning(self, "警告", "波段格式错误，请使用如 990-1010, 1080-1100 的格式。")
+            return
+        if not bands:
+            return
+        self._snapshot_params()
+
+        def work(token, progress):
+            return self._source_map(token, progress).band_integrals(bands, token=token, on_progress=progress)
+
+        def done(values):
+            self._set_layers({f"波段 {lo:g}-{hi:g}": values[:, j] for j, (lo, hi) in enumerate(bands)})
+        self._start("波段积分", work, done)
+
+    def run_nmf(self):
+        n_components = self.nmf_spin.value()
+        self._snapshot_params()
+
+        def work(token, progress):
+            return self._source_map(token, progress).nmf(n_components, token=token, on_progress=progress)
+
+        def done(result):
+            W, H = result
+            self.nmf_components = H
+            self._set_layers({f"NMF 组分 {j + 1}": W[:, j] for j in range(W.shape[1])})
+        self._start("面扫 NMF", work, done)
+
+    def _browse_library(self):
+        folder = QFileDialog.getExistingDirectory(self, "选择标准库文件夹")
+        if folder:
+            self.library_input.setText(folder)
+
+    def run_matching(self):
+        folder = self.library_input.text().strip()
+        if not os.path.isdir(folder):
+            QMessageBox.warning(self, "警告", "请先选择标准库文件夹。")
+            return
+        self._snapshot_params()
+
+        def work(token, progress):
+            from src.core.matcher import SpectralMatcher
+            matcher = SpectralMatcher(folder)
+            return self._source_map(token, progress).match_scores(matcher, token=token, on_progress=progress)
+
+        def done(result):
+            if not result['names']:
+                QMessageBox.warning(self, "警告", "标准库中没有可用的光谱。")
+                return
+            layers = {'最佳匹配得分': result['best_score'],
+                      '最佳匹配序号': result['best_index'].astype(np.float64)}
+            # 逐条库光谱的得分图只为作为最佳匹配出现最多的几条生成（前 k 名之外记为 0）
+            counts = np.bincount(result['best_index'], minlength=len(result['names']))
+            for j in np.argsort(-counts)[:MAX_MATCH_LAYERS]:
+                if counts[j] == 0:
+                    break
+                hit = result['top_index'] == j
+                layers[f"匹配 {result['names'][j]}"] = np.where(hit, result['top_score'], 0.0).max(axis=1)
+            self.match_names = result['names']
+            self._set_layers(layers)
+        self._start("面扫库匹配", work, done)
+
+    # ---------------- 绘图
+    def redraw(self):
+        self.figure.clear()
+        if self.raman_map is None:
+            self.canvas.draw_idle()
+            return
+        name = self.layer_combo.currentText()
+        values = self.layers.get(name)
+        self.image_ax = self.figure.add_subplot(1, 2, 1)
+        self.spectrum_ax = self.figure.add_subplot(1, 2, 2)
+        if values is not None:
+            image = self.raman_map.image(values)
+            im = self.image_ax.imshow(image, origin='lower', extent=self.raman_map.extent(),
+                                      cmap=self.cmap_combo.currentText(), aspect='equal', interpolation='nearest')
+            self.figure.colorbar(im, ax=self.image_ax, fraction=0.046, pad=0.04)
+            self.image_ax.set_title(name)
+            self.image_ax.set_xlabel("X")
+            self.image_ax.set_ylabel("Y")
+        self.spectrum_ax.set_title("点击图像查看像素光谱")
+        self.spectrum_ax.set_xlabel("Wavenumber (cm⁻¹)")
+        self.figure.tight_layout()
+        self.canvas.draw_idle()
+
+    def _on_click(self, event):
+        if self.raman_map is None or event.inaxes is not getattr(self, 'image_ax', None):
+            return
+        index, spectrum = self.raman_map.spectrum_at(event.xdata, event.ydata)
+        x, y = self.raman_map.coords[index]
+        self.spectrum_ax.cla()
+        self.spectrum_ax.plot(self.raman_map.wavenumbers, spectrum, color='black', linewidth=1.0)
+        self.spectrum_ax.set_title(f"像素 #{index} ({x:g}, {y:g})")
+        self.spectrum_ax.set_xlabel("Wavenumber (cm⁻¹)")
+        self.canvas.draw_idle()
+
+    def closeEvent(self, event):
+        self.cancel_task()
+        super().closeEvent(event)
@@ -10,9 +10,9 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont
 from pathlib import Path
 from datetime import datetime
-import json
 
 from src.core.project_save_manager import ProjectSaveManager
+from src.core.project_catalog import read_project_info
 
 
 class StartupProjectDialog(QDialog):
@@ -135,34 +135,26 @@ class StartupProjectDialog(QDialog):
         layout.addLayout(button_layout)
     
     def _load_recent_projects(self):
-        """加载最近的项目列表"""
+        """加载最近的项目列表（从项目索引读取，按 mtime 校验）"""
         self.project_list.clear()
         
-        # 扫描项目目录
-        project_files = list(self.projects_dir.glob("*.json")) + list(self.projects_dir.glob("*.hdf5")) + list(self.projects_dir.glob("*.h5"))
-        
-        # 按修改时间排序
-        project_files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-        
         # 只显示最近10个项目
-        for project_file in project_files[:10]:
+        for entry in self._list_recent_projects(limit=10):
             try:
-                # 读取项目信息
-                project_info = self._read_project_info(project_file)
-                
-                name = project_file.stem
-                save_time = project_info.get('save_time', '')
+                name = entry['name']
+                save_time = entry.get('save_time', '')
+                mtime_str = datetime.fromtimestamp(entry['mtime_ns'] / 1e9).strftime("%Y-%m-%d %H:%M:%S")
                 if save_time:
                     try:
                         dt = datetime.fromisoformat(save_time)
                         date_str = dt.strftime("%Y-%m-%d %H:%M:%S")
                     except:
-                        date_str = datetime.fromtimestamp(project_file.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+                        date_str = mtime_str
                 else:
-                    date_str = datetime.fromtimestamp(project_file.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+                    date_str = mtime_str
                 
-                csv_path = project_info.get('csv_folder_path', '')
-                note = project_info.get('note', '')
+                csv_path = entry.get('csv_folder_path', '')
+                note = entry.get('note', '')
                 
                 # 显示格式：名称 | 日期 | CSV路径 | 备注
                 display_text = f"{name} | {date_str}"
@@ -172,43 +164,35 @@ class StartupProjectDialog(QDialog):
                     display_text += f" | {note}"
                 
                 item = QListWidgetItem(display_text)
-                item.setData(Qt.ItemDataRole.UserRole, str(project_file))
+                item.setData(Qt.ItemDataRole.UserRole, entry['path'])
                 self.project_list.addItem(item)
             except Exception as e:
-                print(f"读取项目信息失败 {project_file}: {e}")
+                print(f"读取项目信息失败 {entry.get('path')}: {e}")
                 continue
     
+    def _list_recent_projects(self, limit: int = 10) -> list:
+        """从项目索引获取最近项目；索引不可用时回退到逐个读取项目文件"""
+        catalog = self.project_save_manager.catalog
+        if catalog is not None:
+            try:
+                return catalog.list_projects(limit=limit)
+            except Exception as e:
+                print(f"读取项目索引失败，改为扫描项目目录: {e}")
+        
+        # 扫描项目目录，按修改时间排序
+        project_files = list(self.projects_dir.glob("*.json")) + list(self.projects_dir.glob("*.hdf5")) + list(self.projects_dir.glob("*.h5"))
+        project_files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+        entries = []
+        for project_file in project_files[:limit]:
+            st = project_file.stat()
+            entries.append({'path': str(project_file), 'name': project_file.stem,
+                            'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                            **self._read_project_info(project_file)})
+        return entries
+    
     def _read_project_info(self, project_file: Path) -> dict:
         """读取项目文件的基本信息"""
-        info = {}
-        
-        try:
-            if project_file.suffix.lower() == '.json':
-                with open(project_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    info['save_time'] = data.get('save_time', '')
-                    info['csv_folder_path'] = data.get('csv_folder_path', '')
-                    info['note'] = data.get('note', '')
-            else:
-                # HDF5 格式
-                try:
-                    import h5py
-                    with h5py.File(project_file, 'r') as f:
-                        info['save_time'] = f.attrs.get('save_time', '')
-                        if isinstance(info['save_time'], bytes):
-                            info['save_time'] = info['save_time'].decode('utf-8')
-                        info['csv_folder_path'] = f.attrs.get('csv_folder_path', '')
-                        if isinstance(info['csv_folder_path'], bytes):
-                            info['csv_folder_path'] = info['csv_folder_path'].decode('utf-8')
-                        info['note'] = f.attrs.get('note', '')
-                        if isinstance(info['note'], bytes):
-                            info['note'] = info['note'].decode('utf-8')
-                except ImportError:
-                    pass
-        except Exception as e:
-            print(f"读取项目文件失败: {e}")
-        
-        return info
+        return read_project_info(project_file)
     
     def _on_project_double_clicked(self, item):
         """双击项目时加载"""
@@ -316,6 +300,8 @@ class StartupProjectDialog(QDialog):
         if reply == QMessageBox.StandardButton.Yes:
             try:
                 os.remove(project_path)
+                if self.project_save_manager.catalog is not None:
+                    self.project_save_manager.catalog.remove(project_path)
                 # 刷新列表
                 self._load_recent_projects()
             except Exception as e:
@@ -0,0 +1,79 @@
+"""
+启动性能报告对话框
+显示启动各阶段耗时、后台预热状态与模块导入耗时（类似 python -X importtime）
+"""
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QComboBox
+)
+
+from src.utils import startup
+
+
+class StartupReportDialog(QDialog):
+    """启动性能报告（调试用）"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("启动性能报告")
+        self.resize(760, 620)
+        self._setup_ui()
+        self.refresh()
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+        self.summary_label.setStyleSheet("font-size: 10pt;")
+        layout.addWidget(self.summary_label)
+
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("排序:"))
+        self.sort_combo = QComboBox()
+        self.sort_combo.addItems(["累计耗时", "自身耗时"])
+        self.sort_combo.currentIndexChanged.connect(self.refresh)
+        control_layout.addWidget(self.sort_combo)
+        control_layout.addStretch()
+        refresh_btn = QPushButton("刷新")
+        refresh_btn.clicked.connect(self.refresh)
+        control_layout.addWidget(refresh_btn)
+        layout.addLayout(control_layout)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(4)
+        self.table.setHorizontalHeaderLabels(["模块", "累计 (ms)", "自身 (ms)", "线程"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for col in (1, 2, 3):
+            self.table.horizontalHeader().setSectionResizeMode(col, QHeaderView.ResizeMode.ResizeToContents)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.accept)
+        layout.addWidget(close_btn)
+
+    def refresh(self):
+        lines = []
+        for phase, seconds in startup.phases():
+            lines.append(f"{phase}: {seconds:.2f} s")
+        warmup = startup.warmup_state()
+        status_text = {'idle': '未开始', 'running': '进行中', 'finished': '已完成'}.get(warmup['status'], warmup['status'])
+        warmup_line = f"后台预热: {status_text}，已导入 {len(warmup['done'])} 个模块"
+        if warmup['status'] == 'finished':
+            warmup_line += f"，用时 {warmup['seconds']:.2f} s"
+        if warmup['failed']:
+            warmup_line += f"，失败: {', '.join(warmup['failed'])}"
+        lines.append(warmup_line)
+        if not startup.import_timer.installed:
+            lines.append("（导入耗时统计未启用：需通过 main.py 启动）")
+        self.summary_label.setText("<br>".join(lines))
+
+        key = 'cumulative_ms' if self.sort_combo.currentIndex() == 0 else 'self_ms'
+        records = startup.import_timer.top(200, key=key)
+        self.table.setRowCount(len(records))
+        for row, record in enumerate(records):
+            self.table.setItem(row, 0, QTableWidgetItem("  " * record['depth'] + record['module']))
+            self.table.setItem(row, 1, QTableWidgetItem(f"{record['cumulative_ms']:.1f}"))
+            self.table.setItem(row, 2, QTableWidgetItem(f"{record['self_ms']:.1f}"))
+            self.table.setItem(row, 3, QTableWidgetItem(record['thread']))
@@ -49,6 +49,8 @@ from src.utils.helpers import natural_sort_key, group_files_by_name
 from src.core.preprocessor import DataPreProcessor
 from src.core.generators import SyntheticDataGenerator
 from src.core.matcher import SpectralMatcher
+from src.core import two_dcos
+from src.core.two_dcos import TwoDCOSEngine
 from src.core.transformers import AutoencoderTransformer, NonNegativeTransformer, AdaptiveMineralFilter
 from src.ui.widgets.custom_widgets import CollapsibleGroupBox, SmartDoubleSpinBox
 from src.ui.canvas import MplCanvas
@@ -161,6 +163,23 @@ class TwoDCOSWindow(QDialog):
         gaussian_widget.setLayout(gaussian_layout)
         control_layout.addRow("高斯平滑:", gaussian_widget)
         
+        # 移动窗口 2D-COS（沿扰动方向的 MW2D / PCMW2D）
+        moving_layout = QHBoxLayout()
+        self.moving_window_spin = QSpinBox()
+        self.moving_window_spin.setRange(3, 999)
+        self.moving_window_spin.setValue(5)
+        self.moving_window_spin.setToolTip("窗口大小（组数，建议取奇数）；扰动值从组名中解析（如 25mg → 25），无法解析时按组序号")
+        self.btn_moving_window = QPushButton("MW2D / PCMW2D 图")
+        self.btn_moving_window.setToolTip("沿扰动方向滑动窗口，绘制 扰动-波数 图（MW2D 自相关、PCMW2D 同步/异步）")
+        self.btn_moving_window.clicked.connect(self.open_moving_window_plot)
+        moving_layout.addWidget(QLabel("窗口大小:"))
+        moving_layout.addWidget(self.moving_window_spin)
+        moving_layout.addWidget(self.btn_moving_window)
+        moving_layout.addStretch()
+        moving_widget = QWidget()
+        moving_widget.setLayout(moving_layout)
+        control_layout.addRow("移动窗口 2D-COS:", moving_widget)
+        
         # 最敏感有机物波段文本框
         self.sensitive_bands_text = QTextEdit()
         self.sensitive_bands_text.setReadOnly(True)
@@ -195,8 +214,9 @@ class TwoDCOSWindow(QDialog):
         self.peak_wavenumbers = None  # 峰值对应的波数
         self.peak_intensities = None  # 峰值强度
         self.current_wavenumbers_roi = None  # 当前ROI的波数数组
-        self.current_Phi = None  # 当前同步相关矩阵
-        self.current_Psi = None  # 当前异步相关矩阵
+        self.current_Phi = None  # 当前同步相关矩阵（CorrelationMap，float32 分块存储）
+        self.current_Psi = None  # 当前异步相关矩阵（CorrelationMap，float32 分块存储）
+        self._cos_engine = TwoDCOSEngine()  # 按 数据 + ROI + 平滑参数 缓存相关谱
         self.current_y_representative = None  # 当前代表性光谱
         self.selected_ref_peak_wavenumber = None  # 用户选择的参考峰波数（用于恢复选择）
         
@@ -210,6 +230,8 @@ class TwoDCOSWindow(QDialog):
         
         # 边缘分布图窗口
         self._marginal_plot_window = None
+        # 移动窗口 2D-COS 窗口
+        self._moving_window_plot = None
         
     def set_data(self, X_matrix, wavenumbers, group_names):
         """
@@ -223,6 +245,7 @@ class TwoDCOSWindow(QDialog):
         self.X_matrix = X_matrix
         self.wavenumbers = wavenumbers
         self.group_names = group_names
+        self._cos_engine.set_data(X_matrix, wavenumbers)
         
         # 自动设置 ROI 范围（如果未设置）
         if not self.roi_min_input.text() or not self.roi_max_input.text():
@@ -244,36 +267,20 @@ class TwoDCOSWindow(QDialog):
             roi_min = min(raw_min, raw_max)
             roi_max = max(raw_min, raw_max)
             
-            # 应用 ROI 截断
-            mask = (self.wavenumbers >= roi_min) & (self.wavenumbers <= roi_max)
-            wavenumbers_roi = self.wavenumbers[mask]
-            X_roi = self.X_matrix[:, mask]
-            
-            if X_roi.shape[1] == 0:
-                QMessageBox.warning(self, "错误", "ROI范围内无数据点")
-                return
-            
-            # 计算动态光谱
-            y_mean = np.mean(X_roi, axis=0)
-            y_tilde = X_roi - y_mean[np.newaxis, :]
-            n = y_tilde.shape[0]
-            if n < 2:
-                QMessageBox.warning(self, "错误", "组数不足（至少需要2组）")
+            # 同步/异步相关谱（按 数据 + ROI + 平滑参数 缓存；只改等高线层数等绘图参数时不重新计算）
+            sigma = self.gaussian_smooth_sigma_spin.value() if self.gaussian_smooth_check.isChecked() else None
+            try:
+                result = self._cos_engine.compute(self.X_matrix, self.wavenumbers, roi_min, roi_max, sigma=sigma)
+            except ValueError as e:
+                QMessageBox.warning(self, "错误", str(e))
                 return
-            
-            Phi = (1.0 / (n - 1)) * y_tilde.T @ y_tilde  # 同步
-            
-            # Hilbert 变换计算异步
-            from scipy.signal import hilbert
-            from scipy.ndimage import gaussian_filter
-            y_hilbert = hilbert(y_tilde, axis=0)
-            N = np.imag(y_hilbert)
-            Psi = (1.0 / (n - 1)) * y_tilde.T @ N
-            
-            # 高斯平滑 (去噪)
-            if self.gaussian_smooth_check.isChecked():
-                sigma = self.gaussian_smooth_sigma_spin.value()
-                Psi = gaussian_filter(Psi, sigma=sigma)
+            wavenumbers_roi = result.wavenumbers_roi
+            X_roi = result.X_roi
+            Phi = result.Phi
+            Psi = result.Psi
+            # 显示分辨率的图（完整矩阵的块平均），用 imshow 绘制
+            x_disp, Phi_disp, Psi_disp = result.display_maps()
+            extent = self._map_extent(x_disp)
             
             # 清除现有图
             self.figure.clear()
@@ -294,17 +301,14 @@ class TwoDCOSWindow(QDialog):
             ax2.set_box_aspect(1)
             
             # 等高线层数
-            n_levels = self.contour_levels_spin.value()
+            n_levels = max(2, self.contour_levels_spin.value())
             
             # 绘制同步图
-            vmax_sync = np.max(np.abs(Phi))
+            vmax_sync = two_dcos.max_abs(Phi) or 1.0
             vmin_sync = -vmax_sync
             levels_sync = np.linspace(vmin_sync, vmax_sync, n_levels)
             
-            contour1 = ax1.contourf(wavenumbers_roi, wavenumbers_roi, Phi, 
-                                   levels=levels_sync, cmap='RdBu_r', extend='both')
-            ax1.contour(wavenumbers_roi, wavenumbers_roi, Phi, 
-                       levels=levels_sync, colors='black', linewidths=0.5, alpha=0.3)
+            contour1 = self._draw_map(ax1, x_disp, Phi_disp, extent, levels_sync, 'RdBu_r')
             
             # 绘制主对角线（x=y）
             ax1.plot([roi_min, roi_max], [roi_min, roi_max], 
@@ -325,14 +329,11 @@ class TwoDCOSWindow(QDialog):
             self._apply_publication_style(ax1)
             
             # 绘制异步图
-            vmax_async = np.max(np.abs(Psi))
+            vmax_async = two_dcos.max_abs(Psi) or 1.0
             vmin_async = -vmax_async
             levels_async = np.linspace(vmin_async, vmax_async, n_levels)
             
-            contour2 = ax2.contourf(wavenumbers_roi, wavenumbers_roi, Psi, 
-                                   levels=levels_async, cmap='seismic', extend='both')
-            ax2.contour(wavenumbers_roi, wavenumbers_roi, Psi, 
-                       levels=levels_async, colors='black', linewidths=0.5, alpha=0.3)
+            contour2 = self._draw_map(ax2, x_disp, Psi_disp, extent, levels_async, 'seismic')
             
             # 绘制主对角线（x=y）
             ax2.plot([roi_min, roi_max], [roi_min, roi_max], 
@@ -394,14 +395,62 @@ class TwoDCOSWindow(QDialog):
             self.figure.tight_layout(rect=[0, 0.03, 1, 0.92])
             self.canvas.draw()
             
-            # 如果有参考光谱，打开边缘分布图窗口（在布局调整之后）
+            # 如果有参考光谱，打开边缘分布图窗口（在布局调整之后，使用显示分辨率的异步图）
             if has_ref_spectrum:
-                self._open_marginal_plot_window(wavenumbers_roi, Phi, Psi, y_representative)
+                self._open_marginal_plot_window(x_disp, Phi_disp, Psi_disp, y_representative)
             
         except Exception as e:
             QMessageBox.critical(self, "错误", f"更新2D-COS图时出错：{str(e)}")
             traceback.print_exc()
     
+    def _current_roi(self):
+        """当前 ROI 范围（输入为空时使用全部波数）"""
+        raw_min = float(self.roi_min_input.text()) if self.roi_min_input.text() else np.min(self.wavenumbers)
+        raw_max = float(self.roi_max_input.text()) if self.roi_max_input.text() else np.max(self.wavenumbers)
+        return min(raw_min, raw_max), max(raw_min, raw_max)
+    
+    def open_moving_window_plot(self):
+        """计算（或取缓存）MW2D / PCMW2D 并在单独窗口中显示"""
+        if self.X_matrix is None or self.wavenumbers is None:
+            QMessageBox.warning(self, "提示", "请先运行 2D-COS 分析")
+            return
+        try:
+            roi_min, roi_max = self._current_roi()
+            perturbation = two_dcos.perturbation_values(self.group_names)
+            result = self._cos_engine.moving_window(self.X_matrix, self.wavenumbers, roi_min, roi_max,
+                                                    self.moving_window_spin.value(), perturbation)
+        except ValueError as e:
+            QMessageBox.warning(self, "错误", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"移动窗口 2D-COS 计算失败：{str(e)}")
+            traceback.print_exc()
+            return
+        
+        if self._moving_window_plot is None:
+            self._moving_window_plot = TwoDCOSMovingWindowPlot(self)
+        self._moving_window_plot.set_result(result, max(2, self.contour_levels_spin.value()))
+        self._moving_window_plot.show()
+        self._moving_window_plot.raise_()
+    
+    @staticmethod
+    def _map_extent(x_disp):
+        """imshow 的 extent：像素中心位于 x_disp（首尾各扩展半个像素）"""
+        half = (x_disp[-1] - x_disp[0]) / (2 * (len(x_disp) - 1)) if len(x_disp) > 1 else 0.5
+        return [x_disp[0] - half, x_disp[-1] + half, x_disp[0] - half, x_disp[-1] + half]
+    
+    @staticmethod
+    def _draw_map(ax, x_disp, Z, extent, levels, cmap, contour_lines=True):
+        """用 imshow 绘制分级着色的相关图，并叠加等高线（均基于显示分辨率的矩阵）"""
+        from matplotlib.colors import BoundaryNorm
+        cmap_obj = plt.get_cmap(cmap)
+        norm = BoundaryNorm(levels, ncolors=cmap_obj.N, extend='both')
+        image = ax.imshow(Z, extent=extent, origin='lower', cmap=cmap_obj, norm=norm,
+                          aspect='auto', interpolation='nearest')
+        if contour_lines and len(x_disp) > 1:
+            ax.contour(x_disp, x_disp, Z, levels=levels, colors='black', linewidths=0.5, alpha=0.3)
+        return image
+    
     def _detect_peaks_and_update_combo(self, wavenumbers, y_representative):
         """
         检测峰值并更新参考峰选择下拉框
@@ -662,8 +711,8 @@ class TwoDCOSWindow(QDialog):
         
         Args:
             wavenumbers: 波数数组
-            Phi: 同步相关矩阵 (n_wavenumbers, n_wavenumbers)
-            Psi: 异步相关矩阵 (n_wavenumbers, n_wavenumbers)
+            Phi: 同步相关矩阵 (n_wavenumbers, n_wavenumbers)，ndarray 或 CorrelationMap
+            Psi: 异步相关矩阵 (n_wavenumbers, n_wavenumbers)，ndarray 或 CorrelationMap
             y_representative: 代表性光谱数组（用于峰值检测），如果为 None 则跳过
             ref_peak_idx_in_peaks: 参考峰在 peak_indices 中的索引（如果为 None，则使用最强峰）
         """
@@ -704,6 +753,14 @@ class TwoDCOSWindow(QDialog):
                 ref_wavenumber = peak_wavenumbers[max_intensity_idx]
                 ref_intensity = peak_intensities[max_intensity_idx]
             
+            # 噪声阈值（从UI控件读取，相对于最大相关强度）
+            threshold_factor = self.noise_threshold_spin.value()
+            threshold = threshold_factor * max(two_dcos.max_abs(Phi), two_dcos.max_abs(Psi))
+            
+            # 参考峰所在列（CorrelationMap 只读取需要的分块）
+            phi_ref = Phi[:, ref_idx_in_peaks] if isinstance(Phi, np.ndarray) else Phi.column(ref_idx_in_peaks)
+            psi_ref = Psi[:, ref_idx_in_peaks] if isinstance(Psi, np.ndarray) else Psi.column(ref_idx_in_peaks)
+            
             # C. 应用 Noda 规则进行排序
             earlier_peaks = []  # 早于参考峰的峰（更灵敏）
             later_peaks = []   # 晚于参考峰的峰
@@ -714,13 +771,10 @@ class TwoDCOSWindow(QDialog):
                     continue  # 跳过参考峰本身
                 
                 # 读取同步强度和异步强度
-                phi_val = Phi[peak_idx, ref_idx_in_peaks]
-                psi_val = Psi[peak_idx, ref_idx_in_peaks]
-                
-                # 排除太小的值（噪声）- 从UI控件读取阈值
-                threshold_factor = self.noise_threshold_spin.value()
-                threshold = threshold_factor * max(np.max(np.abs(Phi)), np.max(np.abs(Psi)))
+                phi_val = phi_ref[peak_idx]
+                psi_val = psi_ref[peak_idx]
                 
+                # 排除太小的值（噪声）
                 if np.abs(phi_val) > threshold and np.abs(psi_val) > threshold:
                     wavenumber = peak_wavenumbers[i]
                     intensity_psi = psi_val
@@ -966,8 +1020,10 @@ class TwoDCOSMarginalPlotWindow(QDialog):
             if vmax_async == 0: vmax_async = 1.0
             levels_async = np.linspace(-vmax_async, vmax_async, 20)
             
-            contour = ax_main.contourf(self.wavenumbers_roi, self.wavenumbers_roi, self.Psi, 
-                                   levels=levels_async, cmap='seismic', extend='both')
+            # 异步图为显示分辨率的矩阵（由主窗口传入），imshow 绘制
+            contour = TwoDCOSWindow._draw_map(ax_main, self.wavenumbers_roi, self.Psi,
+                                              TwoDCOSWindow._map_extent(self.wavenumbers_roi),
+                                              levels_async, 'seismic', contour_lines=False)
             
             # 绘制对角线
             ax_main.plot([x_min, x_max], [x_min, x_max], 'k--', linewidth=1.0, alpha=0.5)
@@ -1030,3 +1086,57 @@ class TwoDCOSMarginalPlotWindow(QDialog):
             traceback.print_exc()
 
 
+class TwoDCOSMovingWindowPlot(QDialog):
+    """移动窗口 2D-COS 窗口：MW2D 自相关、PCMW2D 同步/异步的 扰动-波数 图"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Moving-Window 2D-COS (MW2D / PCMW2D)")
+        self.setWindowFlags(
+            Qt.WindowType.Window |
+            Qt.WindowType.WindowMinimizeButtonHint |
+            Qt.WindowType.WindowMaximizeButtonHint |
+            Qt.WindowType.WindowCloseButtonHint
+        )
+        self.resize(1400, 520)
+        self.main_layout = QVBoxLayout(self)
+        from matplotlib.figure import Figure
+        self.figure = Figure(figsize=(15, 5), dpi=100)
+        self.canvas = FigureCanvas(self.figure)
+        self.toolbar = NavigationToolbar(self.canvas, self)
+        self.main_layout.addWidget(self.toolbar)
+        self.main_layout.addWidget(self.canvas)
+        self.result = None
+    
+    def set_result(self, result, n_levels=20, max_points=two_dcos.DEFAULT_DISPLAY_POINTS):
+        """绘制 MovingWindowResult（沿波数方向块平均到显示分辨率）"""
+        self.result = result
+        try:
+            self.figure.clear()
+            x_disp, _ = two_dcos.block_average(np.asarray(result.wavenumbers_roi, dtype=np.float64), max_points)
+            panels = [
+                (result.mw2d, "MW2D (Autocorrelation)", 'viridis', False),
+                (result.pc_sync, "PCMW2D Synchronous", 'RdBu_r', True),
+                (result.pc_async, "PCMW2D Asynchronous", 'seismic', True),
+            ]
+            for i, (Z, title, cmap, symmetric) in enumerate(panels, 1):
+                Z_disp, _ = two_dcos.block_average(Z, max_points)
+                ax = self.figure.add_subplot(1, 3, i)
+                vmax = float(np.max(np.abs(Z_disp))) or 1.0
+                vmin = -vmax if symmetric else float(np.min(Z_disp))
+                mesh = ax.pcolormesh(x_disp, result.perturbation, Z_disp, cmap=cmap,
+                                     vmin=vmin, vmax=vmax, shading='nearest')
+                if Z_disp.shape[0] > 1 and Z_disp.shape[1] > 1:
+                    ax.contour(x_disp, result.perturbation, Z_disp, levels=np.linspace(vmin, vmax, n_levels),
+                               colors='black', linewidths=0.4, alpha=0.3)
+                if x_disp[0] < x_disp[-1]:
+                    ax.invert_xaxis()
+                ax.set_xlabel("Wavenumber (cm⁻¹)", fontfamily='Times New Roman', fontsize=13)
+                ax.set_ylabel("Perturbation", fontfamily='Times New Roman', fontsize=13)
+                ax.set_title(title, fontfamily='Times New Roman', fontsize=14, fontweight='bold')
+                self.figure.colorbar(mesh, ax=ax)
+            self.figure.suptitle(f"Window = {result.window}", fontfamily='Times New Roman', fontsize=12)
+            self.figure.tight_layout(rect=[0, 0, 1, 0.95])
+            self.canvas.draw()
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"绘制移动窗口 2D-COS 时出错：{str(e)}")
+            traceback.print_exc()
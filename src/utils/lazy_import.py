@@ -72,3 +72,44 @@ sklearn_decomposition = lazy_import('sklearn.decomposition')
 sklearn_neural_network = lazy_import('sklearn.neural_network')
 sklearn_base = lazy_import('sklearn.base')
 
+
+
+class LazyAttribute:
+    """
+    延迟解析的模块属性（类/函数）
+    首次调用或访问属性时才导入所在模块，适用于只会被调用（实例化）的类，
+    不适用于 isinstance 检查或作为基类。
+    """
+    
+    def __init__(self, module_name: str, attr_name: str):
+        self._module_name = module_name
+        self._attr_name = attr_name
+        self._target: Optional[Any] = None
+    
+    def resolve(self) -> Any:
+        """导入模块并返回真实对象"""
+        if self._target is None:
+            module = __import__(self._module_name, fromlist=[self._attr_name])
+            self._target = getattr(module, self._attr_name)
+        return self._target
+    
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+    
+    def __getattr__(self, name: str):
+        return getattr(self.resolve(), name)
+    
+    def __repr__(self):
+        state = "resolved" if self._target is not None else "deferred"
+        return f"<LazyAttribute {self._module_name}.{self._attr_name} ({state})>"
+
+
+def lazy_attr(module_name: str, attr_name: str) -> LazyAttribute:
+    """
+    延迟导入模块中的某个属性
+    
+    Example:
+        TwoDCOSWindow = lazy_attr('src.ui.windows.two_dcos_window', 'TwoDCOSWindow')
+        win = TwoDCOSWindow(parent)  # 此时才导入 two_dcos_window
+    """
+    return LazyAttribute(module_name, attr_name)
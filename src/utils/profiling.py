@@ -0,0 +1,229 @@
+"""
+性能分析（耗时区间 + 计数器）
+
+核心模块与窗口向全局 profiler 报告：
+- span(name, **args)：嵌套计时区间（with 语句），按线程维护调用栈，记录总耗时与自身耗时（扣除子区间）
+- timed(name)：函数装饰器，等价于用 span 包住整个函数体
+- count(name, n=1)：计数器（已解析文件数、缓存命中/未命中、NNLS 求解次数等）
+
+开关：环境变量 SPECTRA_PROFILE=1 启动即开启，或在“帮助 → 性能面板”中勾选。
+关闭时 span() 返回共享的空上下文、count() 直接返回，开销只有一次属性判断。
+
+导出：
+- export_json(path)：汇总表 + 计数器 + 原始事件
+- export_chrome_trace(path)：Chrome Trace Event 格式，可在 chrome://tracing 或 https://ui.perfetto.dev 中打开
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+ENV_VAR = 'SPECTRA_PROFILE'
+DEFAULT_MAX_EVENTS = 200000
+
+
+class _NullSpan:
+    """关闭时使用的空上下文"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'args', 'start', 'children')
+
+    def __init__(self, profiler: 'Profiler', name: str, args: Optional[Dict[str, Any]]):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.start = 0.0
+        self.children = 0.0
+
+    def __enter__(self):
+        self.profiler._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        stack = self.profiler._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        duration = end - self.start
+        if stack:
+            stack[-1].children += duration
+        self.profiler._record(self, duration, len(stack))
+        return False
+
+
+class Profiler:
+    """全局性能分析器（线程安全）"""
+
+    def __init__(self, enabled: Optional[bool] = None, max_events: int = DEFAULT_MAX_EVENTS):
+        if enabled is None:
+            enabled = os.environ.get(ENV_VAR, '0').strip().lower() in ('1', 'true', 'on', 'yes')
+        self.enabled = bool(enabled)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        self._events = deque(maxlen=max_events)
+        self._stats: Dict[str, List[float]] = {}     # name -> [count, total, self_total, min, max]
+        self._counters: Dict[str, float] = {}
+        self._thread_names: Dict[int, str] = {}
+
+    # ---------------- 开关
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def set_enabled(self, enabled: bool):
+        self.enabled = bool(enabled)
+
+    def reset(self):
+        with self._lock:
+            self._origin = time.perf_counter()
+            self._events.clear()
+            self._stats.clear()
+            self._counters.clear()
+            self._thread_names.clear()
+
+    # ---------------- 记录
+    def span(self, name: str, **args):
+        """计时区间：with profiler.span('nmf.fit', k=3): ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args or None)
+
+    def timed(self, name: Optional[str] = None) -> Callable:
+        """函数装饰器（关闭时只多一次判断）"""
+        def decorator(fn):
+            label = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def wrapper(*a, **kw):
+                if not self.enabled:
+                    return fn(*a, **kw)
+                with _Span(self, label, None):
+                    return fn(*a, **kw)
+            return wrapper
+        return decorator
+
+    def count(self, name: str, n: float = 1):
+        if not self.enabled:
+            return
+        ts = time.perf_counter()
+        with self._lock:
+            value = self._counters.get(name, 0) + n
+            self._counters[name] = value
+            self._events.append(('C', name, ts - self._origin, value, threading.get_ident()))
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, span: _Span, duration: float, depth: int):
+        self_time = duration - span.children
+        tid = threading.get_ident()
+        with self._lock:
+            if tid not in self._thread_names:
+                self._thread_names[tid] = threading.current_thread().name
+            stats = self._stats.get(span.name)
+            if stats is None:
+                self._stats[span.name] = [1, duration, self_time, duration, duration]
+            else:
+                stats[0] += 1
+                stats[1] += duration
+                stats[2] += self_time
+                if duration < stats[3]:
+                    stats[3] = duration
+                if duration > stats[4]:
+                    stats[4] = duration
+            self._events.append(('X', span.name, span.start - self._origin, duration, tid, depth, span.args))
+
+    # ---------------- 查询
+    def summary(self, sort_key: str = 'total') -> List[Dict[str, Any]]:
+        """各区间汇总：[{'name','count','total','self','mean','min','max'}]（秒），按 sort_key 降序"""
+        with self._lock:
+            items = [(name, list(v)) for name, v in self._stats.items()]
+        rows = [{'name': name, 'count': int(c), 'total': total, 'self': self_total,
+                 'mean': total / c if c else 0.0, 'min': mn, 'max': mx}
+                for name, (c, total, self_total, mn, mx) in items]
+        rows.sort(key=lambda r: r.get(sort_key, 0), reverse=True)
+        return rows
+
+    def counters(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def report(self, top: int = 20) -> str:
+        """文本报告（控制台打印用）"""
+        lines = [f"{'区间':<40} {'次数':>8} {'总计(ms)':>12} {'自身(ms)':>12} {'平均(ms)':>10}"]
+        for r in self.summary()[:top]:
+            lines.append(f"{r['name']:<40} {r['count']:>8} {r['total'] * 1e3:>12.2f} "
+                         f"{r['self'] * 1e3:>12.2f} {r['mean'] * 1e3:>10.3f}")
+        for name, value in sorted(self.counters().items()):
+            lines.append(f"[计数] {name}: {value:g}")
+        return "\n".join(lines)
+
+    # ---------------- 导出
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            events = list(self._events)
+        return {
+            'enabled': self.enabled,
+            'spans': self.summary(),
+            'counters': self.counters(),
+            'events': [
+                {'type': 'span', 'name': e[1], 'start': e[2], 'duration': e[3], 'thread': e[4], 'depth': e[5],
+                 'args': e[6] or {}} if e[0] == 'X' else
+                {'type': 'counter', 'name': e[1], 'time': e[2], 'value': e[3], 'thread': e[4]}
+                for e in events
+            ],
+        }
+
+    def export_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1, default=repr)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Chrome Trace Event 格式（ts/dur 为微秒）"""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        trace = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                 for tid, name in thread_names.items()]
+        for e in events:
+            if e[0] == 'X':
+                item = {'name': e[1], 'ph': 'X', 'ts': e[2] * 1e6, 'dur': e[3] * 1e6, 'pid': pid, 'tid': e[4]}
+                if e[6]:
+                    item['args'] = {k: (v if isinstance(v, (int, float, str, bool)) else repr(v))
+                                    for k, v in e[6].items()}
+                trace.append(item)
+            else:
+                trace.append({'name': e[1], 'ph': 'C', 'ts': e[2] * 1e6, 'pid': pid, 'args': {'value': e[3]}})
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+profiler = Profiler()
+span = profiler.span
+timed = profiler.timed
+count = profiler.count
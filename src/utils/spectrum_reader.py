@@ -0,0 +1,62 @@
+"""
+两列光谱文件读取（X, Y）：跳过头部行 + 按物理 X 范围截断
+
+不依赖界面，可在进程池子任务中调用（如 peak_fitting.fit_folder）；
+界面侧的 DataController.read_data 也委托给这里。
+"""
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.skip_rows_detector import SkipRowsDetector
+
+
+def read_spectrum(file_path: str, skip_rows: int = -1, x_min_phys: Optional[float] = None,
+                  x_max_phys: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    读取单个光谱文件并按物理范围截断
+
+    Args:
+        file_path: 文件路径
+        skip_rows: 读取时跳过的头部行数（-1 表示自动检测第一个数字数据行）
+        x_min_phys: 物理下限
+        x_max_phys: 物理上限
+
+    Returns:
+        (x, y) 截断后的波数与强度（X 降序）
+
+    Raises:
+        ValueError: 数据列不足 2 列或范围内无数据
+    """
+    if skip_rows == -1:
+        skip_rows = SkipRowsDetector.detect_skip_rows(file_path)
+
+    try:
+        df = pd.read_csv(file_path, header=None, skiprows=skip_rows, sep=None, engine='python')
+    except Exception:
+        df = pd.read_csv(file_path, header=None, skiprows=skip_rows)
+
+    if df.shape[1] < 2:
+        raise ValueError("数据列不足2列")
+
+    x = df.iloc[:, 0].values.astype(float)
+    y = df.iloc[:, 1].values.astype(float)
+
+    # 强制 X 降序 (Wavenumber 高->低)
+    if len(x) > 1 and x[0] < x[-1]:
+        x = x[::-1]
+        y = y[::-1]
+
+    # 物理截断
+    mask = np.ones_like(x, dtype=bool)
+    if x_min_phys is not None:
+        mask &= (x >= x_min_phys)
+    if x_max_phys is not None:
+        mask &= (x <= x_max_phys)
+
+    if not np.any(mask):
+        raise ValueError(f"文件 {os.path.basename(file_path)} 在 X-Range [{x_min_phys}-{x_max_phys}] 内无数据。")
+
+    return x[mask], y[mask]
@@ -0,0 +1,170 @@
+"""
+启动性能：导入耗时统计、启动阶段计时与后台预热
+
+- ImportTimer：sys.meta_path 钩子，记录每个模块的导入耗时（自身/累计，类似 python -X importtime）
+- mark(phase)：记录启动阶段时间点（相对进程启动）
+- start_warmup()：主窗口显示后在后台线程预先导入延迟加载的重型模块（sklearn、torch、大型分析窗口），
+  用户首次打开相应功能时无需再等待导入
+"""
+import importlib
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+_T0 = time.perf_counter()
+
+# 主窗口延迟导入、显示后在后台预热的模块（按依赖顺序，先底层库再窗口）
+DEFERRED_MODULES = (
+    'sklearn.decomposition',
+    'sklearn.pipeline',
+    'src.core.transformers',  # 依赖 torch（若已安装）
+    'src.ui.windows.two_dcos_window',
+    'src.ui.windows.quantitative_window',
+    'src.ui.windows.nmf_validation_window',
+    'src.ui.windows.nmf_study_window',
+    'src.ui.windows.raman_map_window',
+    'src.ui.windows.performance_panel',
+    'src.ui.windows.classification_window',
+    'src.ui.windows.dae_window',
+    'src.ui.windows.batch_plot_window',
+    'src.ui.windows.style_matching_window',
+)
+
+
+class ImportTimer:
+    """
+    记录模块导入耗时的 meta path 钩子
+    只包装 loader.exec_module（模块体执行），查找耗时不计入；嵌套导入从父模块的自身耗时中扣除。
+    """
+
+    def __init__(self):
+        self.records: List[Dict] = []  # 按完成顺序：{'module', 'self_ms', 'cumulative_ms', 'depth', 'thread'}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._finder = None
+
+    @property
+    def installed(self) -> bool:
+        return self._finder is not None
+
+    def install(self):
+        if self._finder is not None:
+            return
+        timer = self
+
+        class _TimingFinder:
+            @staticmethod
+            def find_spec(fullname, path=None, target=None):
+                # 交给其余 finder 查找，只包装找到的 loader
+                for finder in sys.meta_path:
+                    if finder is _TimingFinder or not hasattr(finder, 'find_spec'):
+                        continue
+                    spec = finder.find_spec(fullname, path, target)
+                    if spec is not None:
+                        timer._wrap_loader(spec)
+                        return spec
+                return None
+
+        self._finder = _TimingFinder
+        sys.meta_path.insert(0, _TimingFinder)
+
+    def uninstall(self):
+        if self._finder is not None and self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self._finder = None
+
+    def _wrap_loader(self, spec):
+        loader = spec.loader
+        # 类级别的 loader（内置/冻结模块）无法按实例包装，跳过
+        if loader is None or isinstance(loader, type) or not hasattr(loader, 'exec_module'):
+            return
+        original = loader.exec_module
+        name = spec.name
+        timer = self
+
+        def exec_module(module):
+            stack = getattr(timer._local, 'stack', None)
+            if stack is None:
+                stack = timer._local.stack = []
+            stack.append(0.0)  # 子模块累计耗时
+            start = time.perf_counter()
+            try:
+                return original(module)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                with timer._lock:
+                    timer.records.append({
+                        'module': name,
+                        'self_ms': (elapsed - children) * 1000.0,
+                        'cumulative_ms': elapsed * 1000.0,
+                        'depth': len(stack),
+                        'thread': threading.current_thread().name,
+                    })
+
+        try:
+            loader.exec_module = exec_module
+        except (AttributeError, TypeError):
+            pass
+
+    def top(self, n: int = 50, key: str = 'cumulative_ms') -> List[Dict]:
+        with self._lock:
+            records = list(self.records)
+        return sorted(records, key=lambda r: r[key], reverse=True)[:n]
+
+
+import_timer = ImportTimer()
+_phases: List[tuple] = []  # (阶段名称, 相对启动的秒数)
+_warmup_state = {'status': 'idle', 'done': [], 'failed': {}, 'seconds': 0.0}
+
+
+def mark(phase: str):
+    """记录启动阶段时间点"""
+    elapsed = time.perf_counter() - _T0
+    _phases.append((phase, elapsed))
+    print(f"[启动] {phase}: {elapsed:.2f} s")
+
+
+def phases() -> List[tuple]:
+    return list(_phases)
+
+
+def warmup_state() -> Dict:
+    return {
+        'status': _warmup_state['status'],
+        'done': list(_warmup_state['done']),
+        'failed': dict(_warmup_state['failed']),
+        'seconds': _warmup_state['seconds'],
+    }
+
+
+def _warmup(modules):
+    _warmup_state['status'] = 'running'
+    start = time.perf_counter()
+    for name in modules:
+        if name in sys.modules:
+            _warmup_state['done'].append(name)
+            continue
+        try:
+            importlib.import_module(name)
+            _warmup_state['done'].append(name)
+        except Exception as e:
+            _warmup_state['failed'][name] = str(e)
+    _warmup_state['seconds'] = time.perf_counter() - start
+    _warmup_state['status'] = 'finished'
+    print(f"[启动] 后台预热完成: {len(_warmup_state['done'])} 个模块, 用时 {_warmup_state['seconds']:.2f} s")
+
+
+def start_warmup(modules=DEFERRED_MODULES) -> Optional[threading.Thread]:
+    """
+    在后台线程导入延迟加载的模块（只执行模块导入，不创建任何窗口/控件）
+    若用户在预热完成前打开对应功能，导入锁保证其等待同一次导入完成，不会重复导入。
+    """
+    if _warmup_state['status'] != 'idle':
+        return None
+    thread = threading.Thread(target=_warmup, args=(tuple(modules),), name="startup-warmup", daemon=True)
+    thread.start()
+    return thread
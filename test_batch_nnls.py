@@ -0,0 +1,58 @@
+"""
+批量 NNLS 测试脚本
+与逐行 scipy.optimize.nnls 对比，覆盖原始计数量级（×1e3）的输入
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+from scipy.optimize import nnls
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.core.batch_nnls import batch_nnls
+
+
+def _check_parity(scale, seed=0, n_trials=10):
+    """H、X 同乘 scale 后，batch_nnls（冷启动与热启动）与逐行 nnls 的最大相对误差"""
+    rng = np.random.default_rng(seed)
+    worst = 0.0
+    for _ in range(n_trials):
+        k = int(rng.integers(2, 8))
+        H = rng.random((k, 200)) * scale
+        W_true = np.maximum(rng.normal(1.0, 1.5, (30, k)), 0.0)
+        X = W_true @ H + rng.normal(0.0, 0.05 * scale, (30, 200))
+        reference = np.array([nnls(H.T, x)[0] for x in X])
+        norm = max(float(np.abs(reference).max()), 1e-300)
+        W, _ = batch_nnls(H, X)
+        worst = max(worst, float(np.abs(W - reference).max()) / norm)
+        W_warm, _ = batch_nnls(H, X, W0=reference * 1.01)
+        worst = max(worst, float(np.abs(W_warm - reference).max()) / norm)
+    return worst
+
+
+def test_batch_nnls_matches_scipy():
+    """单位量级输入"""
+    assert _check_parity(1.0) < 1e-8
+
+
+def test_batch_nnls_matches_scipy_scaled():
+    """原始拉曼计数量级（×1e3）：权重不能被容差清零"""
+    assert _check_parity(1e3) < 1e-8
+
+
+def test_batch_nnls_unnormalized_targets():
+    """H 归一化、X 为大计数（权重 ~1e3）"""
+    rng = np.random.default_rng(1)
+    H = rng.random((4, 300))
+    X = rng.random((20, 4)) * 1e3 @ H
+    W, _ = batch_nnls(H, X)
+    reference = np.array([nnls(H.T, x)[0] for x in X])
+    assert np.abs(W - reference).max() / np.abs(reference).max() < 1e-8
+
+
+if __name__ == "__main__":
+    for scale in (1.0, 1e2, 1e3, 1e4):
+        print(f"scale={scale:g}: 最大相对误差 {_check_parity(scale):.2e}")
@@ -0,0 +1,56 @@
+"""
+增量 NMF 测试脚本
+在单位量级与原始计数量级（×1e3）的合成数据上验证 WARM_START_RTOL / MINIBATCH_RTOL
+"""
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.core.incremental_nmf import warm_start_nmf, minibatch_nmf, WARM_START_RTOL, MINIBATCH_RTOL
+
+
+def _relative_errors(scale, seed=0):
+    """(热启动, 小批量更新) 相对于收敛冷启动的重构误差增幅：前 300 条为上一次模型，新增 100 条"""
+    from sklearn.decomposition import NMF
+
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0.0, 1.0, 800)
+    H_true = np.array([np.exp(-((x - c) / 0.02) ** 2) for c in (0.2, 0.45, 0.7)]) + 0.05
+    X = (rng.random((400, 3)) * 2.0 @ H_true + 0.02 * rng.random((400, 800))) * scale
+    labels = [f's{i}' for i in range(400)]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        prev_model = NMF(3, init='nndsvda', max_iter=2000, tol=1e-7, random_state=0)
+        W_prev = prev_model.fit_transform(X[:300])
+        previous = {'W': W_prev, 'H': prev_model.components_, 'sample_labels': labels[:300]}
+        cold = NMF(3, init='nndsvda', max_iter=2000, tol=1e-7, random_state=0).fit(X)
+        _, _, warm_info = warm_start_nmf(X, labels, previous)
+        W, _, _, mb_info = minibatch_nmf(X, labels, 3, previous=previous)
+    assert np.any(W > 0)
+    cold_err = cold.reconstruction_err_
+    return warm_info['reconstruction_err'] / cold_err - 1.0, mb_info['reconstruction_err'] / cold_err - 1.0
+
+
+def test_incremental_nmf_unit_scale():
+    warm, minibatch = _relative_errors(1.0)
+    assert warm <= WARM_START_RTOL
+    assert minibatch <= MINIBATCH_RTOL
+
+
+def test_incremental_nmf_raw_counts():
+    """原始计数量级：新增样本的 NNLS 投影不能被清零（否则 MiniBatchNMF 拒绝全零的 W）"""
+    warm, minibatch = _relative_errors(1e3)
+    assert warm <= WARM_START_RTOL
+    assert minibatch <= MINIBATCH_RTOL
+
+
+if __name__ == "__main__":
+    for scale in (1.0, 1e3):
+        warm, minibatch = _relative_errors(scale)
+        print(f"scale={scale:g}: 热启动 {warm:+.4f}（容差 {WARM_START_RTOL}），小批量 {minibatch:+.4f}（容差 {MINIBATCH_RTOL}）")